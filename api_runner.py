@@ -0,0 +1,172 @@
+#!/usr/bin/env python3
+"""
+LeoConnect API Test Runner
+Runs tester sections concurrently while respecting their data dependencies
+"""
+
+import io
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, List, Sequence
+
+
+_local = threading.local()
+
+
+class _ThreadRoutedStdout:
+    """Stdout proxy that sends writes from a running task to that task's buffer"""
+
+    def __init__(self, stream):
+        self._stream = stream
+
+    def write(self, text):
+        buffer = getattr(_local, 'stdout', None)
+        return (buffer or self._stream).write(text)
+
+    def flush(self):
+        if getattr(_local, 'stdout', None) is None:
+            self._stream.flush()
+
+    def __getattr__(self, name):
+        return getattr(self._stream, name)
+
+
+class _ThreadRoutedResults(list):
+    """test_results stand-in that keeps each task's results in its own bucket"""
+
+    def append(self, item):
+        bucket = getattr(_local, 'results', None)
+        if bucket is None:
+            super().append(item)
+        else:
+            bucket.append(item)
+
+
+class TestTask:
+    """A tester section plus the sections whose return values it needs"""
+
+    def __init__(self, name: str, func: Callable[..., Any], depends_on: Sequence[str] = ()):
+        self.name = name
+        self.func = func
+        self.depends_on = tuple(depends_on)
+
+
+class TaskGraph:
+    """Ordered set of tasks; dependencies must be declared before their dependents"""
+
+    def __init__(self):
+        self.tasks: List[TestTask] = []
+        self._names: Dict[str, TestTask] = {}
+
+    def add(self, name: str, func: Callable[..., Any], depends_on: Sequence[str] = ()) -> 'TaskGraph':
+        """Register a task. func receives the return values of depends_on, in order"""
+        if name in self._names:
+            raise ValueError(f"Duplicate task: {name}")
+        for dep in depends_on:
+            if dep not in self._names:
+                raise ValueError(f"Task '{name}' depends on undeclared task '{dep}'")
+        task = TestTask(name, func, depends_on)
+        self.tasks.append(task)
+        self._names[name] = task
+        return self
+
+
+class ConcurrentRunner:
+    """
+    Executes a TaskGraph on a thread pool.
+
+    Each task's printed output and logged results are buffered and replayed in
+    declaration order, so the report reads exactly like a sequential run.
+    """
+
+    def __init__(self, tester, max_workers: int = 8):
+        self.tester = tester
+        self.max_workers = max(1, max_workers)
+        self.elapsed = 0.0
+
+    @contextmanager
+    def _task_context(self, stdout: io.StringIO, results: list):
+        _local.stdout = stdout
+        _local.results = results
+        try:
+            yield
+        finally:
+            _local.stdout = None
+            _local.results = None
+
+    def _execute(self, task: TestTask, args: List[Any], stdout: io.StringIO, results: list):
+        with self._task_context(stdout, results):
+            try:
+                return True, task.func(*args)
+            except Exception as e:
+                self.tester.log_test(task.name, False, f"Error: {type(e).__name__}: {e}")
+                return False, None
+
+    def run(self, graph: TaskGraph) -> Dict[str, Any]:
+        """Run every task and return {task name: return value}"""
+        tasks = graph.tasks
+        outputs = {t.name: io.StringIO() for t in tasks}
+        buckets: Dict[str, list] = {t.name: [] for t in tasks}
+        values: Dict[str, Any] = {}
+        succeeded: Dict[str, bool] = {}
+
+        original_results = self.tester.test_results
+        routed_results = _ThreadRoutedResults(original_results)
+        self.tester.test_results = routed_results
+        original_stdout = sys.stdout
+        sys.stdout = _ThreadRoutedStdout(original_stdout)
+
+        pending = list(tasks)
+        running = {}
+        replayed = 0
+        start = time.perf_counter()
+        try:
+            with ThreadPoolExecutor(max_workers=self.max_workers) as pool:
+                while pending or running:
+                    for task in list(pending):
+                        if not all(dep in succeeded for dep in task.depends_on):
+                            continue
+                        pending.remove(task)
+                        failed = [dep for dep in task.depends_on if not succeeded[dep]]
+                        if failed:
+                            with self._task_context(outputs[task.name], buckets[task.name]):
+                                self.tester.log_test(
+                                    task.name, False, f"Skipped: dependency {', '.join(failed)} failed"
+                                )
+                            succeeded[task.name] = False
+                            continue
+                        args = [values[dep] for dep in task.depends_on]
+                        future = pool.submit(self._execute, task, args, outputs[task.name], buckets[task.name])
+                        running[future] = task
+
+                    # Replay finished output in declaration order as soon as it is contiguous
+                    while replayed < len(tasks) and tasks[replayed].name in succeeded:
+                        original_stdout.write(outputs[tasks[replayed].name].getvalue())
+                        original_stdout.flush()
+                        replayed += 1
+
+                    if not running:
+                        continue
+                    done, _ = wait(running, return_when=FIRST_COMPLETED)
+                    for future in done:
+                        task = running.pop(future)
+                        ok, value = future.result()
+                        succeeded[task.name] = ok
+                        values[task.name] = value
+
+            while replayed < len(tasks):
+                original_stdout.write(outputs[tasks[replayed].name].getvalue())
+                replayed += 1
+        finally:
+            self.elapsed = time.perf_counter() - start
+            sys.stdout = original_stdout
+            merged = list(routed_results)
+            for task in tasks:
+                merged.extend(buckets[task.name])
+            original_results[:] = merged
+            self.tester.test_results = original_results
+
+        return values
@@ -0,0 +1,243 @@
+#!/usr/bin/env python3
+"""
+LeoConnect Benchmark History
+Appends every run's latency histograms to a JSON Lines store and flags p95 regressions between runs
+"""
+
+import argparse
+import json
+import math
+import os
+import subprocess
+from datetime import datetime
+from typing import Any, Dict, List, Optional, Tuple
+
+from colors import Colors
+from latency import LatencyHistogram, LatencyRecorder
+
+
+DEFAULT_HISTORY = 'benchmarks.jsonl'
+
+
+def git_revision() -> Dict[str, Any]:
+    """Commit of the working tree the run was made from, and whether it had local changes"""
+    here = os.path.dirname(os.path.abspath(__file__))
+    try:
+        commit = subprocess.run(['git', 'rev-parse', 'HEAD'], cwd=here, capture_output=True,
+                                text=True, timeout=10).stdout.strip()
+        dirty = bool(subprocess.run(['git', 'status', '--porcelain', '--untracked-files=no'], cwd=here,
+                                    capture_output=True, text=True, timeout=30).stdout.strip())
+    except (OSError, subprocess.SubprocessError):
+        return {'commit': None, 'dirty': None}
+    return {'commit': commit or None, 'dirty': dirty}
+
+
+def record_run(path: str, tool: str, base_url: str, recorder: LatencyRecorder,
+               wall_time: Optional[float] = None, label: Optional[str] = None,
+               extra: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+    """Append one run to the history file and return the stored record"""
+    now = datetime.now()
+    run = {
+        'id': now.strftime('%Y%m%d-%H%M%S-') + os.urandom(2).hex(),
+        'timestamp': now.isoformat(timespec='seconds'),
+        'tool': tool,
+        'label': label,
+        'base_url': base_url,
+        'git': git_revision(),
+        'wall_time': wall_time,
+        'latency': recorder.to_dict(),
+    }
+    if extra:
+        run.update(extra)
+    with open(path, 'a', encoding='utf-8') as f:
+        f.write(json.dumps(run, separators=(',', ':')) + '\n')
+    return run
+
+
+def load_runs(path: str, tool: Optional[str] = None, base_url: Optional[str] = None) -> List[Dict[str, Any]]:
+    """Runs in the order they were recorded; unreadable lines (e.g. a torn final write) are skipped"""
+    runs = []
+    if not os.path.exists(path):
+        return runs
+    with open(path, encoding='utf-8') as f:
+        for line in f:
+            try:
+                run = json.loads(line)
+            except ValueError:
+                continue
+            if (tool is None or run.get('tool') == tool) and (base_url is None or run.get('base_url') == base_url):
+                runs.append(run)
+    return runs
+
+
+def find_run(runs: List[Dict[str, Any]], ref: str) -> Dict[str, Any]:
+    """Resolve a negative index (-1 = latest), a run ID prefix, a label, or a git commit prefix"""
+    if not runs:
+        raise SystemExit("No benchmark runs recorded yet")
+    try:
+        index = int(ref)
+        if index < 0:
+            return runs[index]
+    except ValueError:
+        pass
+    except IndexError:
+        raise SystemExit(f"Only {len(runs)} runs recorded; '{ref}' is out of range")
+    for run in reversed(runs):
+        commit = (run.get('git') or {}).get('commit') or ''
+        if run['id'].startswith(ref) or run.get('label') == ref or (len(ref) >= 7 and commit.startswith(ref)):
+            return run
+    raise SystemExit(f"No run matches '{ref}'")
+
+
+def mann_whitney(baseline: LatencyHistogram, candidate: LatencyHistogram) -> Tuple[float, float]:
+    """
+    One-sided Mann-Whitney U test that candidate latencies are stochastically larger,
+    computed from histogram buckets (equal buckets count as ties). Returns (z, p).
+    """
+    n1, n2 = baseline.total_count, candidate.total_count
+    if not n1 or not n2:
+        return 0.0, 1.0
+    counts: Dict[int, List[int]] = {}
+    for value, count in baseline.buckets():
+        counts.setdefault(value, [0, 0])[0] += count
+    for value, count in candidate.buckets():
+        counts.setdefault(value, [0, 0])[1] += count
+
+    rank_sum = 0.0
+    below = 0
+    tie_term = 0
+    for value in sorted(counts):
+        a, b = counts[value]
+        tied = a + b
+        rank_sum += b * (below + (tied + 1) / 2)
+        tie_term += tied ** 3 - tied
+        below += tied
+
+    n = n1 + n2
+    u = rank_sum - n2 * (n2 + 1) / 2
+    mean = n1 * n2 / 2
+    variance = n1 * n2 / 12 * ((n + 1) - tie_term / (n * (n - 1))) if n > 1 else 0.0
+    if variance <= 0:
+        return 0.0, 1.0
+    z = (u - mean - 0.5) / math.sqrt(variance)
+    return z, 0.5 * math.erfc(z / math.sqrt(2))
+
+
+def compare_runs(baseline: Dict[str, Any], candidate: Dict[str, Any], threshold: float, alpha: float,
+                 min_count: int) -> Tuple[List[Dict[str, Any]], bool]:
+    """Per (endpoint, status class) p95 change and significance; regressed if any row crosses both bars"""
+    base = LatencyRecorder.from_dict(baseline['latency'])
+    new = LatencyRecorder.from_dict(candidate['latency'])
+    rows = []
+    regressed = False
+    for key in sorted(set(base.stats) | set(new.stats)):
+        row = {'endpoint': key[0], 'status': key[1], 'verdict': 'only in one run'}
+        if key in base.stats and key in new.stats:
+            a, b = base.stats[key].histogram, new.stats[key].histogram
+            p95_a, p95_b = a.percentile(95), b.percentile(95)
+            change = (p95_b - p95_a) / p95_a if p95_a else 0.0
+            z, p = mann_whitney(a, b)
+            row.update(count=(a.total_count, b.total_count), p95=(p95_a, p95_b), change=change, p=p)
+            if min(a.total_count, b.total_count) < min_count:
+                row['verdict'] = 'too few samples'
+            elif change > threshold and p < alpha:
+                row['verdict'] = 'REGRESSED'
+                regressed = True
+            elif change < -threshold and 1 - p < alpha:
+                row['verdict'] = 'improved'
+            else:
+                row['verdict'] = 'ok'
+        rows.append(row)
+    return rows, regressed
+
+
+def describe(run: Dict[str, Any]) -> str:
+    git = run.get('git') or {}
+    commit = (git.get('commit') or 'unknown')[:10] + ('+dirty' if git.get('dirty') else '')
+    label = f" [{run['label']}]" if run.get('label') else ''
+    return f"{run['id']}  {run['timestamp']}  {run['tool']:<18} {commit:<17} {run['base_url']}{label}"
+
+
+def add_history_arguments(parser):
+    """--history/--no-history/--label options for tools that save their runs"""
+    parser.add_argument('--history', default=DEFAULT_HISTORY, help="JSON Lines file runs are appended to")
+    parser.add_argument('--no-history', action='store_true', help="Do not save this run")
+    parser.add_argument('--label', help="Name for this run (usable as a compare reference)")
+
+
+def save_from_args(args, tool: str, recorder: LatencyRecorder, wall_time: Optional[float] = None,
+                   extra: Optional[Dict[str, Any]] = None):
+    if args.no_history or not recorder.total_count:
+        return None
+    # In-process stand-ins listen on a random port, so record them under one stable name
+    base_url = 'stand-in' if getattr(args, 'stand_in', False) else args.base_url
+    run = record_run(args.history, tool, base_url, recorder, wall_time, args.label, extra)
+    print(f"Saved run {run['id']} to {args.history}")
+    return run
+
+
+def print_comparison(baseline: Dict[str, Any], candidate: Dict[str, Any], rows: List[Dict[str, Any]]):
+    print(f"\n{Colors.BOLD}Baseline:  {describe(baseline)}{Colors.RESET}")
+    print(f"{Colors.BOLD}Candidate: {describe(candidate)}{Colors.RESET}\n")
+    print(f"{'Endpoint':<34}{'Status':>7}{'n base':>8}{'n new':>8}{'p95 base':>10}{'p95 new':>10}"
+          f"{'change':>9}{'p':>9}  Verdict")
+    for row in rows:
+        if 'p95' not in row:
+            print(f"{row['endpoint'][:33]:<34}{row['status']:>7}  {Colors.YELLOW}{row['verdict']}{Colors.RESET}")
+            continue
+        color = {'REGRESSED': Colors.RED, 'improved': Colors.GREEN}.get(row['verdict'], '')
+        print(f"{row['endpoint'][:33]:<34}{row['status']:>7}{row['count'][0]:>8}{row['count'][1]:>8}"
+              f"{row['p95'][0] / 1000:>10.1f}{row['p95'][1] / 1000:>10.1f}{row['change'] * 100:>+8.1f}%"
+              f"{row['p']:>9.3g}  {color}{row['verdict']}{Colors.RESET}")
+
+
+def main():
+    """Main function"""
+    parser = argparse.ArgumentParser(description="LeoConnect benchmark history")
+    parser.add_argument('--history', default=DEFAULT_HISTORY)
+    commands = parser.add_subparsers(dest='command', required=True)
+
+    listing = commands.add_parser('list', help="Show recorded runs")
+    listing.add_argument('--tool')
+    listing.add_argument('--limit', type=int, default=20)
+
+    compare = commands.add_parser('compare', help="Test a run against a baseline; exit 1 on p95 regression")
+    compare.add_argument('candidate', nargs='?', default='-1', help="Run to judge (default: latest)")
+    compare.add_argument('--baseline', help="Reference run (default: the previous run of the same tool and URL)")
+    compare.add_argument('--threshold', type=float, default=0.10,
+                         help="Relative p95 increase that counts as a regression (0.10 = 10%%)")
+    compare.add_argument('--alpha', type=float, default=0.05, help="Significance level of the Mann-Whitney test")
+    compare.add_argument('--min-count', type=int, default=20, help="Skip endpoints with fewer samples")
+    compare.add_argument('--tool', help="Only consider runs from this tool")
+    args = parser.parse_args()
+
+    if args.command == 'list':
+        runs = load_runs(args.history, tool=args.tool)
+        for run in runs[-args.limit:]:
+            print(describe(run))
+        if not runs:
+            print(f"No runs in {args.history}")
+        return
+
+    runs = load_runs(args.history, tool=args.tool)
+    candidate = find_run(runs, args.candidate)
+    if args.baseline:
+        baseline = find_run(runs, args.baseline)
+    else:
+        earlier = [r for r in runs[:runs.index(candidate)]
+                   if r['tool'] == candidate['tool'] and r['base_url'] == candidate['base_url']]
+        if not earlier:
+            raise SystemExit(f"No earlier {candidate['tool']} run against {candidate['base_url']} to compare with")
+        baseline = earlier[-1]
+
+    rows, regressed = compare_runs(baseline, candidate, args.threshold, args.alpha, args.min_count)
+    print_comparison(baseline, candidate, rows)
+    if regressed:
+        print(f"\n{Colors.RED}✗ p95 regressed by more than {args.threshold * 100:.0f}% "
+              f"(p < {args.alpha}){Colors.RESET}\n")
+        raise SystemExit(1)
+    print(f"\n{Colors.GREEN}✓ No significant p95 regression{Colors.RESET}\n")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,252 @@
+#!/usr/bin/env python3
+"""
+LeoConnect Capacity Search
+Raises concurrency on one endpoint (step ramp or AIMD) until p99 breaks the SLO or errors/429s rise
+"""
+
+import argparse
+import time
+from datetime import datetime
+from typing import List, Optional
+
+from bench_history import add_history_arguments, save_from_args
+from colors import Colors
+from http_pool import add_pool_arguments, configure_pool_from_args
+from latency import LatencyHistogram, LatencyRecorder
+from load_gen import ENDPOINTS, ClosedLoopGenerator, Endpoint
+from stub_server import add_stand_in_arguments, issue_test_token, start_stand_in
+
+
+class Step:
+    """Outcome of holding one concurrency level for a fixed time"""
+
+    def __init__(self, concurrency: int, recorder: LatencyRecorder, duration: float):
+        self.concurrency = concurrency
+        self.recorder = recorder
+        self.duration = duration
+        self.latency = LatencyHistogram(recorder.highest_trackable, recorder.significant_figures)
+        self.by_status = {}
+        for (_, status), stats in recorder.stats.items():
+            self.latency.merge(stats.histogram)
+            self.by_status[status] = self.by_status.get(status, 0) + stats.histogram.total_count
+        self.breaches: List[str] = []
+
+    @property
+    def requests(self) -> int:
+        return self.latency.total_count
+
+    @property
+    def throughput(self) -> float:
+        """Successful responses per second"""
+        return self.by_status.get('2xx', 0) / self.duration
+
+    def rate(self, *statuses: str) -> float:
+        return sum(self.by_status.get(s, 0) for s in statuses) / self.requests if self.requests else 0.0
+
+    @property
+    def error_rate(self) -> float:
+        # 429s are tracked separately; any other non-2xx or transport failure is an error
+        return max(0.0, 1.0 - self.rate('2xx') - self.rate_limited)
+
+    @property
+    def rate_limited(self) -> float:
+        return self.rate('429')
+
+    def p(self, q: float) -> float:
+        """Percentile in ms"""
+        return self.latency.percentile(q) / 1000
+
+    @property
+    def healthy(self) -> bool:
+        return not self.breaches
+
+
+class CapacitySearch:
+    """
+    Drives one endpoint with `concurrency` zero-think-time users per step.
+
+    'step' adds `increment` users after every healthy step and stops at the first
+    breach. 'aimd' does the same but, on a breach, cuts concurrency by `decrease`
+    and climbs again, stopping after `max_breaches` breaches so the knee is probed
+    from both sides.
+    """
+
+    def __init__(self, base_url: str, endpoint: Endpoint, slo_p99_ms: float, max_error_rate: float = 0.01,
+                 max_429_rate: float = 0.01, step_duration: float = 10.0, token: Optional[str] = None,
+                 seed: Optional[int] = None):
+        self.base_url = base_url
+        self.endpoint = endpoint
+        self.slo_p99_ms = slo_p99_ms
+        self.max_error_rate = max_error_rate
+        self.max_429_rate = max_429_rate
+        self.step_duration = step_duration
+        self.token = token
+        self.seed = seed
+        self.steps: List[Step] = []
+        self.recorder = LatencyRecorder()
+
+    def measure(self, concurrency: int) -> Step:
+        generator = ClosedLoopGenerator(self.base_url, [self.endpoint], users=concurrency, think_time=0,
+                                        token=self.token, seed=self.seed)
+        result = generator.run(self.step_duration)
+        step = Step(concurrency, result.recorder, result.duration)
+        self.recorder.merge(result.recorder)
+        if step.p(99) > self.slo_p99_ms:
+            step.breaches.append(f"p99 {step.p(99):.1f} ms > {self.slo_p99_ms:g} ms")
+        if step.error_rate > self.max_error_rate:
+            step.breaches.append(f"errors {step.error_rate * 100:.1f}%")
+        if step.rate_limited > self.max_429_rate:
+            step.breaches.append(f"429s {step.rate_limited * 100:.1f}%")
+        self.steps.append(step)
+        return step
+
+    def run(self, mode: str, start: int, increment: int, max_concurrency: int, decrease: float = 0.5,
+            max_breaches: int = 3, cooldown: float = 5.0, on_step=None) -> List[Step]:
+        concurrency = start
+        breaches = 0
+        while concurrency <= max_concurrency:
+            step = self.measure(concurrency)
+            if on_step:
+                on_step(step)
+            if step.healthy:
+                concurrency += increment
+                continue
+            breaches += 1
+            if mode == 'step' or breaches >= max_breaches:
+                break
+            concurrency = max(1, int(concurrency * decrease))
+            # Let rate-limit windows and queues drain so the next step is not charged for this one
+            time.sleep(cooldown)
+        return self.steps
+
+    @property
+    def best(self) -> Optional[Step]:
+        """Healthy step with the highest throughput: the maximum sustainable load"""
+        healthy = [s for s in self.steps if s.healthy]
+        return max(healthy, key=lambda s: s.throughput) if healthy else None
+
+    def knee(self, min_gain: float = 0.05) -> Optional[Step]:
+        """First concurrency after which adding users raised throughput by less than min_gain"""
+        ramp = sorted({s.concurrency: s for s in self.steps}.values(), key=lambda s: s.concurrency)
+        for previous, step in zip(ramp, ramp[1:]):
+            if previous.throughput and step.throughput < previous.throughput * (1 + min_gain):
+                return previous
+        return None
+
+    @property
+    def first_429(self) -> Optional[Step]:
+        limited = [s for s in self.steps if s.by_status.get('429')]
+        return min(limited, key=lambda s: s.concurrency) if limited else None
+
+
+def print_step(step: Step):
+    color = Colors.GREEN if step.healthy else Colors.RED
+    verdict = 'ok' if step.healthy else ', '.join(step.breaches)
+    print(f"  {step.concurrency:>6}{step.requests:>9}{step.throughput:>10.1f}{step.p(50):>9.1f}{step.p(99):>9.1f}"
+          f"{step.error_rate * 100:>8.1f}%{step.rate_limited * 100:>7.1f}%  {color}{verdict}{Colors.RESET}")
+
+
+def curve_bar(p99_ms: float, top_ms: float, slo_ms: float, width: int = 40) -> str:
+    """
+    One row of the p99 curve: width + 1 columns, '#' up to p99 and '|' at the SLO
+    (the SLO is at most `top_ms`, so it can sit in the last column).
+
+    >>> curve_bar(1, 500, 500, width=10)
+    '          |'
+    >>> curve_bar(600, 600, 500, width=10)
+    '########## '
+    >>> curve_bar(250, 500, 500, width=10)
+    '#####     |'
+    """
+    filled = min(int(p99_ms / top_ms * width), width)
+    bar = list('#' * filled + ' ' * (width + 1 - filled))
+    slo_col = min(int(slo_ms / top_ms * width), width)
+    if bar[slo_col] == ' ':
+        bar[slo_col] = '|'
+    return ''.join(bar)
+
+
+def print_curve(search: CapacitySearch, width: int = 40):
+    """Latency-vs-load curve, one row per concurrency level (the last measurement wins)"""
+    ramp = sorted({s.concurrency: s for s in search.steps}.values(), key=lambda s: s.concurrency)
+    if not ramp:
+        return
+    top = max(max(s.p(99) for s in ramp), search.slo_p99_ms)
+    print(f"\n{Colors.BOLD}p99 vs concurrency ('|' marks the SLO){Colors.RESET}")
+    for step in ramp:
+        bar = curve_bar(step.p(99), top, search.slo_p99_ms, width)
+        color = Colors.GREEN if step.healthy else Colors.RED
+        print(f"  {step.concurrency:>6} {color}{bar}{Colors.RESET} {step.p(99):>8.1f} ms "
+              f"{step.throughput:>9.1f} req/s")
+
+
+def main():
+    """Main function"""
+    parser = argparse.ArgumentParser(description="LeoConnect capacity search")
+    parser.add_argument('--base-url', default="https://leoconnect.rexosphere.com")
+    parser.add_argument('--token', help="Bearer token sent by every virtual user")
+    parser.add_argument('--endpoint', default='explore', choices=sorted(ENDPOINTS), help="Endpoint to saturate")
+    parser.add_argument('--controller', choices=('step', 'aimd'), default='step')
+    parser.add_argument('--slo-p99-ms', type=float, default=500, help="p99 latency objective")
+    parser.add_argument('--max-error-rate', type=float, default=0.01, help="Tolerated non-2xx/non-429 share")
+    parser.add_argument('--max-429-rate', type=float, default=0.01, help="Tolerated share of 429 responses")
+    parser.add_argument('--start', type=int, default=1, help="Initial concurrency")
+    parser.add_argument('--increment', type=int, default=4, help="Users added after a healthy step")
+    parser.add_argument('--decrease', type=float, default=0.5, help="AIMD multiplicative decrease on a breach")
+    parser.add_argument('--max-breaches', type=int, default=3, help="AIMD stops after this many breaches")
+    parser.add_argument('--cooldown', type=float, default=5, help="AIMD pause after a breach, in seconds")
+    parser.add_argument('--max-concurrency', type=int, default=256)
+    parser.add_argument('--step-duration', type=float, default=10, help="Seconds held at each level")
+    parser.add_argument('--seed', type=int)
+    add_pool_arguments(parser)
+    add_history_arguments(parser)
+    add_stand_in_arguments(parser)
+    args = parser.parse_args()
+    configure_pool_from_args(args, default_maxsize=args.max_concurrency)
+    start_stand_in(args)
+
+    endpoint = ENDPOINTS[args.endpoint]
+    if endpoint.auth and not args.token:
+        if not args.stand_in:
+            raise SystemExit(f"--endpoint {args.endpoint} needs --token; without one every request is a 401")
+        args.token = issue_test_token('capacity-search', 0)
+    print(f"\n{Colors.BOLD}LeoConnect Capacity Search ({args.controller}){Colors.RESET}")
+    print(f"{Colors.BOLD}Base URL: {args.base_url} | {endpoint.method} {endpoint.path} {endpoint.params or ''}"
+          f"{Colors.RESET}")
+    print(f"{Colors.BOLD}SLO: p99 <= {args.slo_p99_ms:g} ms, errors <= {args.max_error_rate * 100:g}%, "
+          f"429s <= {args.max_429_rate * 100:g}%{Colors.RESET}")
+    print(f"{Colors.BOLD}Started at: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}{Colors.RESET}\n")
+    print(f"  {'Users':>6}{'Reqs':>9}{'2xx/s':>10}{'p50':>9}{'p99':>9}{'errors':>9}{'429s':>8}  Verdict")
+
+    search = CapacitySearch(args.base_url, endpoint, args.slo_p99_ms, args.max_error_rate, args.max_429_rate,
+                            args.step_duration, token=args.token, seed=args.seed)
+    search.run(args.controller, args.start, args.increment, args.max_concurrency, args.decrease,
+               args.max_breaches, args.cooldown, on_step=print_step)
+    print_curve(search)
+
+    best, knee, limited = search.best, search.knee(), search.first_429
+    print()
+    if best is None:
+        print(f"{Colors.RED}✗ Even {args.start} user(s) breached the SLO{Colors.RESET}")
+    else:
+        print(f"{Colors.GREEN}Max sustainable throughput: {best.throughput:.1f} req/s at {best.concurrency} users "
+              f"(p99 {best.p(99):.1f} ms){Colors.RESET}")
+    if knee is not None:
+        print(f"Saturation knee: throughput stops growing past {knee.concurrency} users ({knee.throughput:.1f} req/s)")
+    if limited is not None:
+        print(f"Rate limiting starts by {limited.concurrency} users ({limited.rate_limited * 100:.1f}% 429s)")
+    if search.steps and search.steps[-1].healthy and search.steps[-1].concurrency + args.increment > \
+            args.max_concurrency:
+        print(f"{Colors.YELLOW}Reached --max-concurrency {args.max_concurrency} without breaching the SLO{Colors.RESET}")
+    print()
+    save_from_args(args, f'capacity_search:{args.endpoint}', search.recorder,
+                   sum(s.duration for s in search.steps),
+                   extra={'capacity': {'max_rps': best.throughput if best else 0.0,
+                                       'at_concurrency': best.concurrency if best else None,
+                                       'slo_p99_ms': args.slo_p99_ms}})
+    if best is None:
+        raise SystemExit(1)
+
+
+if __name__ == "__main__":
+    main()
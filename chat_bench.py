@@ -0,0 +1,350 @@
+#!/usr/bin/env python3
+"""
+LeoConnect Chat Benchmark
+Synthetic user pairs exchange encrypted messages; measures send, delivery, /conversations scaling and payload size cost
+"""
+
+import argparse
+import base64
+import random
+import statistics
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+import requests
+
+from bench_history import add_history_arguments, save_from_args
+from colors import Colors
+from http_pool import add_pool_arguments, configure_pool_from_args, mount_shared_pool
+from latency import LatencyHistogram, LatencyRecorder, TimedSession
+from stub_server import add_stand_in_arguments, start_stand_in
+
+
+# RSA-2048/PKCS#1 ciphertext as the app sends it: "ENC:" + 256 bytes in base64
+RSA_BLOCK_CHARS = len('ENC:') + 344
+
+
+def fake_public_key(rng: random.Random) -> str:
+    """PEM-shaped 2048-bit RSA SubjectPublicKeyInfo (294 bytes), like CryptoServiceImpl exports"""
+    encoded = base64.b64encode(rng.randbytes(294)).decode()
+    return f"-----BEGIN PUBLIC KEY-----\n{encoded}\n-----END PUBLIC KEY-----"
+
+
+def encrypted_content(size: int, rng: random.Random) -> str:
+    """'ENC:' + base64 ciphertext of roughly `size` characters"""
+    raw = max(1, (size - 4) * 3 // 4)
+    return 'ENC:' + base64.b64encode(rng.randbytes(raw)).decode()
+
+
+class ChatUser:
+    """One authenticated identity with its own timed session on the shared pool"""
+
+    def __init__(self, base_url: str, token: str, recorder: LatencyRecorder, timeout: float = 15):
+        self.base_url = base_url
+        self.timeout = timeout
+        self.uid: Optional[str] = None
+        self.session = mount_shared_pool(TimedSession(recorder))
+        self.session.headers.update({
+            'User-Agent': 'LeoConnect-Chat-Bench/1.0',
+            'Accept': 'application/json',
+            'Authorization': f'Bearer {token}'
+        })
+
+    def login(self) -> str:
+        response = self.session.get(f"{self.base_url}/users/me", timeout=self.timeout)
+        response.raise_for_status()
+        self.uid = response.json()['uid']
+        return self.uid
+
+    def publish_key(self, public_key: str) -> int:
+        """Status of PUT /users/me/public-key; 409 means a different key is already registered"""
+        response = self.session.put(f"{self.base_url}/users/me/public-key",
+                                    json={'publicKey': public_key}, timeout=self.timeout)
+        return response.status_code
+
+    def send(self, receiver: str, content: str) -> Optional[Dict[str, Any]]:
+        response = self.session.post(f"{self.base_url}/messages",
+                                     json={'receiverId': receiver, 'content': content}, timeout=self.timeout)
+        return response.json() if response.status_code in (200, 201) else None
+
+    def thread(self, other: str) -> Tuple[List[Dict[str, Any]], int]:
+        response = self.session.get(f"{self.base_url}/messages/{other}", timeout=self.timeout)
+        response.raise_for_status()
+        return response.json(), len(response.content)
+
+    def conversations(self) -> Tuple[List[Dict[str, Any]], int]:
+        response = self.session.get(f"{self.base_url}/conversations", timeout=self.timeout)
+        response.raise_for_status()
+        return response.json(), len(response.content)
+
+    def delete(self, message_id: str) -> int:
+        return self.session.delete(f"{self.base_url}/messages/{message_id}", timeout=self.timeout).status_code
+
+
+class ExchangeResult:
+    def __init__(self):
+        self.sent: Dict[str, float] = {}
+        self.seen: Dict[str, float] = {}
+        self.send_failures = 0
+        self.poll_errors = 0
+        self.largest_thread_bytes = 0
+        self.delivery = LatencyHistogram()
+
+    @property
+    def lost(self) -> int:
+        return sum(1 for message_id in self.sent if message_id not in self.seen)
+
+
+class ChatBenchmark:
+    def __init__(self, base_url: str, tokens: Iterable[str], recorder: LatencyRecorder, seed: int = 0):
+        self.base_url = base_url
+        self.recorder = recorder
+        self.rng = random.Random(seed)
+        self._tokens = iter(tokens)
+        self._lock = threading.Lock()
+
+    def new_user(self) -> ChatUser:
+        with self._lock:
+            token = next(self._tokens, None)
+        if token is None:
+            raise SystemExit("Ran out of identities; pass more tokens or use --stand-in")
+        user = ChatUser(self.base_url, token, self.recorder)
+        user.login()
+        return user
+
+    def users(self, count: int, workers: int = 16) -> List[ChatUser]:
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            return list(pool.map(lambda _: self.new_user(), range(count)))
+
+    def exchange(self, pairs: List[Tuple[ChatUser, ChatUser]], rate: float, duration: float,
+                 poll_interval: float, message_size: int, drain: float = 5.0) -> ExchangeResult:
+        """Open-loop sends at `rate` msg/s across all pairs while every recipient polls its thread"""
+        result = ExchangeResult()
+        stop_polling = threading.Event()
+
+        def poll(me: ChatUser, partner: ChatUser):
+            while not stop_polling.is_set():
+                try:
+                    thread, size = me.thread(partner.uid)
+                except (requests.exceptions.RequestException, ValueError):
+                    with self._lock:
+                        result.poll_errors += 1
+                    thread, size = [], 0
+                now = time.perf_counter()
+                with self._lock:
+                    result.largest_thread_bytes = max(result.largest_thread_bytes, size)
+                    for message in thread:
+                        if message.get('receiverId') == me.uid and message['id'] not in result.seen:
+                            result.seen[message['id']] = now
+                stop_polling.wait(poll_interval)
+
+        def send(sender: ChatUser, receiver: ChatUser, content: str):
+            start = time.perf_counter()
+            try:
+                message = sender.send(receiver.uid, content)
+            except requests.exceptions.RequestException:
+                message = None
+            with self._lock:
+                if message is None:
+                    result.send_failures += 1
+                else:
+                    result.sent[message['id']] = start
+
+        pollers = [threading.Thread(target=poll, args=(me, partner), daemon=True)
+                   for a, b in pairs for me, partner in ((a, b), (b, a))]
+        for poller in pollers:
+            poller.start()
+
+        contents = [encrypted_content(message_size, self.rng) for _ in range(16)]
+        with ThreadPoolExecutor(max_workers=max(4, len(pairs) * 2)) as pool:
+            start = time.perf_counter()
+            deadline = start + duration
+            next_send = start
+            index = 0
+            while next_send < deadline:
+                delay = next_send - time.perf_counter()
+                if delay > 0:
+                    time.sleep(delay)
+                a, b = pairs[index % len(pairs)]
+                sender, receiver = (a, b) if (index // len(pairs)) % 2 == 0 else (b, a)
+                pool.submit(send, sender, receiver, contents[index % len(contents)])
+                index += 1
+                next_send += 1 / rate
+
+        # Give pollers time to observe the last messages
+        drain_deadline = time.perf_counter() + drain
+        while time.perf_counter() < drain_deadline:
+            with self._lock:
+                if all(message_id in result.seen for message_id in result.sent):
+                    break
+            time.sleep(poll_interval)
+        stop_polling.set()
+        for poller in pollers:
+            poller.join()
+
+        for message_id, sent_at in result.sent.items():
+            seen_at = result.seen.get(message_id)
+            if seen_at is not None:
+                result.delivery.record_seconds(max(0.0, seen_at - sent_at))
+        return result
+
+    def conversation_scaling(self, checkpoints: List[int], repeats: int = 5) -> List[Tuple[int, float, int]]:
+        """(conversations, median GET /conversations seconds, response bytes) as one user's inbox grows"""
+        hub = self.new_user()
+        points = []
+        partners = 0
+        for target in sorted(checkpoints):
+            for partner in self.users(target - partners):
+                partner.send(hub.uid, encrypted_content(RSA_BLOCK_CHARS, self.rng))
+            partners = target
+            samples = []
+            size = 0
+            for _ in range(repeats):
+                start = time.perf_counter()
+                conversations, size = hub.conversations()
+                samples.append(time.perf_counter() - start)
+            points.append((len(conversations), statistics.median(samples), size))
+        return points
+
+    def payload_sizes(self, sizes: List[int], repeats: int = 5) -> List[Dict[str, Any]]:
+        """Send, fetch and delete one message of each size on an otherwise empty thread"""
+        sender, receiver = self.users(2)
+        rows = []
+        for size in sizes:
+            content = encrypted_content(size, self.rng)
+            timings = {'send': [], 'fetch': [], 'delete': []}
+            for _ in range(repeats):
+                start = time.perf_counter()
+                message = sender.send(receiver.uid, content)
+                timings['send'].append(time.perf_counter() - start)
+                if message is None:
+                    break
+                start = time.perf_counter()
+                receiver.thread(sender.uid)
+                timings['fetch'].append(time.perf_counter() - start)
+                start = time.perf_counter()
+                sender.delete(message['id'])
+                timings['delete'].append(time.perf_counter() - start)
+            rows.append({'size': len(content), **{k: statistics.median(v) if v else None
+                                                  for k, v in timings.items()}})
+        return rows
+
+
+def stand_in_tokens(tag: str):
+    """Unlimited fresh stand-in identities"""
+    index = 0
+    while True:
+        index += 1
+        yield f"test-token-chat-{tag}-{index:05d}"
+
+
+def print_exchange(result: ExchangeResult, pairs: int, rate: float, duration: float, poll_interval: float):
+    print(f"\n{Colors.BLUE}{'='*70}{Colors.RESET}")
+    print(f"{Colors.BOLD}Message exchange: {pairs} pairs, {rate:g} msg/s for {duration:g}s, "
+          f"poll every {poll_interval * 1000:.0f} ms{Colors.RESET}")
+    print(f"{Colors.BLUE}{'='*70}{Colors.RESET}\n")
+    h = result.delivery
+    print(f"  Sent: {len(result.sent)}  failed: {result.send_failures}  "
+          f"delivered: {h.total_count}  never seen: {result.lost}  poll errors: {result.poll_errors}")
+    if h.total_count:
+        print(f"  Delivery latency (ms): p50 {h.percentile(50) / 1000:.1f}  p90 {h.percentile(90) / 1000:.1f}  "
+              f"p99 {h.percentile(99) / 1000:.1f}  max {h.max_value / 1000:.1f}")
+        print(f"  {Colors.CYAN}Half the poll interval ({poll_interval * 500:.0f} ms) is expected polling delay"
+              f"{Colors.RESET}")
+    print(f"  Largest /messages/{{userId}} response: {result.largest_thread_bytes / 1024:.1f} KB")
+
+
+def print_scaling(points: List[Tuple[int, float, int]]):
+    print(f"\n{Colors.BLUE}{'='*70}{Colors.RESET}")
+    print(f"{Colors.BOLD}GET /conversations vs conversation count{Colors.RESET}")
+    print(f"{Colors.BLUE}{'='*70}{Colors.RESET}\n")
+    print(f"  {'Conversations':>13}{'Median ms':>12}{'KB':>10}")
+    for count, latency, size in points:
+        print(f"  {count:>13}{latency * 1000:>12.2f}{size / 1024:>10.1f}")
+    if len(points) >= 2 and len({c for c, _, _ in points}) >= 2:
+        slope, intercept = statistics.linear_regression([c for c, _, _ in points], [l * 1000 for _, l, _ in points])
+        print(f"\n  Fit: {intercept:.2f} ms + {slope * 100:.2f} ms per 100 conversations")
+
+
+def print_payloads(rows: List[Dict[str, Any]]):
+    print(f"\n{Colors.BLUE}{'='*70}{Colors.RESET}")
+    print(f"{Colors.BOLD}Encrypted payload size{Colors.RESET}")
+    print(f"{Colors.BLUE}{'='*70}{Colors.RESET}\n")
+    print(f"  {'Chars':>10}{'Send ms':>10}{'Fetch ms':>10}{'Delete ms':>11}")
+    for row in rows:
+        cells = ''.join(f"{row[k] * 1000:>10.2f}" if row[k] is not None else f"{'failed':>10}"
+                        for k in ('send', 'fetch'))
+        delete = f"{row['delete'] * 1000:>11.2f}" if row['delete'] is not None else f"{'-':>11}"
+        print(f"  {row['size']:>10}{cells}{delete}")
+
+
+def main():
+    """Main function"""
+    parser = argparse.ArgumentParser(description="LeoConnect chat benchmark")
+    parser.add_argument('--base-url', default="https://leoconnect.rexosphere.com")
+    parser.add_argument('--tokens-file', help="One bearer token per line (required against a real backend)")
+    parser.add_argument('--pairs', type=int, default=10, help="User pairs exchanging messages")
+    parser.add_argument('--rate', type=float, default=20, help="Total messages per second")
+    parser.add_argument('--duration', type=float, default=20, help="Exchange length in seconds")
+    parser.add_argument('--poll-interval', type=float, default=0.25, help="Recipient poll period in seconds")
+    parser.add_argument('--message-size', type=int, default=RSA_BLOCK_CHARS,
+                        help="Characters per exchanged message (default: one RSA block)")
+    parser.add_argument('--conversations', default='1,10,25,50,100',
+                        help="Inbox sizes at which GET /conversations is timed (0 to skip)")
+    parser.add_argument('--payload-sizes', default=f'{RSA_BLOCK_CHARS},4096,65536,262144',
+                        help="Message sizes for the payload test (0 to skip)")
+    parser.add_argument('--seed', type=int, default=0)
+    add_pool_arguments(parser)
+    add_history_arguments(parser)
+    add_stand_in_arguments(parser)
+    args = parser.parse_args()
+    configure_pool_from_args(args, default_maxsize=args.pairs * 4)
+    start_stand_in(args)
+
+    if args.tokens_file:
+        with open(args.tokens_file) as f:
+            tokens = [line.strip() for line in f if line.strip()]
+    elif args.stand_in:
+        tokens = stand_in_tokens(f"{random.getrandbits(24):06x}")
+    else:
+        raise SystemExit("Pass --tokens-file with one token per synthetic user, or use --stand-in")
+
+    print(f"\n{Colors.BOLD}LeoConnect Chat Benchmark{Colors.RESET}")
+    print(f"{Colors.BOLD}Base URL: {args.base_url}{Colors.RESET}")
+    print(f"{Colors.BOLD}Started at: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}{Colors.RESET}")
+
+    recorder = LatencyRecorder()
+    bench = ChatBenchmark(args.base_url, tokens, recorder, seed=args.seed)
+    started = time.perf_counter()
+
+    people = bench.users(args.pairs * 2)
+    key_conflicts = sum(1 for user in people if user.publish_key(fake_public_key(bench.rng)) == 409)
+    if key_conflicts:
+        print(f"{Colors.YELLOW}{key_conflicts} identities already had a different public key (409){Colors.RESET}")
+    pairs = list(zip(people[::2], people[1::2]))
+    exchange = bench.exchange(pairs, args.rate, args.duration, args.poll_interval, args.message_size)
+    print_exchange(exchange, len(pairs), args.rate, args.duration, args.poll_interval)
+
+    checkpoints = [int(c) for c in args.conversations.split(',') if int(c) > 0]
+    if checkpoints:
+        print_scaling(bench.conversation_scaling(checkpoints))
+    sizes = [int(s) for s in args.payload_sizes.split(',') if int(s) > 0]
+    if sizes:
+        print_payloads(bench.payload_sizes(sizes))
+
+    wall_time = time.perf_counter() - started
+    print(f"\n{Colors.CYAN}Latency by endpoint (ms):{Colors.RESET}")
+    for line in recorder.report_lines(wall_time):
+        print(f"  {line}")
+    print()
+    save_from_args(args, 'chat_bench', recorder, wall_time,
+                   extra={'delivered': exchange.delivery.total_count, 'lost': exchange.lost,
+                          'delivery_ms': {f"p{q}": exchange.delivery.percentile(q) / 1000 for q in (50, 90, 99)}})
+    raise SystemExit(1 if exchange.lost or exchange.send_failures else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,261 @@
+#!/usr/bin/env python3
+"""
+LeoConnect Cold Start Profiler
+Sends requests after controlled idle gaps, separates first-request from warm latency per route and fits the idle threshold
+"""
+
+import argparse
+import random
+import statistics
+import time
+from datetime import datetime, timedelta
+from typing import Dict, List, Optional, Tuple
+
+import requests
+
+from bench_history import add_history_arguments, save_from_args
+from colors import Colors
+from http_pool import add_pool_arguments, configure_pool_from_args, mount_shared_pool, shared_adapter
+from latency import LatencyHistogram, LatencyRecorder, status_class
+from stub_server import add_stand_in_arguments, start_stand_in
+
+DEFAULT_ROUTES = ['/', '/districts', '/explore?limit=10']
+DEFAULT_GAPS = '5s,15s,30s,1m,2m,5m,10m,15m,20m'
+
+
+def parse_gap(text: str) -> float:
+    """'90', '90s', '5m' or '1h' in seconds"""
+    text = text.strip().lower()
+    scale = {'s': 1, 'm': 60, 'h': 3600}.get(text[-1:])
+    return float(text[:-1]) * scale if scale else float(text)
+
+
+def format_gap(seconds: float) -> str:
+    if seconds >= 3600 and seconds % 3600 == 0:
+        return f"{seconds / 3600:g}h"
+    if seconds >= 60 and seconds % 60 == 0:
+        return f"{seconds / 60:g}m"
+    return f"{seconds:g}s"
+
+
+class Sample:
+    """One request: the first after an idle gap (`first`) or a warm one right after it"""
+
+    def __init__(self, route: str, gap: float, first: bool, status: Optional[int], total: float,
+                 connect: float, server: float):
+        self.route = route
+        self.gap = gap
+        self.first = first
+        self.status = status
+        self.total = total
+        self.connect = connect  # dns + connect + tls; 0 on a kept-alive connection
+        self.server = server    # request sent -> headers: server time plus one network round trip
+        self.cold = False
+
+
+class IdleProfiler:
+    """
+    Each probe sleeps for one idle gap with no traffic from this process, then
+    sends one route (the leader, rotating so every route gets its turn first),
+    then every other route once and `warm` more rounds. By default the pooled
+    connections are closed before the leader, as when a user reopens the app.
+    Other clients of a shared backend keep it warm, so the threshold only shows
+    when nobody else is using it.
+    """
+
+    def __init__(self, base_url: str, routes: List[str], token: Optional[str] = None, warm: int = 3,
+                 fresh_connections: bool = True, timeout: float = 60):
+        self.base_url = base_url
+        self.routes = routes
+        self.warm = warm
+        self.fresh_connections = fresh_connections
+        self.timeout = timeout
+        self.recorder = LatencyRecorder()
+        self.samples: List[Sample] = []
+        self.session = mount_shared_pool(requests.Session())
+        self.session.headers.update({'User-Agent': 'LeoConnect-Cold-Start/1.0', 'Accept': 'application/json'})
+        if token:
+            self.session.headers.update({'Authorization': f'Bearer {token}'})
+
+    def _send(self, route: str, gap: float, first: bool) -> Sample:
+        start = time.perf_counter()
+        status = None
+        timing = None
+        try:
+            response = self.session.get(f"{self.base_url}{route}", timeout=self.timeout)
+            status = response.status_code
+            timing = getattr(response, 'timing', None)
+        except requests.exceptions.RequestException:
+            pass
+        end = time.perf_counter()
+        connect = server = 0.0
+        if timing is not None:
+            connect = (timing.dns or 0) + (timing.connect or 0) + (timing.tls or 0)
+            server = timing.ttfb or 0.0
+        sample = Sample(route, gap, first, status, end - start, connect, server)
+        self.recorder.record(f"GET {route.split('?')[0]}", 'first' if first and status else status_class(status),
+                             start, end)
+        self.samples.append(sample)
+        return sample
+
+    def warm_up(self):
+        for route in self.routes:
+            for _ in range(self.warm):
+                self._send(route, 0.0, False)
+
+    def probe(self, gap: float, leader: str) -> Sample:
+        time.sleep(gap)
+        if self.fresh_connections:
+            shared_adapter().close()
+        lead = self._send(leader, gap, True)
+        for round_index in range(max(self.warm, 1)):
+            for route in self.routes:
+                if route != leader or round_index > 0:
+                    self._send(route, gap, False)
+        return lead
+
+    def warm_server(self, route: str) -> LatencyHistogram:
+        histogram = LatencyHistogram()
+        for sample in self.samples:
+            if sample.route == route and not sample.first and sample.status is not None:
+                histogram.record_seconds(sample.server)
+        return histogram
+
+    def classify(self, factor: float, min_extra_ms: float) -> Dict[str, float]:
+        """Mark first requests whose server time is well above that route's warm p50; returns the warm p50s (s)"""
+        warm_p50 = {route: self.warm_server(route).percentile(50) / 1_000_000 for route in self.routes}
+        for sample in self.firsts:
+            base = warm_p50.get(sample.route, 0.0)
+            sample.cold = sample.server > base * factor and sample.server - base > min_extra_ms / 1000
+        return warm_p50
+
+    @property
+    def firsts(self) -> List[Sample]:
+        return [sample for sample in self.samples if sample.first and sample.status is not None]
+
+
+def fit_threshold(samples: List[Sample]) -> Tuple[Optional[float], Optional[float], int]:
+    """
+    Step fit of cold vs idle gap: (longest gap counted warm, shortest gap counted
+    cold, misclassified samples). None on a side means no gap fell there.
+    """
+    gaps = sorted({sample.gap for sample in samples})
+    best = (None, None, len(samples) + 1)
+    # Candidate k: gaps[:k] are expected warm, gaps[k:] cold
+    for k in range(len(gaps) + 1):
+        cut = gaps[k] if k < len(gaps) else float('inf')
+        errors = sum(1 for sample in samples if sample.cold != (sample.gap >= cut))
+        if errors < best[2]:
+            best = (gaps[k - 1] if k > 0 else None, gaps[k] if k < len(gaps) else None, errors)
+    return best
+
+
+def _ms(seconds: float) -> str:
+    return f"{seconds * 1000:.1f}"
+
+
+def print_report(profiler: IdleProfiler, warm_p50: Dict[str, float], wall_time: float):
+    print(f"\n{Colors.BOLD}First request after idle (ms){Colors.RESET}")
+    print(f"{'Route':<24}{'Gap':>6}{'n':>4}{'first':>9}{'connect':>9}{'server':>9}{'x warm':>8}{'cold':>7}")
+    for route in profiler.routes:
+        by_gap: Dict[float, List[Sample]] = {}
+        for sample in profiler.firsts:
+            if sample.route == route:
+                by_gap.setdefault(sample.gap, []).append(sample)
+        for gap in sorted(by_gap):
+            group = by_gap[gap]
+            server = statistics.median(s.server for s in group)
+            ratio = server / warm_p50[route] if warm_p50.get(route) else 0.0
+            cold = sum(1 for s in group if s.cold)
+            color = Colors.RED if cold * 2 > len(group) else ''
+            print(f"{color}{route:<24}{format_gap(gap):>6}{len(group):>4}"
+                  f"{_ms(statistics.median(s.total for s in group)):>9}"
+                  f"{_ms(statistics.median(s.connect for s in group)):>9}{_ms(server):>9}"
+                  f"{ratio:>7.1f}x{cold:>5}/{len(group)}{Colors.RESET if color else ''}")
+
+    print(f"\n{Colors.BOLD}Warm latency (ms){Colors.RESET}")
+    print(f"{'Route':<24}{'n':>6}{'server p50':>12}{'p99':>9}")
+    for route in profiler.routes:
+        histogram = profiler.warm_server(route)
+        print(f"{route:<24}{histogram.total_count:>6}{histogram.percentile(50) / 1000:>12.1f}"
+              f"{histogram.percentile(99) / 1000:>9.1f}")
+
+    firsts = profiler.firsts
+    warm_below, cold_from, errors = fit_threshold(firsts)
+    cold = [s for s in firsts if s.cold]
+    print(f"\n{Colors.BOLD}Idle threshold{Colors.RESET}")
+    if not cold:
+        longest = format_gap(max(s.gap for s in firsts)) if firsts else '-'
+        print(f"  {Colors.GREEN}No cold starts after idle gaps up to {longest}{Colors.RESET}")
+    elif warm_below is None:
+        print(f"  {Colors.RED}Cold after every gap tried; the threshold is below {format_gap(cold_from)}{Colors.RESET}")
+    else:
+        edge = f"between {format_gap(warm_below)} and {format_gap(cold_from)}" if cold_from is not None \
+            else f"longer than {format_gap(warm_below)}"
+        print(f"  {Colors.YELLOW}Cold starts begin once idle for {edge}{Colors.RESET} "
+              f"({errors}/{len(firsts)} probes disagree with that step)")
+    if cold:
+        penalty = statistics.median(s.server - warm_p50.get(s.route, 0.0) for s in cold)
+        print(f"  Cold penalty: +{_ms(penalty)} ms server time (median over {len(cold)} cold first requests)")
+    print(f"\nProfiled for {timedelta(seconds=round(wall_time))}\n")
+
+
+def main():
+    """Main function"""
+    parser = argparse.ArgumentParser(description="LeoConnect cold-start and idle-gap latency profiler")
+    parser.add_argument('--base-url', default="https://leoconnect.rexosphere.com")
+    parser.add_argument('--token', help="Bearer token (adds /feed to the default routes)")
+    parser.add_argument('--routes', help=f"Comma-separated GET paths (default {','.join(DEFAULT_ROUTES)})")
+    parser.add_argument('--gaps', default=DEFAULT_GAPS, help="Comma-separated idle gaps, e.g. 30s,5m,20m")
+    parser.add_argument('--rounds', type=int, default=2, help="Times each gap is probed")
+    parser.add_argument('--warm', type=int, default=3, help="Warm rounds over every route after each probe")
+    parser.add_argument('--keep-connections', action='store_true',
+                        help="Reuse pooled connections across gaps instead of reconnecting like a reopened app")
+    parser.add_argument('--cold-factor', type=float, default=2.0,
+                        help="A first request is cold when its server time exceeds this many warm p50s")
+    parser.add_argument('--min-cold-ms', type=float, default=50, help="...and exceeds the warm p50 by this much")
+    parser.add_argument('--seed', type=int)
+    add_pool_arguments(parser)
+    add_history_arguments(parser)
+    add_stand_in_arguments(parser)
+    args = parser.parse_args()
+    configure_pool_from_args(args)
+    start_stand_in(args)
+
+    routes = args.routes.split(',') if args.routes else DEFAULT_ROUTES + (['/feed?limit=10'] if args.token else [])
+    gaps = [parse_gap(gap) for gap in args.gaps.split(',')]
+    rng = random.Random(args.seed)
+    # Shuffled per round so slow drift in the backend does not line up with gap length
+    schedule = []
+    for _ in range(args.rounds):
+        schedule.extend(rng.sample(gaps, len(gaps)))
+    planned = sum(schedule)
+
+    print(f"\n{Colors.BOLD}LeoConnect Cold Start Profiler{Colors.RESET}")
+    print(f"{Colors.BOLD}Base URL: {args.base_url} | {len(schedule)} probes over {len(routes)} routes, "
+          f"about {timedelta(seconds=round(planned))} of idle{Colors.RESET}")
+    print(f"{Colors.BOLD}Started at: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')} (done around "
+          f"{(datetime.now() + timedelta(seconds=planned)).strftime('%H:%M')}){Colors.RESET}\n")
+
+    profiler = IdleProfiler(args.base_url, routes, args.token, args.warm, not args.keep_connections)
+    started = time.perf_counter()
+    profiler.warm_up()
+    for index, gap in enumerate(schedule):
+        leader = routes[index % len(routes)]
+        lead = profiler.probe(gap, leader)
+        print(f"  [{index + 1}/{len(schedule)}] idle {format_gap(gap):>5} -> GET {leader}: "
+              f"{_ms(lead.total)} ms (server {_ms(lead.server)}, connect {_ms(lead.connect)})"
+              f"{'' if lead.status else f' {Colors.RED}failed{Colors.RESET}'}")
+    wall_time = time.perf_counter() - started
+
+    warm_p50 = profiler.classify(args.cold_factor, args.min_cold_ms)
+    print_report(profiler, warm_p50, wall_time)
+    warm_below, cold_from, _ = fit_threshold(profiler.firsts)
+    save_from_args(args, 'cold_start', profiler.recorder, wall_time,
+                   extra={'gaps': [format_gap(g) for g in gaps], 'rounds': args.rounds,
+                          'threshold': {'warm_below': warm_below, 'cold_from': cold_from},
+                          'cold_probes': sum(1 for s in profiler.firsts if s.cold)})
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,16 @@
+#!/usr/bin/env python3
+"""
+LeoConnect Terminal Colors
+ANSI color codes shared by the testers and benchmark tools; imports nothing so any module can use it
+"""
+
+
+class Colors:
+    """ANSI color codes for terminal output"""
+    GREEN = '\033[92m'
+    RED = '\033[91m'
+    YELLOW = '\033[93m'
+    BLUE = '\033[94m'
+    CYAN = '\033[96m'
+    RESET = '\033[0m'
+    BOLD = '\033[1m'
@@ -0,0 +1,208 @@
+#!/usr/bin/env python3
+"""
+LeoConnect Compression Probe
+Requests every read endpoint with each Accept-Encoding and reports wire size, ratio and latency
+"""
+
+import argparse
+import json
+import statistics
+import time
+import zlib
+from datetime import datetime
+from typing import Dict, List, Optional
+
+import requests
+
+from colors import Colors
+from http_pool import mount_shared_pool
+from stub_server import add_stand_in_arguments, start_stand_in
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+
+ENCODINGS = ['identity', 'gzip', 'deflate', 'br']
+
+# Read routes the app calls; auth routes are skipped without a token
+PROBE_ROUTES = [
+    ('/', {}, False),
+    ('/feed', {'limit': 10}, True),
+    ('/explore', {'limit': 10}, False),
+    ('/districts', {}, False),
+    ('/clubs', {'district': '306 A1'}, False),
+    ('/search', {'q': 'leo'}, False),
+    ('/search/users', {'q': 'a'}, False),
+    ('/events', {'limit': 10}, False),
+    ('/users/me', {}, True),
+    ('/conversations', {}, True),
+    ('/notifications', {'limit': 20}, True),
+]
+
+
+def decode_body(raw: bytes, encoding: str) -> Optional[bytes]:
+    """Undo a Content-Encoding; None when it cannot be decoded here"""
+    encoding = encoding.lower()
+    try:
+        if encoding in ('', 'identity'):
+            return raw
+        if encoding == 'gzip':
+            return zlib.decompress(raw, 31)
+        if encoding == 'deflate':
+            try:
+                return zlib.decompress(raw)
+            except zlib.error:
+                return zlib.decompress(raw, -15)
+        if encoding == 'br' and brotli is not None:
+            return brotli.decompress(raw)
+    except Exception:
+        return None
+    return None
+
+
+class ProbeSample:
+    def __init__(self, route: str, requested: str):
+        self.route = route
+        self.requested = requested
+        self.served = ''
+        self.status: Optional[int] = None
+        self.content_type = ''
+        self.vary = ''
+        self.wire_bytes = 0
+        self.body_bytes: Optional[int] = None
+        self.latencies: List[float] = []
+        self.is_json: Optional[bool] = None
+        self.error: Optional[str] = None
+
+    @property
+    def latency(self) -> float:
+        return statistics.median(self.latencies) if self.latencies else 0.0
+
+    @property
+    def ratio(self) -> Optional[float]:
+        if self.body_bytes is None or not self.wire_bytes:
+            return None
+        return self.body_bytes / self.wire_bytes
+
+
+class CompressionProbe:
+    def __init__(self, base_url: str, token: Optional[str] = None, repeats: int = 3, timeout: float = 15):
+        self.base_url = base_url
+        self.token = token
+        self.repeats = repeats
+        self.timeout = timeout
+        self.session = mount_shared_pool(requests.Session())
+        self.session.headers.update({
+            'User-Agent': 'LeoConnect-Compression-Probe/1.0',
+            'Accept': 'application/json'
+        })
+        if token:
+            self.session.headers.update({'Authorization': f'Bearer {token}'})
+
+    def probe(self, path: str, params: Dict, encoding: str) -> ProbeSample:
+        sample = ProbeSample(path, encoding)
+        for _ in range(self.repeats):
+            start = time.perf_counter()
+            try:
+                with self.session.get(f"{self.base_url}{path}", params=params, stream=True,
+                                      headers={'Accept-Encoding': encoding}, timeout=self.timeout) as response:
+                    raw = response.raw.read(decode_content=False)
+                    sample.latencies.append(time.perf_counter() - start)
+            except requests.exceptions.RequestException as e:
+                sample.error = str(e)
+                return sample
+            sample.status = response.status_code
+            sample.served = response.headers.get('Content-Encoding', 'identity')
+            sample.content_type = response.headers.get('Content-Type', '')
+            sample.vary = response.headers.get('Vary', '')
+            sample.wire_bytes = len(raw)
+        body = decode_body(raw, sample.served)
+        if body is not None:
+            sample.body_bytes = len(body)
+            try:
+                json.loads(body)
+                sample.is_json = True
+            except ValueError:
+                sample.is_json = False
+        return sample
+
+
+def analyze(samples: Dict[str, Dict[str, ProbeSample]], budget_kb: float, min_bytes: int) -> List[str]:
+    """Findings per route: ignored compression, wrong Content-Type, missing Vary, byte budget"""
+    findings = []
+    for route, by_encoding in samples.items():
+        identity = by_encoding.get('identity')
+        if identity is None or identity.error or identity.status is None:
+            continue
+        size = identity.body_bytes or identity.wire_bytes
+        if identity.is_json and 'application/json' not in identity.content_type.lower():
+            findings.append(f"{route}: JSON served as '{identity.content_type or 'no Content-Type'}'")
+        compressible = size >= min_bytes
+        served = {s.served.lower() for s in by_encoding.values() if not s.error}
+        if compressible and served <= {'identity', ''}:
+            findings.append(f"{route}: ignores compression ({size / 1024:.1f} KB always sent as identity)")
+        for sample in by_encoding.values():
+            if sample.served.lower() not in ('identity', '') and 'accept-encoding' not in sample.vary.lower():
+                findings.append(f"{route}: {sample.served} response without 'Vary: Accept-Encoding'")
+                break
+        best = min((s.wire_bytes for s in by_encoding.values() if not s.error and s.wire_bytes), default=0)
+        if budget_kb and best > budget_kb * 1024:
+            findings.append(f"{route}: {best / 1024:.1f} KB on the wire exceeds the {budget_kb:.0f} KB budget")
+    return findings
+
+
+def main():
+    """Main function"""
+    parser = argparse.ArgumentParser(description="LeoConnect compression negotiation probe")
+    parser.add_argument('--base-url', default="https://leoconnect.rexosphere.com")
+    parser.add_argument('--token', help="Bearer token; authenticated routes are skipped without one")
+    parser.add_argument('--repeats', type=int, default=3, help="Requests per route and encoding (median latency)")
+    parser.add_argument('--budget-kb', type=float, default=50, help="Per-endpoint wire-size budget (0 disables)")
+    parser.add_argument('--min-bytes', type=int, default=1024,
+                        help="Bodies smaller than this are not expected to be compressed")
+    add_stand_in_arguments(parser)
+    args = parser.parse_args()
+    start_stand_in(args)
+
+    print(f"\n{Colors.BOLD}LeoConnect Compression Probe{Colors.RESET}")
+    print(f"{Colors.BOLD}Base URL: {args.base_url}{Colors.RESET}")
+    print(f"{Colors.BOLD}Started at: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}{Colors.RESET}")
+    if brotli is None:
+        print(f"{Colors.YELLOW}brotli not installed: br bodies are measured but not decoded{Colors.RESET}")
+
+    probe = CompressionProbe(args.base_url, token=args.token, repeats=args.repeats)
+    samples: Dict[str, Dict[str, ProbeSample]] = {}
+    for path, params, needs_auth in PROBE_ROUTES:
+        if needs_auth and not args.token:
+            continue
+        samples[path] = {encoding: probe.probe(path, params, encoding) for encoding in ENCODINGS}
+
+    print(f"\n{Colors.BLUE}{'='*92}{Colors.RESET}")
+    print(f"{'Route':<16}{'Asked':<10}{'Served':<10}{'Status':>7}{'Wire B':>10}{'Body B':>10}"
+          f"{'Ratio':>7}{'ms':>9}{'Δ ms':>9}")
+    print(f"{Colors.BLUE}{'='*92}{Colors.RESET}")
+    for route, by_encoding in samples.items():
+        baseline = by_encoding['identity'].latency
+        for encoding, s in by_encoding.items():
+            if s.error:
+                print(f"{route:<16}{encoding:<10}{Colors.RED}{s.error[:60]}{Colors.RESET}")
+                continue
+            ratio = f"{s.ratio:.2f}" if s.ratio else 'n/a'
+            body = s.body_bytes if s.body_bytes is not None else 'n/a'
+            print(f"{route:<16}{encoding:<10}{s.served:<10}{s.status:>7}{s.wire_bytes:>10}{body:>10}"
+                  f"{ratio:>7}{s.latency * 1000:>9.1f}{(s.latency - baseline) * 1000:>+9.1f}")
+
+    findings = analyze(samples, args.budget_kb, args.min_bytes)
+    print(f"\n{Colors.BOLD}Findings{Colors.RESET}")
+    if not findings:
+        print(f"  {Colors.GREEN}✓ Every route negotiates compression and stays within budget{Colors.RESET}")
+    for finding in findings:
+        print(f"  {Colors.RED}✗ {finding}{Colors.RESET}")
+    print()
+    raise SystemExit(1 if findings else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,306 @@
+#!/usr/bin/env python3
+"""
+LeoConnect Feed Streaming Profiler
+Parses /feed and /explore item by item and accounts for wire bytes, TTFB/TTLB and image payload share
+"""
+
+import argparse
+import codecs
+import json
+import re
+import time
+import tracemalloc
+from datetime import datetime
+from typing import Any, Dict, Iterable, Iterator, List, Optional
+
+import requests
+
+from colors import Colors
+from http_pool import mount_shared_pool
+from stub_server import add_stand_in_arguments, start_stand_in
+
+
+# Post fields that carry images (URLs or base64 bytes rendered by Base64Image)
+IMAGE_FIELDS = ('images', 'imageUrl', 'imageBytes', 'authorLogo', 'photoURL', 'logoUrl', 'coverImageUrl')
+_BASE64_RUN = re.compile(r'^[A-Za-z0-9+/=\s]{1024,}$')
+
+_decoder = json.JSONDecoder()
+_WHITESPACE = ' \t\n\r'
+
+
+class StreamParseError(ValueError):
+    pass
+
+
+def _decoded_chunks(chunks: Iterable[bytes]) -> Iterator[str]:
+    decoder = codecs.getincrementaldecoder('utf-8')()
+    for chunk in chunks:
+        text = decoder.decode(chunk)
+        if text:
+            yield text
+    tail = decoder.decode(b'', final=True)
+    if tail:
+        yield tail
+
+
+class _Buffer:
+    """Text window over a chunk stream; consumed text is dropped so memory stays bounded"""
+
+    def __init__(self, chunks: Iterable[str]):
+        self._chunks = iter(chunks)
+        self.text = ''
+        self.pos = 0
+        self.exhausted = False
+        self.peak = 0
+
+    def fill(self) -> bool:
+        if self.exhausted:
+            return False
+        try:
+            chunk = next(self._chunks)
+        except StopIteration:
+            self.exhausted = True
+            return False
+        self.text = self.text[self.pos:] + chunk
+        self.pos = 0
+        self.peak = max(self.peak, len(self.text))
+        return True
+
+    def peek(self, skip: str = _WHITESPACE) -> Optional[str]:
+        """Next significant character (skipping `skip`), or None at end of stream"""
+        while True:
+            while self.pos < len(self.text) and self.text[self.pos] in skip:
+                self.pos += 1
+            if self.pos < len(self.text):
+                return self.text[self.pos]
+            if not self.fill():
+                return None
+
+    def expect(self, char: str):
+        if self.peek() != char:
+            raise StreamParseError(f"Expected '{char}' in JSON stream")
+        self.pos += 1
+
+    def value(self):
+        """Decode one complete JSON value at the cursor, reading more chunks as needed"""
+        self.peek()
+        while True:
+            try:
+                value, end = _decoder.raw_decode(self.text, self.pos)
+                # A number or literal ending exactly at the buffer edge may continue in the next chunk
+                if end < len(self.text) or self.exhausted or isinstance(value, (dict, list, str)):
+                    span = self.text[self.pos:end]
+                    self.pos = end
+                    return value, span
+            except json.JSONDecodeError:
+                if self.exhausted:
+                    raise StreamParseError("Truncated JSON stream")
+            if not self.fill():
+                if self.exhausted and self.pos >= len(self.text):
+                    raise StreamParseError("Truncated JSON stream")
+
+
+class JsonItemStream:
+    """
+    Iterates (item, item_text) for each element of a top-level JSON array, or of
+    obj[wrapper_key] when the response is wrapped in an object. Only one item is
+    held in memory at a time; peak_chars is the largest parse window seen.
+    """
+
+    def __init__(self, chunks: Iterable[bytes], wrapper_key: str = 'posts'):
+        self._buffer = _Buffer(_decoded_chunks(chunks))
+        self.wrapper_key = wrapper_key
+
+    @property
+    def peak_chars(self) -> int:
+        return self._buffer.peak
+
+    def __iter__(self) -> Iterator[tuple]:
+        buffer = self._buffer
+        first = buffer.peek()
+        if first == '{':
+            buffer.pos += 1
+            while True:
+                if buffer.peek() == '}':
+                    return
+                key, _ = buffer.value()
+                buffer.expect(':')
+                if key == self.wrapper_key and buffer.peek() == '[':
+                    break
+                buffer.value()
+                if buffer.peek() == ',':
+                    buffer.pos += 1
+        elif first != '[':
+            raise StreamParseError("Response is neither a JSON array nor an object")
+
+        buffer.expect('[')
+        if buffer.peek() == ']':
+            return
+        while True:
+            yield buffer.value()
+            nxt = buffer.peek()
+            if nxt == ',':
+                buffer.pos += 1
+            elif nxt == ']':
+                return
+            else:
+                raise StreamParseError("Malformed JSON array")
+
+
+def image_bytes(item: Dict[str, Any]) -> int:
+    """Serialized size of the item's image fields plus any other long base64 strings"""
+    total = 0
+    for key, value in item.items():
+        if key in IMAGE_FIELDS:
+            if value:
+                total += len(json.dumps(value))
+        elif isinstance(value, str) and _BASE64_RUN.match(value):
+            total += len(value) + 2
+    return total
+
+
+class FeedStreamStats:
+    """Wire and timing accounting for one streamed response"""
+
+    def __init__(self, route: str, limit: int):
+        self.route = route
+        self.limit = limit
+        self.status: Optional[int] = None
+        self.items = 0
+        self.wire_bytes = 0
+        self.body_bytes = 0
+        self.item_bytes = 0
+        self.image_bytes = 0
+        self.content_encoding = ''
+        self.time_to_headers = 0.0
+        self.time_to_first_byte = 0.0
+        self.time_to_last_byte = 0.0
+        self.peak_buffer_chars = 0
+        self.error: Optional[str] = None
+
+    @property
+    def image_share(self) -> float:
+        return self.image_bytes / self.item_bytes if self.item_bytes else 0.0
+
+
+class FeedStreamer:
+    """Streams feed-like responses without materialising the whole body"""
+
+    def __init__(self, base_url: str, token: Optional[str] = None, chunk_size: int = 16 * 1024,
+                 timeout: float = 30):
+        self.base_url = base_url
+        self.chunk_size = chunk_size
+        self.timeout = timeout
+        self.session = mount_shared_pool(requests.Session())
+        self.session.headers.update({
+            'User-Agent': 'LeoConnect-Feed-Streamer/1.0',
+            'Accept': 'application/json'
+        })
+        if token:
+            self.session.headers.update({'Authorization': f'Bearer {token}'})
+
+    def fetch(self, route: str, limit: int, on_item=None) -> FeedStreamStats:
+        stats = FeedStreamStats(route, limit)
+        start = time.perf_counter()
+        try:
+            with self.session.get(f"{self.base_url}/{route}", params={'limit': limit},
+                                  stream=True, timeout=self.timeout) as response:
+                stats.time_to_headers = time.perf_counter() - start
+                stats.status = response.status_code
+                stats.content_encoding = response.headers.get('Content-Encoding', 'identity')
+
+                def chunks():
+                    for chunk in response.iter_content(self.chunk_size):
+                        if not stats.time_to_first_byte:
+                            stats.time_to_first_byte = time.perf_counter() - start
+                        stats.body_bytes += len(chunk)
+                        yield chunk
+
+                if response.status_code == 200:
+                    items = JsonItemStream(chunks())
+                    for item, text in items:
+                        stats.items += 1
+                        stats.item_bytes += len(text.encode())
+                        if isinstance(item, dict):
+                            stats.image_bytes += image_bytes(item)
+                        if on_item:
+                            on_item(item)
+                    stats.peak_buffer_chars = items.peak_chars
+                else:
+                    for _ in chunks():
+                        pass
+                stats.time_to_last_byte = time.perf_counter() - start
+                # Bytes read off the socket, before any Content-Encoding is undone
+                stats.wire_bytes = response.raw.tell() or stats.body_bytes
+        except (requests.exceptions.RequestException, StreamParseError) as e:
+            stats.error = f"{type(e).__name__}: {e}"
+        return stats
+
+
+def print_report(results: List[FeedStreamStats], peak_memory: Optional[int]):
+    print(f"\n{Colors.BLUE}{'='*104}{Colors.RESET}")
+    print(f"{Colors.BOLD}Feed Payload Accounting{Colors.RESET}")
+    print(f"{Colors.BLUE}{'='*104}{Colors.RESET}\n")
+    print(f"{'Route':<10}{'Limit':>6}{'Status':>7}{'Items':>7}{'Wire KB':>10}{'Body KB':>10}"
+          f"{'Img %':>7}{'Hdr ms':>9}{'TTFB ms':>9}{'TTLB ms':>9}{'Xfer ms':>9}  Encoding")
+    for s in results:
+        if s.error:
+            print(f"{s.route:<10}{s.limit:>6}  {Colors.RED}{s.error}{Colors.RESET}")
+            continue
+        print(f"{s.route:<10}{s.limit:>6}{s.status:>7}{s.items:>7}{s.wire_bytes / 1024:>10.1f}"
+              f"{s.body_bytes / 1024:>10.1f}{s.image_share * 100:>7.1f}{s.time_to_headers * 1000:>9.1f}"
+              f"{s.time_to_first_byte * 1000:>9.1f}{s.time_to_last_byte * 1000:>9.1f}"
+              f"{(s.time_to_last_byte - s.time_to_first_byte) * 1000:>9.1f}  {s.content_encoding}")
+
+    ok = [s for s in results if not s.error and s.time_to_last_byte]
+    if ok:
+        transfer = sum(s.time_to_last_byte - s.time_to_first_byte for s in ok)
+        total = sum(s.time_to_last_byte for s in ok)
+        images = sum(s.image_bytes for s in ok)
+        body = sum(s.item_bytes for s in ok)
+        print(f"\n{Colors.CYAN}Body transfer is {transfer / total * 100:.1f}% of total latency; "
+              f"image fields are {images / body * 100 if body else 0:.1f}% of item bytes{Colors.RESET}")
+    largest = max((s.peak_buffer_chars for s in results), default=0)
+    if largest:
+        print(f"Largest parse window: {largest / 1024:.1f} KB")
+    if peak_memory is not None:
+        print(f"Peak traced memory: {peak_memory / 1024:.1f} KB")
+    print()
+
+
+def main():
+    """Main function"""
+    parser = argparse.ArgumentParser(description="LeoConnect streaming feed profiler")
+    parser.add_argument('--base-url', default="https://leoconnect.rexosphere.com")
+    parser.add_argument('--token', help="Bearer token (/feed requires one)")
+    parser.add_argument('--routes', default='feed,explore')
+    parser.add_argument('--limits', default='10,100,500', help="Comma-separated limit values")
+    parser.add_argument('--chunk-kb', type=int, default=16, help="Read size per chunk")
+    parser.add_argument('--trace-memory', action='store_true', help="Report peak Python heap via tracemalloc")
+    add_stand_in_arguments(parser)
+    args = parser.parse_args()
+    start_stand_in(args)
+
+    print(f"\n{Colors.BOLD}LeoConnect Feed Streaming Profiler{Colors.RESET}")
+    print(f"{Colors.BOLD}Base URL: {args.base_url}{Colors.RESET}")
+    print(f"{Colors.BOLD}Started at: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}{Colors.RESET}")
+
+    streamer = FeedStreamer(args.base_url, token=args.token, chunk_size=args.chunk_kb * 1024)
+    if args.trace_memory:
+        tracemalloc.start()
+    results = []
+    for route in [r.strip() for r in args.routes.split(',')]:
+        for limit in [int(l) for l in args.limits.split(',')]:
+            results.append(streamer.fetch(route, limit))
+    peak = None
+    if args.trace_memory:
+        peak = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+        if args.stand_in:
+            print(f"{Colors.YELLOW}Traced memory includes the in-process stand-in; "
+                  f"run stub_server.py separately to measure the client alone{Colors.RESET}")
+    print_report(results, peak)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,213 @@
+#!/usr/bin/env python3
+"""
+LeoConnect Harness Overhead
+Quiet mode with a batched background event writer, and accounting of the client CPU each request costs
+"""
+
+import argparse
+import contextlib
+import gzip
+import json
+import os
+import threading
+import time
+from collections import Counter, deque
+from typing import Any, List, Optional
+
+from colors import Colors
+from http_pool import add_listener
+from latency import LatencyHistogram, route_template
+
+
+class EventWriter:
+    """
+    Structured JSON Lines events written off the hot path. emit() only appends a
+    tuple to a deque; a background thread encodes and writes whole batches every
+    `flush_interval` seconds (or as soon as `batch_size` are waiting). Past
+    `max_pending` queued events new ones are counted as dropped instead of
+    blocking the caller.
+    """
+
+    def __init__(self, path: str, batch_size: int = 512, flush_interval: float = 0.5, max_pending: int = 200_000):
+        self.path = path
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.max_pending = max_pending
+        self.written = 0
+        self.dropped = 0
+        self.batches = 0
+        if path.endswith('.gz'):
+            self._file = gzip.open(path, 'wt', encoding='utf-8')
+        else:
+            self._file = open(path, 'w', encoding='utf-8', buffering=1 << 16)
+        self._pending: deque = deque()
+        self._wake = threading.Event()
+        self._closed = False
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+
+    def emit(self, kind: str, **fields: Any):
+        if len(self._pending) >= self.max_pending:
+            self.dropped += 1
+            return
+        self._pending.append((time.time(), kind, fields))
+        if len(self._pending) >= self.batch_size:
+            self._wake.set()
+
+    def request_listener(self, request, response, timing, error):
+        """Shared-pool listener emitting one 'request' event per exchange"""
+        self.emit('request', method=request.method, route=route_template(request.url),
+                  status=response.status_code if response is not None else None,
+                  error=type(error).__name__ if error is not None else None,
+                  ms=round((timing.headers_at - timing.started) * 1000, 3) if timing.headers_at else None)
+
+    def _drain(self):
+        lines: List[str] = []
+        while self._pending:
+            at, kind, fields = self._pending.popleft()
+            lines.append(json.dumps({'t': round(at, 6), 'type': kind, **fields}, separators=(',', ':'),
+                                    default=str))
+        if lines:
+            self._file.write('\n'.join(lines) + '\n')
+            self.written += len(lines)
+            self.batches += 1
+
+    def _run(self):
+        while not self._closed:
+            self._wake.wait(self.flush_interval)
+            self._wake.clear()
+            self._drain()
+
+    def close(self):
+        if self._closed:
+            return
+        self._closed = True
+        self._wake.set()
+        self._thread.join()
+        self._drain()
+        self._file.close()
+
+
+class ClientOverhead:
+    """
+    Per-thread CPU (time.thread_time) spent by the harness around each request.
+    'http client' is CPU inside Session.request (requests/urllib3 building the
+    request and parsing the response); the rest of that call's wall time is
+    'wait' (network, server, and waiting for the GIL). JSON decode, validation
+    and logging are measured where they happen.
+    """
+
+    CATEGORIES = ('http client', 'json decode', 'validation', 'logging')
+
+    def __init__(self):
+        self.cpu: Counter = Counter()
+        self.wait = 0.0
+        self.requests = 0
+        self.client_cpu = LatencyHistogram()
+        self.started_wall = time.perf_counter()
+        self.started_cpu = time.process_time()
+        self._lock = threading.Lock()
+
+    def add(self, category: str, seconds: float):
+        with self._lock:
+            self.cpu[category] += seconds
+
+    @contextlib.contextmanager
+    def measure(self, category: str):
+        start = time.thread_time()
+        try:
+            yield
+        finally:
+            self.add(category, time.thread_time() - start)
+
+    def record_request(self, wall: float, cpu: float):
+        with self._lock:
+            self.requests += 1
+            self.cpu['http client'] += cpu
+            self.wait += max(0.0, wall - cpu)
+            self.client_cpu.record_seconds(cpu)
+
+    def wrap_json(self, response):
+        """Charge response.json() to 'json decode'"""
+        decode = response.json
+
+        def timed_json(**kwargs):
+            with self.measure('json decode'):
+                return decode(**kwargs)
+
+        response.json = timed_json
+
+    def report_lines(self) -> List[str]:
+        wall = time.perf_counter() - self.started_wall
+        process_cpu = time.process_time() - self.started_cpu
+        per = max(self.requests, 1)
+        harness = sum(self.cpu.values())
+        lines = [f"{'Category':<14}{'CPU ms':>10}{'per request µs':>16}"]
+        for category in self.CATEGORIES:
+            seconds = self.cpu.get(category, 0.0)
+            lines.append(f"{category:<14}{seconds * 1000:>10.1f}{seconds / per * 1_000_000:>16.0f}")
+        lines.append(f"{'wait':<14}{self.wait * 1000:>10.1f}{self.wait / per * 1_000_000:>16.0f}  "
+                     f"(network + server + GIL; wall, not CPU)")
+        inside = self.cpu.get('http client', 0.0)
+        share = inside / max(inside + self.wait, 1e-9)
+        color = Colors.RED if share > 0.2 else Colors.YELLOW if share > 0.05 else Colors.GREEN
+        lines.append(f"{self.requests} requests; harness CPU {harness * 1000:.1f} ms "
+                     f"({harness / per * 1_000_000:.0f} µs/request), http client CPU p50 "
+                     f"{self.client_cpu.percentile(50):.0f} µs, p99 {self.client_cpu.percentile(99):.0f} µs")
+        lines.append(f"{color}Client CPU is {share * 100:.1f}% of the time recorded as request latency{Colors.RESET}")
+        busy = process_cpu / max(wall, 1e-9)
+        color = Colors.RED if busy > 0.8 else Colors.GREEN
+        lines.append(f"{color}Process CPU {process_cpu:.2f}s over {wall:.2f}s wall ({busy * 100:.0f}% of one core"
+                     f"{'; the GIL is likely inflating latencies' if busy > 0.8 else ''}){Colors.RESET}")
+        return lines
+
+
+def measure(overhead: Optional[ClientOverhead], category: str):
+    """overhead.measure(category), or a no-op when accounting is off"""
+    return overhead.measure(category) if overhead is not None else contextlib.nullcontext()
+
+
+@contextlib.contextmanager
+def quiet_output(enabled: bool = True):
+    """Discard everything printed inside the block when enabled"""
+    if not enabled:
+        yield
+        return
+    with open(os.devnull, 'w') as devnull, contextlib.redirect_stdout(devnull):
+        yield
+
+
+def add_quiet_arguments(parser: argparse.ArgumentParser):
+    """--quiet / --events / --overhead for the testers"""
+    parser.add_argument('--quiet', action='store_true', help="No per-check output; only the final summary")
+    parser.add_argument('--events', metavar='PATH',
+                        help="Write check and request events as JSON Lines (batched, off the hot path; .gz ok)")
+    parser.add_argument('--overhead', action='store_true',
+                        help="Account client CPU per request (HTTP client, JSON decode, validation, logging)")
+
+
+def events_from_args(args) -> Optional[EventWriter]:
+    if not args.events:
+        return None
+    writer = EventWriter(args.events)
+    add_listener(writer.request_listener)
+    return writer
+
+
+def overhead_from_args(args) -> Optional[ClientOverhead]:
+    return ClientOverhead() if args.overhead else None
+
+
+def print_overhead(overhead: ClientOverhead):
+    print(f"\n{Colors.BLUE}Client overhead:{Colors.RESET}")
+    for line in overhead.report_lines():
+        print(f"  {line}")
+
+
+def close_events(events: Optional[EventWriter]):
+    """Flush the remaining events and say where they went"""
+    if events is None:
+        return
+    events.close()
+    dropped = f", {Colors.RED}{events.dropped} dropped{Colors.RESET}" if events.dropped else ''
+    print(f"{events.written} events written to {events.path} in {events.batches} batches{dropped}")
@@ -0,0 +1,374 @@
+#!/usr/bin/env python3
+"""
+LeoConnect HTTP Cache
+Size-bounded LRU client cache honouring ETag/Last-Modified/Cache-Control, with a per-endpoint effectiveness report
+"""
+
+import argparse
+import hashlib
+import threading
+import time
+from collections import OrderedDict
+from datetime import datetime
+from email.utils import parsedate_to_datetime
+from typing import Dict, List, Optional, Tuple
+
+import requests
+from requests.adapters import BaseAdapter
+from requests.structures import CaseInsensitiveDict
+
+from colors import Colors
+from http_pool import mount_shared_pool, shared_adapter
+from latency import route_template
+from stub_server import add_stand_in_arguments, start_stand_in
+
+
+def parse_cache_control(value: str) -> Dict[str, Optional[str]]:
+    directives = {}
+    for part in value.split(','):
+        name, _, arg = part.strip().partition('=')
+        if name:
+            directives[name.lower()] = arg.strip('"') or None
+    return directives
+
+
+def _http_date(value: Optional[str]) -> Optional[float]:
+    if not value:
+        return None
+    try:
+        return parsedate_to_datetime(value).timestamp()
+    except (TypeError, ValueError):
+        return None
+
+
+class CacheEntry:
+    def __init__(self, response: requests.Response, now: float):
+        self.status_code = response.status_code
+        self.reason = response.reason
+        self.headers = CaseInsensitiveDict(response.headers)
+        self.content = response.content
+        self.encoding = response.encoding
+        self.url = response.url
+        self.etag = response.headers.get('ETag')
+        self.last_modified = response.headers.get('Last-Modified')
+        self.stored_at = now
+        self.expires_at = now + freshness_lifetime(response.headers, now)
+
+    @property
+    def size(self) -> int:
+        return len(self.content) + sum(len(k) + len(v) for k, v in self.headers.items())
+
+    @property
+    def has_validators(self) -> bool:
+        return bool(self.etag or self.last_modified)
+
+    def refresh(self, not_modified: requests.Response, now: float):
+        """Fold a 304's headers into the stored response and restart its freshness"""
+        for name in ('ETag', 'Last-Modified', 'Cache-Control', 'Expires', 'Date'):
+            if name in not_modified.headers:
+                self.headers[name] = not_modified.headers[name]
+        self.etag = self.headers.get('ETag')
+        self.last_modified = self.headers.get('Last-Modified')
+        self.stored_at = now
+        self.expires_at = now + freshness_lifetime(self.headers, now)
+
+    def to_response(self, request: requests.PreparedRequest) -> requests.Response:
+        response = requests.Response()
+        response.status_code = self.status_code
+        response.reason = self.reason
+        response.headers = CaseInsensitiveDict(self.headers)
+        response._content = self.content
+        response._content_consumed = True
+        response.encoding = self.encoding
+        response.url = self.url
+        response.request = request
+        return response
+
+
+def freshness_lifetime(headers, now: float) -> float:
+    """Seconds a response may be reused without revalidation (0 when it must always revalidate)"""
+    directives = parse_cache_control(headers.get('Cache-Control', ''))
+    if 'no-cache' in directives or 'no-store' in directives:
+        return 0.0
+    for name in ('s-maxage', 'max-age'):
+        if directives.get(name):
+            try:
+                return max(0.0, float(directives[name]))
+            except ValueError:
+                return 0.0
+    expires = _http_date(headers.get('Expires'))
+    if expires is not None:
+        date = _http_date(headers.get('Date')) or time.time()
+        return max(0.0, expires - date)
+    return 0.0
+
+
+def uncacheable_reason(response: requests.Response) -> Optional[str]:
+    """Why a 200 GET response cannot be stored, or None if it can"""
+    directives = parse_cache_control(response.headers.get('Cache-Control', ''))
+    if 'no-store' in directives:
+        return 'no-store'
+    if 'Vary' in response.headers and response.headers['Vary'].strip() == '*':
+        return 'Vary: *'
+    if not (response.headers.get('ETag') or response.headers.get('Last-Modified')) \
+            and not freshness_lifetime(response.headers, time.time()):
+        return 'no validators or lifetime'
+    return None
+
+
+class EndpointCacheStats:
+    def __init__(self):
+        self.requests = 0
+        self.fresh_hits = 0
+        self.revalidated = 0
+        self.conditional_sent = 0
+        self.misses = 0
+        self.uncacheable: Dict[str, int] = {}
+        self.bytes_saved = 0
+        self.full_fetch_seconds = 0.0
+        self.not_modified_seconds = 0.0
+        self.cache_control: Optional[str] = None
+        self.validators: set = set()
+        self._lock = threading.Lock()
+
+    def add(self, **amounts):
+        with self._lock:
+            for name, amount in amounts.items():
+                setattr(self, name, getattr(self, name) + amount)
+
+    def record_full_fetch(self, response: requests.Response, seconds: float, reason: Optional[str]):
+        """A 200 from the origin: its cache headers, and why it was not stored if it was not"""
+        with self._lock:
+            self.misses += 1
+            self.full_fetch_seconds += seconds
+            self.cache_control = response.headers.get('Cache-Control', self.cache_control)
+            self.validators.update(v for v in ('ETag', 'Last-Modified') if v in response.headers)
+            if reason:
+                self.uncacheable[reason] = self.uncacheable.get(reason, 0) + 1
+
+    @property
+    def mean_full_fetch(self) -> float:
+        return self.full_fetch_seconds / self.misses if self.misses else 0.0
+
+    @property
+    def seconds_saved(self) -> float:
+        full = self.mean_full_fetch
+        return self.fresh_hits * full + max(0.0, self.revalidated * full - self.not_modified_seconds)
+
+    @property
+    def supports_304(self) -> Optional[bool]:
+        if self.revalidated:
+            return True
+        return False if self.conditional_sent else None
+
+    def verdict(self) -> str:
+        if not (self.misses or self.fresh_hits or self.revalidated):
+            return 'no 200 responses'
+        if self.uncacheable and not (self.fresh_hits or self.revalidated):
+            return 'uncacheable: ' + ', '.join(sorted(self.uncacheable))
+        if self.fresh_hits:
+            return 'served from cache'
+        if self.revalidated:
+            return 'revalidates with 304'
+        if self.conditional_sent:
+            return 'ignores conditional requests'
+        return 'cacheable (not yet reused)'
+
+
+class ResponseCache:
+    """Thread-safe LRU of GET responses bounded by total bytes and entry count"""
+
+    def __init__(self, max_bytes: int = 8 * 1024 * 1024, max_entries: int = 1024):
+        self.max_bytes = max_bytes
+        self.max_entries = max_entries
+        self.entries: 'OrderedDict[str, CacheEntry]' = OrderedDict()
+        self.size = 0
+        self.evictions = 0
+        self.stats: Dict[str, EndpointCacheStats] = {}
+        self._lock = threading.Lock()
+
+    # Request headers that select a different representation (the stand-in and backend Vary on these)
+    KEY_HEADERS = ('Authorization', 'Accept', 'Accept-Encoding')
+
+    @classmethod
+    def key_for(cls, request: requests.PreparedRequest) -> str:
+        """URL plus credential and negotiation headers, so users never see each other's responses"""
+        parts = [request.method, request.url] + [request.headers.get(name, '') for name in cls.KEY_HEADERS]
+        return hashlib.sha1('\n'.join(parts).encode()).hexdigest()
+
+    def endpoint_stats(self, url: str) -> EndpointCacheStats:
+        name = route_template(url)
+        with self._lock:
+            return self.stats.setdefault(name, EndpointCacheStats())
+
+    def get(self, key: str) -> Optional[CacheEntry]:
+        with self._lock:
+            entry = self.entries.get(key)
+            if entry is not None:
+                self.entries.move_to_end(key)
+            return entry
+
+    def put(self, key: str, entry: CacheEntry):
+        if entry.size > self.max_bytes:
+            return
+        with self._lock:
+            old = self.entries.pop(key, None)
+            if old is not None:
+                self.size -= old.size
+            self.entries[key] = entry
+            self.size += entry.size
+            while self.size > self.max_bytes or len(self.entries) > self.max_entries:
+                _, evicted = self.entries.popitem(last=False)
+                self.size -= evicted.size
+                self.evictions += 1
+
+    def report_lines(self) -> List[str]:
+        lines = [f"{'Endpoint':<28}{'Reqs':>6}{'Fresh':>7}{'304':>6}{'Miss':>6}{'304?':>6}"
+                 f"{'KB saved':>10}{'ms saved':>10}  Cache-Control / verdict"]
+        with self._lock:
+            items = sorted(self.stats.items())
+        for endpoint, s in items:
+            supports = {True: 'yes', False: 'no', None: '-'}[s.supports_304]
+            policy = s.cache_control or ('validators: ' + '/'.join(sorted(s.validators)) if s.validators else 'none')
+            lines.append(f"{endpoint[:27]:<28}{s.requests:>6}{s.fresh_hits:>6}{s.revalidated:>6}{s.misses:>6}"
+                         f"{supports:>6}{s.bytes_saved / 1024:>10.1f}{s.seconds_saved * 1000:>10.1f}  "
+                         f"{policy} -> {s.verdict()}")
+        total_bytes = sum(s.bytes_saved for _, s in items)
+        total_ms = sum(s.seconds_saved for _, s in items) * 1000
+        lines.append(f"Cache: {len(self.entries)} entries, {self.size / 1024:.1f}/{self.max_bytes / 1024:.0f} KB, "
+                     f"{self.evictions} evictions | saved {total_bytes / 1024:.1f} KB and ~{total_ms:.0f} ms")
+        return lines
+
+
+class CachingAdapter(BaseAdapter):
+    """Answers GETs from a ResponseCache, revalidating with If-None-Match/If-Modified-Since when stale"""
+
+    def __init__(self, cache: ResponseCache, inner: Optional[BaseAdapter] = None):
+        super().__init__()
+        self.cache = cache
+        self.inner = inner or shared_adapter()
+
+    def send(self, request: requests.PreparedRequest, stream=False, **kwargs) -> requests.Response:
+        if request.method != 'GET' or stream:
+            return self.inner.send(request, stream=stream, **kwargs)
+        stats = self.cache.endpoint_stats(request.url)
+        stats.add(requests=1)
+        key = self.cache.key_for(request)
+        entry = self.cache.get(key)
+        now = time.time()
+        request_directives = parse_cache_control(request.headers.get('Cache-Control', ''))
+        if entry is not None and now < entry.expires_at and 'no-cache' not in request_directives:
+            stats.add(fresh_hits=1, bytes_saved=len(entry.content))
+            response = entry.to_response(request)
+            response.from_cache = 'fresh'
+            return response
+
+        if entry is not None and entry.has_validators:
+            if entry.etag:
+                request.headers['If-None-Match'] = entry.etag
+            if entry.last_modified:
+                request.headers['If-Modified-Since'] = entry.last_modified
+            stats.add(conditional_sent=1)
+
+        # Session.send only fills in response.elapsed after the adapter returns, so time the fetch here
+        start = time.perf_counter()
+        response = self.inner.send(request, stream=False, **kwargs)
+        response.content
+        fetch_seconds = time.perf_counter() - start
+        if response.status_code == 304 and entry is not None:
+            response.close()
+            entry.refresh(response, time.time())
+            stats.add(revalidated=1, bytes_saved=len(entry.content),
+                      not_modified_seconds=fetch_seconds)
+            cached = entry.to_response(request)
+            cached.from_cache = 'revalidated'
+            return cached
+
+        response.from_cache = None
+        if response.status_code != 200:
+            return response
+        reason = uncacheable_reason(response)
+        stats.record_full_fetch(response, fetch_seconds, reason)
+        if not reason:
+            self.cache.put(key, CacheEntry(response, now))
+        return response
+
+    def close(self):
+        self.inner.close()
+
+
+def enable_cache(session: requests.Session, cache: ResponseCache) -> requests.Session:
+    """Put a cache in front of the session's (shared-pool) transport"""
+    mount_shared_pool(session)
+    adapter = CachingAdapter(cache)
+    session.mount('http://', adapter)
+    session.mount('https://', adapter)
+    return session
+
+
+def add_cache_arguments(parser):
+    parser.add_argument('--no-cache', action='store_true', help="Disable the client-side HTTP cache")
+    parser.add_argument('--cache-mb', type=float, default=8, help="HTTP cache size bound")
+
+
+def cache_from_args(args) -> Optional[ResponseCache]:
+    if args.no_cache:
+        return None
+    return ResponseCache(max_bytes=int(args.cache_mb * 1024 * 1024))
+
+
+# Read routes checked by the standalone probe
+CACHE_PROBE_ROUTES: List[Tuple[str, Dict]] = [
+    ('/districts', {}),
+    ('/clubs', {'district': '306 A1'}),
+    ('/clubs', {'district': '306 B1'}),
+    ('/explore', {'limit': 10}),
+    ('/events', {'limit': 10}),
+    ('/search', {'q': 'leo'}),
+    ('/', {}),
+]
+
+
+def main():
+    """Main function"""
+    parser = argparse.ArgumentParser(description="LeoConnect HTTP cache effectiveness probe")
+    parser.add_argument('--base-url', default="https://leoconnect.rexosphere.com")
+    parser.add_argument('--token', help="Bearer token")
+    parser.add_argument('--passes', type=int, default=3,
+                        help="Fetches per route; the last pass forces revalidation to test 304 support")
+    add_cache_arguments(parser)
+    add_stand_in_arguments(parser)
+    args = parser.parse_args()
+    start_stand_in(args)
+
+    print(f"\n{Colors.BOLD}LeoConnect HTTP Cache Probe{Colors.RESET}")
+    print(f"{Colors.BOLD}Base URL: {args.base_url}{Colors.RESET}")
+    print(f"{Colors.BOLD}Started at: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}{Colors.RESET}\n")
+
+    cache = ResponseCache(max_bytes=int(args.cache_mb * 1024 * 1024))
+    session = enable_cache(requests.Session(), cache)
+    session.headers.update({'User-Agent': 'LeoConnect-Cache-Probe/1.0', 'Accept': 'application/json'})
+    if args.token:
+        session.headers.update({'Authorization': f'Bearer {args.token}'})
+
+    for n in range(args.passes):
+        revalidate = n == args.passes - 1 and n > 0
+        headers = {'Cache-Control': 'no-cache'} if revalidate else {}
+        for path, params in CACHE_PROBE_ROUTES:
+            try:
+                response = session.get(f"{args.base_url}{path}", params=params, headers=headers, timeout=15)
+                print(f"  pass {n + 1}  {path:<12}{str(params):<26}{response.status_code:>5}  "
+                      f"{getattr(response, 'from_cache', None) or 'network'}")
+            except requests.exceptions.RequestException as e:
+                print(f"  pass {n + 1}  {path:<12}{Colors.RED}{e}{Colors.RESET}")
+
+    print(f"\n{Colors.BLUE}{'='*100}{Colors.RESET}")
+    print(f"{Colors.BOLD}Cache effectiveness{Colors.RESET}")
+    print(f"{Colors.BLUE}{'='*100}{Colors.RESET}")
+    for line in cache.report_lines():
+        print(line)
+    print()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,340 @@
+#!/usr/bin/env python3
+"""
+LeoConnect Shared HTTP Pool
+One tunable connection pool for every tool, with DNS/TCP/TLS/TTFB/transfer timing and reuse counters
+"""
+
+import socket
+import threading
+import time
+from typing import Callable, Dict, List, Optional
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.connection import HTTPConnection, HTTPSConnection
+from urllib3.connectionpool import HTTPConnectionPool, HTTPSConnectionPool
+
+from latency import LatencyHistogram
+
+
+PHASES = ('dns', 'connect', 'tls', 'ttfb', 'transfer')
+
+_local = threading.local()
+_listeners: List[Callable] = []
+_send_listeners: List[Callable] = []
+
+
+class PhaseTiming:
+    """
+    Phase durations (seconds) for one request. dns/connect/tls are None when the
+    request went out on a kept-alive connection.
+    """
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.dns: Optional[float] = None
+        self.connect: Optional[float] = None
+        self.tls: Optional[float] = None
+        self.ttfb: Optional[float] = None
+        self.transfer: Optional[float] = None
+        self.pool_hit = False
+        self.sent_at: Optional[float] = None
+        self.headers_at: Optional[float] = None
+        self.finished_at: Optional[float] = None
+
+    @property
+    def reused(self) -> bool:
+        return self.connect is None
+
+    @property
+    def total(self) -> float:
+        return (self.finished_at or self.headers_at or self.started) - self.started
+
+    def finish(self, now: float):
+        if self.finished_at is None and self.headers_at is not None:
+            self.finished_at = now
+            self.transfer = now - self.headers_at
+
+    def as_dict(self) -> Dict[str, Optional[float]]:
+        return {phase: getattr(self, phase) for phase in PHASES}
+
+
+def _current() -> Optional[PhaseTiming]:
+    return getattr(_local, 'timing', None)
+
+
+class _TimedConnectionMixin:
+    """Splits urllib3's connect into DNS, TCP and TLS and stamps request/response times"""
+
+    _timing: Optional[PhaseTiming] = None
+
+    def _new_conn(self):
+        timing = _current()
+        if timing is None:
+            return super()._new_conn()
+        start = time.perf_counter()
+        try:
+            address = socket.getaddrinfo(self._dns_host, self.port, 0, socket.SOCK_STREAM)[0][4]
+        except socket.gaierror:
+            # Let urllib3 resolve again and raise its own NameResolutionError
+            return super()._new_conn()
+        resolved = time.perf_counter()
+        timing.dns = resolved - start
+        # Connect to the address we just resolved so DNS is not paid twice
+        host, self._dns_host = self._dns_host, address[0]
+        try:
+            sock = super()._new_conn()
+        finally:
+            self._dns_host = host
+        timing.connect = time.perf_counter() - resolved
+        return sock
+
+    def connect(self):
+        start = time.perf_counter()
+        super().connect()
+        timing = _current()
+        if timing is not None and timing.connect is not None and isinstance(self, HTTPSConnection):
+            timing.tls = max(0.0, time.perf_counter() - start - timing.dns - timing.connect)
+
+    def request(self, *args, **kwargs):
+        timing = _current()
+        if timing is not None:
+            if self.sock is None:
+                self.connect()
+            self._timing = timing
+        super().request(*args, **kwargs)
+        if timing is not None:
+            timing.sent_at = time.perf_counter()
+
+    def getresponse(self, *args, **kwargs):
+        response = super().getresponse(*args, **kwargs)
+        timing = self._timing
+        if timing is not None:
+            timing.headers_at = time.perf_counter()
+            timing.ttfb = timing.headers_at - (timing.sent_at or timing.started)
+        return response
+
+
+class TimedHTTPConnection(_TimedConnectionMixin, HTTPConnection):
+    pass
+
+
+class TimedHTTPSConnection(_TimedConnectionMixin, HTTPSConnection):
+    pass
+
+
+class _CountingPoolMixin:
+    """Counts pool hits, misses, stale connections and discards; closes out each request's timing"""
+
+    stats: 'ConnectionStats'
+
+    def _get_conn(self, timeout=None):
+        conn = super()._get_conn(timeout)
+        # urllib3 has already closed a pooled connection whose socket dropped
+        if conn.sock is not None:
+            self.stats.count('pool_hits')
+            timing = _current()
+            if timing is not None:
+                timing.pool_hit = True
+        elif getattr(conn, '_served', 0):
+            self.stats.count('stale')
+        else:
+            self.stats.count('pool_misses')
+        return conn
+
+    def _put_conn(self, conn):
+        if conn is not None:
+            conn._served = getattr(conn, '_served', 0) + 1
+            timing = conn._timing
+            if timing is not None:
+                conn._timing = None
+                timing.finish(time.perf_counter())
+                self.stats.record(timing)
+            if self.pool is not None and self.pool.full():
+                self.stats.count('discarded')
+        super()._put_conn(conn)
+
+
+class TimedHTTPConnectionPool(_CountingPoolMixin, HTTPConnectionPool):
+    ConnectionCls = TimedHTTPConnection
+
+
+class TimedHTTPSConnectionPool(_CountingPoolMixin, HTTPSConnectionPool):
+    ConnectionCls = TimedHTTPSConnection
+
+
+class ConnectionStats:
+    """Thread-safe phase histograms plus connection reuse and pool counters"""
+
+    COUNTERS = ('pool_hits', 'pool_misses', 'stale', 'discarded')
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.phases = {phase: LatencyHistogram() for phase in PHASES}
+        self.new_total = LatencyHistogram()
+        self.reused_total = LatencyHistogram()
+        self.counters = dict.fromkeys(self.COUNTERS, 0)
+
+    def count(self, name: str):
+        with self._lock:
+            self.counters[name] += 1
+
+    def record(self, timing: PhaseTiming):
+        with self._lock:
+            for phase, value in timing.as_dict().items():
+                if value is not None:
+                    self.phases[phase].record_seconds(value)
+            (self.reused_total if timing.reused else self.new_total).record_seconds(timing.total)
+
+    def reset(self):
+        with self._lock:
+            for histogram in list(self.phases.values()) + [self.new_total, self.reused_total]:
+                histogram.reset()
+            self.counters = dict.fromkeys(self.COUNTERS, 0)
+
+    def merge(self, other: 'ConnectionStats') -> 'ConnectionStats':
+        with self._lock:
+            for phase, histogram in other.phases.items():
+                self.phases[phase].merge(histogram)
+            self.new_total.merge(other.new_total)
+            self.reused_total.merge(other.reused_total)
+            for name, value in other.counters.items():
+                self.counters[name] += value
+        return self
+
+    def to_dict(self) -> Dict:
+        with self._lock:
+            return {
+                'phases': {phase: h.to_dict() for phase, h in self.phases.items()},
+                'new_total': self.new_total.to_dict(),
+                'reused_total': self.reused_total.to_dict(),
+                'counters': dict(self.counters),
+            }
+
+    @classmethod
+    def from_dict(cls, data: Dict) -> 'ConnectionStats':
+        stats = cls()
+        stats.phases = {phase: LatencyHistogram.from_dict(h) for phase, h in data['phases'].items()}
+        stats.new_total = LatencyHistogram.from_dict(data['new_total'])
+        stats.reused_total = LatencyHistogram.from_dict(data['reused_total'])
+        stats.counters.update(data['counters'])
+        return stats
+
+    @property
+    def requests(self) -> int:
+        return self.new_total.total_count + self.reused_total.total_count
+
+    def report_lines(self) -> List[str]:
+        """Phase percentiles (ms), reuse rate, pool counters and what keep-alive saved"""
+        lines = [f"{'Phase':<10}{'Count':>8}{'mean':>9}{'p50':>9}{'p90':>9}{'p99':>9}{'max':>9}"]
+        for phase, h in self.phases.items():
+            if not h.total_count:
+                continue
+            lines.append(f"{phase:<10}{h.total_count:>8}{h.mean / 1000:>9.2f}"
+                         + ''.join(f"{h.percentile(q) / 1000:>9.2f}" for q in (50, 90, 99))
+                         + f"{h.max_value / 1000:>9.2f}")
+        total = self.requests
+        if total:
+            reused = self.reused_total.total_count
+            lines.append(f"Connections: {self.new_total.total_count} opened, {reused}/{total} requests "
+                         f"reused a connection ({reused / total * 100:.1f}%)")
+        c = self.counters
+        lines.append(f"Pool: {c['pool_hits']} hits, {c['pool_misses']} misses, "
+                     f"{c['stale']} stale, {c['discarded']} discarded (pool full)")
+        if self.new_total.total_count and self.reused_total.total_count:
+            new_ms, reused_ms = self.new_total.mean / 1000, self.reused_total.mean / 1000
+            lines.append(f"Keep-alive: {reused_ms:.2f} ms mean on reused vs {new_ms:.2f} ms on new "
+                         f"connections (saves {new_ms - reused_ms:.2f} ms per request)")
+        return lines
+
+
+class InstrumentedAdapter(HTTPAdapter):
+    """HTTPAdapter whose pools time every phase; each response gets a `.timing` PhaseTiming"""
+
+    def __init__(self, pool_connections: int = 10, pool_maxsize: int = 10, max_retries: int = 0,
+                 pool_block: bool = False):
+        self.stats = ConnectionStats()
+        super().__init__(pool_connections=pool_connections, pool_maxsize=pool_maxsize,
+                         max_retries=max_retries, pool_block=pool_block)
+
+    def init_poolmanager(self, *args, **kwargs):
+        super().init_poolmanager(*args, **kwargs)
+        stats = self.stats
+        self.poolmanager.pool_classes_by_scheme = {
+            'http': type('StatsHTTPConnectionPool', (TimedHTTPConnectionPool,), {'stats': stats}),
+            'https': type('StatsHTTPSConnectionPool', (TimedHTTPSConnectionPool,), {'stats': stats}),
+        }
+
+    def send(self, request, *args, **kwargs):
+        for listener in _send_listeners:
+            listener(request)
+        timing = _local.timing = PhaseTiming()
+        try:
+            response = super().send(request, *args, **kwargs)
+        except Exception as e:
+            for listener in _listeners:
+                listener(request, None, timing, e)
+            raise
+        finally:
+            _local.timing = None
+        response.timing = timing
+        for listener in _listeners:
+            listener(request, response, timing, None)
+        return response
+
+
+_shared: Optional[InstrumentedAdapter] = None
+_shared_lock = threading.Lock()
+
+
+def configure_pool(pool_connections: int = 10, pool_maxsize: int = 10, max_retries: int = 0,
+                   pool_block: bool = False) -> InstrumentedAdapter:
+    """Replace the shared adapter; call before sessions are created"""
+    global _shared
+    with _shared_lock:
+        if _shared is not None:
+            _shared.close()
+        _shared = InstrumentedAdapter(pool_connections, pool_maxsize, max_retries, pool_block)
+        return _shared
+
+
+def shared_adapter() -> InstrumentedAdapter:
+    global _shared
+    with _shared_lock:
+        if _shared is None:
+            _shared = InstrumentedAdapter()
+        return _shared
+
+
+def add_listener(listener: Callable):
+    """
+    Call listener(request, response, timing, error) once response headers arrive (or
+    the send fails) for every request through any InstrumentedAdapter; survives configure_pool.
+    """
+    _listeners.append(listener)
+
+
+def add_send_listener(listener: Callable):
+    """Call listener(request) just before every InstrumentedAdapter request goes out"""
+    _send_listeners.append(listener)
+
+
+def mount_shared_pool(session: requests.Session) -> requests.Session:
+    """Route a session's http:// and https:// traffic through the shared pool"""
+    adapter = shared_adapter()
+    session.mount('http://', adapter)
+    session.mount('https://', adapter)
+    return session
+
+
+def add_pool_arguments(parser):
+    """--pool-* options shared by every command-line tool"""
+    parser.add_argument('--pool-maxsize', type=int,
+                        help="Kept-alive connections per host in the shared pool (default: the tool's concurrency)")
+    parser.add_argument('--pool-connections', type=int, default=10, help="Hosts cached by the shared pool")
+    parser.add_argument('--pool-block', action='store_true',
+                        help="Wait for a free connection instead of opening an overflow one")
+
+
+def configure_pool_from_args(args, default_maxsize: int = 10) -> InstrumentedAdapter:
+    return configure_pool(args.pool_connections, args.pool_maxsize or default_maxsize, pool_block=args.pool_block)
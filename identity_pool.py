@@ -0,0 +1,339 @@
+#!/usr/bin/env python3
+"""
+LeoConnect Identity Pool
+Many signed-in users, one pooled session each, with ID tokens refreshed before (or when) they expire
+"""
+
+import argparse
+import base64
+import json
+import threading
+import time
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from typing import List, Optional
+
+import requests
+
+from bench_history import add_history_arguments, save_from_args
+from colors import Colors
+from http_pool import add_pool_arguments, configure_pool_from_args, mount_shared_pool, shared_adapter
+from latency import LatencyRecorder, status_class
+from stub_server import add_stand_in_arguments, start_stand_in
+
+
+def jwt_expiry(token: str) -> Optional[float]:
+    """The `exp` claim of a JWT (e.g. a Firebase ID token), without verifying it"""
+    parts = token.split('.')
+    if len(parts) != 3:
+        return None
+    try:
+        claims = json.loads(base64.urlsafe_b64decode(parts[1] + '=' * (-len(parts[1]) % 4)))
+        return float(claims['exp'])
+    except (ValueError, KeyError, TypeError):
+        return None
+
+
+class Identity:
+    """One user's current ID token"""
+
+    def __init__(self, uid: str, token: Optional[str] = None, expires_at: Optional[float] = None):
+        self.uid = uid
+        self.token = token
+        self.expires_at = expires_at
+        # Lifetime at issue; bounds the refresh margin so short-lived tokens are not renewed on every request
+        self.lifetime = expires_at - time.time() if expires_at is not None else None
+        self.signed_in = False
+        self.lock = threading.Lock()
+
+    def set_token(self, token: str, expires_in: Optional[float]):
+        self.token = token
+        self.lifetime = expires_in
+        self.expires_at = time.time() + expires_in if expires_in else None
+
+    def expires_within(self, seconds: float) -> bool:
+        return self.expires_at is not None and self.expires_at - time.time() < seconds
+
+    def needs_refresh(self, margin: float) -> bool:
+        """Due for renewal: within `margin` of expiry, or half its lifetime for tokens that live shorter"""
+        if self.lifetime:
+            margin = min(margin, self.lifetime / 2)
+        return self.expires_within(margin)
+
+
+class StandInIssuer:
+    """Gets ID tokens from the stand-in's /test/token, the way Google Sign-In hands them to the app"""
+
+    can_refresh = True
+
+    def __init__(self, base_url: str, timeout: float = 10):
+        self.base_url = base_url
+        self.timeout = timeout
+        self.session = mount_shared_pool(requests.Session())
+
+    def issue(self, identity: Identity):
+        response = self.session.post(f"{self.base_url}/test/token", json={'uid': identity.uid},
+                                     timeout=self.timeout)
+        response.raise_for_status()
+        data = response.json()
+        identity.set_token(data['idToken'], data.get('expiresIn'))
+
+
+class StaticTokens:
+    """Pre-issued tokens (one per line); these cannot be renewed, so expiry is only reported"""
+
+    can_refresh = False
+
+    def issue(self, identity: Identity):
+        pass
+
+
+class IdentityPool:
+    """
+    Identities handed out round-robin to virtual users. Each user gets its own
+    IdentitySession; tokens are renewed `refresh_margin` seconds (at most half
+    their lifetime) before they expire, or after a 401 saying they already have, and every renewal signs
+    in again through POST /auth/google as the app does.
+    """
+
+    def __init__(self, base_url: str, issuer, refresh_margin: float = 60.0, timeout: float = 10):
+        self.base_url = base_url
+        self.issuer = issuer
+        self.refresh_margin = refresh_margin
+        self.timeout = timeout
+        self.identities: List[Identity] = []
+        self.recorder = LatencyRecorder()
+        self.counts: Counter = Counter()
+        self._counts_lock = threading.Lock()
+        self._auth_session = mount_shared_pool(requests.Session())
+
+    @classmethod
+    def for_stand_in(cls, base_url: str, count: int, prefix: str = 'vu', **kwargs) -> 'IdentityPool':
+        pool = cls(base_url, StandInIssuer(base_url), **kwargs)
+        pool.identities = [Identity(f"{prefix}-{i:05d}") for i in range(count)]
+        return pool
+
+    @classmethod
+    def from_tokens_file(cls, base_url: str, path: str, **kwargs) -> 'IdentityPool':
+        pool = cls(base_url, StaticTokens(), **kwargs)
+        with open(path) as f:
+            tokens = [line.strip() for line in f if line.strip()]
+        pool.identities = [Identity(f"token-{i + 1}", token, jwt_expiry(token)) for i, token in enumerate(tokens)]
+        return pool
+
+    def __len__(self) -> int:
+        return len(self.identities)
+
+    def count(self, name: str, amount: int = 1):
+        with self._counts_lock:
+            self.counts[name] += amount
+
+    def sign_in(self, identity: Identity) -> Optional[int]:
+        """(Re)issue the token if possible and POST /auth/google with it; returns the sign-in status"""
+        if self.issuer.can_refresh:
+            start = time.perf_counter()
+            try:
+                self.issuer.issue(identity)
+                self.recorder.record('token issue', '2xx', start, time.perf_counter())
+            except (requests.exceptions.RequestException, ValueError, KeyError):
+                self.recorder.record('token issue', 'error', start, time.perf_counter())
+                self.count('issue failures')
+                return None
+        name = 'POST /auth/google (repeat)' if identity.signed_in else 'POST /auth/google (first)'
+        start = time.perf_counter()
+        status = None
+        try:
+            response = self._auth_session.post(f"{self.base_url}/auth/google",
+                                               headers={'Authorization': f"Bearer {identity.token}"},
+                                               timeout=self.timeout)
+            status = response.status_code
+        except requests.exceptions.RequestException:
+            pass
+        self.recorder.record(name, status_class(status), start, time.perf_counter())
+        if status == 200:
+            identity.signed_in = True
+        else:
+            self.count('sign-in failures')
+        return status
+
+    def sign_in_all(self, concurrency: int = 16) -> float:
+        """Sign every identity in; returns the wall time"""
+        start = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=max(1, concurrency)) as pool:
+            list(pool.map(self.sign_in, self.identities))
+        return time.perf_counter() - start
+
+    def refresh(self, identity: Identity, seen_token: Optional[str], reason: str):
+        """Renew identity's token unless another session already replaced `seen_token`"""
+        with identity.lock:
+            if identity.token != seen_token:
+                return
+            if not self.issuer.can_refresh:
+                self.count('expired, not renewable')
+                return
+            self.count(f'{reason} refreshes')
+            self.sign_in(identity)
+
+    def session(self, index: int) -> 'IdentitySession':
+        return IdentitySession(self, self.identities[index % len(self.identities)])
+
+    def report_lines(self) -> List[str]:
+        lines = [f"Identities: {len(self.identities)} ({sum(1 for i in self.identities if i.signed_in)} signed in)"]
+        for name in self.recorder.endpoints():
+            stats = self.recorder.combined(name)
+            h = stats.histogram
+            lines.append(f"  {name:<28} {h.total_count:>6}  p50 {h.percentile(50) / 1000:>7.1f} ms  "
+                         f"p99 {h.percentile(99) / 1000:>7.1f} ms")
+        if self.counts:
+            lines.append('  ' + ', '.join(f"{name}: {count}" for name, count in sorted(self.counts.items())))
+        return lines
+
+
+class IdentitySession(requests.Session):
+    """Pooled session that always sends its identity's current token"""
+
+    def __init__(self, pool: IdentityPool, identity: Identity):
+        super().__init__()
+        mount_shared_pool(self)
+        self.pool = pool
+        self.identity = identity
+
+    def request(self, method, url, *args, **kwargs):
+        token = self.identity.token
+        if token is None:
+            self.pool.refresh(self.identity, token, 'missing-token')
+        elif self.pool.issuer.can_refresh and self.identity.needs_refresh(self.pool.refresh_margin):
+            self.pool.refresh(self.identity, token, 'proactive')
+        token = self.identity.token
+        self.headers['Authorization'] = f"Bearer {token}"
+        response = super().request(method, url, *args, **kwargs)
+        if response.status_code == 401 and 'expired' in response.text.lower():
+            self.pool.count('401 token expired')
+            response.close()
+            self.pool.refresh(self.identity, token, 'reactive')
+            if self.identity.token != token:
+                self.headers['Authorization'] = f"Bearer {self.identity.token}"
+                response = super().request(method, url, *args, **kwargs)
+        return response
+
+
+def add_identity_arguments(parser):
+    """--identities / --tokens-file for tools that run many virtual users"""
+    parser.add_argument('--identities', type=int, default=0,
+                        help="Distinct users to sign in through the stand-in's token issuer (needs --stand-in)")
+    parser.add_argument('--tokens-file', help="Pre-issued bearer tokens, one identity per line")
+    parser.add_argument('--refresh-margin', type=float, default=60,
+                        help="Renew tokens this many seconds before they expire")
+
+
+def pool_from_args(args) -> Optional[IdentityPool]:
+    if args.tokens_file:
+        return IdentityPool.from_tokens_file(args.base_url, args.tokens_file, refresh_margin=args.refresh_margin)
+    if args.identities:
+        if not getattr(args, 'stand_in', False):
+            raise SystemExit("--identities needs --stand-in to issue tokens; use --tokens-file against a real backend")
+        return IdentityPool.for_stand_in(args.base_url, args.identities, refresh_margin=args.refresh_margin)
+    return None
+
+
+def identities_from_args(args, concurrency: int = 16) -> Optional[IdentityPool]:
+    """Build and sign in the pool the options ask for, or None for single-token runs"""
+    pool = pool_from_args(args)
+    if pool is not None:
+        wall_time = pool.sign_in_all(concurrency)
+        signed_in = sum(1 for i in pool.identities if i.signed_in)
+        color = Colors.GREEN if signed_in == len(pool) else Colors.YELLOW
+        print(f"{color}Signed in {signed_in}/{len(pool)} identities in {wall_time:.1f}s{Colors.RESET}")
+    return pool
+
+
+def hold(pool: IdentityPool, duration: float, interval: float, users: int) -> LatencyRecorder:
+    """Each identity polls GET /feed every `interval` seconds, so short-lived tokens must be renewed mid-run"""
+    recorder = LatencyRecorder()
+    deadline = time.perf_counter() + duration
+
+    def user(index: int):
+        session = pool.session(index)
+        while time.perf_counter() < deadline:
+            start = time.perf_counter()
+            status = None
+            try:
+                status = session.get(f"{pool.base_url}/feed", params={'limit': 10}, timeout=10).status_code
+            except requests.exceptions.RequestException:
+                pass
+            recorder.record('GET /feed', status_class(status), start, time.perf_counter())
+            time.sleep(max(0.0, min(interval, deadline - time.perf_counter())))
+
+    threads = [threading.Thread(target=user, args=(i,), daemon=True) for i in range(users)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return recorder
+
+
+def main():
+    """Main function"""
+    parser = argparse.ArgumentParser(description="LeoConnect identity pool and /auth/google benchmark")
+    parser.add_argument('--base-url', default="https://leoconnect.rexosphere.com")
+    parser.add_argument('--concurrency', type=int, default=16, help="Sign-ins in flight at once")
+    parser.add_argument('--rounds', type=int, default=2,
+                        help="Sign-in passes over every identity (the first creates the users)")
+    parser.add_argument('--hold', type=float, default=0,
+                        help="Afterwards, poll /feed as every identity for this many seconds")
+    parser.add_argument('--hold-interval', type=float, default=1.0, help="Seconds between polls while holding")
+    add_identity_arguments(parser)
+    add_pool_arguments(parser)
+    add_history_arguments(parser)
+    add_stand_in_arguments(parser)
+    args = parser.parse_args()
+    if not args.identities and not args.tokens_file:
+        args.identities = 200
+    configure_pool_from_args(args, default_maxsize=max(args.concurrency, args.identities if args.hold else 0))
+    start_stand_in(args)
+
+    pool = pool_from_args(args)
+
+    print(f"\n{Colors.BOLD}LeoConnect /auth/google Benchmark{Colors.RESET}")
+    print(f"{Colors.BOLD}Base URL: {args.base_url} | {len(pool)} identities, {args.concurrency} concurrent"
+          f"{Colors.RESET}")
+    print(f"{Colors.BOLD}Started at: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}{Colors.RESET}\n")
+
+    total_time = 0.0
+    for round_number in range(1, args.rounds + 1):
+        before = pool.recorder.total_count
+        wall_time = pool.sign_in_all(args.concurrency)
+        total_time += wall_time
+        done = pool.recorder.total_count - before
+        print(f"  Round {round_number}: {len(pool)} sign-ins in {wall_time:.2f}s "
+              f"({len(pool) / max(wall_time, 1e-9):.1f} sign-ins/s, {done} requests)")
+    print()
+    for line in pool.report_lines():
+        print(line)
+
+    if args.hold > 0:
+        print(f"\n{Colors.BOLD}Holding {len(pool)} sessions for {args.hold:g}s{Colors.RESET}")
+        pool.counts.clear()
+        recorder = hold(pool, args.hold, args.hold_interval, len(pool))
+        for line in recorder.report_lines(args.hold):
+            print(line)
+        print('  ' + (', '.join(f"{name}: {count}" for name, count in sorted(pool.counts.items()))
+                      or 'no token refreshes needed'))
+        leaked = sum(s.histogram.total_count for (_, status), s in recorder.stats.items() if status == '4xx')
+        color = Colors.GREEN if not leaked else Colors.RED
+        print(f"{color}{leaked} requests failed with 4xx while holding{Colors.RESET}")
+        pool.recorder.merge(recorder)
+
+    connections = shared_adapter().stats
+    if connections.requests:
+        print(f"\n{Colors.BOLD}Connection phases (ms){Colors.RESET}")
+        for line in connections.report_lines():
+            print(line)
+    print()
+    save_from_args(args, 'auth_bench', pool.recorder, total_time + max(args.hold, 0),
+                   extra={'identities': len(pool), 'concurrency': args.concurrency})
+
+
+if __name__ == "__main__":
+    main()
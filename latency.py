@@ -0,0 +1,329 @@
+#!/usr/bin/env python3
+"""
+LeoConnect Latency Recording
+Fixed-memory HDR latency histograms keyed by endpoint and status class
+"""
+
+import math
+import threading
+import time
+from array import array
+from typing import Dict, Iterable, List, Optional, Tuple
+from urllib.parse import urlsplit
+
+import requests
+
+
+class LatencyHistogram:
+    """
+    HdrHistogram-style log-linear histogram of integer microsecond values.
+
+    Memory is fixed by highest_trackable and significant_figures, recording is
+    O(1), and two histograms with the same configuration merge by adding counts.
+    Values above highest_trackable are clamped (and counted in `saturated`).
+    """
+
+    def __init__(self, highest_trackable: int = 60_000_000, significant_figures: int = 3):
+        if not 1 <= significant_figures <= 5:
+            raise ValueError("significant_figures must be between 1 and 5")
+        self.highest_trackable = highest_trackable
+        self.significant_figures = significant_figures
+
+        largest_single_unit = 2 * 10 ** significant_figures
+        self._sub_bucket_count_magnitude = int(math.ceil(math.log2(largest_single_unit)))
+        self._sub_bucket_half_count_magnitude = self._sub_bucket_count_magnitude - 1
+        self._sub_bucket_count = 1 << self._sub_bucket_count_magnitude
+        self._sub_bucket_half_count = self._sub_bucket_count >> 1
+        self._sub_bucket_mask = self._sub_bucket_count - 1
+
+        bucket_count = 1
+        smallest_untrackable = self._sub_bucket_count
+        while smallest_untrackable <= highest_trackable:
+            smallest_untrackable <<= 1
+            bucket_count += 1
+        self._bucket_count = bucket_count
+
+        self.counts = array('q', [0]) * ((bucket_count + 1) * self._sub_bucket_half_count)
+        self.total_count = 0
+        self.saturated = 0
+        self.min_value = 0
+        self.max_value = 0
+        self._sum = 0
+
+    def _index_for(self, value: int) -> int:
+        pow2_ceiling = (value | self._sub_bucket_mask).bit_length()
+        bucket_index = pow2_ceiling - self._sub_bucket_count_magnitude
+        sub_bucket_index = value >> bucket_index
+        return ((bucket_index + 1) << self._sub_bucket_half_count_magnitude) + \
+            (sub_bucket_index - self._sub_bucket_half_count)
+
+    def _value_for(self, index: int) -> int:
+        bucket_index = (index >> self._sub_bucket_half_count_magnitude) - 1
+        sub_bucket_index = (index & (self._sub_bucket_half_count - 1)) + self._sub_bucket_half_count
+        if bucket_index < 0:
+            sub_bucket_index -= self._sub_bucket_half_count
+            bucket_index = 0
+        return sub_bucket_index << bucket_index
+
+    def _highest_equivalent(self, index: int) -> int:
+        value = self._value_for(index)
+        bucket_index = max(0, (index >> self._sub_bucket_half_count_magnitude) - 1)
+        return value + (1 << bucket_index) - 1
+
+    def record(self, value: int, count: int = 1):
+        """Record a value in microseconds"""
+        value = max(0, int(value))
+        if value > self.highest_trackable:
+            self.saturated += count
+            value = self.highest_trackable
+        self.counts[self._index_for(value)] += count
+        if self.total_count == 0 or value < self.min_value:
+            self.min_value = value
+        if value > self.max_value:
+            self.max_value = value
+        self.total_count += count
+        self._sum += value * count
+
+    def record_seconds(self, seconds: float):
+        self.record(int(seconds * 1_000_000))
+
+    def _check_compatible(self, other: 'LatencyHistogram'):
+        if (other.highest_trackable, other.significant_figures) != \
+                (self.highest_trackable, self.significant_figures):
+            raise ValueError("Cannot merge histograms with different configurations")
+
+    def merge(self, other: 'LatencyHistogram') -> 'LatencyHistogram':
+        """Add another histogram's counts into this one"""
+        self._check_compatible(other)
+        if other.total_count == 0:
+            return self
+        for index, count in enumerate(other.counts):
+            if count:
+                self.counts[index] += count
+        if self.total_count == 0 or other.min_value < self.min_value:
+            self.min_value = other.min_value
+        self.max_value = max(self.max_value, other.max_value)
+        self.total_count += other.total_count
+        self.saturated += other.saturated
+        self._sum += other._sum
+        return self
+
+    def copy(self) -> 'LatencyHistogram':
+        return LatencyHistogram(self.highest_trackable, self.significant_figures).merge(self)
+
+    def reset(self):
+        for index in range(len(self.counts)):
+            self.counts[index] = 0
+        self.total_count = self.saturated = self.min_value = self.max_value = self._sum = 0
+
+    @property
+    def mean(self) -> float:
+        return self._sum / self.total_count if self.total_count else 0.0
+
+    def percentile(self, q: float) -> int:
+        """Value at percentile q (0-100), reported as the bucket's highest equivalent value"""
+        if self.total_count == 0:
+            return 0
+        target = max(1, int(math.ceil(q / 100 * self.total_count)))
+        running = 0
+        for index, count in enumerate(self.counts):
+            running += count
+            if running >= target:
+                return min(self._highest_equivalent(index), self.max_value)
+        return self.max_value
+
+    def buckets(self) -> Iterable[Tuple[int, int]]:
+        """(representative value, count) for every non-empty bucket, ascending"""
+        for index, count in enumerate(self.counts):
+            if count:
+                yield self._value_for(index), count
+
+    def to_dict(self) -> Dict:
+        """Sparse, JSON-friendly encoding"""
+        return {
+            'highest_trackable': self.highest_trackable,
+            'significant_figures': self.significant_figures,
+            'counts': {str(i): c for i, c in enumerate(self.counts) if c},
+            'min': self.min_value,
+            'max': self.max_value,
+            'sum': self._sum,
+            'saturated': self.saturated,
+        }
+
+    @classmethod
+    def from_dict(cls, data: Dict) -> 'LatencyHistogram':
+        histogram = cls(data['highest_trackable'], data['significant_figures'])
+        for index, count in data['counts'].items():
+            histogram.counts[int(index)] = count
+            histogram.total_count += count
+        histogram.min_value = data['min']
+        histogram.max_value = data['max']
+        histogram._sum = data['sum']
+        histogram.saturated = data.get('saturated', 0)
+        return histogram
+
+
+# Path segments that are part of a route rather than an ID
+_STATIC_SEGMENTS = {
+    'auth', 'google', 'feed', 'explore', 'posts', 'like', 'comments', 'districts', 'clubs',
+    'follow', 'users', 'me', 'quick-start', 'public-key', 'followers', 'following',
+    'following-clubs', 'search', 'conversations', 'messages', 'events', 'rsvp',
+    'notifications', 'token', 'read', 'read-all', 'preferences',
+}
+
+
+def route_template(url: str) -> str:
+    """Collapse IDs in a URL path so /posts/abc/like and /posts/xyz/like share a key"""
+    path = urlsplit(url).path or '/'
+    segments = [s if s in _STATIC_SEGMENTS else '{id}' for s in path.strip('/').split('/') if s]
+    return '/' + '/'.join(segments)
+
+
+def status_class(status_code: Optional[int]) -> str:
+    """'2xx'..'5xx', or 'error' when no response was received"""
+    if status_code is None:
+        return 'error'
+    return f"{status_code // 100}xx"
+
+
+class EndpointStats:
+    """Histogram plus the time window the samples span"""
+
+    def __init__(self, histogram: LatencyHistogram):
+        self.histogram = histogram
+        self.first_start: Optional[float] = None
+        self.last_end: Optional[float] = None
+
+    def record(self, start: float, end: float, latency_us: int):
+        self.histogram.record(latency_us)
+        if self.first_start is None or start < self.first_start:
+            self.first_start = start
+        if self.last_end is None or end > self.last_end:
+            self.last_end = end
+
+    def merge(self, other: 'EndpointStats'):
+        self.histogram.merge(other.histogram)
+        for attr, pick in (('first_start', min), ('last_end', max)):
+            mine, theirs = getattr(self, attr), getattr(other, attr)
+            setattr(self, attr, theirs if mine is None else mine if theirs is None else pick(mine, theirs))
+
+    @property
+    def throughput(self) -> float:
+        if self.first_start is None or self.last_end is None:
+            return 0.0
+        return self.histogram.total_count / max(self.last_end - self.first_start, 1e-6)
+
+
+class LatencyRecorder:
+    """Thread-safe set of histograms keyed by (endpoint, status class)"""
+
+    def __init__(self, highest_trackable: int = 60_000_000, significant_figures: int = 3):
+        self.highest_trackable = highest_trackable
+        self.significant_figures = significant_figures
+        self._lock = threading.Lock()
+        self.stats: Dict[Tuple[str, str], EndpointStats] = {}
+
+    def _stats_for(self, key: Tuple[str, str]) -> EndpointStats:
+        stats = self.stats.get(key)
+        if stats is None:
+            stats = self.stats[key] = EndpointStats(
+                LatencyHistogram(self.highest_trackable, self.significant_figures))
+        return stats
+
+    def record(self, endpoint: str, status: str, start: float, end: float):
+        """start/end are time.perf_counter() readings"""
+        with self._lock:
+            self._stats_for((endpoint, status)).record(start, end, int((end - start) * 1_000_000))
+
+    def merge(self, other: 'LatencyRecorder') -> 'LatencyRecorder':
+        with self._lock:
+            for key, stats in other.stats.items():
+                self._stats_for(key).merge(stats)
+        return self
+
+    def endpoints(self) -> List[str]:
+        return sorted({endpoint for endpoint, _ in self.stats})
+
+    def combined(self, endpoint: str) -> EndpointStats:
+        """All status classes of one endpoint merged together"""
+        merged = EndpointStats(LatencyHistogram(self.highest_trackable, self.significant_figures))
+        for (name, _), stats in self.stats.items():
+            if name == endpoint:
+                merged.merge(stats)
+        return merged
+
+    @property
+    def total_count(self) -> int:
+        return sum(s.histogram.total_count for s in self.stats.values())
+
+    def to_dict(self) -> Dict:
+        """JSON-friendly encoding; sample windows are kept as spans since perf_counter is per-process"""
+        with self._lock:
+            return {
+                'highest_trackable': self.highest_trackable,
+                'significant_figures': self.significant_figures,
+                'stats': [
+                    {
+                        'endpoint': endpoint,
+                        'status': status,
+                        'span': (stats.last_end - stats.first_start) if stats.first_start is not None else 0.0,
+                        'histogram': stats.histogram.to_dict(),
+                    }
+                    for (endpoint, status), stats in sorted(self.stats.items())
+                ],
+            }
+
+    @classmethod
+    def from_dict(cls, data: Dict) -> 'LatencyRecorder':
+        recorder = cls(data['highest_trackable'], data['significant_figures'])
+        for entry in data['stats']:
+            stats = recorder._stats_for((entry['endpoint'], entry['status']))
+            stats.histogram.merge(LatencyHistogram.from_dict(entry['histogram']))
+            stats.first_start, stats.last_end = 0.0, entry['span']
+        return recorder
+
+    def report_lines(self, wall_time: Optional[float] = None) -> List[str]:
+        """Table of p50/p90/p99/p99.9/max (ms) and throughput per endpoint and status class"""
+        lines = [f"{'Endpoint':<34}{'Status':>7}{'Count':>8}{'RPS':>9}{'p50':>9}{'p90':>9}"
+                 f"{'p99':>9}{'p99.9':>9}{'max':>9}"]
+        for key in sorted(self.stats):
+            stats = self.stats[key]
+            h = stats.histogram
+            rps = h.total_count / wall_time if wall_time else stats.throughput
+            lines.append(
+                f"{key[0][:33]:<34}{key[1]:>7}{h.total_count:>8}{rps:>9.1f}"
+                + ''.join(f"{h.percentile(q) / 1000:>9.1f}" for q in (50, 90, 99, 99.9))
+                + f"{h.max_value / 1000:>9.1f}"
+            )
+        if wall_time:
+            lines.append(f"Total requests: {self.total_count} in {wall_time:.1f}s "
+                         f"({self.total_count / wall_time:.1f} req/s) | latencies in ms")
+        return lines
+
+
+class TimedSession(requests.Session):
+    """requests.Session that times every request (including body download) into a LatencyRecorder"""
+
+    def __init__(self, recorder: Optional[LatencyRecorder] = None):
+        super().__init__()
+        self.recorder = recorder if recorder is not None else LatencyRecorder()
+        # Optional harness_overhead.ClientOverhead charged with the client CPU of each request
+        self.overhead = None
+
+    def request(self, method, url, *args, **kwargs):
+        endpoint = f"{method.upper()} {route_template(url)}"
+        cpu = time.thread_time()
+        start = time.perf_counter()
+        try:
+            response = super().request(method, url, *args, **kwargs)
+        except requests.exceptions.RequestException:
+            self.recorder.record(endpoint, 'error', start, time.perf_counter())
+            raise
+        # Responses answered from a client-side cache never reached the network; keep them apart
+        status = 'cache' if getattr(response, 'from_cache', None) == 'fresh' else status_class(response.status_code)
+        end = time.perf_counter()
+        self.recorder.record(endpoint, status, start, end)
+        if self.overhead is not None:
+            self.overhead.record_request(end - start, time.thread_time() - cpu)
+            self.overhead.wrap_json(response)
+        return response
@@ -0,0 +1,399 @@
+#!/usr/bin/env python3
+"""
+LeoConnect Like Storm
+Many users toggle likes on one hot post and one of its comments at once, then the counters are checked
+"""
+
+import argparse
+import random
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from typing import Any, Dict, List, Optional
+
+import requests
+
+from bench_history import add_history_arguments, save_from_args
+from colors import Colors
+from http_pool import add_pool_arguments, configure_pool_from_args
+from identity_pool import IdentityPool, add_identity_arguments, pool_from_args
+from latency import LatencyRecorder, status_class
+from stub_server import add_stand_in_arguments, start_stand_in
+
+
+class Ledger:
+    """
+    One user's acknowledged toggles on one target. Likes are toggles, so a
+    request that got no answer may or may not have applied and is never retried;
+    it leaves the user's state uncertain until a later toggle is acknowledged.
+    """
+
+    def __init__(self):
+        self.acks: List[Optional[bool]] = []  # isLikedByUser per toggle, None when unacknowledged
+        self.anomalies = 0
+
+    def record(self, liked: Optional[bool]):
+        previous = self.acks[-1] if self.acks else None
+        # Two acknowledged toggles in a row must flip the state
+        if liked is not None and previous is not None and liked == previous:
+            self.anomalies += 1
+        self.acks.append(liked)
+
+    @property
+    def initial(self) -> Optional[bool]:
+        """State before the storm, inferred from the first acknowledged toggle"""
+        for index, liked in enumerate(self.acks):
+            if liked is not None:
+                # Every earlier toggle went unanswered, so the parity is unknown
+                return (not liked) if index == 0 else None
+        return None
+
+    @property
+    def final(self) -> Optional[bool]:
+        """Expected state after the storm, or None when the last toggle went unanswered"""
+        return self.acks[-1] if self.acks else None
+
+
+class LedgerSet:
+    """Every user's ledger for one toggled item, plus the highest count a response acknowledged"""
+
+    def __init__(self):
+        self.ledgers: Dict[int, Ledger] = {}
+        self.max_ack_count = 0
+        self._lock = threading.Lock()
+
+    def ledger(self, user: int) -> Ledger:
+        with self._lock:
+            return self.ledgers.setdefault(user, Ledger())
+
+    def note_count(self, count: int):
+        with self._lock:
+            self.max_ack_count = max(self.max_ack_count, count)
+
+    @property
+    def acknowledged(self) -> int:
+        return sum(1 for ledger in self.ledgers.values() for ack in ledger.acks if ack is not None)
+
+    @property
+    def anomalies(self) -> int:
+        return sum(ledger.anomalies for ledger in self.ledgers.values())
+
+
+class Target(LedgerSet):
+    """A likeable item: the hot post or its hot comment"""
+
+    def __init__(self, kind: str, item_id: str, like_path: str, post_id: str):
+        super().__init__()
+        self.kind = kind
+        self.item_id = item_id
+        self.like_path = like_path
+        self.post_id = post_id
+        self.initial_count = 0
+
+    @property
+    def endpoint(self) -> str:
+        return f"POST /{self.kind}s/{{id}}/like"
+
+    def expected_count(self):
+        """(low, high) likesCount implied by the acknowledged toggles"""
+        low = high = self.initial_count
+        for ledger in self.ledgers.values():
+            before, after = ledger.initial, ledger.final
+            # Unknown endpoints could each be liked or not
+            for state, sign in ((before, -1), (after, 1)):
+                if state is None:
+                    if sign > 0:
+                        high += 1
+                    else:
+                        low -= 1
+                elif state:
+                    low += sign
+                    high += sign
+        return low, high
+
+    @property
+    def uncertain(self) -> int:
+        return sum(1 for ledger in self.ledgers.values() if ledger.final is None or ledger.initial is None)
+
+
+def disagreement(who: str, item: Optional[Dict[str, Any]], missing: str, flag: str, expected: Optional[bool],
+                 counter: str, bounds) -> Optional[str]:
+    """First way a read-back item contradicts the acknowledged toggles: per-user flag, then the counter range"""
+    if item is None:
+        return f"{who}: {missing} missing"
+    if expected is not None and bool(item.get(flag)) != expected:
+        return f"{who}: {flag} {item.get(flag)}, acknowledged {expected}"
+    low, high = bounds
+    count = item.get(counter)
+    if not isinstance(count, int) or not low <= count <= high:
+        return f"{who}: {counter} {count}, expected {low if low == high else f'{low}..{high}'}"
+    return None
+
+
+class ConsistencyRun:
+    """
+    A concurrent toggle run over an identity pool: one session per identity
+    (identity 0 sets things up, the rest take part), a recorder for the run and
+    one for the uncontended baseline, and per-check read-back counts.
+    """
+
+    def __init__(self, base_url: str, identities: IdentityPool, concurrency: int = 64, seed: Optional[int] = None,
+                 timeout: float = 30):
+        self.base_url = base_url
+        self.identities = identities
+        self.concurrency = concurrency
+        self.seed = seed
+        self.timeout = timeout
+        self.recorder = LatencyRecorder()
+        self.baseline = LatencyRecorder()
+        self.mismatches: Dict[str, List[str]] = {}
+        self.checked: Dict[str, int] = {}
+        self._lock = threading.Lock()
+        self._sessions = [identities.session(i) for i in range(len(identities))]
+
+    @property
+    def participants(self) -> range:
+        return range(1, len(self._sessions))
+
+    def _mismatch(self, check: str, detail: Optional[str]):
+        """Count one read-back under `check`; `detail` is None when it was consistent"""
+        with self._lock:
+            self.checked[check] = self.checked.get(check, 0) + 1
+            if detail is not None:
+                self.mismatches.setdefault(check, []).append(detail)
+
+    def _call(self, user: int, method: str, path: str, recorder: Optional[LatencyRecorder] = None,
+              name: Optional[str] = None, **kwargs):
+        return self._send(self._sessions[user], method, path, recorder, name, **kwargs)
+
+    def _send(self, session: requests.Session, method: str, path: str, recorder: Optional[LatencyRecorder] = None,
+              name: Optional[str] = None, **kwargs):
+        """One request; recorded under `name` when a recorder is given. Returns None on a transport error"""
+        start = time.perf_counter()
+        status = None
+        response = None
+        try:
+            response = session.request(method, f"{self.base_url}{path}", timeout=self.timeout, **kwargs)
+            status = response.status_code
+        except requests.exceptions.RequestException:
+            pass
+        if recorder is not None:
+            recorder.record(name, status_class(status), start, time.perf_counter())
+        return response
+
+    def sample_participants(self, sample: int = 0) -> List[int]:
+        users = list(self.participants)
+        if sample and sample < len(users):
+            users = random.Random(self.seed).sample(users, sample)
+        return users
+
+    def contention_line(self, name: str, against: str) -> Optional[str]:
+        """Baseline vs in-run p50/p99 for one endpoint, or None when either side has no samples"""
+        base = self.baseline.combined(name).histogram
+        hot = self.recorder.combined(name).histogram
+        if not (base.total_count and hot.total_count):
+            return None
+        return (f"p50 {base.percentile(50) / 1000:.1f} -> {hot.percentile(50) / 1000:.1f} ms, "
+                f"p99 {base.percentile(99) / 1000:.1f} -> {hot.percentile(99) / 1000:.1f} ms "
+                f"({hot.percentile(99) / max(base.percentile(99), 1):.1f}x p99 vs {against})")
+
+    def print_checks(self, title: str):
+        print(f"\n{Colors.BOLD}{title}{Colors.RESET}")
+        width = max((len(check) for check in self.checked), default=0) + 2
+        for check in sorted(self.checked):
+            failures = self.mismatches.get(check, [])
+            color = Colors.GREEN if not failures else Colors.RED
+            mark = '✓' if not failures else '✗'
+            print(f"  {color}{mark} {check:<{width}} {self.checked[check] - len(failures):>6}/{self.checked[check]} "
+                  f"consistent{Colors.RESET}")
+            for detail in failures[:5]:
+                print(f"      {detail}")
+
+
+class LikeStorm(ConsistencyRun):
+    """
+    Identity 0 authors the hot post and comment; every other identity follows
+    the author (so the post is in their /feed), then toggles each target a
+    random number of times. Afterwards each liker reads both targets back
+    through GET /posts/{id}, /feed and /posts/{id}/comments.
+    """
+
+    def __init__(self, base_url: str, identities: IdentityPool, max_toggles: int = 4, concurrency: int = 64,
+                 seed: Optional[int] = None, timeout: float = 30):
+        super().__init__(base_url, identities, concurrency, seed, timeout)
+        self.max_toggles = max_toggles
+        self.targets: List[Target] = []
+        self.unsupported: List[str] = []
+
+    @property
+    def likers(self) -> range:
+        return self.participants
+
+    def setup(self, post_id: Optional[str] = None):
+        author = 0
+        if post_id is None:
+            response = self._call(author, 'POST', '/posts', json={'content': 'Like storm hot post'})
+            if response is None or response.status_code not in (200, 201):
+                raise SystemExit(f"Could not create the hot post: {response.status_code if response is not None else 'error'}")
+            post_id = response.json()['postId']
+        response = self._call(author, 'POST', f'/posts/{post_id}/comments', json={'content': 'Like storm hot comment'})
+        if response is None or response.status_code not in (200, 201):
+            raise SystemExit(f"Could not comment on {post_id}: {response.status_code if response is not None else 'error'}")
+        comment_id = response.json()['comment']['commentId']
+        self.targets = [Target('post', post_id, f'/posts/{post_id}/like', post_id),
+                        Target('comment', comment_id, f'/comments/{comment_id}/like', post_id)]
+        post = self.read_post(author, post_id)
+        if post is not None:
+            self.targets[0].initial_count = post.get('likesCount', 0)
+        else:
+            # The app never fetches a single post, so a backend may not serve it
+            self.unsupported.append('GET /posts/{id}')
+        author_id = self.identities.identities[author].uid
+        me = self._call(author, 'GET', '/users/me')
+        if me is not None and me.status_code == 200:
+            author_id = me.json().get('uid', author_id)
+        with ThreadPoolExecutor(max_workers=self.concurrency) as pool:
+            list(pool.map(lambda user: self._call(user, 'POST', f'/users/{author_id}/follow'), self.likers))
+
+    def read_post(self, user: int, post_id: str) -> Optional[Dict[str, Any]]:
+        response = self._call(user, 'GET', f'/posts/{post_id}')
+        if response is None or response.status_code != 200:
+            return None
+        return response.json()
+
+    def measure_baseline(self, toggles: int = 40):
+        """The same toggles from a single user on a quiet post, for the uncontended latency"""
+        response = self._call(0, 'POST', '/posts', json={'content': 'Like storm baseline post'})
+        if response is None or response.status_code not in (200, 201):
+            return
+        post_id = response.json()['postId']
+        for _ in range(toggles):
+            self._call(0, 'POST', f'/posts/{post_id}/like', self.baseline, 'POST /posts/{id}/like')
+
+    def _storm_user(self, user: int):
+        rng = random.Random(None if self.seed is None else self.seed * 1_000_003 + user)
+        plan = [target for target in self.targets for _ in range(rng.randint(1, self.max_toggles))]
+        rng.shuffle(plan)
+        for target in plan:
+            response = self._call(user, 'POST', target.like_path, self.recorder, target.endpoint)
+            liked = None
+            if response is not None and response.status_code == 200:
+                try:
+                    data = response.json()
+                    liked = bool(data['isLikedByUser'])
+                    target.note_count(int(data.get('likesCount', 0)))
+                except (ValueError, KeyError, TypeError):
+                    pass
+            target.ledger(user).record(liked)
+
+    def storm(self) -> float:
+        start = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=self.concurrency) as pool:
+            list(pool.map(self._storm_user, self.likers))
+        return time.perf_counter() - start
+
+    def _check(self, check: str, target: Target, user: int, item: Optional[Dict[str, Any]]):
+        """Compare one read-back of target (as user) with the ledger"""
+        ledger = target.ledgers.get(user)
+        self._mismatch(check, disagreement(f"user {user}", item, target.kind, 'isLikedByUser',
+                                           ledger.final if ledger else None, 'likesCount', target.expected_count()))
+
+    def _verify_user(self, user: int):
+        post_target, comment_target = self.targets
+        if 'GET /posts/{id}' not in self.unsupported:
+            self._check('GET /posts/{id}', post_target, user, self.read_post(user, post_target.item_id))
+        response = self._call(user, 'GET', '/feed', params={'limit': 50})
+        if response is not None and response.status_code == 200:
+            found = next((p for p in response.json() if p.get('postId') == post_target.item_id), None)
+            self._check('GET /feed', post_target, user, found)
+        else:
+            self._mismatch('GET /feed', f"user {user}: status {response.status_code if response is not None else 'error'}")
+        response = self._call(user, 'GET', f'/posts/{comment_target.post_id}/comments', params={'limit': 50})
+        if response is not None and response.status_code == 200:
+            comments = response.json().get('comments', [])
+            found = next((c for c in comments if c.get('commentId') == comment_target.item_id), None)
+            self._check('GET /posts/{id}/comments', comment_target, user, found)
+        else:
+            self._mismatch('GET /posts/{id}/comments',
+                           f"user {user}: status {response.status_code if response is not None else 'error'}")
+
+    def verify(self, sample: int = 0):
+        with ThreadPoolExecutor(max_workers=self.concurrency) as pool:
+            list(pool.map(self._verify_user, self.sample_participants(sample)))
+
+    @property
+    def consistent(self) -> bool:
+        return not self.mismatches and not any(target.anomalies for target in self.targets)
+
+
+def print_report(storm: LikeStorm, wall_time: float):
+    print(f"\n{Colors.BOLD}Storm latency{Colors.RESET}")
+    for line in storm.recorder.report_lines(wall_time):
+        print(line)
+    contention = storm.contention_line('POST /posts/{id}/like', "one user on a quiet post")
+    if contention:
+        print(f"\nContention: like {contention}")
+
+    print(f"\n{Colors.BOLD}Acknowledged state{Colors.RESET}")
+    for target in storm.targets:
+        low, high = target.expected_count()
+        toggles = sum(len(ledger.acks) for ledger in target.ledgers.values())
+        expected = f"{low}" if low == high else f"{low}..{high}"
+        print(f"  {target.kind:<8} {target.item_id:<24} {toggles:>7} toggles, expected likesCount {expected} "
+              f"(peak acknowledged {target.max_ack_count}), {target.uncertain} users uncertain")
+        if target.anomalies:
+            print(f"  {Colors.RED}✗ {target.anomalies} acknowledged toggles did not flip the state "
+                  f"(lost or doubled update){Colors.RESET}")
+
+    storm.print_checks("Read-back")
+    for route in storm.unsupported:
+        print(f"  {Colors.YELLOW}- {route} not served by this backend; skipped{Colors.RESET}")
+    print()
+
+
+def main():
+    """Main function"""
+    parser = argparse.ArgumentParser(description="LeoConnect hot-post like storm")
+    parser.add_argument('--base-url', default="https://leoconnect.rexosphere.com")
+    parser.add_argument('--concurrency', type=int, default=64, help="Users toggling at once")
+    parser.add_argument('--max-toggles', type=int, default=4, help="Each user toggles each target 1..N times")
+    parser.add_argument('--post-id', help="Storm an existing post instead of creating one")
+    parser.add_argument('--verify-sample', type=int, default=0, help="Read back as this many users (0 = all)")
+    parser.add_argument('--seed', type=int)
+    add_identity_arguments(parser)
+    add_pool_arguments(parser)
+    add_history_arguments(parser)
+    add_stand_in_arguments(parser)
+    args = parser.parse_args()
+    if not args.identities and not args.tokens_file:
+        args.identities = 1000
+    configure_pool_from_args(args, default_maxsize=args.concurrency)
+    start_stand_in(args)
+
+    identities = pool_from_args(args)
+    if len(identities) < 2:
+        raise SystemExit("Need at least two identities: one author and one liker")
+    print(f"\n{Colors.BOLD}LeoConnect Like Storm{Colors.RESET}")
+    print(f"{Colors.BOLD}Base URL: {args.base_url} | {len(identities) - 1} likers, {args.concurrency} concurrent"
+          f"{Colors.RESET}")
+    print(f"{Colors.BOLD}Started at: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}{Colors.RESET}\n")
+
+    identities.sign_in_all(args.concurrency)
+    storm = LikeStorm(args.base_url, identities, args.max_toggles, args.concurrency, args.seed)
+    storm.setup(args.post_id)
+    storm.measure_baseline()
+    print(f"Hot post {storm.targets[0].item_id}, hot comment {storm.targets[1].item_id}; storming...")
+    wall_time = storm.storm()
+    storm.verify(args.verify_sample)
+    print_report(storm, wall_time)
+
+    save_from_args(args, 'like_storm', storm.recorder, wall_time,
+                   extra={'likers': len(identities) - 1, 'concurrency': args.concurrency,
+                          'consistent': storm.consistent})
+    if not storm.consistent:
+        raise SystemExit(1)
+
+
+if __name__ == "__main__":
+    main()
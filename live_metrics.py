@@ -0,0 +1,346 @@
+#!/usr/bin/env python3
+"""
+LeoConnect Live Metrics
+Serves client-side request metrics in Prometheus/OpenMetrics text format and draws a refreshing terminal dashboard
+"""
+
+import argparse
+import contextlib
+import io
+import shutil
+import sys
+import threading
+import time
+from collections import Counter, deque
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, List, Optional, Tuple
+from urllib.parse import urlsplit
+
+from colors import Colors
+from http_pool import add_listener, add_send_listener
+from latency import LatencyHistogram, route_template
+
+
+# Prometheus histogram upper bounds, in seconds
+BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+OPENMETRICS_TYPE = 'application/openmetrics-text; version=1.0.0; charset=utf-8'
+PROMETHEUS_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+
+
+class RouteMetrics:
+    """Counters for one (method, route) pair; mutated under LiveMetrics' lock"""
+
+    def __init__(self):
+        self.codes: Counter = Counter()
+        self.errors: Counter = Counter()
+        self.in_flight = 0
+        self.request_bytes = 0
+        self.response_bytes = 0
+        self.buckets = [0] * (len(BUCKETS) + 1)
+        self.seconds = 0.0
+        self.latency = LatencyHistogram(significant_figures=2)
+
+    @property
+    def completed(self) -> int:
+        return sum(self.codes.values()) + self.errors['transport']
+
+    @property
+    def failed(self) -> int:
+        return sum(self.errors.values())
+
+    def observe(self, seconds: float):
+        for index, bound in enumerate(BUCKETS):
+            if seconds <= bound:
+                self.buckets[index] += 1
+                break
+        else:
+            self.buckets[-1] += 1
+        self.seconds += seconds
+        self.latency.record_seconds(seconds)
+
+
+def error_class(status_code: int) -> Optional[str]:
+    if status_code == 429:
+        return '429'
+    if status_code >= 500:
+        return '5xx'
+    if status_code >= 400:
+        return '4xx'
+    return None
+
+
+def _label(value: str) -> str:
+    return value.replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+class LiveMetrics:
+    """
+    Shared-pool listener keeping per-route request counts by status code, error
+    classes (4xx, 429, 5xx and transport failures), in-flight requests, bytes
+    and a time-to-headers histogram.
+    """
+
+    def __init__(self, tool: str):
+        self.tool = tool
+        self.started = time.time()
+        self.routes: Dict[Tuple[str, str], RouteMetrics] = {}
+        self.transport_errors: Counter = Counter()
+        self._lock = threading.Lock()
+        add_send_listener(self.on_send)
+        add_listener(self.on_done)
+
+    def _route(self, request) -> RouteMetrics:
+        key = (request.method, route_template(urlsplit(request.url).path))
+        route = self.routes.get(key)
+        if route is None:
+            route = self.routes[key] = RouteMetrics()
+        return route
+
+    def on_send(self, request):
+        body = request.body
+        size = len(body) if isinstance(body, (bytes, str)) else 0
+        with self._lock:
+            route = self._route(request)
+            route.in_flight += 1
+            route.request_bytes += size
+
+    def on_done(self, request, response, timing, error):
+        with self._lock:
+            route = self._route(request)
+            route.in_flight -= 1
+            if response is None:
+                route.errors['transport'] += 1
+                self.transport_errors[type(error).__name__] += 1
+                return
+            route.codes[response.status_code] += 1
+            failure = error_class(response.status_code)
+            if failure:
+                route.errors[failure] += 1
+            size = response.headers.get('Content-Length')
+            if size is not None and size.isdigit():
+                route.response_bytes += int(size)
+            if timing.headers_at is not None:
+                route.observe(timing.headers_at - timing.started)
+
+    def exposition(self, openmetrics: bool = False) -> str:
+        """The metrics page, in OpenMetrics 1.0 or Prometheus 0.0.4 text format"""
+        lines: List[str] = []
+
+        def family(name: str, kind: str, help_text: str):
+            # OpenMetrics names a counter family without its _total suffix
+            shown = name[:-len('_total')] if openmetrics and kind == 'counter' else name
+            lines.append(f"# HELP {shown} {help_text}")
+            lines.append(f"# TYPE {shown} {kind}")
+
+        with self._lock:
+            routes = sorted(self.routes.items())
+            family('leoconnect_client_info', 'gauge', "Tool generating this traffic")
+            lines.append(f'leoconnect_client_info{{tool="{_label(self.tool)}"}} 1')
+            family('leoconnect_client_start_time_seconds', 'gauge', "Unix time the run started")
+            lines.append(f"leoconnect_client_start_time_seconds {self.started:.3f}")
+
+            family('leoconnect_client_requests_total', 'counter', "Responses received, by route and status code")
+            for (method, path), route in routes:
+                for code, count in sorted(route.codes.items()):
+                    lines.append(f'leoconnect_client_requests_total{{method="{method}",route="{_label(path)}",'
+                                 f'code="{code}"}} {count}')
+            family('leoconnect_client_errors_total', 'counter',
+                   "Failed requests, by route and class (4xx, 429, 5xx, transport)")
+            for (method, path), route in routes:
+                for name, count in sorted(route.errors.items()):
+                    lines.append(f'leoconnect_client_errors_total{{method="{method}",route="{_label(path)}",'
+                                 f'class="{name}"}} {count}')
+            family('leoconnect_client_transport_errors_total', 'counter', "Requests with no response, by exception")
+            for name, count in sorted(self.transport_errors.items()):
+                lines.append(f'leoconnect_client_transport_errors_total{{exception="{_label(name)}"}} {count}')
+            family('leoconnect_client_in_flight_requests', 'gauge', "Requests sent and not yet answered")
+            for (method, path), route in routes:
+                lines.append(f'leoconnect_client_in_flight_requests{{method="{method}",route="{_label(path)}"}} '
+                             f'{route.in_flight}')
+            for name, attr, help_text in (
+                    ('leoconnect_client_request_bytes_total', 'request_bytes', "Request body bytes sent"),
+                    ('leoconnect_client_response_bytes_total', 'response_bytes',
+                     "Response body bytes received (Content-Length)")):
+                family(name, 'counter', help_text)
+                for (method, path), route in routes:
+                    lines.append(f'{name}{{method="{method}",route="{_label(path)}"}} {getattr(route, attr)}')
+
+            family('leoconnect_client_request_duration_seconds', 'histogram',
+                   "Time from sending a request to its response headers")
+            for (method, path), route in routes:
+                labels = f'method="{method}",route="{_label(path)}"'
+                cumulative = 0
+                for bound, count in zip(BUCKETS, route.buckets):
+                    cumulative += count
+                    lines.append(f'leoconnect_client_request_duration_seconds_bucket{{{labels},le="{bound:g}"}} '
+                                 f'{cumulative}')
+                cumulative += route.buckets[-1]
+                lines.append(f'leoconnect_client_request_duration_seconds_bucket{{{labels},le="+Inf"}} {cumulative}')
+                lines.append(f'leoconnect_client_request_duration_seconds_sum{{{labels}}} {route.seconds:.6f}')
+                lines.append(f'leoconnect_client_request_duration_seconds_count{{{labels}}} {cumulative}')
+        if openmetrics:
+            lines.append('# EOF')
+        return '\n'.join(lines) + '\n'
+
+    def snapshot(self) -> List[Tuple[str, int, int, int, int, LatencyHistogram]]:
+        """(endpoint, completed, failed, in flight, response bytes, latency copy) per route"""
+        with self._lock:
+            return [(f"{method} {path}", route.completed, route.failed, route.in_flight, route.response_bytes,
+                     route.latency.copy()) for (method, path), route in sorted(self.routes.items())]
+
+
+class _MetricsHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        if urlsplit(self.path).path != '/metrics':
+            self.send_error(404)
+            return
+        openmetrics = 'application/openmetrics-text' in self.headers.get('Accept', '')
+        data = self.server.metrics.exposition(openmetrics).encode()
+        self.send_response(200)
+        self.send_header('Content-Type', OPENMETRICS_TYPE if openmetrics else PROMETHEUS_TYPE)
+        self.send_header('Content-Length', str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def log_message(self, format, *args):
+        pass
+
+
+def serve_metrics(metrics: LiveMetrics, host: str = '127.0.0.1', port: int = 9464) -> ThreadingHTTPServer:
+    """Serve GET /metrics on a daemon thread for as long as the process runs"""
+    server = ThreadingHTTPServer((host, port), _MetricsHandler)
+    server.daemon_threads = True
+    server.metrics = metrics
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+class _TailBuffer(io.TextIOBase):
+    """Stdout replacement keeping the last lines a tool printed, for the dashboard to show"""
+
+    def __init__(self, keep: int = 200):
+        self.lines = deque(maxlen=keep)
+        self._partial = ''
+        self._lock = threading.Lock()
+
+    def write(self, text: str) -> int:
+        with self._lock:
+            parts = (self._partial + text).split('\n')
+            self._partial = parts.pop()
+            self.lines.extend(part for part in parts if part.strip())
+        return len(text)
+
+    def tail(self, count: int) -> List[str]:
+        with self._lock:
+            return list(self.lines)[-count:]
+
+
+class Dashboard:
+    """Redraws a per-route table every `interval` seconds in place of the tool's scrolling output"""
+
+    def __init__(self, metrics: LiveMetrics, interval: float = 1.0, title: str = '', metrics_url: str = '',
+                 enabled: bool = True):
+        self.metrics = metrics
+        self.enabled = enabled
+        self.interval = interval
+        self.title = title or metrics.tool
+        self.metrics_url = metrics_url
+        self.output = _TailBuffer()
+        self._stream = sys.stdout
+        self._previous: Dict[str, Tuple[int, float]] = {}
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def render(self) -> str:
+        now = time.perf_counter()
+        rows = self.metrics.snapshot()
+        width, height = shutil.get_terminal_size((120, 40))
+        elapsed = time.time() - self.metrics.started
+        total = sum(row[1] for row in rows)
+        failed = sum(row[2] for row in rows)
+        in_flight = sum(row[3] for row in rows)
+        received = sum(row[4] for row in rows)
+        rate_now = 0.0
+        body = []
+        for name, completed, errors, flying, _, latency in rows:
+            before, at = self._previous.get(name, (0, now - self.interval))
+            rate = (completed - before) / max(now - at, 1e-9)
+            rate_now += rate
+            self._previous[name] = (completed, now)
+            color = Colors.RED if errors else ''
+            body.append(f"{color}{name[:38]:<39}{completed:>8}{rate:>8.1f}{flying:>5}"
+                        f"{latency.percentile(50) / 1000:>9.1f}{latency.percentile(95) / 1000:>9.1f}"
+                        f"{latency.percentile(99) / 1000:>9.1f}{errors:>7}{Colors.RESET}")
+        minutes, seconds = divmod(int(elapsed), 60)
+        lines = [
+            f"{Colors.BOLD}LeoConnect {self.title} — live{Colors.RESET}  {minutes:02d}:{seconds:02d} elapsed"
+            + (f"  |  {self.metrics_url}" if self.metrics_url else ''),
+            f"Requests {total} ({rate_now:.1f}/s now)  |  in flight {in_flight}  |  "
+            f"{(Colors.RED if failed else Colors.GREEN)}errors {failed} ({failed / max(total, 1) * 100:.1f}%)"
+            f"{Colors.RESET}  |  received {received / 1_000_000:.2f} MB",
+            '',
+            f"{Colors.BLUE}{'Endpoint':<39}{'Reqs':>8}{'/s':>8}{'In':>5}{'p50 ms':>9}{'p95 ms':>9}{'p99 ms':>9}"
+            f"{'Err':>7}{Colors.RESET}",
+        ] + body
+        room = max(0, height - len(lines) - 3)
+        if room:
+            lines += ['', f"{Colors.BLUE}Recent output{Colors.RESET}"]
+            lines += [line[:width - 2] for line in self.output.tail(room)]
+        return '\033[H\033[J' + '\n'.join(lines) + '\n'
+
+    def _loop(self):
+        while not self._stop.wait(self.interval):
+            self._stream.write(self.render())
+            self._stream.flush()
+
+    @contextlib.contextmanager
+    def showing(self):
+        """Capture the tool's output and keep the dashboard on screen until the block exits"""
+        self._stream = sys.stdout
+        sys.stdout = self.output
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._loop, daemon=True)
+        self._thread.start()
+        try:
+            yield self
+        finally:
+            self._stop.set()
+            self._thread.join()
+            sys.stdout = self._stream
+            self._stream.write(self.render())
+            self._stream.flush()
+
+
+def add_live_arguments(parser: argparse.ArgumentParser):
+    """--metrics-port / --dashboard options for tools that run long enough to watch"""
+    parser.add_argument('--metrics-port', type=int,
+                        help="Serve Prometheus/OpenMetrics text at http://HOST:PORT/metrics during the run (0 = any)")
+    parser.add_argument('--metrics-host', default='127.0.0.1', help="Interface for --metrics-port")
+    parser.add_argument('--dashboard', action='store_true', help="Show a refreshing dashboard instead of the log")
+    parser.add_argument('--dashboard-interval', type=float, default=1.0, help="Seconds between dashboard redraws")
+
+
+def live_from_args(args, tool: str) -> Optional[Dashboard]:
+    """
+    Start collecting (and serving) live metrics if asked to. Returns the
+    dashboard to wrap the run in via live_view(); its output is captured
+    only when --dashboard is set.
+    """
+    if args.metrics_port is None and not args.dashboard:
+        return None
+    metrics = LiveMetrics(tool)
+    url = ''
+    if args.metrics_port is not None:
+        server = serve_metrics(metrics, args.metrics_host, args.metrics_port)
+        host, port = server.server_address[:2]
+        url = f"http://{host}:{port}/metrics"
+        print(f"Serving live metrics at {url}")
+    return Dashboard(metrics, args.dashboard_interval, tool, url, enabled=args.dashboard)
+
+
+def live_view(dashboard: Optional[Dashboard]):
+    """Context for the measured part of a run: the dashboard when enabled, otherwise nothing"""
+    if dashboard is None or not dashboard.enabled:
+        return contextlib.nullcontext()
+    return dashboard.showing()
@@ -0,0 +1,300 @@
+#!/usr/bin/env python3
+"""
+LeoConnect Distributed Load
+Runs the load generator in N worker processes (local or on other hosts) and merges their histograms
+"""
+
+import argparse
+import multiprocessing
+import ipaddress
+import os
+import secrets
+import socket
+import threading
+import time
+from datetime import datetime
+from multiprocessing.connection import Client, Listener
+from typing import Any, Dict, List
+
+from bench_history import add_history_arguments, save_from_args
+from colors import Colors
+from http_pool import ConnectionStats, configure_pool, shared_adapter
+from latency import LatencyRecorder
+from load_gen import ENDPOINTS, ClosedLoopGenerator, LoadResult, OpenLoopGenerator, parse_endpoints
+from stub_server import StubServer, add_stand_in_arguments, stand_in_options
+
+
+AUTHKEY_ENV = 'LEOCONNECT_LOAD_AUTHKEY'
+
+
+def split(total: float, parts: int, index: int, integral: bool = True):
+    """Share of `total` given to worker `index` out of `parts`"""
+    if not integral:
+        return total / parts
+    return int(total) // parts + (1 if index < int(total) % parts else 0)
+
+
+def build_jobs(args: argparse.Namespace, workers: int) -> List[Dict[str, Any]]:
+    """One job per worker; users or arrival rate are divided between them"""
+    jobs = []
+    for index in range(workers):
+        job = {
+            'index': index,
+            'mode': args.mode,
+            'base_url': args.base_url,
+            'token': args.token,
+            'endpoints': args.endpoints,
+            'duration': args.duration,
+            'seed': None if args.seed is None else args.seed + index * 1000,
+        }
+        if args.mode == 'closed':
+            job.update(users=split(args.users, workers, index), think=args.think)
+        else:
+            job.update(rate=split(args.rate, workers, index, integral=False),
+                       max_workers=max(1, split(args.max_workers, workers, index)), poisson=args.poisson)
+        jobs.append(job)
+    return jobs
+
+
+def run_job(job: Dict[str, Any]) -> Dict[str, Any]:
+    """Execute one worker's share of the load and return mergeable results"""
+    endpoints = parse_endpoints(job['endpoints'])
+    if job['mode'] == 'closed':
+        if not job['users']:
+            return {'index': job['index'], 'host': socket.gethostname(), 'pid': os.getpid(), 'idle': True}
+        configure_pool(pool_maxsize=job['users'])
+        generator = ClosedLoopGenerator(job['base_url'], endpoints, users=job['users'], think_time=job['think'],
+                                        token=job['token'], seed=job['seed'])
+    else:
+        configure_pool(pool_maxsize=job['max_workers'])
+        generator = OpenLoopGenerator(job['base_url'], endpoints, rate=job['rate'], max_workers=job['max_workers'],
+                                      poisson=job['poisson'], token=job['token'], seed=job['seed'])
+    result = generator.run(job['duration'])
+    return {
+        'index': job['index'],
+        'host': socket.gethostname(),
+        'pid': os.getpid(),
+        'duration': result.duration,
+        'latency': result.recorder.to_dict(),
+        'connections': shared_adapter().stats.to_dict(),
+    }
+
+
+def worker_main(address, authkey: bytes):
+    """Connect to the coordinator, wait for a job and its start time, run it and send the results back"""
+    with Client(address, authkey=authkey) as conn:
+        job = conn.recv()
+        # Every worker starts at the same wall-clock instant (hosts need synchronised clocks)
+        time.sleep(max(0.0, job['start_at'] - time.time()))
+        try:
+            conn.send(run_job(job))
+        except Exception as e:
+            conn.send({'index': job['index'], 'host': socket.gethostname(), 'pid': os.getpid(),
+                       'error': f"{type(e).__name__}: {e}"})
+
+
+def _serve_stand_in(conn, options: Dict[str, Any]):
+    server = StubServer(**options).start()
+    conn.send(server.base_url)
+    conn.recv()
+    server.stop()
+
+
+class Coordinator:
+    """Hands out jobs to every connected worker and merges what they send back"""
+
+    def __init__(self, address, authkey: bytes, local_workers: int, remote_workers: int = 0,
+                 show_authkey: bool = False):
+        self.address = address
+        self.authkey = authkey
+        self.show_authkey = show_authkey
+        self.local_workers = local_workers
+        self.remote_workers = remote_workers
+        self.processes: List[multiprocessing.Process] = []
+
+    @property
+    def workers(self) -> int:
+        return self.local_workers + self.remote_workers
+
+    def run(self, jobs: List[Dict[str, Any]], start_delay: float = 1.0,
+            connect_timeout: float = 120) -> List[Dict[str, Any]]:
+        context = multiprocessing.get_context('spawn')
+        with Listener(self.address, authkey=self.authkey) as listener:
+            self.address = listener.address
+            for _ in range(self.local_workers):
+                process = context.Process(target=worker_main, args=(listener.address, self.authkey), daemon=True)
+                process.start()
+                self.processes.append(process)
+            if self.remote_workers:
+                # A generated key is only known here; an explicit one stays off the console
+                key = f"--authkey {self.authkey.decode()}" if self.show_authkey else f"--authkey (or ${AUTHKEY_ENV})"
+                print(f"Waiting for {self.remote_workers} remote worker(s): "
+                      f"load_cluster.py {key} worker --connect {listener.address[0]}:{listener.address[1]}")
+
+            connections = []
+
+            def accept_all():
+                while len(connections) < self.workers:
+                    connections.append(listener.accept())
+
+            acceptor = threading.Thread(target=accept_all, daemon=True)
+            acceptor.start()
+            acceptor.join(connect_timeout)
+            if acceptor.is_alive():
+                raise SystemExit(f"Only {len(connections)} of {self.workers} workers connected")
+
+        start_at = time.time() + start_delay
+        for conn, job in zip(connections, jobs):
+            conn.send(dict(job, start_at=start_at))
+        results = []
+        for conn in connections:
+            try:
+                results.append(conn.recv())
+            except EOFError:
+                results.append({'error': 'worker disconnected before reporting'})
+            conn.close()
+        for process in self.processes:
+            process.join(timeout=10)
+        return results
+
+
+def merge_results(results: List[Dict[str, Any]]):
+    recorder = LatencyRecorder()
+    connections = ConnectionStats()
+    duration = 0.0
+    for result in results:
+        if 'latency' not in result:
+            continue
+        recorder.merge(LatencyRecorder.from_dict(result['latency']))
+        connections.merge(ConnectionStats.from_dict(result['connections']))
+        duration = max(duration, result['duration'])
+    return recorder, connections, duration
+
+
+def print_workers(results: List[Dict[str, Any]]):
+    print(f"\n{Colors.BOLD}Workers{Colors.RESET}")
+    total = 0.0
+    for result in sorted(results, key=lambda r: r.get('index', -1)):
+        where = f"#{result.get('index', '?')} {result.get('host', '?')}:{result.get('pid', '?')}"
+        if 'error' in result:
+            print(f"  {where:<32}{Colors.RED}{result['error']}{Colors.RESET}")
+        elif result.get('idle'):
+            print(f"  {where:<32}idle (no virtual users assigned)")
+        else:
+            count = LatencyRecorder.from_dict(result['latency']).total_count
+            rps = count / result['duration']
+            total += rps
+            print(f"  {where:<32}{count:>8} requests {rps:>9.1f} req/s")
+    print(f"  {'Aggregate':<32}{'':>17}{total:>9.1f} req/s")
+
+
+def parse_address(text: str):
+    host, _, port = text.rpartition(':')
+    if not host:
+        raise SystemExit(f"'{text}' has no host; give HOST:PORT (all interfaces must be asked for explicitly)")
+    return host, int(port)
+
+
+def is_loopback(host: str) -> bool:
+    try:
+        return ipaddress.ip_address(socket.gethostbyname(host)).is_loopback
+    except (OSError, ValueError):
+        return False
+
+
+def main():
+    """Main function"""
+    parser = argparse.ArgumentParser(description="LeoConnect multi-process load coordinator")
+    parser.add_argument('--authkey', default=os.environ.get(AUTHKEY_ENV),
+                        help=f"Shared secret between coordinator and workers (default ${AUTHKEY_ENV}; "
+                             f"the coordinator generates one when neither is set)")
+    roles = parser.add_subparsers(dest='role', required=True)
+
+    worker = roles.add_parser('worker', help="Join a coordinator running on another host")
+    worker.add_argument('--connect', required=True, help="Coordinator host:port")
+
+    run = roles.add_parser('run', help="Coordinate a distributed load test")
+    run.add_argument('--base-url', default="https://leoconnect.rexosphere.com")
+    run.add_argument('--token', help="Bearer token sent by every virtual user")
+    run.add_argument('--endpoints', default='feed,explore,districts',
+                     help=f"Comma-separated mix from: {', '.join(ENDPOINTS)}")
+    run.add_argument('--duration', type=float, default=30, help="Run length in seconds")
+    run.add_argument('--seed', type=int)
+    run.add_argument('--processes', type=int, default=os.cpu_count() or 1, help="Local worker processes")
+    run.add_argument('--remote-workers', type=int, default=0, help="Workers expected from other hosts")
+    run.add_argument('--listen', default='127.0.0.1:0',
+                     help="Coordinator address; a non-loopback address (for remote workers) needs --authkey")
+    add_history_arguments(run)
+    add_stand_in_arguments(run)
+    modes = run.add_subparsers(dest='mode', required=True)
+
+    closed = modes.add_parser('closed', help="N virtual users with think time, spread over the workers")
+    closed.add_argument('--users', type=int, default=10)
+    closed.add_argument('--think', type=float, default=1.0, help="Mean think time in seconds")
+
+    open_loop = modes.add_parser('open', help="Constant total arrival rate, split between the workers")
+    open_loop.add_argument('--rate', type=float, default=100, help="Total requests per second")
+    open_loop.add_argument('--max-workers', type=int, default=256, help="Total max requests in flight")
+    open_loop.add_argument('--poisson', action='store_true', help="Poisson instead of uniform arrivals")
+
+    args = parser.parse_args()
+
+    if args.role == 'worker':
+        if not args.authkey:
+            raise SystemExit(f"Workers need the coordinator's key: --authkey or ${AUTHKEY_ENV}")
+        worker_main(parse_address(args.connect), args.authkey.encode())
+        return
+
+    # Workers exchange pickles with the coordinator, so the key must never be guessable
+    listen = parse_address(args.listen)
+    generated = not args.authkey
+    if generated and not is_loopback(listen[0]):
+        raise SystemExit(f"Listening on {listen[0]} accepts workers from the network; "
+                         f"set --authkey or ${AUTHKEY_ENV} to a secret shared with them")
+    authkey = (args.authkey or secrets.token_hex(32)).encode()
+
+    parse_endpoints(args.endpoints)
+    stand_in = None
+    if args.stand_in:
+        if args.remote_workers:
+            # The stand-in only listens on loopback, so other hosts could not reach it
+            raise SystemExit("--stand-in runs on this host only; use --base-url for a backend remote workers can reach")
+        context = multiprocessing.get_context('spawn')
+        parent, child = context.Pipe()
+        stand_in = context.Process(target=_serve_stand_in, args=(child, stand_in_options(args)), daemon=True)
+        stand_in.start()
+        args.base_url = parent.recv()
+
+    coordinator = Coordinator(listen, authkey, args.processes, args.remote_workers, show_authkey=generated)
+    print(f"\n{Colors.BOLD}LeoConnect Distributed Load ({args.mode} loop){Colors.RESET}")
+    print(f"{Colors.BOLD}Base URL: {args.base_url} | Workers: {args.processes} local, "
+          f"{args.remote_workers} remote{Colors.RESET}")
+    print(f"{Colors.BOLD}Started at: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}{Colors.RESET}")
+
+    results = coordinator.run(build_jobs(args, coordinator.workers))
+    if stand_in is not None:
+        parent.send('stop')
+        stand_in.join(timeout=10)
+
+    recorder, connections, duration = merge_results(results)
+    print_workers(results)
+    if args.mode == 'closed':
+        title = f"Closed loop: {args.users} users over {coordinator.workers} workers, {args.think}s think time"
+    else:
+        title = f"Open loop: {args.rate} req/s target over {coordinator.workers} workers"
+    merged = LoadResult(recorder)
+    merged.finished = merged.started + duration
+    merged.print_summary(title)
+    if connections.requests:
+        print(f"{Colors.BOLD}Connection phases, all workers (ms){Colors.RESET}")
+        for line in connections.report_lines():
+            print(line)
+        print()
+    save_from_args(args, f'load_cluster:{args.mode}', recorder, duration,
+                   extra={'scenario': title, 'workers': coordinator.workers})
+    if any('error' in r for r in results):
+        raise SystemExit(1)
+
+
+if __name__ == "__main__":
+    main()
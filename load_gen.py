@@ -0,0 +1,303 @@
+#!/usr/bin/env python3
+"""
+LeoConnect Load Generator
+Drives the tester endpoints with closed-loop virtual users or an open-loop arrival rate
+"""
+
+import argparse
+import itertools
+import random
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from typing import Any, Dict, List, Optional
+
+import requests
+
+from bench_history import add_history_arguments, save_from_args
+from colors import Colors
+from http_pool import add_pool_arguments, configure_pool_from_args, mount_shared_pool, shared_adapter
+from identity_pool import IdentityPool, add_identity_arguments, identities_from_args
+from latency import LatencyRecorder, status_class
+from live_metrics import add_live_arguments, live_from_args, live_view
+from schemas import SchemaCheck, add_schema_arguments
+from stub_server import add_stand_in_arguments, start_stand_in
+from traffic_log import add_record_arguments, record_from_args
+
+
+class Endpoint:
+    """One request shape taken from the testers"""
+
+    def __init__(self, name: str, method: str, path: str, params: Optional[Dict[str, Any]] = None,
+                 body: Optional[Dict[str, Any]] = None, auth: bool = False):
+        self.name = name
+        self.method = method
+        self.path = path
+        self.params = params
+        self.body = body
+        self.auth = auth  # only answered with a bearer token
+
+    def send(self, session: requests.Session, base_url: str, timeout: float = 10) -> requests.Response:
+        return session.request(self.method, f"{base_url}{self.path}", params=self.params,
+                               json=self.body, timeout=timeout)
+
+
+# Requests issued by LeoConnectAPITester / LeoConnectDetailedTester
+ENDPOINTS: Dict[str, Endpoint] = {
+    'health': Endpoint('health', 'GET', '/'),
+    'auth': Endpoint('auth', 'POST', '/auth/google', body={}, auth=True),
+    'feed': Endpoint('feed', 'GET', '/feed', params={'limit': 10}, auth=True),
+    'explore': Endpoint('explore', 'GET', '/explore', params={'limit': 10}),
+    'districts': Endpoint('districts', 'GET', '/districts'),
+    'clubs': Endpoint('clubs', 'GET', '/clubs', params={'district': 'test-district'}),
+    'search': Endpoint('search', 'GET', '/search', params={'q': 'leo'}),
+    'create_post': Endpoint('create_post', 'POST', '/posts', body={'content': 'Test post from load generator'},
+                            auth=True),
+    'like_post': Endpoint('like_post', 'POST', '/posts/test-post-123/like', auth=True),
+}
+
+
+def make_session(token: Optional[str] = None, identities: Optional[IdentityPool] = None,
+                 user_index: int = 0) -> requests.Session:
+    """
+    Session configured like the testers', drawing connections from the shared pool.
+    With an identity pool, virtual user `user_index` signs in as its own identity.
+    """
+    if identities is not None:
+        session = identities.session(user_index)
+    else:
+        session = mount_shared_pool(requests.Session())
+    session.headers.update({
+        'User-Agent': 'LeoConnect-Load-Generator/1.0',
+        'Accept': 'application/json'
+    })
+    if token and identities is None:
+        session.headers.update({'Authorization': f'Bearer {token}'})
+    return session
+
+
+class LoadResult:
+    """Per-endpoint latency histograms for one run"""
+
+    def __init__(self, recorder: Optional[LatencyRecorder] = None, schemas: Optional[SchemaCheck] = None):
+        self.recorder = recorder if recorder is not None else LatencyRecorder()
+        self.schemas = schemas
+        self.started = time.perf_counter()
+        self.finished = self.started
+
+    def record(self, endpoint: str, status: str, start: float, end: float):
+        """status is a status class ('2xx', '4xx', ...) or 'error'"""
+        self.recorder.record(endpoint, status, start, end)
+
+    def stop(self):
+        self.finished = time.perf_counter()
+
+    @property
+    def duration(self) -> float:
+        return max(self.finished - self.started, 1e-9)
+
+    def print_summary(self, title: str):
+        width = 97
+        print(f"\n{Colors.BLUE}{'='*width}{Colors.RESET}")
+        print(f"{Colors.BOLD}{title}{Colors.RESET}")
+        print(f"{Colors.BLUE}{'='*width}{Colors.RESET}\n")
+        for line in self.recorder.report_lines(self.duration):
+            print(line)
+        connections = shared_adapter().stats
+        if connections.requests:
+            print(f"\n{Colors.BOLD}Connection phases (ms){Colors.RESET}")
+            for line in connections.report_lines():
+                print(line)
+        if self.schemas is not None:
+            self.schemas.close()
+            print(f"\n{Colors.BOLD}Response schemas{Colors.RESET}")
+            for line in self.schemas.report_lines():
+                print(line)
+        print(f"{Colors.BLUE}{'='*width}{Colors.RESET}\n")
+
+
+def issue(endpoint: Endpoint, session: requests.Session, base_url: str, result: LoadResult,
+          intended_start: Optional[float] = None):
+    """
+    Send one request and record it.
+
+    When intended_start is given the latency is measured from the scheduled send
+    time rather than the actual one, so queueing behind a slow server is charged
+    to the server instead of silently omitted.
+    """
+    start = time.perf_counter()
+    response = None
+    try:
+        response = endpoint.send(session, base_url)
+    except requests.exceptions.RequestException:
+        pass
+    end = time.perf_counter()
+    status_code = response.status_code if response is not None else None
+    origin = intended_start if intended_start is not None else start
+    # Rate limiting is its own outcome, not just another 4xx
+    status = '429' if status_code == 429 else status_class(status_code)
+    result.record(endpoint.name, status, origin, end)
+    # Outside the timed window; sampled bodies are validated on the checker's own thread
+    if result.schemas is not None and response is not None:
+        result.schemas.observe(endpoint.method, endpoint.path, response)
+
+
+class ClosedLoopGenerator:
+    """N virtual users, each sending a request, waiting for it, then thinking"""
+
+    def __init__(self, base_url: str, endpoints: List[Endpoint], users: int = 10,
+                 think_time: float = 1.0, token: Optional[str] = None, seed: Optional[int] = None,
+                 identities: Optional[IdentityPool] = None, schemas: Optional[SchemaCheck] = None):
+        self.base_url = base_url
+        self.endpoints = endpoints
+        self.users = users
+        self.think_time = think_time
+        self.token = token
+        self.identities = identities
+        self.schemas = schemas
+        self.seed = seed
+
+    def _virtual_user(self, user_index: int, deadline: float, result: LoadResult):
+        rng = random.Random(None if self.seed is None else self.seed + user_index)
+        session = make_session(self.token, self.identities, user_index)
+        while time.perf_counter() < deadline:
+            issue(rng.choice(self.endpoints), session, self.base_url, result)
+            if self.think_time > 0:
+                # Exponential think time keeps users from synchronising
+                time.sleep(min(rng.expovariate(1 / self.think_time), max(0.0, deadline - time.perf_counter())))
+
+    def run(self, duration: float) -> LoadResult:
+        result = LoadResult(schemas=self.schemas)
+        deadline = time.perf_counter() + duration
+        threads = [threading.Thread(target=self._virtual_user, args=(i, deadline, result), daemon=True)
+                   for i in range(self.users)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        result.stop()
+        return result
+
+
+class OpenLoopGenerator:
+    """Fires requests on a fixed schedule regardless of how fast responses come back"""
+
+    def __init__(self, base_url: str, endpoints: List[Endpoint], rate: float = 100.0,
+                 max_workers: int = 256, poisson: bool = False, token: Optional[str] = None,
+                 seed: Optional[int] = None, identities: Optional[IdentityPool] = None,
+                 schemas: Optional[SchemaCheck] = None):
+        self.base_url = base_url
+        self.endpoints = endpoints
+        self.rate = rate
+        self.max_workers = max_workers
+        self.poisson = poisson
+        self.token = token
+        self.identities = identities
+        self.schemas = schemas
+        self.rng = random.Random(seed)
+        self._local = threading.local()
+        self._workers = itertools.count()
+
+    def _session(self) -> requests.Session:
+        session = getattr(self._local, 'session', None)
+        if session is None:
+            # Each pool thread acts as one user
+            session = self._local.session = make_session(self.token, self.identities, next(self._workers))
+        return session
+
+    def _fire(self, endpoint: Endpoint, intended_start: float, result: LoadResult):
+        issue(endpoint, self._session(), self.base_url, result, intended_start=intended_start)
+
+    def run(self, duration: float) -> LoadResult:
+        result = LoadResult(schemas=self.schemas)
+        start = time.perf_counter()
+        deadline = start + duration
+        next_send = start
+        with ThreadPoolExecutor(max_workers=self.max_workers) as pool:
+            while next_send < deadline:
+                delay = next_send - time.perf_counter()
+                if delay > 0:
+                    time.sleep(delay)
+                # Late dispatches still carry their original intended start time
+                pool.submit(self._fire, self.rng.choice(self.endpoints), next_send, result)
+                gap = self.rng.expovariate(self.rate) if self.poisson else 1 / self.rate
+                next_send += gap
+        result.stop()
+        return result
+
+
+def parse_endpoints(names: str) -> List[Endpoint]:
+    selected = []
+    for name in names.split(','):
+        name = name.strip()
+        if name not in ENDPOINTS:
+            raise SystemExit(f"Unknown endpoint '{name}'. Choose from: {', '.join(ENDPOINTS)}")
+        selected.append(ENDPOINTS[name])
+    return selected
+
+
+def main():
+    """Main function"""
+    parser = argparse.ArgumentParser(description="LeoConnect load generator")
+    parser.add_argument('--base-url', default="https://leoconnect.rexosphere.com")
+    parser.add_argument('--token', help="Bearer token sent by every virtual user")
+    parser.add_argument('--endpoints', default='feed,explore,districts',
+                        help=f"Comma-separated mix from: {', '.join(ENDPOINTS)}")
+    parser.add_argument('--duration', type=float, default=30, help="Run length in seconds")
+    parser.add_argument('--seed', type=int)
+    add_identity_arguments(parser)
+    add_pool_arguments(parser)
+    add_record_arguments(parser)
+    add_live_arguments(parser)
+    add_schema_arguments(parser, default_rate=0.05)
+    add_history_arguments(parser)
+    add_stand_in_arguments(parser)
+    modes = parser.add_subparsers(dest='mode', required=True)
+
+    closed = modes.add_parser('closed', help="N virtual users with think time")
+    closed.add_argument('--users', type=int, default=10)
+    closed.add_argument('--think', type=float, default=1.0, help="Mean think time in seconds")
+
+    open_loop = modes.add_parser('open', help="Constant arrival rate")
+    open_loop.add_argument('--rate', type=float, default=100, help="Requests per second")
+    open_loop.add_argument('--max-workers', type=int, default=256, help="Max requests in flight")
+    open_loop.add_argument('--poisson', action='store_true', help="Poisson instead of uniform arrivals")
+
+    args = parser.parse_args()
+    endpoints = parse_endpoints(args.endpoints)
+    configure_pool_from_args(args, default_maxsize=args.users if args.mode == 'closed' else args.max_workers)
+    start_stand_in(args)
+    identities = identities_from_args(args)
+    record_from_args(args, f'load_gen:{args.mode}')
+    live = live_from_args(args, f'load_gen:{args.mode}')
+    schemas = SchemaCheck(rate=args.schema_sample, background=True) if args.schema_sample > 0 else None
+
+    print(f"\n{Colors.BOLD}LeoConnect Load Generator ({args.mode} loop){Colors.RESET}")
+    print(f"{Colors.BOLD}Base URL: {args.base_url}{Colors.RESET}")
+    print(f"{Colors.BOLD}Started at: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}{Colors.RESET}")
+
+    if args.mode == 'closed':
+        generator = ClosedLoopGenerator(args.base_url, endpoints, users=args.users,
+                                        think_time=args.think, token=args.token, seed=args.seed,
+                                        identities=identities, schemas=schemas)
+        title = f"Closed loop: {args.users} users, {args.think}s think time"
+    else:
+        generator = OpenLoopGenerator(args.base_url, endpoints, rate=args.rate,
+                                      max_workers=args.max_workers, poisson=args.poisson,
+                                      token=args.token, seed=args.seed, identities=identities,
+                                      schemas=schemas)
+        title = f"Open loop: {args.rate} req/s target ({'poisson' if args.poisson else 'uniform'} arrivals)"
+
+    with live_view(live):
+        result = generator.run(args.duration)
+    result.print_summary(title)
+    if identities is not None:
+        for line in identities.report_lines():
+            print(line)
+        print()
+    save_from_args(args, f'load_gen:{args.mode}', result.recorder, result.duration, extra={'scenario': title})
+
+
+if __name__ == "__main__":
+    main()
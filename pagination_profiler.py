@@ -0,0 +1,210 @@
+#!/usr/bin/env python3
+"""
+LeoConnect Deep-Pagination Profiler
+Crawls followers/following/following-clubs page by page and checks whether page cost grows with offset
+"""
+
+import argparse
+import math
+import statistics
+import time
+from datetime import datetime
+from typing import Dict, List, Optional, Tuple
+
+import requests
+
+from colors import Colors
+from http_pool import mount_shared_pool
+from latency import LatencyRecorder, TimedSession
+from stub_server import POPULAR_UID, add_stand_in_arguments, start_stand_in
+
+
+# Route suffix -> key holding the page's items (FollowersResponse / FollowingClubsResponse)
+PAGED_ROUTES = {
+    'followers': 'followers',
+    'following': 'following',
+    'following-clubs': 'clubs',
+}
+
+
+class PageSample:
+    def __init__(self, offset: int, items: int, latency: float):
+        self.offset = offset
+        self.items = items
+        self.latency = latency
+
+
+class CrawlResult:
+    """Every page fetched while walking one route with one page size"""
+
+    def __init__(self, route: str, page_size: int):
+        self.route = route
+        self.page_size = page_size
+        self.pages: List[PageSample] = []
+        self.total_items = 0
+        self.reported_total: Optional[int] = None
+        self.elapsed = 0.0
+        self.error: Optional[str] = None
+
+    @property
+    def seconds_per_item(self) -> float:
+        return self.elapsed / self.total_items if self.total_items else math.inf
+
+    def offset_trend(self) -> Tuple[float, float, float]:
+        """Least-squares fit of latency (ms) on offset: (slope ms per 1k offset, intercept ms, t-statistic)"""
+        if len(self.pages) < 3:
+            return 0.0, 0.0, 0.0
+        offsets = [p.offset for p in self.pages]
+        latencies = [p.latency * 1000 for p in self.pages]
+        if len(set(offsets)) < 2 or len(set(latencies)) < 2:
+            return 0.0, statistics.fmean(latencies), 0.0
+        slope, intercept = statistics.linear_regression(offsets, latencies)
+        r = statistics.correlation(offsets, latencies)
+        n = len(self.pages)
+        t = r * math.sqrt((n - 2) / max(1e-12, 1 - r * r))
+        return slope * 1000, intercept, t
+
+
+class PaginationProfiler:
+    """Walks every page of a user's follow lists"""
+
+    def __init__(self, base_url: str, token: Optional[str] = None, timeout: float = 30,
+                 max_pages: int = 10_000):
+        self.base_url = base_url
+        self.timeout = timeout
+        self.max_pages = max_pages
+        self.latency = LatencyRecorder()
+        self.session = mount_shared_pool(TimedSession(self.latency))
+        self.session.headers.update({
+            'User-Agent': 'LeoConnect-Pagination-Profiler/1.0',
+            'Accept': 'application/json'
+        })
+        if token:
+            self.session.headers.update({'Authorization': f'Bearer {token}'})
+
+    def crawl(self, user_id: str, route: str, page_size: int) -> CrawlResult:
+        result = CrawlResult(route, page_size)
+        items_key = PAGED_ROUTES[route]
+        offset = 0
+        started = time.perf_counter()
+        for _ in range(self.max_pages):
+            page_start = time.perf_counter()
+            try:
+                response = self.session.get(
+                    f"{self.base_url}/users/{user_id}/{route}",
+                    params={'limit': page_size, 'offset': offset},
+                    timeout=self.timeout
+                )
+                latency = time.perf_counter() - page_start
+                if response.status_code != 200:
+                    result.error = f"Status {response.status_code} at offset {offset}"
+                    break
+                data = response.json()
+            except (requests.exceptions.RequestException, ValueError) as e:
+                result.error = f"{type(e).__name__} at offset {offset}: {e}"
+                break
+            items = data.get(items_key) or []
+            result.pages.append(PageSample(offset, len(items), latency))
+            result.total_items += len(items)
+            result.reported_total = data.get('total', result.reported_total)
+            offset += len(items)
+            if not items or not data.get('hasMore'):
+                break
+        result.elapsed = time.perf_counter() - started
+        return result
+
+
+def print_offset_plot(result: CrawlResult, rows: int = 16, width: int = 50):
+    """Median page latency per offset band, as a horizontal bar chart"""
+    if not result.pages:
+        return
+    bands = min(rows, len(result.pages))
+    per_band = math.ceil(len(result.pages) / bands)
+    medians = []
+    for i in range(0, len(result.pages), per_band):
+        chunk = result.pages[i:i + per_band]
+        medians.append((chunk[0].offset, statistics.median(p.latency * 1000 for p in chunk)))
+    peak = max(m for _, m in medians) or 1.0
+    for offset, median in medians:
+        bar = '#' * max(1, int(round(median / peak * width)))
+        print(f"    offset {offset:>9} | {bar} {median:.1f} ms")
+
+
+def report(results: Dict[str, List[CrawlResult]], growth_threshold: float, min_t: float) -> bool:
+    """Print per-route verdicts; returns True when any route looks like an OFFSET scan"""
+    flagged = False
+    for route, crawls in results.items():
+        print(f"\n{Colors.BLUE}{'='*70}{Colors.RESET}")
+        print(f"{Colors.BOLD}/users/{{id}}/{route}{Colors.RESET}")
+        print(f"{Colors.BLUE}{'='*70}{Colors.RESET}\n")
+
+        usable = [c for c in crawls if c.total_items]
+        for crawl in crawls:
+            status = f"{Colors.RED}{crawl.error}{Colors.RESET}" if crawl.error else "complete"
+            print(f"  limit={crawl.page_size:<5} pages={len(crawl.pages):<6} items={crawl.total_items:<8} "
+                  f"crawl={crawl.elapsed:7.2f}s  {crawl.seconds_per_item * 1e6 if crawl.total_items else 0:8.1f} us/item  {status}")
+        if not usable:
+            continue
+
+        # Judge the offset trend on the crawl with the most pages
+        deepest = max(usable, key=lambda c: len(c.pages))
+        slope, intercept, t = deepest.offset_trend()
+        max_offset = deepest.pages[-1].offset
+        growth = slope * max_offset / 1000 / intercept if intercept > 0 else 0.0
+        print(f"\n  Latency vs offset (limit={deepest.page_size}):")
+        print_offset_plot(deepest)
+        print(f"\n  Fit: {intercept:.1f} ms + {slope:.3f} ms per 1k offset (t={t:.1f}); "
+              f"last page predicted {growth * 100:+.0f}% vs first")
+        if t >= min_t and growth >= growth_threshold:
+            flagged = True
+            print(f"  {Colors.RED}✗ Page cost grows linearly with offset - likely a full-scan OFFSET query{Colors.RESET}")
+        else:
+            print(f"  {Colors.GREEN}✓ Page cost does not grow materially with offset{Colors.RESET}")
+
+        best = min(usable, key=lambda c: c.seconds_per_item)
+        print(f"  {Colors.CYAN}Best page size: limit={best.page_size} "
+              f"({best.elapsed:.2f}s for {best.total_items} items){Colors.RESET}")
+    return flagged
+
+
+def main():
+    """Main function"""
+    parser = argparse.ArgumentParser(description="LeoConnect deep-pagination profiler")
+    parser.add_argument('--base-url', default="https://leoconnect.rexosphere.com")
+    parser.add_argument('--token', help="Bearer token")
+    parser.add_argument('--user-id', help="Account whose lists are crawled (default: the stand-in's popular account)")
+    parser.add_argument('--routes', default=','.join(PAGED_ROUTES),
+                        help=f"Comma-separated subset of: {', '.join(PAGED_ROUTES)}")
+    parser.add_argument('--page-sizes', default='10,50,100,200', help="Comma-separated limits to compare")
+    parser.add_argument('--max-pages', type=int, default=10_000, help="Stop each crawl after this many pages")
+    parser.add_argument('--growth-threshold', type=float, default=0.5,
+                        help="Flag when the last page is predicted this much slower than the first (0.5 = 50%%)")
+    parser.add_argument('--min-t', type=float, default=3.0, help="Minimum t-statistic of the offset slope to flag")
+    add_stand_in_arguments(parser)
+    parser.add_argument('--stand-in-followers', type=int, default=20_000,
+                        help="Followers of the stand-in's popular account")
+    args = parser.parse_args()
+
+    start_stand_in(args, popular_followers=args.stand_in_followers)
+    user_id = args.user_id or POPULAR_UID
+    routes = [r.strip() for r in args.routes.split(',')]
+    for route in routes:
+        if route not in PAGED_ROUTES:
+            raise SystemExit(f"Unknown route '{route}'. Choose from: {', '.join(PAGED_ROUTES)}")
+    page_sizes = [int(size) for size in args.page_sizes.split(',')]
+
+    print(f"\n{Colors.BOLD}LeoConnect Deep-Pagination Profiler{Colors.RESET}")
+    print(f"{Colors.BOLD}Base URL: {args.base_url} | User: {user_id}{Colors.RESET}")
+    print(f"{Colors.BOLD}Started at: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}{Colors.RESET}")
+
+    profiler = PaginationProfiler(args.base_url, token=args.token, max_pages=args.max_pages)
+    started = time.perf_counter()
+    results = {route: [profiler.crawl(user_id, route, size) for size in page_sizes] for route in routes}
+    flagged = report(results, args.growth_threshold, args.min_t)
+
+    print(f"\n{Colors.BOLD}Total crawl time: {time.perf_counter() - started:.2f}s{Colors.RESET}")
+    raise SystemExit(1 if flagged else 0)
+
+
+if __name__ == "__main__":
+    main()
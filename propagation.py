@@ -0,0 +1,288 @@
+#!/usr/bin/env python3
+"""
+LeoConnect Read-After-Write Propagation
+Measures how long new posts, comments and events take to show up in the listings that should contain them
+"""
+
+import argparse
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta, timezone
+from typing import Any, Callable, Dict, List, Optional
+
+import requests
+
+from bench_history import add_history_arguments, save_from_args
+from colors import Colors
+from http_pool import add_pool_arguments, configure_pool_from_args, mount_shared_pool
+from latency import LatencyRecorder
+from load_gen import ClosedLoopGenerator, parse_endpoints
+from seeder import discover_clubs
+from stub_server import add_stand_in_arguments, start_stand_in
+
+
+def contains(key: str, unwrap: Optional[str] = None) -> Callable[[Any, str], bool]:
+    """Finder for a list response (or the list under `unwrap`) holding an item whose `key` is the new ID"""
+    def find(data: Any, item_id: str) -> bool:
+        items = data.get(unwrap, []) if unwrap and isinstance(data, dict) else data
+        return isinstance(items, list) and any(isinstance(i, dict) and i.get(key) == item_id for i in items)
+    return find
+
+
+class Backoff:
+    """Poll delays: initial, initial*factor, ... capped at maximum (seconds)"""
+
+    def __init__(self, initial: float = 0.005, factor: float = 2.0, maximum: float = 0.5):
+        self.initial = initial
+        self.factor = factor
+        self.maximum = maximum
+
+    def delays(self):
+        delay = self.initial
+        while True:
+            yield delay
+            delay = min(delay * self.factor, self.maximum)
+
+
+class PropagationProbe:
+    """
+    After a write is acknowledged, polls each listing with exponential backoff
+    until the new item appears. The recorded delay runs from the acknowledgement
+    to the send time of the first poll that saw the item, so the poll's own
+    round trip is not charged to propagation. Items never seen within `timeout`
+    are recorded with status 'timeout'.
+    """
+
+    def __init__(self, base_url: str, tokens: Dict[str, Optional[str]], backoff: Backoff, timeout: float = 30,
+                 pollers: int = 64):
+        self.base_url = base_url
+        self.tokens = tokens
+        self.backoff = backoff
+        self.timeout = timeout
+        self.recorder = LatencyRecorder()
+        self.polls: Dict[str, List[int]] = {}
+        self.writes: Dict[str, int] = {}
+        self.write_failures: Dict[str, int] = {}
+        self._lock = threading.Lock()
+        self._local = threading.local()
+        self._pool = ThreadPoolExecutor(max_workers=pollers)
+
+    def session(self, who: str) -> requests.Session:
+        sessions = getattr(self._local, 'sessions', None)
+        if sessions is None:
+            sessions = self._local.sessions = {}
+        session = sessions.get(who)
+        if session is None:
+            session = sessions[who] = mount_shared_pool(requests.Session())
+            session.headers.update({'Accept': 'application/json'})
+            if self.tokens.get(who):
+                session.headers.update({'Authorization': f"Bearer {self.tokens[who]}"})
+        return session
+
+    def write(self, kind: str, path: str, body: Dict[str, Any], id_of: Callable[[Any], str]):
+        """POST as the writer; returns (new ID, acknowledgement time) or None"""
+        try:
+            response = self.session('writer').post(f"{self.base_url}{path}", json=body, timeout=15)
+            acked_at = time.perf_counter()
+            if response.status_code in (200, 201):
+                with self._lock:
+                    self.writes[kind] = self.writes.get(kind, 0) + 1
+                return id_of(response.json()), acked_at
+            failure = str(response.status_code)
+        except (requests.exceptions.RequestException, ValueError, KeyError, TypeError) as e:
+            failure = type(e).__name__
+        with self._lock:
+            key = f"{kind}: {failure}"
+            self.write_failures[key] = self.write_failures.get(key, 0) + 1
+        return None
+
+    def watch(self, name: str, who: str, path: str, params: Optional[Dict[str, Any]],
+              finder: Callable[[Any, str], bool], item_id: str, acked_at: float):
+        self._pool.submit(self._watch, name, who, path, params, finder, item_id, acked_at)
+
+    def _watch(self, name, who, path, params, finder, item_id, acked_at):
+        session = self.session(who)
+        deadline = acked_at + self.timeout
+        polls = 0
+        for delay in self.backoff.delays():
+            sent = time.perf_counter()
+            polls += 1
+            try:
+                response = session.get(f"{self.base_url}{path}", params=params, timeout=15)
+                if response.status_code == 200 and finder(response.json(), item_id):
+                    self.recorder.record(name, '2xx', acked_at, max(sent, acked_at))
+                    break
+            except (requests.exceptions.RequestException, ValueError):
+                pass
+            if time.perf_counter() + delay > deadline:
+                self.recorder.record(name, 'timeout', acked_at, deadline)
+                break
+            time.sleep(delay)
+        with self._lock:
+            self.polls.setdefault(name, []).append(polls)
+
+    def drain(self):
+        self._pool.shutdown(wait=True)
+
+
+class PropagationRun:
+    """Writes a post, a comment on it and an event every `interval` seconds and watches each listing"""
+
+    def __init__(self, probe: PropagationProbe, writer_uid: str, club_id: str, observer: bool):
+        self.probe = probe
+        self.writer_uid = writer_uid
+        self.club_id = club_id
+        self.observer = observer
+
+    def sample(self, index: int):
+        probe = self.probe
+        stamp = datetime.now().strftime('%H:%M:%S.%f')
+        written = probe.write('post', '/posts', {'content': f"Propagation probe {index} at {stamp}",
+                                                 'clubId': self.club_id}, lambda d: d['postId'])
+        if written:
+            post_id, acked_at = written
+            posts = contains('postId')
+            probe.watch('post -> GET /feed (author)', 'writer', '/feed', {'limit': 50}, posts, post_id, acked_at)
+            if self.observer:
+                probe.watch('post -> GET /feed (follower)', 'observer', '/feed', {'limit': 50}, posts, post_id,
+                            acked_at)
+            probe.watch('post -> GET /explore', 'writer', '/explore', {'limit': 50}, posts, post_id, acked_at)
+            probe.watch('post -> GET /clubs/{id}/posts', 'writer', f'/clubs/{self.club_id}/posts', {'limit': 50},
+                        posts, post_id, acked_at)
+            probe.watch('post -> GET /users/{id}/posts', 'writer', f'/users/{self.writer_uid}/posts',
+                        {'limit': 50}, posts, post_id, acked_at)
+            written = probe.write('comment', f'/posts/{post_id}/comments', {'content': f"Probe comment {index}"},
+                                  lambda d: d['comment']['commentId'])
+            if written:
+                comment_id, acked_at = written
+                probe.watch('comment -> GET /posts/{id}/comments', 'writer', f'/posts/{post_id}/comments',
+                            {'limit': 200}, contains('commentId', 'comments'), comment_id, acked_at)
+        event_date = (datetime.now(timezone.utc) + timedelta(days=30)).isoformat()
+        written = probe.write('event', '/events', {'name': f"Propagation probe {index}", 'description': stamp,
+                                                   'eventDate': event_date, 'clubId': self.club_id},
+                              lambda d: d['eventId'])
+        if written:
+            event_id, acked_at = written
+            probe.watch('event -> GET /events?clubId=', 'writer', '/events', {'clubId': self.club_id, 'limit': 50},
+                        contains('eventId'), event_id, acked_at)
+
+    def run(self, duration: float, interval: float) -> int:
+        deadline = time.perf_counter() + duration
+        next_sample = time.perf_counter()
+        index = 0
+        while next_sample < deadline:
+            delay = next_sample - time.perf_counter()
+            if delay > 0:
+                time.sleep(delay)
+            self.sample(index)
+            index += 1
+            next_sample += interval
+        return index
+
+
+def print_report(probe: PropagationProbe, max_p99_ms: float) -> bool:
+    """Per listing: delay percentiles and polls needed; returns False if any listing breaks the guard"""
+    ok = True
+    print(f"\n{Colors.BOLD}Propagation delay after the write was acknowledged (ms){Colors.RESET}")
+    print(f"{'Write -> listing':<40}{'Seen':>6}{'Lost':>6}{'p50':>9}{'p90':>9}{'p99':>9}{'max':>9}{'polls':>7}")
+    for name in probe.recorder.endpoints():
+        seen = probe.recorder.stats.get((name, '2xx'))
+        lost = probe.recorder.stats.get((name, 'timeout'))
+        lost_count = lost.histogram.total_count if lost else 0
+        polls = probe.polls.get(name, [])
+        mean_polls = sum(polls) / len(polls) if polls else 0.0
+        if seen is None:
+            print(f"{Colors.RED}{name:<40}{0:>6}{lost_count:>6}{'-':>9}{'-':>9}{'-':>9}{'-':>9}{mean_polls:>7.1f}"
+                  f"{Colors.RESET}")
+            ok = False
+            continue
+        h = seen.histogram
+        p99 = h.percentile(99) / 1000
+        breach = lost_count > 0 or p99 > max_p99_ms
+        ok = ok and not breach
+        color = Colors.RED if breach else Colors.GREEN
+        print(f"{color}{name:<40}{h.total_count:>6}{lost_count:>6}{h.percentile(50) / 1000:>9.1f}"
+              f"{h.percentile(90) / 1000:>9.1f}{p99:>9.1f}{h.max_value / 1000:>9.1f}{mean_polls:>7.1f}{Colors.RESET}")
+    writes = ', '.join(f"{count} {kind}s" for kind, count in sorted(probe.writes.items()))
+    print(f"\nWrites acknowledged: {writes or 'none'}")
+    for failure, count in sorted(probe.write_failures.items()):
+        print(f"  {Colors.RED}{count} failed writes ({failure}){Colors.RESET}")
+    verdict = f"every listing within p99 {max_p99_ms:g} ms and nothing lost" if ok else \
+        f"some listing exceeded p99 {max_p99_ms:g} ms or never showed the new item"
+    print(f"{Colors.GREEN if ok else Colors.RED}{'✓' if ok else '✗'} {verdict}{Colors.RESET}\n")
+    return ok
+
+
+def main():
+    """Main function"""
+    parser = argparse.ArgumentParser(description="LeoConnect read-after-write propagation")
+    parser.add_argument('--base-url', default="https://leoconnect.rexosphere.com")
+    parser.add_argument('--token', help="Bearer token of the writing user")
+    parser.add_argument('--observer-token', help="Bearer token of a user who follows the writer")
+    parser.add_argument('--club-id', help="Club the probe posts and events belong to (default: first found)")
+    parser.add_argument('--duration', type=float, default=30, help="Seconds to keep writing samples")
+    parser.add_argument('--interval', type=float, default=1.0, help="Seconds between samples")
+    parser.add_argument('--poll-initial-ms', type=float, default=5, help="First poll delay")
+    parser.add_argument('--poll-factor', type=float, default=2.0, help="Backoff multiplier")
+    parser.add_argument('--poll-max-ms', type=float, default=500, help="Longest delay between polls")
+    parser.add_argument('--timeout', type=float, default=30, help="Give up on an item after this many seconds")
+    parser.add_argument('--max-p99-ms', type=float, default=1000, help="Guard: fail if any listing's p99 exceeds")
+    parser.add_argument('--background-users', type=int, default=0, help="Closed-loop users loading the backend")
+    parser.add_argument('--background-endpoints', default='feed,explore,districts')
+    add_pool_arguments(parser)
+    add_history_arguments(parser)
+    add_stand_in_arguments(parser)
+    args = parser.parse_args()
+    configure_pool_from_args(args, default_maxsize=64 + args.background_users)
+    start_stand_in(args)
+
+    if args.stand_in:
+        args.token = args.token or 'test-token-propagation-writer'
+        args.observer_token = args.observer_token or 'test-token-propagation-observer'
+    if not args.token:
+        raise SystemExit("--token is required: propagation is measured for the writing user")
+    probe = PropagationProbe(args.base_url, {'writer': args.token, 'observer': args.observer_token},
+                             Backoff(args.poll_initial_ms / 1000, args.poll_factor, args.poll_max_ms / 1000),
+                             args.timeout)
+    me = probe.session('writer').get(f"{args.base_url}/users/me", timeout=15)
+    me.raise_for_status()
+    writer_uid = me.json()['uid']
+    club_id = args.club_id
+    if not club_id:
+        clubs = discover_clubs(args.base_url, probe.session('writer'))
+        if not clubs:
+            raise SystemExit("No clubs found; pass --club-id")
+        club_id = clubs[0]
+    if args.observer_token:
+        probe.session('observer').post(f"{args.base_url}/users/{writer_uid}/follow", timeout=15)
+
+    print(f"\n{Colors.BOLD}LeoConnect Read-After-Write Propagation{Colors.RESET}")
+    print(f"{Colors.BOLD}Base URL: {args.base_url} | writer {writer_uid}, club {club_id}{Colors.RESET}")
+    print(f"{Colors.BOLD}Polling {args.poll_initial_ms:g} ms x{args.poll_factor:g} up to {args.poll_max_ms:g} ms, "
+          f"{args.background_users} background users{Colors.RESET}")
+    print(f"{Colors.BOLD}Started at: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}{Colors.RESET}")
+
+    background = None
+    if args.background_users:
+        generator = ClosedLoopGenerator(args.base_url, parse_endpoints(args.background_endpoints),
+                                        users=args.background_users, think_time=0.1, token=args.token)
+        background = threading.Thread(target=generator.run, args=(args.duration,), daemon=True)
+        background.start()
+
+    start = time.perf_counter()
+    samples = PropagationRun(probe, writer_uid, club_id, bool(args.observer_token)).run(args.duration, args.interval)
+    probe.drain()
+    wall_time = time.perf_counter() - start
+    if background is not None:
+        background.join()
+    print(f"\n{samples} samples in {wall_time:.1f}s")
+    ok = print_report(probe, args.max_p99_ms)
+    save_from_args(args, 'propagation', probe.recorder, wall_time,
+                   extra={'samples': samples, 'max_p99_ms': args.max_p99_ms, 'ok': ok})
+    if not ok:
+        raise SystemExit(1)
+
+
+if __name__ == "__main__":
+    main()
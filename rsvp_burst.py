@@ -0,0 +1,276 @@
+#!/usr/bin/env python3
+"""
+LeoConnect RSVP Burst
+Many users RSVP to freshly announced events at the same instant while others list events, then attendee counts are checked
+"""
+
+import argparse
+import random
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta, timezone
+from typing import Any, Dict, List, Optional
+
+import requests
+
+from bench_history import add_history_arguments, save_from_args
+from colors import Colors
+from http_pool import add_pool_arguments, configure_pool_from_args
+from identity_pool import IdentityPool, add_identity_arguments, pool_from_args
+from latency import LatencyRecorder
+from like_storm import ConsistencyRun, LedgerSet, disagreement
+from seeder import discover_clubs
+from stub_server import add_stand_in_arguments, start_stand_in
+
+
+class BurstEvent(LedgerSet):
+    """One announced event and every attendee's acknowledged RSVP toggles"""
+
+    def __init__(self, event_id: str, club_id: Optional[str]):
+        super().__init__()
+        self.event_id = event_id
+        self.club_id = club_id
+
+    def expected_count(self):
+        """(low, high) rsvpCount implied by the acknowledged toggles; the event starts with no attendees"""
+        low = high = 0
+        for ledger in self.ledgers.values():
+            if ledger.final is None:
+                # Last toggle unanswered: attending or not
+                high += 1
+            elif ledger.final:
+                low += 1
+                high += 1
+        return low, high
+
+    @property
+    def uncertain(self) -> int:
+        return sum(1 for ledger in self.ledgers.values() if ledger.final is None)
+
+
+class RsvpBurst(ConsistencyRun):
+    """
+    Identity 0 announces the events; every other identity is an attendee. The
+    attendees' requests are split over `concurrency` threads that are released
+    together by a barrier, each RSVPing to every event and, with probability
+    `change_rate`, cancelling and RSVPing again. RSVP is a toggle, so it is never
+    retried. Listing threads read /events, /events?clubId= and /events/{id}
+    for the whole burst.
+    """
+
+    def __init__(self, base_url: str, identities: IdentityPool, concurrency: int = 64, listers: int = 4,
+                 change_rate: float = 0.1, seed: Optional[int] = None, timeout: float = 30):
+        super().__init__(base_url, identities, concurrency, seed, timeout)
+        self.listers = listers
+        self.change_rate = change_rate
+        self.events: List[BurstEvent] = []
+
+    @property
+    def attendees(self) -> range:
+        return self.participants
+
+    def announce(self, count: int, clubs: List[str]):
+        """Create the events, spread over the known clubs (a district-wide event has no club)"""
+        when = (datetime.now(timezone.utc) + timedelta(days=14)).strftime('%Y-%m-%dT%H:%M:%SZ')
+        for index in range(count):
+            club_id = clubs[index % len(clubs)] if clubs else None
+            body = {'name': f"RSVP burst event {index + 1}", 'description': "District-wide announcement",
+                    'eventDate': when, 'clubId': club_id}
+            response = self._call(0, 'POST', '/events', json=body)
+            if response is None or response.status_code not in (200, 201):
+                raise SystemExit(f"Could not create an event: {response.status_code if response is not None else 'error'}")
+            self.events.append(BurstEvent(response.json()['eventId'], club_id))
+
+    def _list_once(self, session: requests.Session, rng: random.Random, recorder: LatencyRecorder):
+        event = rng.choice(self.events)
+        choice = rng.randrange(3)
+        if choice == 0:
+            self._send(session, 'GET', '/events', recorder, 'GET /events', params={'limit': 20})
+        elif choice == 1 and event.club_id:
+            self._send(session, 'GET', '/events', recorder, 'GET /events?clubId',
+                       params={'limit': 20, 'clubId': event.club_id})
+        else:
+            self._send(session, 'GET', f'/events/{event.event_id}', recorder, 'GET /events/{id}')
+
+    def measure_baseline(self, requests_count: int = 60):
+        """Listing latency with nothing else running"""
+        rng = random.Random(self.seed)
+        session = self.identities.session(0)
+        for _ in range(requests_count):
+            self._list_once(session, rng, self.baseline)
+
+    def _lister(self, index: int, done: threading.Event):
+        rng = random.Random(None if self.seed is None else self.seed + index)
+        session = self.identities.session(0)
+        while not done.is_set():
+            self._list_once(session, rng, self.recorder)
+
+    def _plan(self, user: int) -> List[BurstEvent]:
+        rng = random.Random(None if self.seed is None else self.seed * 1_000_003 + user)
+        plan = []
+        for event in self.events:
+            # Some attendees change their mind: RSVP, cancel, RSVP again
+            plan.extend([event] * (3 if rng.random() < self.change_rate else 1))
+        rng.shuffle(plan)
+        return plan
+
+    def _attendee_thread(self, users: List[int], barrier: threading.Barrier):
+        plans = [(user, self._plan(user)) for user in users]
+        barrier.wait()
+        for user, plan in plans:
+            for event in plan:
+                response = self._call(user, 'POST', f'/events/{event.event_id}/rsvp', self.recorder,
+                                      'POST /events/{id}/rsvp')
+                attending = None
+                if response is not None and response.status_code == 200:
+                    try:
+                        data = response.json()
+                        attending = bool(data['hasRSVPd'])
+                        event.note_count(int(data['rsvpCount']))
+                    except (ValueError, KeyError, TypeError):
+                        pass
+                event.ledger(user).record(attending)
+
+    def burst(self) -> float:
+        attendees = list(self.attendees)
+        threads_count = max(1, min(self.concurrency, len(attendees)))
+        barrier = threading.Barrier(threads_count + 1)
+        done = threading.Event()
+        listers = [threading.Thread(target=self._lister, args=(i, done), daemon=True) for i in range(self.listers)]
+        threads = [threading.Thread(target=self._attendee_thread, args=(attendees[i::threads_count], barrier),
+                                    daemon=True) for i in range(threads_count)]
+        for thread in threads:
+            thread.start()
+        barrier.wait()
+        start = time.perf_counter()
+        for thread in listers:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        elapsed = time.perf_counter() - start
+        done.set()
+        for thread in listers:
+            thread.join()
+        return elapsed
+
+    def _check(self, check: str, event: BurstEvent, who: str, item: Optional[Dict[str, Any]],
+               attending: Optional[bool] = None):
+        """Compare one read-back of an event with the acknowledged RSVPs"""
+        detail = disagreement(who, item, f"event {event.event_id}", 'hasRSVPd', attending, 'rsvpCount',
+                              event.expected_count())
+        participants = item.get('rsvpParticipants') if item is not None else None
+        if detail is None and isinstance(participants, list) and len(participants) != item['rsvpCount']:
+            detail = f"{who}: {len(participants)} rsvpParticipants but rsvpCount {item['rsvpCount']}"
+        self._mismatch(check, detail)
+
+    def _read_event(self, user: int, event: BurstEvent) -> Optional[Dict[str, Any]]:
+        response = self._call(user, 'GET', f'/events/{event.event_id}')
+        if response is None or response.status_code != 200:
+            return None
+        return response.json()
+
+    def _verify_attendee(self, user: int):
+        for event in self.events:
+            ledger = event.ledgers.get(user)
+            self._check('GET /events/{id} (attendee)', event, f"user {user}",
+                        self._read_event(user, event), ledger.final if ledger else False)
+
+    def verify(self, sample: int = 0):
+        for event in self.events:
+            self._check('GET /events/{id}', event, "organizer", self._read_event(0, event))
+            params = {'limit': 50}
+            if event.club_id:
+                params['clubId'] = event.club_id
+            response = self._call(0, 'GET', '/events', params=params)
+            check = 'GET /events?clubId' if event.club_id else 'GET /events'
+            if response is not None and response.status_code == 200:
+                found = next((e for e in response.json() if e.get('eventId') == event.event_id), None)
+                self._check(check, event, "organizer", found)
+            else:
+                self._mismatch(check, f"organizer: status {response.status_code if response is not None else 'error'}")
+        with ThreadPoolExecutor(max_workers=self.concurrency) as pool:
+            list(pool.map(self._verify_attendee, self.sample_participants(sample)))
+
+    @property
+    def consistent(self) -> bool:
+        return not self.mismatches and not any(event.anomalies for event in self.events)
+
+
+def print_report(burst: RsvpBurst, wall_time: float):
+    rsvps = burst.recorder.combined('POST /events/{id}/rsvp').histogram.total_count
+    print(f"\n{Colors.BOLD}Burst latency ({rsvps} RSVPs in {wall_time:.2f}s, {rsvps / max(wall_time, 1e-9):.0f}/s)"
+          f"{Colors.RESET}")
+    for line in burst.recorder.report_lines(wall_time):
+        print(line)
+    print(f"\n{Colors.BOLD}Listing while the burst runs{Colors.RESET}")
+    for name in ('GET /events', 'GET /events?clubId', 'GET /events/{id}'):
+        contention = burst.contention_line(name, "idle")
+        if contention:
+            print(f"  {name:<20} {contention}")
+
+    print(f"\n{Colors.BOLD}Acknowledged RSVPs{Colors.RESET}")
+    for event in burst.events:
+        low, high = event.expected_count()
+        expected = f"{low}" if low == high else f"{low}..{high}"
+        print(f"  {event.event_id:<24} {event.acknowledged:>7} acknowledged, expected attendees {expected} "
+              f"(peak acknowledged {event.max_ack_count}), {event.uncertain} users uncertain")
+        if event.anomalies:
+            print(f"  {Colors.RED}✗ {event.anomalies} acknowledged RSVPs did not flip hasRSVPd "
+                  f"(lost or doubled update){Colors.RESET}")
+
+    burst.print_checks("Final attendee counts")
+    print()
+
+
+def main():
+    """Main function"""
+    parser = argparse.ArgumentParser(description="LeoConnect event RSVP burst")
+    parser.add_argument('--base-url', default="https://leoconnect.rexosphere.com")
+    parser.add_argument('--events', type=int, default=3, help="Events announced at once")
+    parser.add_argument('--concurrency', type=int, default=64, help="Threads released together for the burst")
+    parser.add_argument('--listers', type=int, default=4, help="Threads listing events during the burst")
+    parser.add_argument('--change-rate', type=float, default=0.1,
+                        help="Fraction of attendees who cancel and RSVP again")
+    parser.add_argument('--verify-sample', type=int, default=0, help="Read back as this many attendees (0 = all)")
+    parser.add_argument('--seed', type=int)
+    add_identity_arguments(parser)
+    add_pool_arguments(parser)
+    add_history_arguments(parser)
+    add_stand_in_arguments(parser)
+    args = parser.parse_args()
+    if not args.identities and not args.tokens_file:
+        args.identities = 500
+    configure_pool_from_args(args, default_maxsize=args.concurrency + args.listers)
+    start_stand_in(args)
+
+    identities = pool_from_args(args)
+    if len(identities) < 2:
+        raise SystemExit("Need at least two identities: one organizer and one attendee")
+    print(f"\n{Colors.BOLD}LeoConnect RSVP Burst{Colors.RESET}")
+    print(f"{Colors.BOLD}Base URL: {args.base_url} | {len(identities) - 1} attendees, {args.events} events, "
+          f"{args.concurrency} concurrent{Colors.RESET}")
+    print(f"{Colors.BOLD}Started at: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}{Colors.RESET}\n")
+
+    identities.sign_in_all(args.concurrency)
+    burst = RsvpBurst(args.base_url, identities, args.concurrency, args.listers, args.change_rate, args.seed)
+    try:
+        clubs = discover_clubs(args.base_url, identities.session(0))
+    except requests.exceptions.RequestException:
+        clubs = []
+    burst.announce(args.events, clubs)
+    burst.measure_baseline()
+    print(f"Announced {', '.join(event.event_id for event in burst.events)}; bursting...")
+    wall_time = burst.burst()
+    burst.verify(args.verify_sample)
+    print_report(burst, wall_time)
+
+    save_from_args(args, 'rsvp_burst', burst.recorder, wall_time,
+                   extra={'attendees': len(identities) - 1, 'events': len(burst.events),
+                          'concurrency': args.concurrency, 'consistent': burst.consistent})
+    if not burst.consistent:
+        raise SystemExit(1)
+
+
+if __name__ == "__main__":
+    main()
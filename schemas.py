@@ -0,0 +1,433 @@
+#!/usr/bin/env python3
+"""
+LeoConnect Response Schemas
+Validators for the app's domain models, compiled once from their Kotlin declarations and sampled under load
+"""
+
+import argparse
+import json
+import queue
+import random
+import re
+import sys
+import threading
+import time
+from collections import Counter
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from colors import Colors
+from latency import LatencyHistogram, route_template
+
+
+# Field declarations copied from composeApp/.../domain/model/*.kt (and data/model/Notification.kt,
+# data/source/remote/KtorRemoteDataSource.kt for the wrappers). A field with a default may be
+# missing; a nullable one may be null. Nested models are declared before the models using them.
+MODELS: Dict[str, List[Tuple[str, str]]] = {
+    'SocialLinks': [
+        ('facebook', 'String? = null'), ('instagram', 'String? = null'), ('twitter', 'String? = null'),
+    ],
+    'Club': [
+        ('clubId', 'String'), ('name', 'String'), ('district', 'String'), ('districtId', 'String = ""'),
+        ('description', 'String? = null'), ('logoUrl', 'String? = null'), ('coverImageUrl', 'String? = null'),
+        ('membersCount', 'Int = 0'), ('followersCount', 'Int = 0'), ('postsCount', 'Int? = null'),
+        ('isFollowing', 'Boolean = false'), ('isOfficial', 'Boolean? = null'), ('isUserAdmin', 'Boolean? = null'),
+        ('address', 'String? = null'), ('email', 'String? = null'), ('phone', 'String? = null'),
+        ('socialLinks', 'SocialLinks? = null'),
+    ],
+    'ChairmanInfo': [
+        ('name', 'String'), ('photoUrl', 'String? = null'), ('email', 'String? = null'),
+    ],
+    'District': [
+        ('districtId', 'String'), ('name', 'String'), ('region', 'String? = null'), ('clubsCount', 'Int = 0'),
+        ('membersCount', 'Int = 0'), ('description', 'String? = null'), ('logoUrl', 'String? = null'),
+        ('coverImageUrl', 'String? = null'), ('chairman', 'ChairmanInfo? = null'),
+    ],
+    'Post': [
+        ('postId', 'String'), ('clubId', 'String'), ('clubName', 'String = ""'), ('authorId', 'String = ""'),
+        ('authorName', 'String'), ('authorLogo', 'String?'), ('content', 'String'), ('imageUrl', 'String?'),
+        ('images', 'List<String> = emptyList()'), ('likesCount', 'Int = 0'), ('commentsCount', 'Int = 0'),
+        ('sharesCount', 'Int = 0'), ('isLikedByUser', 'Boolean = false'), ('isPinned', 'Boolean = false'),
+        ('createdAt', 'String = ""'), ('updatedAt', 'String = ""'),
+    ],
+    'Comment': [
+        ('commentId', 'String'), ('postId', 'String'), ('userId', 'String'), ('authorName', 'String'),
+        ('authorPhotoUrl', 'String?'), ('content', 'String'), ('createdAt', 'String'), ('likesCount', 'Int = 0'),
+        ('isLikedByUser', 'Boolean = false'),
+    ],
+    'CommentResponse': [
+        ('comments', 'List<Comment>'), ('total', 'Int'), ('hasMore', 'Boolean'),
+    ],
+    'RSVPParticipant': [
+        ('uid', 'String'), ('displayName', 'String'), ('photoUrl', 'String?'),
+    ],
+    'Event': [
+        ('eventId', 'String'), ('clubId', 'String?'), ('clubName', 'String?'), ('authorId', 'String'),
+        ('authorName', 'String'), ('name', 'String'), ('description', 'String'), ('eventDate', 'String'),
+        ('imageUrl', 'String?'), ('rsvpCount', 'Int'), ('hasRSVPd', 'Boolean'),
+        ('rsvpParticipants', 'List<RSVPParticipant>'), ('createdAt', 'String'), ('updatedAt', 'String'),
+    ],
+    'RSVPResponse': [
+        ('message', 'String'), ('rsvpCount', 'Int'), ('hasRSVPd', 'Boolean'),
+    ],
+    'Message': [
+        ('id', 'String'), ('senderId', 'String'), ('receiverId', 'String'), ('content', 'String'),
+        ('isRead', 'Boolean'), ('createdAt', 'String'),
+    ],
+    'UserProfile': [
+        ('uid', 'String'), ('email', 'String'), ('displayName', 'String'), ('photoURL', 'String? = null'),
+        ('leoId', 'String? = null'), ('bio', 'String? = null'), ('isWebmaster', 'Boolean = false'),
+        ('isVerified', 'Boolean = false'), ('assignedClubId', 'String? = null'),
+        ('followingClubs', 'List<String> = emptyList()'), ('onboardingCompleted', 'Boolean = false'),
+        ('publicKey', 'String? = null'), ('postsCount', 'Int? = 0'), ('followersCount', 'Int? = 0'),
+        ('followingCount', 'Int? = 0'), ('isFollowing', 'Boolean? = false'), ('isMutualFollow', 'Boolean? = false'),
+    ],
+    'Notification': [
+        ('id', 'String'), ('type', 'String'), ('title', 'String'), ('body', 'String'),
+        ('data', 'Map<String, String>? = null'), ('isRead', 'Boolean'), ('createdAt', 'String'),
+    ],
+    'NotificationListResponse': [
+        ('notifications', 'List<Notification>'), ('total', 'Int'), ('hasMore', 'Boolean'),
+    ],
+}
+
+# What the app decodes each response as (KtorRemoteDataSource), keyed like LatencyRecorder endpoints
+ROUTE_TYPES: Dict[str, str] = {
+    'POST /auth/google': 'UserProfile',
+    'GET /feed': 'List<Post>',
+    'GET /explore': 'List<Post>',
+    'POST /posts': 'Post',
+    'GET /posts/{id}': 'Post',
+    'GET /posts/{id}/comments': 'CommentResponse',
+    'GET /districts': 'List<String>',
+    'GET /clubs': 'List<Club>',
+    'GET /clubs/{id}/posts': 'List<Post>',
+    'GET /users/me': 'UserProfile',
+    'GET /users/{id}': 'UserProfile',
+    'GET /users/{id}/posts': 'List<Post>',
+    'GET /messages/{id}': 'List<Message>',
+    'POST /messages': 'Message',
+    'GET /events': 'List<Event>',
+    'POST /events': 'Event',
+    'GET /events/{id}': 'Event',
+    'POST /events/{id}/rsvp': 'RSVPResponse',
+    'GET /notifications': 'NotificationListResponse',
+}
+
+# A check returns None when the value conforms, else the first problem relative to the value,
+# e.g. ".likesCount: expected Int, got bool" or "[3].userId: missing"
+Check = Callable[[Any], Optional[str]]
+
+_MISSING = object()
+_DECLARATION = re.compile(r'^(?P<type>[\w<>, ]+?)(?P<nullable>\?)?(?:\s*=.*)?$')
+_PRIMITIVES = {'String': str, 'Int': int, 'Boolean': bool, 'Long': int}
+_INTEGER = re.compile(r'^-?\d+$')
+
+
+def _type_name(value: Any) -> str:
+    return 'null' if value is None else type(value).__name__
+
+
+class Validator:
+    """One compiled model: the field checks are built once and reused for every item"""
+
+    def __init__(self, name: str, fields: List[Tuple[str, str]], registry: Dict[str, 'Validator'],
+                 lenient: bool = False):
+        self.name = name
+        self.known = frozenset(field for field, _ in fields)
+        self.checks: List[Tuple[str, bool, bool, Check]] = []
+        for field, declaration in fields:
+            match = _DECLARATION.match(declaration)
+            if not match:
+                raise ValueError(f"{name}.{field}: cannot parse '{declaration}'")
+            required = '=' not in declaration
+            nullable = match.group('nullable') is not None
+            self.checks.append((field, required, nullable, compile_type(match.group('type').strip(), registry,
+                                                                      lenient)))
+
+    def __call__(self, item: Any) -> Optional[str]:
+        if type(item) is not dict:
+            return f": expected {self.name} object, got {_type_name(item)}"
+        for field, required, nullable, check in self.checks:
+            value = item.get(field, _MISSING)
+            if value is _MISSING:
+                if required:
+                    return f".{field}: missing"
+            elif value is None:
+                if not nullable:
+                    return f".{field}: null but not nullable"
+            else:
+                problem = check(value)
+                if problem:
+                    return f".{field}{problem}"
+        return None
+
+    def extra_fields(self, item: Any) -> List[str]:
+        """Fields the app does not know (ignored by its ignoreUnknownKeys decoder, but drift all the same)"""
+        return [key for key in item if key not in self.known] if type(item) is dict else []
+
+
+def _lenient_accepts(kotlin_type: str, value: Any) -> bool:
+    """What the app's `isLenient = true` Json also decodes: quoted numbers and booleans, bare literals as String"""
+    if kotlin_type == 'String':
+        return type(value) in (int, float, bool)
+    if type(value) is not str:
+        return False
+    if kotlin_type == 'Boolean':
+        return value in ('true', 'false')
+    return _INTEGER.match(value) is not None
+
+
+def compile_type(kotlin_type: str, registry: Dict[str, Validator], lenient: bool = False) -> Check:
+    """
+    Check for a Kotlin type: String, Int, Boolean, List<T>, Map<String, T> or a
+    registered model. Strict checks follow the JSON types exactly; `lenient`
+    also accepts what the app's lenient decoder coerces.
+    """
+    if kotlin_type in _PRIMITIVES:
+        expected = _PRIMITIVES[kotlin_type]
+
+        # `type() is` keeps bool out of Int and int out of Boolean; neither decoder mode converts those
+        def primitive(value):
+            if type(value) is not expected and not (lenient and _lenient_accepts(kotlin_type, value)):
+                return f": expected {kotlin_type}, got {_type_name(value)}"
+            return None
+        return primitive
+    if kotlin_type.startswith('List<') and kotlin_type.endswith('>'):
+        element = compile_type(kotlin_type[5:-1].strip(), registry, lenient)
+
+        def list_of(value):
+            if type(value) is not list:
+                return f": expected list, got {_type_name(value)}"
+            for index, entry in enumerate(value):
+                problem = element(entry)
+                if problem:
+                    return f"[{index}]{problem}"
+            return None
+        return list_of
+    if kotlin_type.startswith('Map<') and kotlin_type.endswith('>'):
+        values = compile_type(kotlin_type[4:-1].split(',', 1)[1].strip(), registry, lenient)
+
+        def map_of(value):
+            if type(value) is not dict:
+                return f": expected map, got {_type_name(value)}"
+            for key, entry in value.items():
+                problem = values(entry)
+                if problem:
+                    return f".{key}{problem}"
+            return None
+        return map_of
+    if kotlin_type in registry:
+        return registry[kotlin_type]
+    raise ValueError(f"Unknown Kotlin type '{kotlin_type}'")
+
+
+def compile_models(models: Dict[str, List[Tuple[str, str]]], lenient: bool = False) -> Dict[str, Validator]:
+    registry: Dict[str, Validator] = {}
+    for name, fields in models.items():
+        registry[name] = Validator(name, fields, registry, lenient)
+    return registry
+
+
+VALIDATORS = compile_models(MODELS)
+# Only consulted when the strict check fails, to tell real failures from strict-JSON warnings
+LENIENT_VALIDATORS = compile_models(MODELS, lenient=True)
+
+
+class TypeStats:
+    """Validation outcome and cost for one response type"""
+
+    def __init__(self):
+        self.responses = 0
+        self.items = 0
+        self.failed = 0
+        self.strict_only = 0
+        self.cpu = 0.0
+        self.per_item = LatencyHistogram()
+        self.problems: Counter = Counter()
+        self.warnings: Counter = Counter()
+        self.extra: Counter = Counter()
+
+
+class SchemaCheck:
+    """
+    Validates response bodies against ROUTE_TYPES. `rate` is the fraction of
+    responses checked. With `background`, observe() only samples and queues the
+    raw body; decoding and validation run on a worker thread, and bodies arriving
+    while the queue is full are dropped (counted) rather than blocking the caller.
+    """
+
+    def __init__(self, rate: float = 1.0, overhead=None, background: bool = False, max_queued: int = 1000):
+        self.rate = rate
+        self.overhead = overhead
+        self.stats: Dict[str, TypeStats] = {}
+        self.skipped = 0
+        self.dropped = 0
+        self._checks: Dict[str, Tuple[Check, Check]] = {}
+        self._lock = threading.Lock()
+        self._queue: Optional[queue.Queue] = None
+        self._worker: Optional[threading.Thread] = None
+        if background:
+            self._queue = queue.Queue(maxsize=max_queued)
+            self._worker = threading.Thread(target=self._drain, daemon=True)
+            self._worker.start()
+
+    def _checks_for(self, type_name: str) -> Tuple[Check, Check]:
+        checks = self._checks.get(type_name)
+        if checks is None:
+            checks = self._checks[type_name] = (compile_type(type_name, VALIDATORS),
+                                                compile_type(type_name, LENIENT_VALIDATORS, lenient=True))
+        return checks
+
+    def validate(self, type_name: str, payload: Any) -> Optional[str]:
+        """
+        Check a decoded body; returns the first problem the app's decoder would
+        fail on, or None. Bodies that only the lenient decoder accepts pass,
+        and their first strict-JSON mismatch is counted as a warning.
+        """
+        strict, lenient = self._checks_for(type_name)
+        label = type_name[5:-1] if type_name.startswith('List<') else type_name
+        start = time.thread_time()
+        problem = warning = None
+        mismatch = strict(payload)
+        if mismatch:
+            problem = lenient(payload)
+            if problem:
+                problem = label + problem
+            else:
+                warning = label + mismatch
+        extra: List[str] = []
+        element = VALIDATORS.get(label)
+        if element is not None:
+            for item in (payload if type(payload) is list else [payload]):
+                extra.extend(element.extra_fields(item))
+        cpu = time.thread_time() - start
+        items = len(payload) if type(payload) is list else 1
+        if self.overhead is not None:
+            self.overhead.add('validation', cpu)
+        with self._lock:
+            stats = self.stats.setdefault(type_name, TypeStats())
+            stats.responses += 1
+            stats.items += items
+            stats.cpu += cpu
+            if items:
+                stats.per_item.record_seconds(cpu / items)
+            if problem:
+                stats.failed += 1
+                stats.problems[re.sub(r'\[\d+\]', '[]', problem)] += 1
+            elif warning:
+                stats.strict_only += 1
+                stats.warnings[re.sub(r'\[\d+\]', '[]', warning)] += 1
+            stats.extra.update(extra)
+        return problem
+
+    def observe(self, method: str, url: str, response):
+        """Sample one finished response and validate it if its route has a known type"""
+        type_name = ROUTE_TYPES.get(f"{method.upper()} {route_template(url)}")
+        if type_name is None or response is None or not 200 <= response.status_code < 300:
+            return
+        if self.rate < 1 and random.random() >= self.rate:
+            self.skipped += 1
+            return
+        if self._queue is None:
+            self._validate_body(type_name, response.content)
+            return
+        try:
+            self._queue.put_nowait((type_name, response.content))
+        except queue.Full:
+            self.dropped += 1
+
+    def _validate_body(self, type_name: str, body: bytes):
+        try:
+            payload = json.loads(body)
+        except ValueError:
+            with self._lock:
+                stats = self.stats.setdefault(type_name, TypeStats())
+                stats.responses += 1
+                stats.failed += 1
+                stats.problems['invalid JSON'] += 1
+            return
+        self.validate(type_name, payload)
+
+    def _drain(self):
+        while True:
+            entry = self._queue.get()
+            if entry is None:
+                return
+            self._validate_body(*entry)
+
+    def close(self):
+        if self._worker is not None:
+            self._queue.put(None)
+            self._worker.join()
+            self._worker = None
+
+    @property
+    def failed(self) -> int:
+        return sum(stats.failed for stats in self.stats.values())
+
+    def report_lines(self) -> List[str]:
+        lines = [f"{'Type':<26}{'Resp':>7}{'Items':>8}{'Failed':>8}{'µs/item p50':>13}{'p99':>8}{'CPU ms':>9}"]
+        for type_name, stats in sorted(self.stats.items()):
+            color = Colors.RED if stats.failed else ''
+            lines.append(f"{color}{type_name:<26}{stats.responses:>7}{stats.items:>8}{stats.failed:>8}"
+                         f"{stats.per_item.percentile(50):>13.1f}{stats.per_item.percentile(99):>8.1f}"
+                         f"{stats.cpu * 1000:>9.2f}{Colors.RESET if color else ''}")
+            for problem, count in stats.problems.most_common(3):
+                lines.append(f"  {Colors.RED}{count}x {problem}{Colors.RESET}")
+            for warning, count in stats.warnings.most_common(3):
+                lines.append(f"  {Colors.YELLOW}{count}x strict JSON only (lenient decode): {warning}{Colors.RESET}")
+            if stats.extra:
+                fields = ', '.join(f"{field} ({count})" for field, count in stats.extra.most_common(5))
+                lines.append(f"  {Colors.YELLOW}fields unknown to the app: {fields}{Colors.RESET}")
+        sampled = f"sampling {self.rate * 100:g}% of responses ({self.skipped} skipped"
+        sampled += f", {self.dropped} dropped with the validator behind)" if self.dropped else ")"
+        lines.append(sampled if self.rate < 1 else "every response validated")
+        return lines
+
+
+def add_schema_arguments(parser: argparse.ArgumentParser, default_rate: float = 1.0):
+    parser.add_argument('--schema-sample', type=float, default=default_rate, metavar='RATE',
+                        help=f"Fraction of responses validated against the app's models "
+                             f"(0 disables; default {default_rate:g})")
+
+
+def print_models():
+    """Compiled models and the routes decoded as each"""
+    for name, validator in VALIDATORS.items():
+        required = sum(1 for _, required, _, _ in validator.checks if required)
+        routes = [route for route, kotlin_type in ROUTE_TYPES.items()
+                  if kotlin_type in (name, f"List<{name}>")]
+        print(f"{Colors.BOLD}{name}{Colors.RESET}: {len(validator.checks)} fields ({required} required)"
+              f"{'  <- ' + ', '.join(routes) if routes else ''}")
+
+
+def main():
+    """Main function"""
+    parser = argparse.ArgumentParser(description="Validate LeoConnect JSON against the app's models")
+    parser.add_argument('type', nargs='?', help="Kotlin type, e.g. Post or List<Club>; omit to list the models")
+    parser.add_argument('file', nargs='?', help="JSON file (default stdin)")
+    parser.add_argument('--repeat', type=int, default=1, help="Validate N times to measure per-item cost")
+    args = parser.parse_args()
+    if not args.type:
+        print_models()
+        return
+
+    with (open(args.file) if args.file else sys.stdin) as handle:
+        payload = json.load(handle)
+    check = SchemaCheck()
+    problem = None
+    for _ in range(args.repeat):
+        problem = check.validate(args.type, payload)
+    for line in check.report_lines()[:-1]:
+        print(line)
+    if problem:
+        print(f"{Colors.RED}✗ {problem}{Colors.RESET}")
+    elif any(stats.strict_only for stats in check.stats.values()):
+        print(f"{Colors.YELLOW}⚠ decodes as {args.type} only with the app's lenient Json{Colors.RESET}")
+    else:
+        print(f"{Colors.GREEN}✓ conforms to {args.type}{Colors.RESET}")
+    raise SystemExit(1 if problem else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,328 @@
+#!/usr/bin/env python3
+"""
+LeoConnect Search Benchmark
+Replays SearchScreen-style keystroke bursts against /search and /search/users with debounce and cancellation
+"""
+
+import argparse
+import math
+import random
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from typing import Dict, List, Optional, Tuple
+
+import requests
+
+from bench_history import add_history_arguments, save_from_args
+from colors import Colors
+from http_pool import add_pool_arguments, configure_pool_from_args, mount_shared_pool
+from latency import LatencyHistogram, LatencyRecorder, status_class
+from stub_server import add_stand_in_arguments, start_stand_in
+
+
+# SearchScreenModel and MessagesTab both wait 500 ms after the last keystroke
+APP_DEBOUNCE_MS = 500
+
+SEARCH_PATHS = {'search': '/search', 'users': '/search/users'}
+
+
+def build_corpus(base_url: str, session: requests.Session) -> Dict[str, List[str]]:
+    """Terms people search for: district and club names for /search, author names for /search/users"""
+    terms = set()
+    districts = session.get(f"{base_url}/districts", timeout=15).json()
+    for district in districts:
+        terms.add(district)
+        response = session.get(f"{base_url}/clubs", params={'district': district}, timeout=15)
+        if response.status_code == 200:
+            for club in response.json():
+                name = club.get('name', '')
+                terms.add(name)
+                # People also type just the distinctive part, e.g. "Kandy" rather than "Leo Club of Kandy"
+                terms.update(word for word in name.split() if len(word) > 3 and word.lower() not in ('club',))
+    names = set()
+    response = session.get(f"{base_url}/explore", params={'limit': 100}, timeout=15)
+    if response.status_code == 200:
+        names.update(p['authorName'] for p in response.json() if isinstance(p, dict) and p.get('authorName'))
+    return {'search': sorted(t for t in terms if t), 'users': sorted(names)}
+
+
+def keystroke_script(rng: random.Random, term: str, keystroke_ms: float, pause_prob: float,
+                     debounce_ms: float) -> List[Tuple[float, str]]:
+    """(delay before the key in seconds, query after the key) for one burst of typing"""
+    length = len(term) if rng.random() < 0.4 else rng.randint(min(3, len(term)), len(term))
+    script = []
+    sigma = 0.5
+    mu = math.log(keystroke_ms / 1000)
+    for n in range(1, length + 1):
+        delay = rng.lognormvariate(mu, sigma) if n > 1 else 0.0
+        if n > 1 and rng.random() < pause_prob:
+            # A hesitation long enough for the debounce to fire mid-word
+            delay += rng.uniform(1.2, 3.0) * max(debounce_ms, APP_DEBOUNCE_MS) / 1000
+        script.append((delay, term[:n]))
+    return script
+
+
+def length_label(path: str, length: int) -> str:
+    return f"{path} len {length:>2}" if length < 10 else f"{path} len 10+"
+
+
+class ModeResult:
+    """Counters for one strategy (every keystroke, or debounce plus cancellation)"""
+
+    def __init__(self, name: str):
+        self.name = name
+        self.recorder = LatencyRecorder()
+        self.time_to_results = LatencyHistogram()
+        self.sizes: Dict[str, List[int]] = {}
+        self.keystrokes = 0
+        self.sent = 0
+        self.cancelled = 0
+        self.out_of_order = 0
+        self.failed = 0
+        self.bytes = 0
+        self.sessions = 0
+        self.unanswered = 0
+        self._lock = threading.Lock()
+
+    def add(self, **amounts):
+        with self._lock:
+            for name, amount in amounts.items():
+                setattr(self, name, getattr(self, name) + amount)
+
+    def record_size(self, label: str, size: int):
+        with self._lock:
+            self.bytes += size
+            totals = self.sizes.setdefault(label, [0, 0])
+            totals[0] += size
+            totals[1] += 1
+
+    def response_latency(self) -> LatencyHistogram:
+        merged = LatencyHistogram()
+        for stats in self.recorder.stats.values():
+            merged.merge(stats.histogram)
+        return merged
+
+
+class TypingSession:
+    """
+    One burst of typing. Every keystroke bumps the generation; a debounce timer
+    sends the query only if no newer key arrived, and a response whose generation
+    is stale is cancelled (body never read, connection dropped) like a cancelled Job.
+    """
+
+    def __init__(self, bench: 'SearchBenchmark', result: ModeResult, path: str, script: List[Tuple[float, str]],
+                 debounce: float, cancel: bool):
+        self.bench = bench
+        self.result = result
+        self.path = path
+        self.script = script
+        self.debounce = debounce
+        self.cancel = cancel
+        self.generation = 0
+        self.shown = 0
+        self.last_key_at = 0.0
+        self.done = threading.Event()
+        self._timer: Optional[threading.Timer] = None
+        self._lock = threading.Lock()
+
+    def run(self, timeout: float = 30):
+        for delay, query in self.script:
+            time.sleep(delay)
+            with self._lock:
+                self.generation += 1
+                generation = self.generation
+                self.last_key_at = time.perf_counter()
+                if self._timer is not None:
+                    self._timer.cancel()
+            self.result.add(keystrokes=1)
+            if self.debounce > 0:
+                self._timer = threading.Timer(self.debounce, self._fire, (query, generation))
+                self._timer.daemon = True
+                self._timer.start()
+            else:
+                self._fire(query, generation)
+        if not self.done.wait(timeout):
+            self.result.add(unanswered=1)
+        self.result.add(sessions=1)
+
+    def _stale(self, generation: int) -> bool:
+        with self._lock:
+            return generation != self.generation
+
+    def _fire(self, query: str, generation: int):
+        if self._stale(generation) and self.debounce > 0:
+            return
+        self.bench.pool.submit(self._request, query, generation)
+
+    def _request(self, query: str, generation: int):
+        label = length_label(self.path, len(query))
+        self.result.add(sent=1)
+        start = time.perf_counter()
+        try:
+            response = self.bench.session().get(f"{self.bench.base_url}{self.path}", params={'q': query},
+                                                timeout=15, stream=True)
+        except requests.exceptions.RequestException:
+            self.result.recorder.record(label, 'error', start, time.perf_counter())
+            self.result.add(failed=1)
+            self._finish(generation)
+            return
+        if self.cancel and self._stale(generation):
+            response.close()
+            self.result.add(cancelled=1)
+            return
+        content = response.content
+        end = time.perf_counter()
+        self.result.recorder.record(label, status_class(response.status_code), start, end)
+        self.result.record_size(label, len(content))
+        with self._lock:
+            # Without cancellation an older query's results can land after a newer one's
+            stale = generation < self.shown
+            self.shown = max(self.shown, generation)
+        if stale:
+            self.result.add(out_of_order=1)
+        self._finish(generation)
+
+    def _finish(self, generation: int):
+        with self._lock:
+            final = generation == len(self.script)
+        if final:
+            self.result.time_to_results.record_seconds(time.perf_counter() - self.last_key_at)
+            self.done.set()
+
+
+class SearchBenchmark:
+    def __init__(self, base_url: str, corpus: Dict[str, List[str]], typists: int = 4, sessions: int = 10,
+                 keystroke_ms: float = 180, pause_prob: float = 0.1, seed: int = 0):
+        self.base_url = base_url
+        self.corpus = corpus
+        self.typists = typists
+        self.sessions = sessions
+        self.keystroke_ms = keystroke_ms
+        self.pause_prob = pause_prob
+        self.seed = seed
+        self.pool = ThreadPoolExecutor(max_workers=max(8, typists * 8))
+        self._local = threading.local()
+
+    def session(self) -> requests.Session:
+        session = getattr(self._local, 'session', None)
+        if session is None:
+            session = self._local.session = mount_shared_pool(requests.Session())
+            session.headers.update({'User-Agent': 'LeoConnect-Search-Bench/1.0', 'Accept': 'application/json'})
+        return session
+
+    def scripts(self, typist: int, endpoints: List[str], debounce_ms: float):
+        """The same bursts for every mode, so the strategies see identical typing"""
+        rng = random.Random(f"{self.seed}:{typist}")
+        for _ in range(self.sessions):
+            endpoint = rng.choice(endpoints)
+            term = rng.choice(self.corpus[endpoint])
+            yield SEARCH_PATHS[endpoint], keystroke_script(rng, term, self.keystroke_ms, self.pause_prob, debounce_ms)
+
+    def run(self, name: str, endpoints: List[str], debounce_ms: float, cancel: bool,
+            script_debounce_ms: float) -> ModeResult:
+        result = ModeResult(name)
+
+        def typist(index: int):
+            for path, script in self.scripts(index, endpoints, script_debounce_ms):
+                TypingSession(self, result, path, script, debounce_ms / 1000, cancel).run()
+                time.sleep(random.Random(f"{self.seed}:{index}:gap").uniform(0.2, 0.6))
+
+        threads = [threading.Thread(target=typist, args=(i,), daemon=True) for i in range(self.typists)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        return result
+
+
+def print_modes(results: List[ModeResult]):
+    print(f"\n{Colors.BOLD}{'Strategy':<30}{'Keys':>7}{'Sent':>7}{'Cancel':>8}{'Stale':>7}{'KB':>9}"
+          f"{'p50':>8}{'p95':>8}{'p95 to results':>16}{Colors.RESET}")
+    for r in results:
+        latency = r.response_latency()
+        print(f"{r.name:<30}{r.keystrokes:>7}{r.sent:>7}{r.cancelled:>8}{r.out_of_order:>7}{r.bytes / 1024:>9.1f}"
+              f"{latency.percentile(50) / 1000:>8.1f}{latency.percentile(95) / 1000:>8.1f}"
+              f"{r.time_to_results.percentile(95) / 1000:>14.1f}ms")
+        if r.failed or r.unanswered:
+            print(f"  {Colors.RED}{r.failed} failed requests, {r.unanswered} sessions never got final results"
+                  f"{Colors.RESET}")
+    if len(results) == 2 and results[0].sent:
+        naive, app = results
+        saved_requests = 1 - app.sent / naive.sent
+        saved_bytes = 1 - app.bytes / naive.bytes if naive.bytes else 0.0
+        print(f"\nDebounce + cancellation sent {saved_requests * 100:.0f}% fewer requests and moved "
+              f"{saved_bytes * 100:.0f}% fewer bytes; {naive.out_of_order} stale result sets were avoided")
+
+
+def print_prefix_lengths(result: ModeResult):
+    print(f"\n{Colors.BOLD}Latency by prefix length ({result.name}){Colors.RESET}")
+    print(f"{'Query':<24}{'Count':>7}{'p50':>8}{'p95':>8}{'p99':>8}{'mean KB':>9}")
+    for label in sorted({endpoint for endpoint, _ in result.recorder.stats}):
+        h = result.recorder.combined(label).histogram
+        size, count = result.sizes.get(label, (0, 0))
+        print(f"{label:<24}{h.total_count:>7}" + ''.join(f"{h.percentile(q) / 1000:>8.1f}" for q in (50, 95, 99))
+              + f"{(size / count / 1024 if count else 0):>9.1f}")
+
+
+def main():
+    """Main function"""
+    parser = argparse.ArgumentParser(description="LeoConnect typeahead search benchmark")
+    parser.add_argument('--base-url', default="https://leoconnect.rexosphere.com")
+    parser.add_argument('--endpoints', default='search,users', help="Comma-separated from: search, users")
+    parser.add_argument('--typists', type=int, default=4, help="Concurrent people typing")
+    parser.add_argument('--sessions', type=int, default=10, help="Searches typed by each person")
+    parser.add_argument('--keystroke-ms', type=float, default=180, help="Median gap between keystrokes")
+    parser.add_argument('--pause-prob', type=float, default=0.1, help="Chance of a mid-word hesitation per key")
+    parser.add_argument('--debounce-ms', type=float, default=APP_DEBOUNCE_MS)
+    parser.add_argument('--no-cancel', action='store_true', help="Let stale in-flight requests finish")
+    parser.add_argument('--no-baseline', action='store_true', help="Skip the request-per-keystroke comparison run")
+    parser.add_argument('--seed', type=int, default=0)
+    add_pool_arguments(parser)
+    add_history_arguments(parser)
+    add_stand_in_arguments(parser)
+    args = parser.parse_args()
+    endpoints = [e.strip() for e in args.endpoints.split(',') if e.strip()]
+    unknown = [e for e in endpoints if e not in SEARCH_PATHS]
+    if unknown or not endpoints:
+        raise SystemExit(f"Unknown endpoint(s) {', '.join(unknown)}. Choose from: {', '.join(SEARCH_PATHS)}")
+    configure_pool_from_args(args, default_maxsize=args.typists * 8)
+    start_stand_in(args)
+
+    bench = SearchBenchmark(args.base_url, {}, args.typists, args.sessions, args.keystroke_ms, args.pause_prob,
+                            args.seed)
+    bench.corpus = build_corpus(args.base_url, bench.session())
+    endpoints = [e for e in endpoints if bench.corpus[e]]
+    if not endpoints:
+        raise SystemExit("Could not build a search corpus from /districts, /clubs and /explore")
+
+    print(f"\n{Colors.BOLD}LeoConnect Search Benchmark{Colors.RESET}")
+    print(f"{Colors.BOLD}Base URL: {args.base_url} | {args.typists} typists x {args.sessions} searches, "
+          f"~{args.keystroke_ms:g} ms per key{Colors.RESET}")
+    print(f"{Colors.BOLD}Corpus: " + ', '.join(f"{len(bench.corpus[e])} {e} terms" for e in endpoints)
+          + f"{Colors.RESET}")
+    print(f"{Colors.BOLD}Started at: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}{Colors.RESET}")
+
+    results = []
+    started = time.perf_counter()
+    if not args.no_baseline:
+        results.append(bench.run('every keystroke', endpoints, 0, False, args.debounce_ms))
+    app_name = f"debounce {args.debounce_ms:g} ms" + ('' if args.no_cancel else ' + cancel')
+    app = bench.run(app_name, endpoints, args.debounce_ms, not args.no_cancel, args.debounce_ms)
+    results.append(app)
+    wall_time = time.perf_counter() - started
+    bench.pool.shutdown()
+
+    print_modes(results)
+    print_prefix_lengths(results[0])
+    print()
+    save_from_args(args, 'search_bench', app.recorder, wall_time,
+                   extra={'requests_saved': 1 - app.sent / results[0].sent if len(results) == 2 and results[0].sent
+                          else None})
+    if any(r.failed or r.unanswered for r in results):
+        raise SystemExit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,433 @@
+#!/usr/bin/env python3
+"""
+LeoConnect Data Seeder
+Fills a backend with a deterministic synthetic data set through the app's own routes, with bounded concurrency
+"""
+
+import argparse
+import base64
+import json
+import random
+import sys
+import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta, timezone
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional
+
+import requests
+
+from bench_history import add_history_arguments, save_from_args
+from colors import Colors
+from http_pool import add_pool_arguments, configure_pool_from_args, mount_shared_pool
+from latency import LatencyRecorder, TimedSession
+from stub_server import CLUB_TOWNS, TOPICS, add_stand_in_arguments, start_stand_in
+
+
+# Event dates are offsets from a fixed day so a seed always produces the same data set
+EVENT_EPOCH = datetime(2026, 1, 1, 10, 0, tzinfo=timezone.utc)
+
+RETRYABLE_STATUSES = (429, 500, 502, 503, 504)
+
+
+class Op:
+    """
+    One write. `key` is derived from the plan seed and sent as Idempotency-Key so a
+    retried create is not applied twice; `ensure` names a response flag that must
+    end up true, for toggle routes (like, RSVP) a retry could otherwise flip back.
+    """
+
+    __slots__ = ('user', 'method', 'path', 'body', 'key', 'ensure', 'then')
+
+    def __init__(self, user: int, method: str, path: str, body: Optional[Dict[str, Any]], key: str,
+                 ensure: Optional[str] = None, then: Optional[Callable[[Any], Iterable['Op']]] = None):
+        self.user = user
+        self.method = method
+        self.path = path
+        self.body = body
+        self.key = key
+        self.ensure = ensure
+        self.then = then
+
+
+def created_id(payload: Any, field: str, wrapper: Optional[str] = None) -> Optional[str]:
+    """ID from a create response, whether returned bare or wrapped (e.g. {'comment': {...}})"""
+    if not isinstance(payload, dict):
+        return None
+    if wrapper and isinstance(payload.get(wrapper), dict):
+        payload = payload[wrapper]
+    return payload.get(field)
+
+
+class SeedPlan:
+    """Every write the seeder makes, generated lazily and reproducibly from one seed"""
+
+    def __init__(self, seed: int = 1, users: int = 100, posts: int = 1000, comments_per_post: int = 2,
+                 likes_per_post: int = 5, follows_per_user: int = 10, club_follows_per_user: int = 3,
+                 events: int = 20, rsvps_per_event: int = 10, image_bytes: int = 0):
+        self.seed = seed
+        self.users = users
+        self.posts = posts
+        self.comments_per_post = comments_per_post
+        self.likes_per_post = likes_per_post
+        self.follows_per_user = follows_per_user
+        self.club_follows_per_user = club_follows_per_user
+        self.events = events
+        self.rsvps_per_event = rsvps_per_event
+        self.image_bytes = image_bytes
+
+    def rng(self, *parts) -> random.Random:
+        """Independent stream per entity, so results do not depend on completion order"""
+        return random.Random(':'.join(str(p) for p in (self.seed,) + parts))
+
+    def key(self, *parts) -> str:
+        return '-'.join(str(p) for p in ('seed', self.seed) + parts)
+
+    def totals(self, clubs: int) -> Dict[str, int]:
+        """Expected number of writes per phase"""
+        others = max(0, self.users - 1)
+        return {
+            'users': self.users,
+            'follows': self.users * (min(self.follows_per_user, others) + min(self.club_follows_per_user, clubs)),
+            'posts': self.posts * (1 + self.comments_per_post + min(self.likes_per_post, self.users)),
+            'events': self.events * (1 + min(self.rsvps_per_event, self.users)),
+        }
+
+    def user_ops(self, clubs: List[str], uids: List[Optional[str]]) -> Iterator[Op]:
+        for i in range(self.users):
+            rng = self.rng('user', i)
+            body = {'leoId': f"LEO{self.seed:03d}{i:07d}"}
+            if clubs:
+                body['assignedClubId'] = rng.choice(clubs)
+
+            def remember(payload, i=i):
+                uids[i] = created_id(payload, 'uid')
+                return ()
+            yield Op(i, 'POST', '/users/me/quick-start', body, self.key('user', i), then=remember)
+
+    def follow_ops(self, clubs: List[str], uids: List[Optional[str]]) -> Iterator[Op]:
+        for i in range(self.users):
+            rng = self.rng('follow', i)
+            others = [j for j in rng.sample(range(self.users), min(self.users, self.follows_per_user + 1))
+                      if j != i][:self.follows_per_user]
+            for j in others:
+                if uids[j]:
+                    yield Op(i, 'POST', f"/users/{uids[j]}/follow", None, self.key('follow', i, j))
+            for club_id in rng.sample(clubs, min(len(clubs), self.club_follows_per_user)):
+                yield Op(i, 'POST', f"/clubs/{club_id}/follow", None, self.key('club-follow', i, club_id))
+
+    def image(self, rng: random.Random) -> str:
+        return base64.b64encode(rng.randbytes(self.image_bytes)).decode()
+
+    def post_ops(self, clubs: List[str], post_ids: Optional[List[str]] = None) -> Iterator[Op]:
+        for n in range(self.posts):
+            rng = self.rng('post', n)
+            body = {'content': f"Our {rng.choice(TOPICS)} in {rng.choice(CLUB_TOWNS)} was a success! "
+                               f"#seed{self.seed}-p{n}"}
+            if clubs:
+                body['clubId'] = rng.choice(clubs)
+            if self.image_bytes:
+                body['imagesList'] = [{'imageBytes': self.image(rng)}]
+            yield Op(rng.randrange(self.users), 'POST', '/posts', body, self.key('post', n),
+                     then=lambda payload, n=n: self._post_followups(n, payload, post_ids))
+
+    def _post_followups(self, n: int, payload: Any, post_ids: Optional[List[str]]) -> List[Op]:
+        post_id = created_id(payload, 'postId', 'post')
+        if not post_id:
+            return []
+        if post_ids is not None:
+            post_ids.append(post_id)
+        rng = self.rng('post-activity', n)
+        ops = []
+        for c in range(self.comments_per_post):
+            ops.append(Op(rng.randrange(self.users), 'POST', f"/posts/{post_id}/comments",
+                          {'content': f"Great work, Leos! #seed{self.seed}-p{n}-c{c}"}, self.key('comment', n, c)))
+        for liker in rng.sample(range(self.users), min(self.likes_per_post, self.users)):
+            ops.append(Op(liker, 'POST', f"/posts/{post_id}/like", None, self.key('like', n, liker),
+                          ensure='isLikedByUser'))
+        return ops
+
+    def event_ops(self, clubs: List[str], event_ids: Optional[List[str]] = None) -> Iterator[Op]:
+        for n in range(self.events):
+            rng = self.rng('event', n)
+            body = {
+                'name': f"District {rng.choice(TOPICS)} #{n}",
+                'description': f"Join us in {rng.choice(CLUB_TOWNS)}! #seed{self.seed}-e{n}",
+                'eventDate': (EVENT_EPOCH + timedelta(days=rng.randint(1, 365))).isoformat(),
+            }
+            if clubs:
+                body['clubId'] = rng.choice(clubs)
+            yield Op(rng.randrange(self.users), 'POST', '/events', body, self.key('event', n),
+                     then=lambda payload, n=n: self._event_followups(n, payload, event_ids))
+
+    def _event_followups(self, n: int, payload: Any, event_ids: Optional[List[str]]) -> List[Op]:
+        event_id = created_id(payload, 'eventId', 'event')
+        if not event_id:
+            return []
+        if event_ids is not None:
+            event_ids.append(event_id)
+        rng = self.rng('rsvp', n)
+        return [Op(user, 'POST', f"/events/{event_id}/rsvp", None, self.key('rsvp', n, user), ensure='hasRSVPd')
+                for user in rng.sample(range(self.users), min(self.rsvps_per_event, self.users))]
+
+
+class PhaseStats:
+    def __init__(self, name: str, expected: int):
+        self.name = name
+        self.expected = expected
+        self.done = 0
+        self.failed = 0
+        self.retries = 0
+        self.corrected = 0
+        self.errors: List[str] = []
+        self.started = time.perf_counter()
+        self.finished: Optional[float] = None
+
+    @property
+    def elapsed(self) -> float:
+        return (self.finished or time.perf_counter()) - self.started
+
+    @property
+    def rate(self) -> float:
+        return (self.done + self.failed) / max(self.elapsed, 1e-9)
+
+
+class Seeder:
+    """
+    Streams Ops through `concurrency` workers. Follow-ups an Op produces (comments
+    and likes for a new post, RSVPs for a new event) go to the front of the queue,
+    so dependent writes are pipelined behind their parent instead of waiting for a
+    whole phase to finish.
+    """
+
+    def __init__(self, base_url: str, tokens: List[str], concurrency: int = 16, retries: int = 5,
+                 timeout: float = 15, recorder: Optional[LatencyRecorder] = None):
+        self.base_url = base_url
+        self.tokens = tokens
+        self.concurrency = max(1, concurrency)
+        self.retries = retries
+        self.timeout = timeout
+        self.recorder = recorder if recorder is not None else LatencyRecorder()
+        self.phases: List[PhaseStats] = []
+        self._local = threading.local()
+        self._cond = threading.Condition()
+        self._followups: 'deque[Op]' = deque()
+        self._inflight = 0
+
+    def session(self) -> requests.Session:
+        session = getattr(self._local, 'session', None)
+        if session is None:
+            session = self._local.session = mount_shared_pool(TimedSession(self.recorder))
+            session.headers.update({'User-Agent': 'LeoConnect-Seeder/1.0', 'Accept': 'application/json'})
+        return session
+
+    def send(self, op: Op, stats: PhaseStats, key: Optional[str] = None) -> Optional[Any]:
+        """Send with retries on transport errors, 429 and 5xx; returns the JSON payload or None on failure"""
+        headers = {'Authorization': f'Bearer {self.tokens[op.user]}', 'Idempotency-Key': key or op.key}
+        error = None
+        for attempt in range(self.retries + 1):
+            if attempt:
+                with self._cond:
+                    stats.retries += 1
+            try:
+                response = self.session().request(op.method, f"{self.base_url}{op.path}", json=op.body,
+                                                   headers=headers, timeout=self.timeout)
+            except requests.exceptions.RequestException as e:
+                error = f"{type(e).__name__}: {e}"
+                time.sleep(min(10.0, 0.25 * 2 ** attempt) * random.uniform(0.5, 1.5))
+                continue
+            if response.status_code in RETRYABLE_STATUSES:
+                error = f"HTTP {response.status_code}"
+                retry_after = response.headers.get('Retry-After', '')
+                delay = float(retry_after) if retry_after.isdigit() else 0.25 * 2 ** attempt
+                time.sleep(min(10.0, delay) * random.uniform(0.5, 1.5))
+                continue
+            if response.status_code >= 400:
+                error = f"HTTP {response.status_code}: {response.text[:120]}"
+                break
+            try:
+                return response.json()
+            except ValueError:
+                return {}
+        with self._cond:
+            stats.failed += 1
+            if len(stats.errors) < 5:
+                stats.errors.append(f"{op.method} {op.path}: {error}")
+        return None
+
+    def _execute(self, op: Op, stats: PhaseStats):
+        try:
+            payload = self.send(op, stats)
+            if payload is not None and op.ensure and isinstance(payload, dict) and payload.get(op.ensure) is False:
+                # A retried toggle (or a pre-existing like/RSVP) flipped it off; toggle once more
+                payload = self.send(op, stats, key=op.key + '-ensure')
+                with self._cond:
+                    stats.corrected += 1
+            followups = list(op.then(payload)) if payload is not None and op.then else []
+            with self._cond:
+                if payload is not None:
+                    stats.done += 1
+                self._followups.extend(followups)
+        finally:
+            with self._cond:
+                self._inflight -= 1
+                self._cond.notify_all()
+
+    def run_phase(self, name: str, ops: Iterable[Op], expected: int, progress: bool = True) -> PhaseStats:
+        stats = PhaseStats(name, expected)
+        self.phases.append(stats)
+        reporter = None
+        stop = threading.Event()
+        if progress:
+            reporter = threading.Thread(target=self._progress, args=(stats, stop), daemon=True)
+            reporter.start()
+
+        source = iter(ops)
+        exhausted = False
+        with ThreadPoolExecutor(max_workers=self.concurrency) as pool:
+            while True:
+                with self._cond:
+                    while self._inflight >= self.concurrency or \
+                            (exhausted and not self._followups and self._inflight):
+                        self._cond.wait()
+                    if self._followups:
+                        op = self._followups.popleft()
+                    elif not exhausted:
+                        op = next(source, None)
+                        if op is None:
+                            exhausted = True
+                            continue
+                    else:
+                        break
+                    self._inflight += 1
+                pool.submit(self._execute, op, stats)
+
+        stats.finished = time.perf_counter()
+        stop.set()
+        if reporter is not None:
+            reporter.join()
+        return stats
+
+    @staticmethod
+    def _progress(stats: PhaseStats, stop: threading.Event):
+        while True:
+            stopping = stop.wait(1.0)
+            finished = stats.done + stats.failed
+            remaining = max(0, stats.expected - finished)
+            eta = remaining / stats.rate if stats.rate else 0
+            sys.stdout.write(f"\r  {stats.name:<8}{finished:>9}/{stats.expected:<9} {stats.rate:>8.1f} ops/s  "
+                             f"retries {stats.retries:<5} failed {stats.failed:<5} ETA {eta:>6.0f}s ")
+            sys.stdout.flush()
+            if stopping:
+                sys.stdout.write('\n')
+                return
+
+
+def discover_clubs(base_url: str, session: requests.Session) -> List[str]:
+    """Club IDs across every district; the API has no route to create clubs, so we seed around existing ones"""
+    districts = session.get(f"{base_url}/districts", timeout=15)
+    districts.raise_for_status()
+    club_ids = set()
+    for district in districts.json():
+        response = session.get(f"{base_url}/clubs", params={'district': district}, timeout=15)
+        if response.status_code == 200:
+            club_ids.update(c['clubId'] for c in response.json() if isinstance(c, dict) and c.get('clubId'))
+    return sorted(club_ids)
+
+
+def print_report(seeder: Seeder, clubs: int, wall_time: float):
+    print(f"\n{Colors.BLUE}{'='*80}{Colors.RESET}")
+    print(f"{Colors.BOLD}Seeding summary ({clubs} existing clubs used){Colors.RESET}")
+    print(f"{Colors.BLUE}{'='*80}{Colors.RESET}\n")
+    print(f"{'Phase':<10}{'Expected':>10}{'Done':>10}{'Failed':>8}{'Retries':>9}{'Fixed':>7}{'Seconds':>9}{'ops/s':>9}")
+    for stats in seeder.phases:
+        color = Colors.RED if stats.failed else ''
+        print(f"{color}{stats.name:<10}{stats.expected:>10}{stats.done:>10}{stats.failed:>8}{stats.retries:>9}"
+              f"{stats.corrected:>7}{stats.elapsed:>9.1f}{stats.rate:>9.1f}{Colors.RESET}")
+        for error in stats.errors:
+            print(f"  {Colors.RED}{error}{Colors.RESET}")
+    print()
+    for line in seeder.recorder.report_lines(wall_time):
+        print(line)
+    print()
+
+
+def main():
+    """Main function"""
+    parser = argparse.ArgumentParser(description="LeoConnect deterministic data seeder")
+    parser.add_argument('--base-url', default="https://leoconnect.rexosphere.com")
+    parser.add_argument('--tokens-file', help="One bearer token per synthetic user (required against a real backend)")
+    parser.add_argument('--seed', type=int, default=1, help="Same seed, same data set")
+    parser.add_argument('--users', type=int, default=100)
+    parser.add_argument('--posts', type=int, default=1000)
+    parser.add_argument('--comments-per-post', type=int, default=2)
+    parser.add_argument('--likes-per-post', type=int, default=5)
+    parser.add_argument('--follows-per-user', type=int, default=10)
+    parser.add_argument('--club-follows-per-user', type=int, default=3)
+    parser.add_argument('--events', type=int, default=20)
+    parser.add_argument('--rsvps-per-event', type=int, default=10)
+    parser.add_argument('--image-bytes', type=int, default=0, help="Size of one attached image per post")
+    parser.add_argument('--concurrency', type=int, default=16, help="Writes in flight")
+    parser.add_argument('--retries', type=int, default=5)
+    parser.add_argument('--districts', type=int, default=6, help="Stand-in only: districts to pre-create")
+    parser.add_argument('--clubs-per-district', type=int, default=5, help="Stand-in only: clubs per district")
+    parser.add_argument('--manifest', help="Write the created user, club, post and event IDs to this JSON file")
+    parser.add_argument('--no-progress', action='store_true')
+    add_pool_arguments(parser)
+    add_history_arguments(parser)
+    add_stand_in_arguments(parser)
+    args = parser.parse_args()
+    configure_pool_from_args(args, default_maxsize=args.concurrency)
+    # Clubs cannot be created through the API, so an empty stand-in gets them up front
+    start_stand_in(args, users=0, posts=0, comments_per_post=0, events=0,
+                   districts=args.districts, clubs_per_district=args.clubs_per_district)
+
+    if args.tokens_file:
+        with open(args.tokens_file) as f:
+            tokens = [line.strip() for line in f if line.strip()][:args.users]
+        args.users = len(tokens)
+    elif args.stand_in:
+        tokens = [f"test-token-seed{args.seed}-{i:07d}" for i in range(args.users)]
+    else:
+        raise SystemExit("Pass --tokens-file with one token per synthetic user, or use --stand-in")
+    if not tokens:
+        raise SystemExit("No users to seed with")
+
+    plan = SeedPlan(args.seed, args.users, args.posts, args.comments_per_post, args.likes_per_post,
+                    args.follows_per_user, args.club_follows_per_user, args.events, args.rsvps_per_event,
+                    args.image_bytes)
+    seeder = Seeder(args.base_url, tokens, args.concurrency, args.retries)
+    clubs = discover_clubs(args.base_url, seeder.session())
+    totals = plan.totals(len(clubs))
+
+    print(f"\n{Colors.BOLD}LeoConnect Data Seeder (seed {args.seed}){Colors.RESET}")
+    print(f"{Colors.BOLD}Base URL: {args.base_url} | {args.concurrency} writes in flight{Colors.RESET}")
+    print(f"{Colors.BOLD}Plan: " + ', '.join(f"{name} {count}" for name, count in totals.items())
+          + f" writes{Colors.RESET}")
+    print(f"{Colors.BOLD}Started at: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}{Colors.RESET}\n")
+
+    uids: List[Optional[str]] = [None] * args.users
+    post_ids: Optional[List[str]] = [] if args.manifest else None
+    event_ids: Optional[List[str]] = [] if args.manifest else None
+    progress = not args.no_progress
+    started = time.perf_counter()
+    seeder.run_phase('users', plan.user_ops(clubs, uids), totals['users'], progress)
+    seeder.run_phase('follows', plan.follow_ops(clubs, uids), totals['follows'], progress)
+    seeder.run_phase('posts', plan.post_ops(clubs, post_ids), totals['posts'], progress)
+    seeder.run_phase('events', plan.event_ops(clubs, event_ids), totals['events'], progress)
+    wall_time = time.perf_counter() - started
+
+    print_report(seeder, len(clubs), wall_time)
+    if args.manifest:
+        with open(args.manifest, 'w', encoding='utf-8') as f:
+            json.dump({'seed': args.seed, 'base_url': args.base_url, 'users': uids, 'clubs': clubs,
+                       'posts': post_ids, 'events': event_ids}, f)
+        print(f"Wrote manifest to {args.manifest}")
+    save_from_args(args, 'seeder', seeder.recorder, wall_time, extra={'seed': args.seed, 'plan': totals})
+    if any(stats.failed for stats in seeder.phases):
+        raise SystemExit(1)
+
+
+if __name__ == "__main__":
+    main()
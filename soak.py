@@ -0,0 +1,407 @@
+#!/usr/bin/env python3
+"""
+LeoConnect Soak Test
+Runs the tester scenarios for hours with fixed-memory rolling windows, periodic snapshots and drift alerts
+"""
+
+import argparse
+import contextlib
+import json
+import os
+import sys
+import threading
+import time
+from collections import Counter, deque
+from datetime import datetime
+from typing import Dict, List, Optional
+
+from api_runner import ConcurrentRunner
+from bench_history import add_history_arguments, save_from_args
+from colors import Colors
+from http_pool import add_pool_arguments, configure_pool_from_args
+from latency import LatencyHistogram, LatencyRecorder, route_template
+from live_metrics import add_live_arguments, live_from_args, live_view
+from stub_server import add_stand_in_arguments, start_stand_in
+from test_api import LeoConnectAPITester
+from test_api_detailed import LeoConnectDetailedTester
+
+
+# Status classes that count as failures. 4xx are tracked apart: some are expected from the start (401 without
+# a token), so only a 4xx rate rising above the baseline's (429s, tokens expiring mid-soak) is drift
+ERROR_STATUSES = ('5xx', 'error')
+CLIENT_ERROR_STATUSES = ('4xx', '429')
+
+
+class WindowStats:
+    """Latency, error and response-size aggregates for one endpoint over one window"""
+
+    __slots__ = ('latency', 'requests', 'errors', 'rejected', 'bytes', 'sized')
+
+    def __init__(self):
+        # Two significant figures keep each histogram ~20 KB; plenty for drift detection
+        self.latency = LatencyHistogram(significant_figures=2)
+        self.requests = 0
+        self.errors = 0
+        self.rejected = 0
+        self.bytes = 0
+        self.sized = 0
+
+    def merge(self, other: 'WindowStats') -> 'WindowStats':
+        self.latency.merge(other.latency)
+        self.requests += other.requests
+        self.errors += other.errors
+        self.rejected += other.rejected
+        self.bytes += other.bytes
+        self.sized += other.sized
+        return self
+
+    @property
+    def error_rate(self) -> float:
+        return self.errors / self.requests if self.requests else 0.0
+
+    @property
+    def rejected_rate(self) -> float:
+        """Share of 4xx responses"""
+        return self.rejected / self.requests if self.requests else 0.0
+
+    @property
+    def mean_size(self) -> float:
+        return self.bytes / self.sized if self.sized else 0.0
+
+    def p(self, q: float) -> float:
+        """Percentile in ms"""
+        return self.latency.percentile(q) / 1000
+
+
+class Window:
+    """Everything observed during one interval, keyed by endpoint"""
+
+    def __init__(self, index: int, started: float):
+        self.index = index
+        self.started = started
+        self.endpoints: Dict[str, WindowStats] = {}
+        self.iterations = 0
+        self.checks = 0
+        self.failed = 0
+
+    def stats(self, endpoint: str) -> WindowStats:
+        stats = self.endpoints.get(endpoint)
+        if stats is None:
+            stats = self.endpoints[endpoint] = WindowStats()
+        return stats
+
+    def total(self) -> WindowStats:
+        total = WindowStats()
+        for stats in self.endpoints.values():
+            total.merge(stats)
+        return total
+
+    def merge(self, other: 'Window') -> 'Window':
+        for endpoint, stats in other.endpoints.items():
+            self.stats(endpoint).merge(stats)
+        self.iterations += other.iterations
+        self.checks += other.checks
+        self.failed += other.failed
+        return self
+
+
+class RollingWindows:
+    """
+    Ring of the last `keep` windows plus a frozen baseline (the first
+    `baseline_windows` complete windows). Memory depends on the number of
+    endpoints and windows, never on how long the soak runs.
+    """
+
+    def __init__(self, window_seconds: float = 60, keep: int = 30, baseline_windows: int = 3):
+        self.window_seconds = window_seconds
+        self.baseline_windows = baseline_windows
+        self.started = time.time()
+        self.ring: 'deque[Window]' = deque(maxlen=keep)
+        self.current = Window(0, self.started)
+        self.baseline = Window(-1, self.started)
+        self.baselined = 0
+        self._lock = threading.Lock()
+
+    def advance(self, now: Optional[float] = None) -> List[Window]:
+        """Close every window that has ended by `now` and return them, oldest first"""
+        now = time.time() if now is None else now
+        closed = []
+        with self._lock:
+            index = int((now - self.started) / self.window_seconds)
+            while self.current.index < index:
+                finished = self.current
+                self.ring.append(finished)
+                if self.baselined < self.baseline_windows:
+                    self.baseline.merge(finished)
+                    self.baselined += 1
+                closed.append(finished)
+                self.current = Window(finished.index + 1, self.started + (finished.index + 1) * self.window_seconds)
+        return closed
+
+    @property
+    def baseline_ready(self) -> bool:
+        return self.baselined >= self.baseline_windows
+
+    def record(self, endpoint: str, status: str, latency_us: int):
+        with self._lock:
+            stats = self.current.stats(endpoint)
+            stats.latency.record(latency_us)
+            stats.requests += 1
+            if status in ERROR_STATUSES:
+                stats.errors += 1
+            elif status in CLIENT_ERROR_STATUSES:
+                stats.rejected += 1
+
+    def record_size(self, endpoint: str, size: int):
+        with self._lock:
+            stats = self.current.stats(endpoint)
+            stats.bytes += size
+            stats.sized += 1
+
+    def record_iteration(self, checks: int, failed: int):
+        with self._lock:
+            self.current.iterations += 1
+            self.current.checks += checks
+            self.current.failed += failed
+
+
+class SoakMonitor:
+    """LatencyRecorder-compatible sink: feeds both the rolling windows and a lifetime recorder"""
+
+    def __init__(self, windows: RollingWindows):
+        self.windows = windows
+        self.lifetime = LatencyRecorder()
+
+    def record(self, endpoint: str, status: str, start: float, end: float):
+        self.lifetime.record(endpoint, status, start, end)
+        self.windows.record(endpoint, status, int((end - start) * 1_000_000))
+
+    def response_hook(self, response, *args, **kwargs):
+        endpoint = f"{response.request.method} {route_template(response.url)}"
+        self.windows.record_size(endpoint, len(response.content))
+
+
+def trend_per_hour(points: List[tuple]) -> Optional[float]:
+    """Least-squares slope of (seconds, value) points, as a fraction of the mean value per hour"""
+    points = [(t, v) for t, v in points if v]
+    if len(points) < 3:
+        return None
+    n = len(points)
+    mean_t = sum(t for t, _ in points) / n
+    mean_v = sum(v for _, v in points) / n
+    spread = sum((t - mean_t) ** 2 for t, _ in points)
+    if not spread or not mean_v:
+        return None
+    slope = sum((t - mean_t) * (v - mean_v) for t, v in points) / spread
+    return slope * 3600 / mean_v
+
+
+class DriftDetector:
+    """Compares a window with the baseline: p95 ratio, error- and 4xx-rate increase and mean response size ratio"""
+
+    def __init__(self, latency_ratio: float = 1.5, error_delta: float = 0.02, size_ratio: float = 1.25,
+                 min_count: int = 20):
+        self.latency_ratio = latency_ratio
+        self.error_delta = error_delta
+        self.size_ratio = size_ratio
+        self.min_count = min_count
+
+    def check(self, baseline: Window, window: Window) -> List[str]:
+        alerts = []
+        pairs = [('all', baseline.total(), window.total())]
+        pairs += [(name, baseline.endpoints[name], stats) for name, stats in sorted(window.endpoints.items())
+                  if name in baseline.endpoints]
+        for name, base, now in pairs:
+            if min(base.requests, now.requests) < self.min_count:
+                continue
+            p95_base, p95_now = base.p(95), now.p(95)
+            if p95_base and p95_now > p95_base * self.latency_ratio:
+                alerts.append(f"{name}: p95 {p95_base:.1f} -> {p95_now:.1f} ms (x{p95_now / p95_base:.2f})")
+            if now.error_rate - base.error_rate > self.error_delta:
+                alerts.append(f"{name}: error rate {base.error_rate * 100:.1f}% -> {now.error_rate * 100:.1f}%")
+            if now.rejected_rate - base.rejected_rate > self.error_delta:
+                alerts.append(f"{name}: 4xx rate {base.rejected_rate * 100:.1f}% -> {now.rejected_rate * 100:.1f}%")
+            if base.mean_size and now.mean_size > base.mean_size * self.size_ratio:
+                alerts.append(f"{name}: response size {base.mean_size / 1024:.1f} -> "
+                              f"{now.mean_size / 1024:.1f} KB (x{now.mean_size / base.mean_size:.2f})")
+        return alerts
+
+
+class SoakRunner:
+    """Repeats a tester's task graph until the deadline, printing a snapshot as each window closes"""
+
+    def __init__(self, tester, windows: RollingWindows, detector: DriftDetector, workers: int = 8,
+                 pause: float = 1.0, snapshot_file: Optional[str] = None, out=None):
+        self.tester = tester
+        self.windows = windows
+        self.detector = detector
+        self.workers = workers
+        self.pause = pause
+        self.snapshot_file = snapshot_file
+        self.out = out or sys.stdout
+        self.monitor = SoakMonitor(windows)
+        self.failures: Counter = Counter()
+        self.alerts = 0
+        self.iterations = 0
+        self._stop = threading.Event()
+        tester.session.recorder = self.monitor
+        tester.session.hooks['response'].append(self.monitor.response_hook)
+
+    def iterate(self):
+        """One pass over the scenarios with their per-check output discarded"""
+        with open(os.devnull, 'w') as devnull, contextlib.redirect_stdout(devnull):
+            if self.tester.test_health_check():
+                ConcurrentRunner(self.tester, max_workers=self.workers).run(self.tester.build_task_graph())
+        results = self.tester.test_results
+        failed = [r['test'] for r in results if not r['passed']]
+        self.failures.update(failed)
+        self.windows.record_iteration(len(results), len(failed))
+        results.clear()
+        self.tester.warnings.clear()
+        self.iterations += 1
+
+    def snapshot(self, window: Window):
+        total = window.total()
+        rps = total.requests / self.windows.window_seconds
+        at = datetime.fromtimestamp(window.started + self.windows.window_seconds).strftime('%H:%M:%S')
+        color = Colors.RED if window.failed else Colors.GREEN
+        print(f"[{at}] #{window.index:<4} iters {window.iterations:>4}  reqs {total.requests:>6} ({rps:>6.1f}/s)  "
+              f"p50 {total.p(50):>7.1f}  p95 {total.p(95):>7.1f}  p99 {total.p(99):>7.1f} ms  "
+              f"err {total.error_rate * 100:>5.1f}%  4xx {total.rejected_rate * 100:>5.1f}%  size {total.mean_size / 1024:>6.1f} KB  "
+              f"{color}{window.failed}/{window.checks} checks failed{Colors.RESET}", file=self.out)
+
+        ring = list(self.windows.ring)
+        p95_trend = trend_per_hour([(w.started, w.total().p(95)) for w in ring])
+        size_trend = trend_per_hour([(w.started, w.total().mean_size) for w in ring])
+        if p95_trend is not None and size_trend is not None:
+            print(f"           trend over last {len(ring)} windows: p95 {p95_trend * 100:+.0f}%/h, "
+                  f"size {size_trend * 100:+.0f}%/h", file=self.out)
+
+        alerts = self.detector.check(self.windows.baseline, window) if self.windows.baseline_ready else []
+        for alert in alerts:
+            print(f"           {Colors.YELLOW}drift: {alert}{Colors.RESET}", file=self.out)
+        self.alerts += len(alerts)
+        self.out.flush()
+
+        if self.snapshot_file:
+            with open(self.snapshot_file, 'a', encoding='utf-8') as f:
+                f.write(json.dumps({
+                    'window': window.index, 'end': window.started + self.windows.window_seconds,
+                    'iterations': window.iterations, 'requests': total.requests,
+                    'p50_ms': total.p(50), 'p95_ms': total.p(95), 'p99_ms': total.p(99),
+                    'error_rate': total.error_rate, 'rejected_rate': total.rejected_rate, 'mean_size': total.mean_size,
+                    'checks': window.checks, 'failed': window.failed,
+                    'p95_trend_per_hour': p95_trend, 'size_trend_per_hour': size_trend, 'drift': alerts,
+                }) + '\n')
+
+    def _snapshots(self):
+        while True:
+            next_close = self.windows.started + (self.windows.current.index + 1) * self.windows.window_seconds
+            stopping = self._stop.wait(max(0.0, next_close - time.time()) + 0.01)
+            for window in self.windows.advance():
+                self.snapshot(window)
+            if stopping:
+                return
+
+    def run(self, duration: float):
+        reporter = threading.Thread(target=self._snapshots, daemon=True)
+        reporter.start()
+        deadline = time.time() + duration
+        try:
+            while time.time() < deadline:
+                self.iterate()
+                self._stop.wait(min(self.pause, max(0.0, deadline - time.time())))
+        except KeyboardInterrupt:
+            print(f"\n{Colors.YELLOW}Interrupted; writing the final report{Colors.RESET}", file=self.out)
+        finally:
+            self._stop.set()
+            reporter.join()
+
+
+def print_report(runner: SoakRunner, wall_time: float):
+    print(f"\n{Colors.BLUE}{'='*100}{Colors.RESET}")
+    print(f"{Colors.BOLD}Soak summary: {runner.iterations} iterations in {wall_time / 3600:.2f} h{Colors.RESET}")
+    print(f"{Colors.BLUE}{'='*100}{Colors.RESET}\n")
+    for line in runner.monitor.lifetime.report_lines(wall_time):
+        print(line)
+
+    windows = runner.windows
+    if windows.baseline_ready and windows.ring:
+        last = windows.ring[-1]
+        print(f"\n{Colors.BOLD}Baseline (first {windows.baselined} windows) vs last window{Colors.RESET}")
+        print(f"{'Endpoint':<34}{'p95 base':>10}{'p95 last':>10}{'err base':>10}{'err last':>10}"
+              f"{'4xx base':>10}{'4xx last':>10}{'KB base':>9}{'KB last':>9}")
+        for name, now in sorted(last.endpoints.items()):
+            base = windows.baseline.endpoints.get(name)
+            if base is None:
+                continue
+            print(f"{name[:33]:<34}{base.p(95):>10.1f}{now.p(95):>10.1f}{base.error_rate * 100:>9.1f}%"
+                  f"{now.error_rate * 100:>9.1f}%{base.rejected_rate * 100:>9.1f}%{now.rejected_rate * 100:>9.1f}%"
+                  f"{base.mean_size / 1024:>9.1f}{now.mean_size / 1024:>9.1f}")
+
+    if runner.failures:
+        print(f"\n{Colors.RED}Failing checks (times failed):{Colors.RESET}")
+        for name, count in runner.failures.most_common(20):
+            print(f"  {count:>6}  {name}")
+    if runner.alerts:
+        print(f"\n{Colors.YELLOW}{runner.alerts} drift alert(s) raised{Colors.RESET}\n")
+    else:
+        print(f"\n{Colors.GREEN}✓ No drift detected{Colors.RESET}\n")
+
+
+def main():
+    """Main function"""
+    parser = argparse.ArgumentParser(description="LeoConnect soak test")
+    parser.add_argument('--base-url', default="https://leoconnect.rexosphere.com")
+    parser.add_argument('--token', help="Bearer token (runs the detailed suite's authenticated checks)")
+    parser.add_argument('--suite', choices=('basic', 'detailed'), default='detailed')
+    parser.add_argument('--duration', type=float, default=3600, help="Soak length in seconds")
+    parser.add_argument('--workers', type=int, default=8, help="Concurrent sections per iteration")
+    parser.add_argument('--pause', type=float, default=1.0, help="Seconds between iterations")
+    parser.add_argument('--window', type=float, default=60, help="Snapshot window in seconds")
+    parser.add_argument('--keep-windows', type=int, default=60, help="Windows kept for trend estimates")
+    parser.add_argument('--baseline-windows', type=int, default=3, help="Leading windows that form the baseline")
+    parser.add_argument('--latency-ratio', type=float, default=1.5, help="p95 growth that counts as drift")
+    parser.add_argument('--error-delta', type=float, default=0.02,
+                        help="Error- or 4xx-rate increase that counts as drift")
+    parser.add_argument('--size-ratio', type=float, default=1.25, help="Response-size growth that counts as drift")
+    parser.add_argument('--min-count', type=int, default=20, help="Samples needed before an endpoint is judged")
+    parser.add_argument('--snapshot-file', help="Also append each snapshot as a JSON line")
+    add_pool_arguments(parser)
+    add_live_arguments(parser)
+    add_history_arguments(parser)
+    add_stand_in_arguments(parser)
+    args = parser.parse_args()
+    configure_pool_from_args(args, default_maxsize=args.workers)
+    start_stand_in(args)
+    live = live_from_args(args, f'soak:{args.suite}')
+
+    if args.suite == 'basic':
+        tester = LeoConnectAPITester(base_url=args.base_url)
+    else:
+        tester = LeoConnectDetailedTester(base_url=args.base_url, token=args.token)
+    windows = RollingWindows(args.window, args.keep_windows, args.baseline_windows)
+    detector = DriftDetector(args.latency_ratio, args.error_delta, args.size_ratio, args.min_count)
+    runner = SoakRunner(tester, windows, detector, workers=args.workers, pause=args.pause,
+                        snapshot_file=args.snapshot_file)
+
+    print(f"\n{Colors.BOLD}LeoConnect Soak Test ({args.suite} suite){Colors.RESET}")
+    print(f"{Colors.BOLD}Base URL: {args.base_url} | {args.duration / 3600:.2f} h, {args.window:g}s windows, "
+          f"baseline = first {args.baseline_windows}{Colors.RESET}")
+    print(f"{Colors.BOLD}Started at: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}{Colors.RESET}\n")
+
+    started = time.perf_counter()
+    with live_view(live):
+        # Snapshots land in the dashboard's output pane while it is showing
+        runner.out = sys.stdout
+        runner.run(args.duration)
+    wall_time = time.perf_counter() - started
+    print_report(runner, wall_time)
+    save_from_args(args, f'soak:{args.suite}', runner.monitor.lifetime, wall_time,
+                   extra={'iterations': runner.iterations, 'drift_alerts': runner.alerts})
+    if runner.alerts:
+        raise SystemExit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,1239 @@
+#!/usr/bin/env python3
+"""
+LeoConnect Stand-in Backend
+In-memory implementation of every route KtorRemoteDataSource and NotificationService call,
+for reproducible offline testing and benchmarking
+"""
+
+import argparse
+import base64
+import contextlib
+import hashlib
+import itertools
+import json
+import math
+import random
+import re
+import threading
+import time
+import zlib
+from collections import OrderedDict
+from datetime import datetime, timedelta, timezone
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Callable, Dict, List, Optional, Tuple
+from urllib.parse import parse_qs, urlsplit
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+
+DISTRICTS = ["306 A1", "306 A2", "306 B1", "306 B2", "306 C1", "306 C2"]
+CLUB_TOWNS = ["Colombo", "Kandy", "Galle", "Jaffna", "Negombo", "Matara", "Kurunegala",
+              "Anuradhapura", "Ratnapura", "Badulla", "Trincomalee", "Batticaloa"]
+FIRST_NAMES = ["Amaya", "Kasun", "Nimali", "Tharindu", "Dilini", "Ravindu", "Sachini",
+               "Chamod", "Ishara", "Nuwan", "Hiruni", "Pasindu", "Sanduni", "Dinuka"]
+LAST_NAMES = ["Perera", "Fernando", "Silva", "Jayasinghe", "Wickramasinghe", "Bandara",
+              "Rajapaksa", "Gunawardena", "Herath", "Dissanayake"]
+TOPICS = ["beach cleanup", "blood donation camp", "tree planting", "book drive",
+          "mentoring session", "health clinic", "charity walk", "leadership workshop"]
+POPULAR_UID = 'popular'
+
+# Read-mostly public routes the stand-in lets clients cache for --cache-max-age seconds
+CACHEABLE_PATHS = ('/districts', '/clubs')
+
+
+class ApiError(Exception):
+    """Raised by route handlers to send an error response"""
+
+    def __init__(self, status: int, message: str):
+        super().__init__(message)
+        self.status = status
+        self.message = message
+
+
+def _now() -> str:
+    return datetime.now(timezone.utc).isoformat(timespec='milliseconds').replace('+00:00', 'Z')
+
+
+def uid_for_token(token: str) -> str:
+    """Stand-in tokens are 'test-token-<uid>[@<expiry>]'; any other bearer string maps to a stable uid"""
+    if token.startswith('test-token-'):
+        return token[len('test-token-'):].partition('@')[0]
+    return 'u-' + hashlib.sha1(token.encode()).hexdigest()[:12]
+
+
+def token_expiry(token: str) -> Optional[float]:
+    """Unix time a stand-in token stops being accepted, or None if it never expires"""
+    if not token.startswith('test-token-'):
+        return None
+    _, _, expiry = token.partition('@')
+    try:
+        return float(expiry) if expiry else None
+    except ValueError:
+        return None
+
+
+def issue_test_token(uid: str, ttl: float) -> str:
+    """Stand-in ID token for uid, valid for ttl seconds (0 = forever)"""
+    return f"test-token-{uid}@{int(time.time() + ttl)}" if ttl > 0 else f"test-token-{uid}"
+
+
+class LeoStore:
+    """All stand-in state, guarded by one lock"""
+
+    def __init__(self, payload_bytes: int = 0, seed: int = 0):
+        self.lock = threading.RLock()
+        self.payload_bytes = payload_bytes
+        self.rng = random.Random(seed)
+        self._ids = {}
+        self.districts: List[str] = []
+        self.clubs: Dict[str, Dict[str, Any]] = {}
+        self.club_followers: Dict[str, Dict[str, None]] = {}
+        self.users: Dict[str, Dict[str, Any]] = {}
+        self.followers: Dict[str, Dict[str, None]] = {}
+        self.following: Dict[str, Dict[str, None]] = {}
+        self.following_clubs: Dict[str, Dict[str, None]] = {}
+        self.posts: Dict[str, Dict[str, Any]] = {}
+        self.post_order: List[str] = []
+        self.post_likes: Dict[str, set] = {}
+        self.user_post_counts: Dict[str, int] = {}
+        self.comments: Dict[str, List[Dict[str, Any]]] = {}
+        self.comment_likes: Dict[str, set] = {}
+        self.comment_index: Dict[str, Dict[str, Any]] = {}
+        self.messages: Dict[Tuple[str, str], List[Dict[str, Any]]] = {}
+        self.message_index: Dict[str, Tuple[str, str]] = {}
+        self.events: Dict[str, Dict[str, Any]] = {}
+        self.event_order: List[str] = []
+        self.rsvps: Dict[str, Dict[str, Dict[str, Any]]] = {}
+        self.notifications: Dict[str, List[Dict[str, Any]]] = {}
+        self.notification_prefs: Dict[str, Dict[str, bool]] = {}
+        self.device_tokens: Dict[str, set] = {}
+        self.propagation_ms = 0.0
+        self.visible_at: Dict[str, float] = {}
+
+    def next_id(self, kind: str) -> str:
+        self._ids[kind] = self._ids.get(kind, 0) + 1
+        return f"{kind}-{self._ids[kind]:06d}"
+
+    def delay_listing(self, item_id: str):
+        """With propagation_ms set, keep a new item out of listings for a random 0..propagation_ms"""
+        if self.propagation_ms > 0:
+            self.visible_at[item_id] = time.monotonic() + self.rng.uniform(0, self.propagation_ms) / 1000
+
+    def listed(self, item_id: str) -> bool:
+        visible_at = self.visible_at.get(item_id)
+        if visible_at is None:
+            return True
+        if time.monotonic() < visible_at:
+            return False
+        del self.visible_at[item_id]
+        return True
+
+    def image_payload(self) -> List[str]:
+        """Base64 image stand-in of roughly payload_bytes, like Base64Image renders"""
+        if self.payload_bytes <= 0:
+            return []
+        raw = self.rng.randbytes(self.payload_bytes * 3 // 4)
+        return [base64.b64encode(raw).decode()]
+
+    # ---- seeding -------------------------------------------------------
+
+    def seed(self, districts: int = 6, clubs_per_district: int = 5, users: int = 50,
+             posts: int = 200, comments_per_post: int = 2, events: int = 10,
+             popular_followers: int = 0):
+        """
+        Deterministic initial data set.
+
+        popular_followers > 0 adds a 'popular' account with that many followers,
+        following every other one back and following every club, for deep paging.
+        """
+        with self.lock:
+            for i in range(districts):
+                self.districts.append(DISTRICTS[i] if i < len(DISTRICTS) else f"306 X{i}")
+            for district in self.districts:
+                for _ in range(clubs_per_district):
+                    self.add_club(f"Leo Club of {self.rng.choice(CLUB_TOWNS)} {self.rng.choice(['North', 'South', 'City', 'Central'])}",
+                                  district)
+            uids = [self.ensure_user(f"seed-{i:04d}")['uid'] for i in range(users)]
+            club_ids = list(self.clubs)
+            for uid in uids:
+                for other in self.rng.sample(uids, min(len(uids), 5)):
+                    if other != uid:
+                        self.follow_user(uid, other)
+                for club_id in self.rng.sample(club_ids, min(len(club_ids), 3)):
+                    self.follow_club(uid, club_id)
+            for _ in range(posts):
+                club_id = self.rng.choice(club_ids) if club_ids else None
+                post = self.create_post(self.rng.choice(uids), f"Our {self.rng.choice(TOPICS)} was a success!",
+                                        club_id, None, images=self.image_payload())
+                for _ in range(comments_per_post):
+                    self.add_comment(post['postId'], self.rng.choice(uids), "Great work, Leos!")
+            for _ in range(events):
+                self.create_event(self.rng.choice(uids), f"District {self.rng.choice(TOPICS)}",
+                                  "Join us!", (datetime.now(timezone.utc) + timedelta(days=self.rng.randint(1, 60))).isoformat(),
+                                  self.rng.choice(club_ids) if club_ids else None)
+            if popular_followers:
+                self.ensure_user(POPULAR_UID)
+                for i in range(popular_followers):
+                    fan = self.ensure_user(f"fan-{i:07d}")['uid']
+                    self.follow_user(fan, POPULAR_UID)
+                    if i % 2 == 0:
+                        self.follow_user(POPULAR_UID, fan)
+                for club_id in club_ids:
+                    self.follow_club(POPULAR_UID, club_id)
+
+    def add_club(self, name: str, district: str) -> Dict[str, Any]:
+        with self.lock:
+            club_id = self.next_id('club')
+            club = {
+                'clubId': club_id, 'name': name, 'district': district,
+                'districtId': district.replace(' ', '-').lower(),
+                'description': f"{name} serving {district}", 'logoUrl': None, 'coverImageUrl': None,
+                'membersCount': 0, 'followersCount': 0, 'postsCount': 0, 'isOfficial': True,
+                'address': None, 'email': None, 'phone': None, 'socialLinks': None,
+            }
+            self.clubs[club_id] = club
+            self.club_followers[club_id] = {}
+            if district not in self.districts:
+                self.districts.append(district)
+            return club
+
+    def ensure_user(self, uid: str) -> Dict[str, Any]:
+        with self.lock:
+            user = self.users.get(uid)
+            if user is None:
+                rng = random.Random(uid)
+                name = f"{rng.choice(FIRST_NAMES)} {rng.choice(LAST_NAMES)}"
+                user = {
+                    'uid': uid, 'email': f"{uid}@leoconnect.test", 'displayName': name,
+                    'photoURL': None, 'leoId': None, 'bio': None, 'isWebmaster': False,
+                    'isVerified': False, 'assignedClubId': None, 'onboardingCompleted': False,
+                    'publicKey': None,
+                }
+                self.users[uid] = user
+                self.followers[uid] = {}
+                self.following[uid] = {}
+                self.following_clubs[uid] = {}
+                self.notifications[uid] = []
+            return user
+
+    # ---- rendering -----------------------------------------------------
+
+    def render_user(self, uid: str, viewer: Optional[str]) -> Dict[str, Any]:
+        user = dict(self.users[uid])
+        user.update({
+            'followingClubs': list(self.following_clubs[uid]),
+            'postsCount': self.user_post_counts.get(uid, 0),
+            'followersCount': len(self.followers[uid]),
+            'followingCount': len(self.following[uid]),
+            'isFollowing': viewer is not None and viewer in self.followers[uid],
+            'isMutualFollow': viewer is not None and viewer in self.followers[uid] and viewer in self.following[uid],
+        })
+        return user
+
+    def render_follower(self, uid: str, viewer: Optional[str]) -> Dict[str, Any]:
+        user = self.users[uid]
+        return {
+            'uid': uid, 'displayName': user['displayName'], 'photoURL': user['photoURL'],
+            'leoId': user['leoId'],
+            'isFollowing': viewer is not None and viewer in self.followers[uid],
+            'isMutualFollow': viewer is not None and viewer in self.followers[uid] and viewer in self.following[uid],
+        }
+
+    def render_club(self, club_id: str, viewer: Optional[str]) -> Dict[str, Any]:
+        club = dict(self.clubs[club_id])
+        club['followersCount'] = len(self.club_followers[club_id])
+        club['isFollowing'] = viewer is not None and viewer in self.club_followers[club_id]
+        return club
+
+    def render_post(self, post_id: str, viewer: Optional[str]) -> Dict[str, Any]:
+        post = dict(self.posts[post_id])
+        post['likesCount'] = len(self.post_likes[post_id])
+        post['commentsCount'] = len(self.comments[post_id])
+        post['isLikedByUser'] = viewer is not None and viewer in self.post_likes[post_id]
+        return post
+
+    def render_comment(self, comment: Dict[str, Any], viewer: Optional[str]) -> Dict[str, Any]:
+        rendered = dict(comment)
+        likes = self.comment_likes[comment['commentId']]
+        rendered['likesCount'] = len(likes)
+        rendered['isLikedByUser'] = viewer is not None and viewer in likes
+        return rendered
+
+    def render_event(self, event_id: str, viewer: Optional[str]) -> Dict[str, Any]:
+        event = dict(self.events[event_id])
+        participants = self.rsvps[event_id]
+        event['rsvpCount'] = len(participants)
+        event['hasRSVPd'] = viewer is not None and viewer in participants
+        event['rsvpParticipants'] = list(participants.values())
+        return event
+
+    # ---- mutations -----------------------------------------------------
+
+    def notify(self, uid: str, kind: str, title: str, body: str, data: Optional[Dict[str, str]] = None):
+        if uid not in self.notifications:
+            return
+        self.notifications[uid].append({
+            'id': self.next_id('notif'), 'type': kind, 'title': title, 'body': body,
+            'data': data, 'isRead': False, 'createdAt': _now(),
+        })
+
+    def create_post(self, uid: str, content: str, club_id: Optional[str], club_name: Optional[str],
+                    images: Optional[List[str]] = None) -> Dict[str, Any]:
+        with self.lock:
+            author = self.ensure_user(uid)
+            club = self.clubs.get(club_id) if club_id else None
+            post_id = self.next_id('post')
+            timestamp = _now()
+            self.posts[post_id] = {
+                'postId': post_id, 'clubId': club_id or '',
+                'clubName': club_name or (club['name'] if club else ''),
+                'authorId': uid, 'authorName': author['displayName'], 'authorLogo': author['photoURL'],
+                'content': content, 'imageUrl': None, 'images': images or [],
+                'sharesCount': 0, 'isPinned': False, 'createdAt': timestamp, 'updatedAt': timestamp,
+            }
+            self.post_order.append(post_id)
+            self.user_post_counts[uid] = self.user_post_counts.get(uid, 0) + 1
+            self.post_likes[post_id] = set()
+            self.comments[post_id] = []
+            self.delay_listing(post_id)
+            if club:
+                club['postsCount'] = (club['postsCount'] or 0) + 1
+            return self.render_post(post_id, uid)
+
+    def delete_post(self, post_id: str):
+        """Undo everything create_post and add_comment set up for the post"""
+        with self.lock:
+            post = self.posts.pop(post_id)
+            self.post_order.remove(post_id)
+            self.user_post_counts[post['authorId']] -= 1
+            self.post_likes.pop(post_id, None)
+            self.visible_at.pop(post_id, None)
+            club = self.clubs.get(post['clubId']) if post['clubId'] else None
+            if club and club['postsCount']:
+                club['postsCount'] -= 1
+            for comment in self.comments.pop(post_id, []):
+                self.comment_likes.pop(comment['commentId'], None)
+                self.comment_index.pop(comment['commentId'], None)
+                self.visible_at.pop(comment['commentId'], None)
+
+    def add_comment(self, post_id: str, uid: str, content: str) -> Dict[str, Any]:
+        with self.lock:
+            if post_id not in self.posts:
+                raise ApiError(404, "Post not found")
+            author = self.ensure_user(uid)
+            comment = {
+                'commentId': self.next_id('comment'), 'postId': post_id, 'userId': uid,
+                'authorName': author['displayName'], 'authorPhotoUrl': author['photoURL'],
+                'content': content, 'createdAt': _now(),
+            }
+            self.comments[post_id].append(comment)
+            self.comment_likes[comment['commentId']] = set()
+            self.comment_index[comment['commentId']] = comment
+            self.delay_listing(comment['commentId'])
+            owner = self.posts[post_id]['authorId']
+            if owner != uid:
+                self.notify(owner, 'comment', 'New comment', f"{author['displayName']} commented on your post",
+                            {'postId': post_id})
+            return self.render_comment(comment, uid)
+
+    def follow_user(self, uid: str, target: str):
+        with self.lock:
+            self.followers[target][uid] = None
+            self.following[uid][target] = None
+
+    def follow_club(self, uid: str, club_id: str):
+        with self.lock:
+            self.club_followers[club_id][uid] = None
+            self.following_clubs[uid][club_id] = None
+
+    def create_event(self, uid: str, name: str, description: str, event_date: str,
+                     club_id: Optional[str], image_url: Optional[str] = None) -> Dict[str, Any]:
+        with self.lock:
+            author = self.ensure_user(uid)
+            club = self.clubs.get(club_id) if club_id else None
+            event_id = self.next_id('event')
+            timestamp = _now()
+            self.events[event_id] = {
+                'eventId': event_id, 'clubId': club_id, 'clubName': club['name'] if club else None,
+                'authorId': uid, 'authorName': author['displayName'], 'name': name,
+                'description': description, 'eventDate': event_date, 'imageUrl': image_url,
+                'createdAt': timestamp, 'updatedAt': timestamp,
+            }
+            self.event_order.append(event_id)
+            self.rsvps[event_id] = {}
+            self.delay_listing(event_id)
+            return self.render_event(event_id, uid)
+
+
+class Route:
+    def __init__(self, method: str, pattern: str, handler: Callable, auth: bool = True):
+        self.method = method
+        self.regex = re.compile('^' + re.sub(r'\{(\w+)\}', r'(?P<\1>[^/]+)', pattern) + '$')
+        self.handler = handler
+        self.auth = auth
+
+
+class Request:
+    """What a route handler sees"""
+
+    def __init__(self, uid: Optional[str], params: Dict[str, str], query: Dict[str, str], body: Any):
+        self.uid = uid
+        self.params = params
+        self.query = query
+        self.body = body if isinstance(body, dict) else {}
+
+    def int_query(self, name: str, default: int, maximum: int = 1000) -> int:
+        try:
+            return max(0, min(maximum, int(self.query.get(name, default))))
+        except ValueError:
+            raise ApiError(400, f"Invalid {name}")
+
+
+class LeoApi:
+    """Route table over a LeoStore"""
+
+    def __init__(self, store: LeoStore, max_replays: int = 100_000, token_ttl: float = 0.0):
+        self.store = store
+        self.token_ttl = token_ttl
+        self.routes: List[Route] = []
+        self.replays: 'OrderedDict[Tuple[Optional[str], str], Tuple[int, Any]]' = OrderedDict()
+        self.max_replays = max_replays
+        r = self._route
+        r('GET', '/', self.health, auth=False)
+        r('POST', '/auth/google', self.auth_google, auth=False)
+        # Stands in for Google Sign-In handing the app a Firebase ID token
+        r('POST', '/test/token', self.issue_token, auth=False)
+        r('GET', '/feed', self.feed)
+        r('GET', '/explore', self.explore, auth=False)
+        r('POST', '/posts', self.create_post)
+        r('GET', '/posts/{postId}', self.get_post, auth=False)
+        r('DELETE', '/posts/{postId}', self.delete_post)
+        r('POST', '/posts/{postId}/like', self.like_post)
+        r('GET', '/posts/{postId}/comments', self.get_comments, auth=False)
+        r('POST', '/posts/{postId}/comments', self.add_comment)
+        r('POST', '/comments/{commentId}/like', self.like_comment)
+        r('GET', '/districts', self.districts, auth=False)
+        r('GET', '/clubs', self.clubs_by_district, auth=False)
+        r('GET', '/clubs/{clubId}/posts', self.club_posts, auth=False)
+        r('POST', '/clubs/{clubId}/follow', self.follow_club)
+        r('DELETE', '/clubs/{clubId}/follow', self.unfollow_club)
+        r('GET', '/users/me', self.get_me)
+        r('PATCH', '/users/me', self.update_me)
+        r('POST', '/users/me/quick-start', self.quick_start)
+        r('PUT', '/users/me/public-key', self.update_public_key)
+        r('GET', '/users/{userId}', self.get_user, auth=False)
+        r('GET', '/users/{userId}/posts', self.user_posts, auth=False)
+        r('POST', '/users/{userId}/follow', self.follow_user)
+        r('DELETE', '/users/{userId}/follow', self.unfollow_user)
+        r('GET', '/users/{userId}/followers', self.user_followers, auth=False)
+        r('GET', '/users/{userId}/following', self.user_following, auth=False)
+        r('GET', '/users/{userId}/following-clubs', self.user_following_clubs, auth=False)
+        r('GET', '/search', self.search, auth=False)
+        r('GET', '/search/users', self.search_users, auth=False)
+        r('GET', '/conversations', self.conversations)
+        r('DELETE', '/conversations/{userId}', self.delete_conversation)
+        r('GET', '/messages/{userId}', self.get_messages)
+        r('POST', '/messages', self.send_message)
+        r('DELETE', '/messages/{messageId}', self.delete_message)
+        r('GET', '/events', self.list_events, auth=False)
+        r('POST', '/events', self.create_event)
+        r('GET', '/events/{eventId}', self.get_event, auth=False)
+        r('PATCH', '/events/{eventId}', self.update_event)
+        r('DELETE', '/events/{eventId}', self.delete_event)
+        r('POST', '/events/{eventId}/rsvp', self.rsvp_event)
+        r('GET', '/notifications', self.list_notifications)
+        r('POST', '/notifications/token', self.register_device)
+        r('DELETE', '/notifications/token', self.unregister_device)
+        r('POST', '/notifications/read-all', self.read_all_notifications)
+        r('GET', '/notifications/preferences', self.get_preferences)
+        r('PATCH', '/notifications/preferences', self.update_preferences)
+        r('PATCH', '/notifications/{notificationId}/read', self.read_notification)
+
+    def _route(self, method: str, pattern: str, handler: Callable, auth: bool = True):
+        self.routes.append(Route(method, pattern, handler, auth))
+
+    def match(self, method: str, path: str) -> Tuple[Optional[Route], Dict[str, str]]:
+        path_matched = False
+        for route in self.routes:
+            found = route.regex.match(path)
+            if found:
+                path_matched = True
+                if route.method == method:
+                    return route, found.groupdict()
+        raise ApiError(405 if path_matched else 404, "Method not allowed" if path_matched else "Not found")
+
+    # ---- helpers -------------------------------------------------------
+
+    def _post(self, post_id: str) -> Dict[str, Any]:
+        if post_id not in self.store.posts:
+            raise ApiError(404, "Post not found")
+        return self.store.posts[post_id]
+
+    def _user(self, uid: str) -> Dict[str, Any]:
+        if uid not in self.store.users:
+            raise ApiError(404, "User not found")
+        return self.store.users[uid]
+
+    def _club(self, club_id: str) -> Dict[str, Any]:
+        if club_id not in self.store.clubs:
+            raise ApiError(404, "Club not found")
+        return self.store.clubs[club_id]
+
+    def _event(self, event_id: str) -> Dict[str, Any]:
+        if event_id not in self.store.events:
+            raise ApiError(404, "Event not found")
+        return self.store.events[event_id]
+
+    def _newest_posts(self, req: Request, keep: Callable[[Dict[str, Any]], bool], limit: int) -> List[Dict[str, Any]]:
+        found = []
+        for post_id in reversed(self.store.post_order):
+            if len(found) >= limit:
+                break
+            if keep(self.store.posts[post_id]) and self.store.listed(post_id):
+                found.append(self.store.render_post(post_id, req.uid))
+        return found
+
+    def _page(self, req: Request, members: Dict[str, None]) -> Tuple[List[str], int, bool]:
+        limit = req.int_query('limit', 50)
+        offset = req.int_query('offset', 0, maximum=10 ** 9)
+        # Walks from the start like a SQL OFFSET scan
+        page = list(itertools.islice(members, offset, offset + limit))
+        return page, len(members), offset + len(page) < len(members)
+
+    # ---- routes --------------------------------------------------------
+
+    def health(self, req: Request):
+        return 200, {'status': 'ok', 'service': 'LeoConnect stand-in'}
+
+    def auth_google(self, req: Request):
+        token = req.body.get('idToken')
+        if req.uid is None and not token:
+            raise ApiError(401, "Missing ID token")
+        uid = req.uid or uid_for_token(token)
+        return 200, self.store.render_user(self.store.ensure_user(uid)['uid'], uid)
+
+    def issue_token(self, req: Request):
+        uid = req.body.get('uid')
+        if not uid or not re.fullmatch(r'[\w-]+', str(uid)):
+            raise ApiError(400, "uid is required")
+        return 200, {'idToken': issue_test_token(uid, self.token_ttl), 'expiresIn': int(self.token_ttl)}
+
+    def feed(self, req: Request):
+        limit = req.int_query('limit', 20)
+        following = self.store.following[req.uid]
+        clubs = self.store.following_clubs[req.uid]
+        posts = self._newest_posts(
+            req, lambda p: p['authorId'] == req.uid or p['authorId'] in following or p['clubId'] in clubs, limit)
+        if not posts:
+            posts = self._newest_posts(req, lambda p: True, limit)
+        return 200, posts
+
+    def explore(self, req: Request):
+        return 200, self._newest_posts(req, lambda p: True, req.int_query('limit', 20))
+
+    def create_post(self, req: Request):
+        content = req.body.get('content')
+        if not content:
+            raise ApiError(400, "Content is required")
+        images = [item.get('imageBytes', '') for item in req.body.get('imagesList') or [] if isinstance(item, dict)]
+        return 201, self.store.create_post(req.uid, content, req.body.get('clubId'), req.body.get('clubName'), images)
+
+    def get_post(self, req: Request):
+        return 200, self.store.render_post(self._post(req.params['postId'])['postId'], req.uid)
+
+    def delete_post(self, req: Request):
+        post = self._post(req.params['postId'])
+        if post['authorId'] != req.uid:
+            raise ApiError(403, "Not your post")
+        self.store.delete_post(post['postId'])
+        return 200, {'success': True}
+
+    def like_post(self, req: Request):
+        post = self._post(req.params['postId'])
+        likes = self.store.post_likes[post['postId']]
+        if req.uid in likes:
+            likes.discard(req.uid)
+        else:
+            likes.add(req.uid)
+            if post['authorId'] != req.uid:
+                self.store.notify(post['authorId'], 'like', 'New like', "Someone liked your post",
+                                  {'postId': post['postId']})
+        return 200, {'isLikedByUser': req.uid in likes, 'likesCount': len(likes)}
+
+    def get_comments(self, req: Request):
+        self._post(req.params['postId'])
+        comments = [c for c in self.store.comments[req.params['postId']] if self.store.listed(c['commentId'])]
+        limit = req.int_query('limit', 50)
+        offset = req.int_query('offset', 0, maximum=10 ** 9)
+        page = comments[offset:offset + limit]
+        return 200, {'comments': [self.store.render_comment(c, req.uid) for c in page],
+                     'total': len(comments), 'hasMore': offset + len(page) < len(comments)}
+
+    def add_comment(self, req: Request):
+        content = req.body.get('content')
+        if not content:
+            raise ApiError(400, "Content is required")
+        return 201, {'comment': self.store.add_comment(req.params['postId'], req.uid, content)}
+
+    def like_comment(self, req: Request):
+        comment_id = req.params['commentId']
+        if comment_id not in self.store.comment_likes:
+            raise ApiError(404, "Comment not found")
+        likes = self.store.comment_likes[comment_id]
+        if req.uid in likes:
+            likes.discard(req.uid)
+        else:
+            likes.add(req.uid)
+        return 200, {'isLikedByUser': req.uid in likes, 'likesCount': len(likes)}
+
+    def districts(self, req: Request):
+        return 200, list(self.store.districts)
+
+    def clubs_by_district(self, req: Request):
+        district = req.query.get('district')
+        return 200, [self.store.render_club(club_id, req.uid) for club_id, club in self.store.clubs.items()
+                     if district is None or club['district'] == district]
+
+    def club_posts(self, req: Request):
+        club_id = self._club(req.params['clubId'])['clubId']
+        return 200, self._newest_posts(req, lambda p: p['clubId'] == club_id, req.int_query('limit', 50))
+
+    def follow_club(self, req: Request):
+        club_id = self._club(req.params['clubId'])['clubId']
+        self.store.follow_club(req.uid, club_id)
+        return 200, {'isFollowing': True, 'followersCount': len(self.store.club_followers[club_id])}
+
+    def unfollow_club(self, req: Request):
+        club_id = self._club(req.params['clubId'])['clubId']
+        self.store.club_followers[club_id].pop(req.uid, None)
+        self.store.following_clubs[req.uid].pop(club_id, None)
+        return 200, {'isFollowing': False, 'followersCount': len(self.store.club_followers[club_id])}
+
+    def get_me(self, req: Request):
+        uid = req.query.get('uid') or req.uid
+        self._user(uid)
+        return 200, self.store.render_user(uid, req.uid)
+
+    def update_me(self, req: Request):
+        user = self.store.users[req.uid]
+        for field in ('displayName', 'leoId', 'assignedClubId', 'bio'):
+            if field in req.body:
+                user[field] = req.body[field]
+        if req.body.get('photoBytes'):
+            user['photoURL'] = f"https://stand-in.leoconnect.test/photos/{req.uid}.jpg"
+        return 200, self.store.render_user(req.uid, req.uid)
+
+    def quick_start(self, req: Request):
+        user = self.store.users[req.uid]
+        for field in ('leoId', 'assignedClubId'):
+            if field in req.body:
+                user[field] = req.body[field]
+        user['onboardingCompleted'] = True
+        return 200, self.store.render_user(req.uid, req.uid)
+
+    def update_public_key(self, req: Request):
+        key = req.body.get('publicKey')
+        if not key:
+            raise ApiError(400, "publicKey is required")
+        user = self.store.users[req.uid]
+        if user['publicKey'] and user['publicKey'] != key and not req.body.get('force'):
+            raise ApiError(409, "Public key already set")
+        user['publicKey'] = key
+        return 200, self.store.render_user(req.uid, req.uid)
+
+    def get_user(self, req: Request):
+        uid = self._user(req.params['userId'])['uid']
+        return 200, self.store.render_user(uid, req.uid)
+
+    def user_posts(self, req: Request):
+        uid = self._user(req.params['userId'])['uid']
+        return 200, self._newest_posts(req, lambda p: p['authorId'] == uid, req.int_query('limit', 50))
+
+    def follow_user(self, req: Request):
+        target = self._user(req.params['userId'])['uid']
+        if target == req.uid:
+            raise ApiError(400, "Cannot follow yourself")
+        self.store.follow_user(req.uid, target)
+        self.store.notify(target, 'follow', 'New follower', "Someone followed you", {'userId': req.uid})
+        return 200, {'isFollowing': True, 'followersCount': len(self.store.followers[target])}
+
+    def unfollow_user(self, req: Request):
+        target = self._user(req.params['userId'])['uid']
+        self.store.followers[target].pop(req.uid, None)
+        self.store.following[req.uid].pop(target, None)
+        return 200, {'isFollowing': False, 'followersCount': len(self.store.followers[target])}
+
+    def user_followers(self, req: Request):
+        uid = self._user(req.params['userId'])['uid']
+        page, total, has_more = self._page(req, self.store.followers[uid])
+        return 200, {'followers': [self.store.render_follower(u, req.uid) for u in page],
+                     'total': total, 'hasMore': has_more}
+
+    def user_following(self, req: Request):
+        uid = self._user(req.params['userId'])['uid']
+        page, total, has_more = self._page(req, self.store.following[uid])
+        return 200, {'following': [self.store.render_follower(u, req.uid) for u in page],
+                     'total': total, 'hasMore': has_more}
+
+    def user_following_clubs(self, req: Request):
+        uid = self._user(req.params['userId'])['uid']
+        page, total, has_more = self._page(req, self.store.following_clubs[uid])
+        return 200, {'clubs': [self.store.render_club(c, req.uid) for c in page],
+                     'total': total, 'hasMore': has_more}
+
+    def search(self, req: Request):
+        q = req.query.get('q', '').strip().lower()
+        if not q:
+            return 200, {'clubs': [], 'districts': [], 'posts': []}
+        clubs = [self.store.render_club(c, req.uid) for c, club in self.store.clubs.items()
+                 if q in club['name'].lower()][:20]
+        districts = [d for d in self.store.districts if q in d.lower()]
+        posts = self._newest_posts(req, lambda p: q in p['content'].lower(), 20)
+        return 200, {'clubs': clubs, 'districts': districts, 'posts': posts}
+
+    def search_users(self, req: Request):
+        q = req.query.get('q', '').strip().lower()
+        if not q:
+            return 200, []
+        return 200, [{'userId': u['uid'], 'displayName': u['displayName'], 'photoUrl': u['photoURL']}
+                     for u in self.store.users.values() if q in u['displayName'].lower()][:20]
+
+    @staticmethod
+    def _conversation_key(a: str, b: str) -> Tuple[str, str]:
+        return (a, b) if a < b else (b, a)
+
+    def conversations(self, req: Request):
+        result = []
+        for (a, b), thread in self.store.messages.items():
+            if req.uid not in (a, b) or not thread:
+                continue
+            other = b if a == req.uid else a
+            user = self.store.users[other]
+            last = thread[-1]
+            result.append({
+                'userId': other, 'displayName': user['displayName'], 'photoUrl': user['photoURL'],
+                'publicKey': user['publicKey'], 'lastMessage': last['content'],
+                'lastMessageAt': last['createdAt'],
+                'unreadCount': sum(1 for m in thread if m['receiverId'] == req.uid and not m['isRead']),
+            })
+        result.sort(key=lambda c: c['lastMessageAt'], reverse=True)
+        return 200, result
+
+    def delete_conversation(self, req: Request):
+        key = self._conversation_key(req.uid, req.params['userId'])
+        for message in self.store.messages.pop(key, []):
+            self.store.message_index.pop(message['id'], None)
+        return 200, {'success': True}
+
+    def get_messages(self, req: Request):
+        thread = self.store.messages.get(self._conversation_key(req.uid, req.params['userId']), [])
+        for message in thread:
+            if message['receiverId'] == req.uid:
+                message['isRead'] = True
+        return 200, [dict(m) for m in thread]
+
+    def send_message(self, req: Request):
+        receiver = req.body.get('receiverId')
+        content = req.body.get('content')
+        if not receiver or not content:
+            raise ApiError(400, "receiverId and content are required")
+        self._user(receiver)
+        message = {'id': self.store.next_id('msg'), 'senderId': req.uid, 'receiverId': receiver,
+                   'content': content, 'isRead': False, 'createdAt': _now()}
+        key = self._conversation_key(req.uid, receiver)
+        self.store.messages.setdefault(key, []).append(message)
+        self.store.message_index[message['id']] = key
+        self.store.notify(receiver, 'message', 'New message', "You have a new message", {'userId': req.uid})
+        return 201, dict(message)
+
+    def delete_message(self, req: Request):
+        key = self.store.message_index.get(req.params['messageId'])
+        if key is None:
+            raise ApiError(404, "Message not found")
+        thread = self.store.messages[key]
+        message = next(m for m in thread if m['id'] == req.params['messageId'])
+        if message['senderId'] != req.uid:
+            raise ApiError(403, "Not your message")
+        thread.remove(message)
+        self.store.message_index.pop(message['id'])
+        return 200, {'success': True}
+
+    def list_events(self, req: Request):
+        limit = req.int_query('limit', 20)
+        club_id = req.query.get('clubId')
+        found = []
+        for event_id in reversed(self.store.event_order):
+            if len(found) >= limit:
+                break
+            if (club_id is None or self.store.events[event_id]['clubId'] == club_id) and self.store.listed(event_id):
+                found.append(self.store.render_event(event_id, req.uid))
+        return 200, found
+
+    def create_event(self, req: Request):
+        for field in ('name', 'description', 'eventDate'):
+            if not req.body.get(field):
+                raise ApiError(400, f"{field} is required")
+        image_url = "https://stand-in.leoconnect.test/events/image.jpg" if req.body.get('imageBytes') else None
+        return 201, self.store.create_event(req.uid, req.body['name'], req.body['description'],
+                                            req.body['eventDate'], req.body.get('clubId'), image_url)
+
+    def get_event(self, req: Request):
+        return 200, self.store.render_event(self._event(req.params['eventId'])['eventId'], req.uid)
+
+    def update_event(self, req: Request):
+        event = self._event(req.params['eventId'])
+        if event['authorId'] != req.uid:
+            raise ApiError(403, "Not your event")
+        for field in ('name', 'description', 'eventDate'):
+            if field in req.body:
+                event[field] = req.body[field]
+        event['updatedAt'] = _now()
+        return 200, self.store.render_event(event['eventId'], req.uid)
+
+    def delete_event(self, req: Request):
+        event = self._event(req.params['eventId'])
+        if event['authorId'] != req.uid:
+            raise ApiError(403, "Not your event")
+        self.store.events.pop(event['eventId'])
+        self.store.event_order.remove(event['eventId'])
+        self.store.rsvps.pop(event['eventId'])
+        return 200, {'success': True}
+
+    def rsvp_event(self, req: Request):
+        event_id = self._event(req.params['eventId'])['eventId']
+        participants = self.store.rsvps[event_id]
+        if req.uid in participants:
+            participants.pop(req.uid)
+            message = "RSVP cancelled"
+        else:
+            user = self.store.users[req.uid]
+            participants[req.uid] = {'uid': req.uid, 'displayName': user['displayName'],
+                                     'photoUrl': user['photoURL']}
+            message = "RSVP confirmed"
+        return 200, {'message': message, 'rsvpCount': len(participants), 'hasRSVPd': req.uid in participants}
+
+    def list_notifications(self, req: Request):
+        items = list(reversed(self.store.notifications[req.uid]))
+        if req.query.get('unreadOnly', 'false').lower() == 'true':
+            items = [n for n in items if not n['isRead']]
+        limit = req.int_query('limit', 20)
+        offset = req.int_query('offset', 0, maximum=10 ** 9)
+        page = items[offset:offset + limit]
+        return 200, {'notifications': [dict(n) for n in page], 'total': len(items),
+                     'hasMore': offset + len(page) < len(items)}
+
+    def register_device(self, req: Request):
+        if not req.body.get('token'):
+            raise ApiError(400, "token is required")
+        self.store.device_tokens.setdefault(req.uid, set()).add(req.body['token'])
+        return 200, {'success': True, 'message': "Token registered"}
+
+    def unregister_device(self, req: Request):
+        self.store.device_tokens.get(req.uid, set()).discard(req.body.get('token'))
+        return 200, {'success': True, 'message': "Token removed"}
+
+    def read_notification(self, req: Request):
+        for notification in self.store.notifications[req.uid]:
+            if notification['id'] == req.params['notificationId']:
+                notification['isRead'] = True
+                return 200, {'success': True}
+        raise ApiError(404, "Notification not found")
+
+    def read_all_notifications(self, req: Request):
+        for notification in self.store.notifications[req.uid]:
+            notification['isRead'] = True
+        return 200, {'success': True}
+
+    def get_preferences(self, req: Request):
+        return 200, dict(self.store.notification_prefs.get(req.uid, {
+            'messagesEnabled': True, 'followsEnabled': True, 'postsEnabled': True,
+            'likesEnabled': False, 'commentsEnabled': True,
+        }))
+
+    def update_preferences(self, req: Request):
+        prefs = self.get_preferences(req)[1]
+        prefs.update({k: bool(v) for k, v in req.body.items() if k in prefs})
+        self.store.notification_prefs[req.uid] = prefs
+        return 200, {'success': True}
+
+    # ---- dispatch ------------------------------------------------------
+
+    def handle(self, method: str, target: str, headers, body: bytes) -> Tuple[int, Any]:
+        parts = urlsplit(target)
+        query = {k: v[-1] for k, v in parse_qs(parts.query).items()}
+        try:
+            route, params = self.match(method, parts.path.rstrip('/') or '/')
+            auth = headers.get('Authorization', '')
+            token = auth[7:].strip() if auth.startswith('Bearer ') else ''
+            uid = uid_for_token(token) if token else None
+            if route.auth and uid is None:
+                raise ApiError(401, "Authentication required")
+            expiry = token_expiry(token) if token else None
+            if expiry is not None and expiry < time.time():
+                raise ApiError(401, "Token expired")
+            try:
+                payload = json.loads(body) if body else {}
+            except ValueError:
+                raise ApiError(400, "Invalid JSON body")
+            replay_key = headers.get('Idempotency-Key') if method == 'POST' else None
+            with self.store.lock:
+                if uid is not None:
+                    self.store.ensure_user(uid)
+                if replay_key and (uid, replay_key) in self.replays:
+                    return self.replays[(uid, replay_key)]
+                result = route.handler(Request(uid, params, query, payload))
+                if replay_key:
+                    self.remember(uid, replay_key, result)
+                return result
+        except ApiError as e:
+            return e.status, {'error': e.message}
+
+    def remember(self, uid: Optional[str], key: str, result: Tuple[int, Any]):
+        """Keep a POST's response so a retry with the same Idempotency-Key is answered without redoing it"""
+        self.replays[(uid, key)] = result
+        if len(self.replays) > self.max_replays:
+            self.replays.popitem(last=False)
+
+
+def encode_body(data: bytes, encoding: str) -> bytes:
+    if encoding == 'gzip':
+        compressor = zlib.compressobj(6, zlib.DEFLATED, 31)
+        return compressor.compress(data) + compressor.flush()
+    if encoding == 'deflate':
+        return zlib.compress(data, 6)
+    if encoding == 'br':
+        return brotli.compress(data, quality=5)
+    return data
+
+
+class TokenBucket:
+    """Admits `rate` requests per second on average, with bursts of up to `burst`"""
+
+    def __init__(self, rate: float, burst: Optional[float] = None):
+        self.rate = rate
+        self.burst = burst if burst is not None else max(1.0, rate)
+        self.tokens = self.burst
+        self.updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def take(self) -> Optional[float]:
+        """None if the request is admitted, otherwise seconds until a token frees up"""
+        with self._lock:
+            now = time.monotonic()
+            self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+            self.updated = now
+            if self.tokens >= 1:
+                self.tokens -= 1
+                return None
+            return (1 - self.tokens) / self.rate
+
+
+def etag_matches(if_none_match: str, etag: str) -> bool:
+    """Weak comparison of an If-None-Match header against an entity tag"""
+    tags = [t.strip() for t in if_none_match.split(',') if t.strip()]
+    return '*' in tags or any(t.removeprefix('W/') == etag.removeprefix('W/') for t in tags)
+
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+    server_version = 'LeoConnectStandIn/1.0'
+    # Headers and body go out in separate writes; without this Nagle adds ~40ms per response
+    disable_nagle_algorithm = True
+
+    def _dispatch(self):
+        server: 'StubServer' = self.server.stub
+        length = int(self.headers.get('Content-Length') or 0)
+        body = self.rfile.read(length) if length else b''
+        retry_after = None
+        # The token issuer plays Google's part, so the backend's limits don't apply to it
+        if urlsplit(self.path).path != '/test/token':
+            retry_after = server.limiter.take() if server.limiter is not None else None
+            if retry_after is None and server.user_rate_limit > 0:
+                retry_after = server.user_limiter(self.headers.get('Authorization', '')).take()
+        if retry_after is not None:
+            data = json.dumps({'error': 'Too many requests'}).encode()
+            self.send_response(429)
+            self.send_header('Retry-After', str(math.ceil(retry_after)))
+            self.send_header('Content-Type', 'application/json; charset=utf-8')
+            self.send_header('Content-Length', str(len(data)))
+            self.send_header('Access-Control-Allow-Origin', '*')
+            self.end_headers()
+            self.wfile.write(data)
+            return
+        # A fixed number of "workers" makes requests queue once the stand-in is saturated
+        with server.workers if server.workers is not None else contextlib.nullcontext():
+            server.cold_start()
+            server.inject_latency()
+            status, payload = server.api.handle(self.command, self.path, self.headers, body)
+        data = json.dumps(payload, separators=(',', ':')).encode()
+        validators = {}
+        if server.conditional and self.command == 'GET' and status == 200:
+            etag = '"' + hashlib.sha1(data).hexdigest()[:20] + '"'
+            validators = {'ETag': etag, 'Cache-Control': server.cache_control(self.path)}
+            if etag_matches(self.headers.get('If-None-Match', ''), etag):
+                self.send_response(304)
+                for name, value in validators.items():
+                    self.send_header(name, value)
+                if server.compression:
+                    self.send_header('Vary', 'Accept-Encoding')
+                self.send_header('Access-Control-Allow-Origin', '*')
+                self.end_headers()
+                return
+        encoding = server.pick_encoding(self.headers.get('Accept-Encoding', ''), len(data))
+        if encoding:
+            data = encode_body(data, encoding)
+        self.send_response(status)
+        for name, value in validators.items():
+            self.send_header(name, value)
+        self.send_header('Content-Type', 'application/json; charset=utf-8')
+        if server.compression:
+            self.send_header('Vary', 'Accept-Encoding')
+        if encoding:
+            self.send_header('Content-Encoding', encoding)
+        self.send_header('Content-Length', str(len(data)))
+        self.send_header('Access-Control-Allow-Origin', '*')
+        self.send_header('Access-Control-Allow-Methods', 'GET, POST, PUT, PATCH, DELETE, OPTIONS')
+        self.send_header('Access-Control-Allow-Headers', 'Authorization, Content-Type')
+        self.end_headers()
+        self.wfile.write(data)
+
+    do_GET = do_POST = do_PUT = do_PATCH = do_DELETE = _dispatch
+
+    def do_OPTIONS(self):
+        self.send_response(204)
+        self.send_header('Access-Control-Allow-Origin', '*')
+        self.send_header('Access-Control-Allow-Methods', 'GET, POST, PUT, PATCH, DELETE, OPTIONS')
+        self.send_header('Access-Control-Allow-Headers', 'Authorization, Content-Type')
+        self.send_header('Content-Length', '0')
+        self.end_headers()
+
+    def log_message(self, format, *args):
+        if self.server.stub.verbose:
+            super().log_message(format, *args)
+
+
+class StubServer:
+    """
+    Runs the stand-in backend on a background thread.
+
+        with StubServer(latency_ms=20, payload_bytes=50_000) as server:
+            LeoConnectAPITester(base_url=server.base_url).run_all_tests()
+    """
+
+    def __init__(self, host: str = '127.0.0.1', port: int = 0, latency_ms: float = 0.0,
+                 jitter_ms: float = 0.0, payload_bytes: int = 0, seed: int = 0,
+                 seed_data: bool = True, verbose: bool = False, compression: bool = False,
+                 min_compress_bytes: int = 1024, conditional: bool = False, cache_max_age: int = 300,
+                 rate_limit: float = 0.0, capacity: int = 0, user_rate_limit: float = 0.0,
+                 token_ttl: float = 0.0, propagation_ms: float = 0.0, cold_start_ms: float = 0.0,
+                 idle_timeout: float = 300.0, **seed_options):
+        self.latency_ms = latency_ms
+        self.cold_start_ms = cold_start_ms
+        self.idle_timeout = idle_timeout
+        self._last_request = time.monotonic()
+        self._warm_at = 0.0
+        self._cold_lock = threading.Lock()
+        self.limiter = TokenBucket(rate_limit) if rate_limit > 0 else None
+        self.user_rate_limit = user_rate_limit
+        self._user_limiters: Dict[str, TokenBucket] = {}
+        self._user_limiters_lock = threading.Lock()
+        self.workers = threading.BoundedSemaphore(capacity) if capacity > 0 else None
+        self.conditional = conditional
+        self.cache_max_age = cache_max_age
+        self.compression = compression
+        self.min_compress_bytes = min_compress_bytes
+        self.jitter_ms = jitter_ms
+        self.verbose = verbose
+        self.store = LeoStore(payload_bytes=payload_bytes, seed=seed)
+        if seed_data:
+            self.store.seed(**seed_options)
+        self.store.propagation_ms = propagation_ms
+        self.api = LeoApi(self.store, token_ttl=token_ttl)
+        self._rng = random.Random(seed)
+        self.httpd = ThreadingHTTPServer((host, port), _Handler)
+        self.httpd.daemon_threads = True
+        self.httpd.stub = self
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def base_url(self) -> str:
+        host, port = self.httpd.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def inject_latency(self):
+        delay = self.latency_ms
+        if self.jitter_ms:
+            delay += self._rng.uniform(0, self.jitter_ms)
+        if delay > 0:
+            time.sleep(delay / 1000)
+
+    def cold_start(self):
+        """Scale to zero: after idle_timeout seconds without requests, the next ones wait cold_start_ms"""
+        if self.cold_start_ms <= 0:
+            return
+        with self._cold_lock:
+            now = time.monotonic()
+            if now - self._last_request > self.idle_timeout:
+                self._warm_at = now + self.cold_start_ms / 1000
+            self._last_request = now
+            wait = self._warm_at - now
+        if wait > 0:
+            time.sleep(wait)
+
+    def user_limiter(self, authorization: str) -> TokenBucket:
+        """Per-caller bucket, keyed by Authorization (anonymous callers share one)"""
+        key = uid_for_token(authorization[7:].strip()) if authorization.startswith('Bearer ') else ''
+        with self._user_limiters_lock:
+            bucket = self._user_limiters.get(key)
+            if bucket is None:
+                bucket = self._user_limiters[key] = TokenBucket(self.user_rate_limit)
+            return bucket
+
+    def pick_encoding(self, accept_encoding: str, size: int) -> Optional[str]:
+        """Preferred Content-Encoding for a response, or None to send it as-is"""
+        if not self.compression or size < self.min_compress_bytes:
+            return None
+        offered = {}
+        for part in accept_encoding.split(','):
+            name, _, params = part.strip().partition(';')
+            q = 1.0
+            if params.strip().startswith('q='):
+                try:
+                    q = float(params.strip()[2:])
+                except ValueError:
+                    q = 0.0
+            if name:
+                offered[name.strip().lower()] = q
+        supported = ['br', 'gzip', 'deflate'] if brotli is not None else ['gzip', 'deflate']
+        candidates = [e for e in supported if offered.get(e, offered.get('*', 0)) > 0]
+        return max(candidates, key=lambda e: offered.get(e, offered.get('*', 0)), default=None)
+
+    def cache_control(self, target: str) -> str:
+        """Cache-Control for a GET response: shared caching for read-mostly routes, revalidation elsewhere"""
+        if urlsplit(target).path.rstrip('/') in CACHEABLE_PATHS:
+            return f"public, max-age={self.cache_max_age}"
+        return "private, no-cache"
+
+    def start(self) -> 'StubServer':
+        self._thread = threading.Thread(target=self.httpd.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+        if self._thread:
+            self._thread.join()
+
+    def __enter__(self) -> 'StubServer':
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+
+def add_stand_in_arguments(parser: argparse.ArgumentParser):
+    """--stand-in options shared by the tester and load tool command lines"""
+    parser.add_argument('--stand-in', action='store_true',
+                        help="Start an in-process stand-in backend and target it instead of --base-url")
+    parser.add_argument('--stand-in-latency-ms', type=float, default=0,
+                        help="Latency injected by the stand-in backend")
+    parser.add_argument('--stand-in-payload-bytes', type=int, default=0,
+                        help="Base64 image size per post in the stand-in backend")
+    parser.add_argument('--stand-in-compress', action='store_true',
+                        help="Let the stand-in backend honour Accept-Encoding")
+    parser.add_argument('--stand-in-conditional', action='store_true',
+                        help="Let the stand-in backend send ETag/Cache-Control and answer 304")
+    parser.add_argument('--stand-in-rate-limit', type=float, default=0,
+                        help="Requests per second the stand-in admits before answering 429 (0 = unlimited)")
+    parser.add_argument('--stand-in-capacity', type=int, default=0,
+                        help="Requests the stand-in serves at once; the rest queue (0 = unlimited)")
+    parser.add_argument('--stand-in-user-rate-limit', type=float, default=0,
+                        help="Requests per second per user before the stand-in answers 429 (0 = unlimited)")
+    parser.add_argument('--stand-in-propagation-ms', type=float, default=0,
+                        help="Keep new posts, comments and events out of listings for up to this long")
+    parser.add_argument('--stand-in-token-ttl', type=float, default=3600,
+                        help="Lifetime of ID tokens issued by the stand-in's /test/token (0 = never expire)")
+    parser.add_argument('--stand-in-cold-start-ms', type=float, default=0,
+                        help="Delay for the first requests after the stand-in has been idle (0 = always warm)")
+    parser.add_argument('--stand-in-idle-timeout', type=float, default=300,
+                        help="Seconds without requests after which the stand-in goes cold")
+
+
+def stand_in_options(args: argparse.Namespace, **seed_options) -> Dict[str, Any]:
+    """StubServer keyword arguments for the --stand-in-* options; seed_options override LeoStore.seed"""
+    return dict(seed_options, latency_ms=args.stand_in_latency_ms,
+                payload_bytes=args.stand_in_payload_bytes,
+                compression=args.stand_in_compress,
+                conditional=args.stand_in_conditional,
+                rate_limit=args.stand_in_rate_limit,
+                capacity=args.stand_in_capacity,
+                user_rate_limit=args.stand_in_user_rate_limit,
+                token_ttl=args.stand_in_token_ttl,
+                propagation_ms=args.stand_in_propagation_ms,
+                cold_start_ms=args.stand_in_cold_start_ms,
+                idle_timeout=args.stand_in_idle_timeout)
+
+
+def start_stand_in(args: argparse.Namespace, **seed_options) -> Optional[StubServer]:
+    """Start the stand-in if requested, pointing args.base_url at it; seed_options override LeoStore.seed"""
+    if not getattr(args, 'stand_in', False):
+        return None
+    server = StubServer(**stand_in_options(args, **seed_options)).start()
+    args.base_url = server.base_url
+    return server
+
+
+def main():
+    """Main function"""
+    parser = argparse.ArgumentParser(description="LeoConnect stand-in backend")
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8787)
+    parser.add_argument('--latency-ms', type=float, default=0, help="Delay added to every response")
+    parser.add_argument('--jitter-ms', type=float, default=0, help="Extra uniform random delay")
+    parser.add_argument('--payload-bytes', type=int, default=0, help="Base64 image size per seeded post")
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--posts', type=int, default=200)
+    parser.add_argument('--users', type=int, default=50)
+    parser.add_argument('--popular-followers', type=int, default=0,
+                        help="Followers of the 'popular' account, for deep pagination")
+    parser.add_argument('--compress', action='store_true', help="Honour Accept-Encoding (gzip/deflate/br)")
+    parser.add_argument('--conditional', action='store_true',
+                        help="Send ETag/Cache-Control on GET responses and answer If-None-Match with 304")
+    parser.add_argument('--cache-max-age', type=int, default=300,
+                        help="max-age for read-mostly routes when --conditional is set")
+    parser.add_argument('--rate-limit', type=float, default=0, help="Requests per second before 429 (0 = off)")
+    parser.add_argument('--capacity', type=int, default=0, help="Requests served concurrently (0 = unlimited)")
+    parser.add_argument('--user-rate-limit', type=float, default=0, help="Requests per second per user (0 = off)")
+    parser.add_argument('--token-ttl', type=float, default=3600, help="Lifetime of issued ID tokens (0 = forever)")
+    parser.add_argument('--propagation-ms', type=float, default=0,
+                        help="Keep new posts, comments and events out of listings for up to this long")
+    parser.add_argument('--cold-start-ms', type=float, default=0,
+                        help="Delay for the first requests after an idle period (0 = always warm)")
+    parser.add_argument('--idle-timeout', type=float, default=300, help="Idle seconds before going cold")
+    parser.add_argument('--verbose', action='store_true', help="Log every request")
+    args = parser.parse_args()
+
+    server = StubServer(args.host, args.port, latency_ms=args.latency_ms, jitter_ms=args.jitter_ms,
+                        payload_bytes=args.payload_bytes, seed=args.seed, verbose=args.verbose,
+                        compression=args.compress, conditional=args.conditional,
+                        cache_max_age=args.cache_max_age, rate_limit=args.rate_limit, capacity=args.capacity,
+                        user_rate_limit=args.user_rate_limit, token_ttl=args.token_ttl,
+                        propagation_ms=args.propagation_ms, cold_start_ms=args.cold_start_ms,
+                        idle_timeout=args.idle_timeout,
+                        posts=args.posts, users=args.users, popular_followers=args.popular_followers)
+    print(f"LeoConnect stand-in listening on {server.base_url} "
+          f"({len(server.store.posts)} posts, {len(server.store.users)} users)")
+    try:
+        server.httpd.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.httpd.server_close()
+
+
+if __name__ == "__main__":
+    main()
@@ -4,43 +4,82 @@ LeoConnect API Test Script
 Tests all endpoints of the LeoConnect backend API
 """
 
+import argparse
 import requests
 import json
-from typing import Dict, Any
+import time
+from typing import Dict, Any, Optional
 from datetime import datetime
 
-
-class Colors:
-    """ANSI color codes for terminal output"""
-    GREEN = '\033[92m'
-    RED = '\033[91m'
-    YELLOW = '\033[93m'
-    BLUE = '\033[94m'
-    RESET = '\033[0m'
-    BOLD = '\033[1m'
+from api_runner import ConcurrentRunner, TaskGraph
+from bench_history import add_history_arguments, save_from_args
+from colors import Colors
+from harness_overhead import (ClientOverhead, EventWriter, add_quiet_arguments, close_events, events_from_args,
+                              measure, overhead_from_args, print_overhead, quiet_output)
+from http_cache import ResponseCache, add_cache_arguments, cache_from_args, enable_cache
+from http_pool import add_pool_arguments, configure_pool_from_args, mount_shared_pool, shared_adapter
+from live_metrics import add_live_arguments, live_from_args, live_view
+from latency import LatencyRecorder, TimedSession
+from schemas import SchemaCheck
+from stub_server import add_stand_in_arguments, start_stand_in
+from traffic_log import add_record_arguments, record_from_args
 
 
 class LeoConnectAPITester:
-    def __init__(self, base_url: str = "https://leoconnect.rexosphere.com"):
+    def __init__(self, base_url: str = "https://leoconnect.rexosphere.com", cache: Optional[ResponseCache] = None,
+                 quiet: bool = False, events: Optional[EventWriter] = None, overhead: Optional[ClientOverhead] = None):
         self.base_url = base_url
-        self.session = requests.Session()
+        self.latency = LatencyRecorder()
+        self.session = mount_shared_pool(TimedSession(self.latency))
+        self.cache = cache
+        self.quiet = quiet
+        self.events = events
+        self.overhead = overhead
+        self.session.overhead = overhead
+        self.schemas = SchemaCheck(overhead=overhead)
+        if cache is not None:
+            enable_cache(self.session, cache)
         self.session.headers.update({
             'User-Agent': 'LeoConnect-API-Tester/1.0',
             'Accept': 'application/json'
         })
         self.test_results = []
+        self.warnings = []
+        self.wall_time = None
 
     def log_test(self, test_name: str, passed: bool, message: str = ""):
         """Log test results"""
-        status = f"{Colors.GREEN}✓ PASS{Colors.RESET}" if passed else f"{Colors.RED}✗ FAIL{Colors.RESET}"
-        print(f"{status} {Colors.BOLD}{test_name}{Colors.RESET}")
-        if message:
-            print(f"  {message}")
-        self.test_results.append({
-            'test': test_name,
-            'passed': passed,
-            'message': message
-        })
+        with measure(self.overhead, 'logging'):
+            if self.events is not None:
+                self.events.emit('check', test=test_name, passed=passed, message=message)
+            if not self.quiet:
+                status = f"{Colors.GREEN}✓ PASS{Colors.RESET}" if passed else f"{Colors.RED}✗ FAIL{Colors.RESET}"
+                print(f"{status} {Colors.BOLD}{test_name}{Colors.RESET}")
+                if message:
+                    print(f"  {message}")
+            self.test_results.append({
+                'test': test_name,
+                'passed': passed,
+                'message': message
+            })
+
+    def log_warning(self, test_name: str, message: str = ""):
+        """Log an advisory finding: reported in the summary, but it does not fail the suite"""
+        with measure(self.overhead, 'logging'):
+            if self.events is not None:
+                self.events.emit('warning', test=test_name, message=message)
+            if not self.quiet:
+                print(f"{Colors.YELLOW}⚠ WARN{Colors.RESET} {Colors.BOLD}{test_name}{Colors.RESET}")
+                if message:
+                    print(f"  {message}")
+            self.warnings.append({'test': test_name, 'message': message})
+
+    def check_schema(self, test_name: str, type_name: str, data) -> bool:
+        """Validate a decoded body against the app's model (schemas.ROUTE_TYPES)"""
+        problem = self.schemas.validate(type_name, data)
+        count = f"{len(data)} item(s) match" if isinstance(data, list) else "Matches"
+        self.log_test(test_name, problem is None, problem or f"{count} {type_name}")
+        return problem is None
 
     def test_health_check(self):
         """Test if the API is reachable"""
@@ -82,12 +121,7 @@ class LeoConnectAPITester:
             if response.status_code == 200:
                 try:
                     data = response.json()
-                    has_profile = all(key in data for key in ['uid', 'email'])
-                    self.log_test(
-                        "Google Sign-In Response Structure",
-                        has_profile,
-                        f"Contains user profile data: {has_profile}"
-                    )
+                    self.check_schema("Google Sign-In Response Structure", 'UserProfile', data)
                 except json.JSONDecodeError:
                     self.log_test("Google Sign-In Response Structure", False, "Invalid JSON response")
 
@@ -125,24 +159,16 @@ class LeoConnectAPITester:
                     )
 
                     if is_list and len(data) > 0:
-                        post = data[0]
-                        has_required_fields = all(key in post for key in ['postId', 'content'])
-                        self.log_test(
-                            "Feed Post Structure",
-                            has_required_fields,
-                            f"Post has required fields: {has_required_fields}"
-                        )
+                        self.check_schema("Feed Post Structure", 'List<Post>', data)
                 except json.JSONDecodeError:
                     self.log_test("Feed Response Structure", False, "Invalid JSON response")
 
         except requests.exceptions.RequestException as e:
             self.log_test("GET /feed", False, f"Error: {str(e)}")
 
-    def test_like_post(self):
+    def test_like_post(self, test_post_id: str = "test-post-123"):
         """Test like post endpoint"""
         try:
-            # Use a test post ID
-            test_post_id = "test-post-123"
             response = self.session.post(
                 f"{self.base_url}/posts/{test_post_id}/like",
                 timeout=10
@@ -157,12 +183,13 @@ class LeoConnectAPITester:
         except requests.exceptions.RequestException as e:
             self.log_test("POST /posts/:id/like", False, f"Error: {str(e)}")
 
-    def test_create_post(self):
-        """Test create post endpoint"""
+    def test_create_post(self) -> Optional[str]:
+        """Test create post endpoint, returning the new post ID if one was created"""
         print(f"\n{Colors.BLUE}{'='*60}{Colors.RESET}")
         print(f"{Colors.BOLD}Testing Post Management{Colors.RESET}")
         print(f"{Colors.BLUE}{'='*60}{Colors.RESET}\n")
 
+        post_id = None
         try:
             test_post = {
                 "content": "Test post from API tester"
@@ -190,14 +217,16 @@ class LeoConnectAPITester:
                         has_post_id,
                         f"Response contains post ID: {has_post_id}"
                     )
+                    if has_post_id:
+                        post_id = data.get('postId', data.get('id'))
+                        self.check_schema("Create Post Schema", 'Post', data)
                 except json.JSONDecodeError:
                     self.log_test("Create Post Response Structure", False, "Invalid JSON response")
 
         except requests.exceptions.RequestException as e:
             self.log_test("POST /posts", False, f"Error: {str(e)}")
 
-        # Test like post after creating
-        self.test_like_post()
+        return post_id
 
     def test_get_districts(self):
         """Test get districts endpoint"""
@@ -226,6 +255,8 @@ class LeoConnectAPITester:
                         is_list,
                         f"Response is a list: {is_list} | Districts: {len(data) if is_list else 'N/A'}"
                     )
+                    if is_list:
+                        self.check_schema("Districts Schema", 'List<String>', data)
                     return data if is_list and len(data) > 0 else None
                 except json.JSONDecodeError:
                     self.log_test("Districts Response Structure", False, "Invalid JSON response")
@@ -262,13 +293,7 @@ class LeoConnectAPITester:
                     )
 
                     if is_list and len(data) > 0:
-                        club = data[0]
-                        has_required_fields = all(key in club for key in ['clubId', 'name'])
-                        self.log_test(
-                            "Club Structure",
-                            has_required_fields,
-                            f"Club has required fields: {has_required_fields}"
-                        )
+                        self.check_schema("Club Structure", 'List<Club>', data)
                 except json.JSONDecodeError:
                     self.log_test("Clubs Response Structure", False, "Invalid JSON response")
 
@@ -301,11 +326,39 @@ class LeoConnectAPITester:
                 f"Content-Type: {content_type}"
             )
 
+            # Check compression on a body large enough to be worth it
+            response = self.session.get(f"{self.base_url}/explore?limit=20",
+                                        headers={'Accept-Encoding': 'gzip, deflate'}, timeout=10)
+            encoding = response.headers.get('Content-Encoding', 'identity')
+            size = len(response.content)
+            # Advisory only: compression_probe.py enforces the size budgets
+            if encoding != 'identity' or size < 1024:
+                self.log_test("Response Compression", True, f"Content-Encoding: {encoding} ({size} bytes decoded)")
+            else:
+                self.log_warning("Response Compression", f"{size} bytes sent uncompressed (Content-Encoding: identity)")
+
         except requests.exceptions.RequestException as e:
             self.log_test("Response Headers", False, f"Error: {str(e)}")
 
-    def run_all_tests(self):
+    def build_task_graph(self) -> TaskGraph:
+        """Independent sections run concurrently; edges carry real data dependencies"""
+        graph = TaskGraph()
+        graph.add("auth", self.test_google_sign_in)
+        graph.add("feed", self.test_get_home_feed)
+        graph.add("create_post", self.test_create_post)
+        # Like the post we just created, falling back to the fixed test ID
+        graph.add("like_post", lambda post_id: self.test_like_post(post_id or "test-post-123"),
+                  depends_on=["create_post"])
+        graph.add("districts", self.test_get_districts)
+        graph.add("clubs", lambda districts: self.test_get_clubs_by_district(districts[0])
+                  if districts else self.test_get_clubs_by_district(),
+                  depends_on=["districts"])
+        graph.add("headers", self.test_response_headers)
+        return graph
+
+    def run_all_tests(self, workers: int = 8):
         """Run all API tests"""
+        started = time.perf_counter()
         print(f"\n{Colors.BOLD}{Colors.BLUE}{'='*60}{Colors.RESET}")
         print(f"{Colors.BOLD}LeoConnect API Test Suite{Colors.RESET}")
         print(f"{Colors.BOLD}Base URL: {self.base_url}{Colors.RESET}")
@@ -317,20 +370,11 @@ class LeoConnectAPITester:
             print(f"\n{Colors.RED}API is not reachable. Stopping tests.{Colors.RESET}")
             return
 
-        # Run all endpoint tests
-        self.test_google_sign_in()
-        self.test_get_home_feed()
-        self.test_create_post()
-
-        # Test districts and clubs
-        districts = self.test_get_districts()
-        if districts and len(districts) > 0:
-            self.test_get_clubs_by_district(districts[0])
-        else:
-            self.test_get_clubs_by_district()
-
-        # Test response headers
-        self.test_response_headers()
+        # Run all endpoint tests, independent sections in parallel
+        runner = ConcurrentRunner(self, max_workers=workers)
+        runner.run(self.build_task_graph())
+        self.wall_time = time.perf_counter() - started
+        print(f"\n{Colors.BOLD}Sections finished in {runner.elapsed:.2f}s ({runner.max_workers} workers){Colors.RESET}")
 
         # Print summary
         self.print_summary()
@@ -358,14 +402,69 @@ class LeoConnectAPITester:
                     if result['message']:
                         print(f"    {result['message']}")
 
+        if self.warnings:
+            print(f"{Colors.YELLOW}Warnings:{Colors.RESET}")
+            for warning in self.warnings:
+                print(f"  - {warning['test']}: {warning['message']}")
+
+        if self.latency.total_count:
+            print(f"\n{Colors.BLUE}Latency by endpoint (ms):{Colors.RESET}")
+            for line in self.latency.report_lines(self.wall_time):
+                print(f"  {line}")
+
+        connections = shared_adapter().stats
+        if connections.requests:
+            print(f"\n{Colors.BLUE}Connection phases (ms):{Colors.RESET}")
+            for line in connections.report_lines():
+                print(f"  {line}")
+
+        if self.cache is not None and self.cache.stats:
+            print(f"\n{Colors.BLUE}HTTP cache:{Colors.RESET}")
+            for line in self.cache.report_lines():
+                print(f"  {line}")
+
+        if self.schemas.stats:
+            print(f"\n{Colors.BLUE}Response schemas:{Colors.RESET}")
+            for line in self.schemas.report_lines():
+                print(f"  {line}")
+
+        if self.overhead is not None:
+            print_overhead(self.overhead)
+
         print(f"\n{Colors.BOLD}Completed at: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}{Colors.RESET}")
         print(f"{Colors.BLUE}{'='*60}{Colors.RESET}\n")
 
 
 def main():
     """Main function"""
-    tester = LeoConnectAPITester()
-    tester.run_all_tests()
+    parser = argparse.ArgumentParser(description="LeoConnect API test suite")
+    parser.add_argument('--base-url', default="https://leoconnect.rexosphere.com")
+    parser.add_argument('--workers', type=int, default=8,
+                        help="Concurrent sections (1 runs everything sequentially)")
+    add_pool_arguments(parser)
+    add_cache_arguments(parser)
+    add_record_arguments(parser)
+    add_live_arguments(parser)
+    add_quiet_arguments(parser)
+    add_history_arguments(parser)
+    add_stand_in_arguments(parser)
+    args = parser.parse_args()
+    configure_pool_from_args(args)
+    start_stand_in(args)
+    record_from_args(args, 'test_api')
+    live = live_from_args(args, 'test_api')
+    events = events_from_args(args)
+
+    tester = LeoConnectAPITester(base_url=args.base_url, cache=cache_from_args(args),
+                                 quiet=args.quiet, events=events, overhead=overhead_from_args(args))
+    with live_view(live), quiet_output(args.quiet):
+        tester.run_all_tests(workers=args.workers)
+    if args.quiet or (live is not None and live.enabled):
+        tester.print_summary()
+    close_events(events)
+    passed = sum(1 for r in tester.test_results if r['passed'])
+    save_from_args(args, 'test_api', tester.latency, tester.wall_time,
+                   extra={'tests': {'passed': passed, 'failed': len(tester.test_results) - passed}})
 
 
 if __name__ == "__main__":
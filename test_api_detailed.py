@@ -4,29 +4,54 @@ LeoConnect API Detailed Test Script
 Tests API with more detailed analysis and optional authentication
 """
 
+import argparse
 import requests
 import json
-import sys
-from typing import Dict, Any, Optional
+import time
+from typing import Dict, Any, List, Optional
 from datetime import datetime
 
-
-class Colors:
-    """ANSI color codes for terminal output"""
-    GREEN = '\033[92m'
-    RED = '\033[91m'
-    YELLOW = '\033[93m'
-    BLUE = '\033[94m'
-    CYAN = '\033[96m'
-    RESET = '\033[0m'
-    BOLD = '\033[1m'
+from api_runner import ConcurrentRunner, TaskGraph
+from bench_history import add_history_arguments, save_from_args
+from colors import Colors
+from harness_overhead import (ClientOverhead, EventWriter, add_quiet_arguments, close_events, events_from_args,
+                              measure, overhead_from_args, print_overhead, quiet_output)
+from http_cache import ResponseCache, add_cache_arguments, cache_from_args, enable_cache
+from http_pool import add_pool_arguments, configure_pool_from_args, mount_shared_pool, shared_adapter
+from live_metrics import add_live_arguments, live_from_args, live_view
+from latency import LatencyRecorder, TimedSession
+from schemas import SchemaCheck
+from stub_server import add_stand_in_arguments, start_stand_in
+from traffic_log import add_record_arguments, record_from_args
+
+
+def abbreviate(value, max_length: int = 80):
+    """Copy of a JSON value with long strings (e.g. base64 images) cut short for printing"""
+    if isinstance(value, dict):
+        return {k: abbreviate(v, max_length) for k, v in value.items()}
+    if isinstance(value, list):
+        return [abbreviate(v, max_length) for v in value]
+    if isinstance(value, str) and len(value) > max_length:
+        return f"{value[:max_length]}... ({len(value)} chars)"
+    return value
 
 
 class LeoConnectDetailedTester:
-    def __init__(self, base_url: str = "https://leoconnect.rexosphere.com", token: Optional[str] = None):
+    def __init__(self, base_url: str = "https://leoconnect.rexosphere.com", token: Optional[str] = None,
+                 cache: Optional[ResponseCache] = None,
+                 quiet: bool = False, events: Optional[EventWriter] = None, overhead: Optional[ClientOverhead] = None):
         self.base_url = base_url
         self.token = token
-        self.session = requests.Session()
+        self.latency = LatencyRecorder()
+        self.session = mount_shared_pool(TimedSession(self.latency))
+        self.cache = cache
+        self.quiet = quiet
+        self.events = events
+        self.overhead = overhead
+        self.session.overhead = overhead
+        self.schemas = SchemaCheck(overhead=overhead)
+        if cache is not None:
+            enable_cache(self.session, cache)
         self.session.headers.update({
             'User-Agent': 'LeoConnect-API-Tester/2.0',
             'Accept': 'application/json'
@@ -36,20 +61,50 @@ class LeoConnectDetailedTester:
                 'Authorization': f'Bearer {token}'
             })
         self.test_results = []
+        self.warnings = []
+        self.wall_time = None
 
     def log_test(self, test_name: str, passed: bool, message: str = "", details: str = ""):
         """Log test results with details"""
-        status = f"{Colors.GREEN}✓ PASS{Colors.RESET}" if passed else f"{Colors.RED}✗ FAIL{Colors.RESET}"
-        print(f"{status} {Colors.BOLD}{test_name}{Colors.RESET}")
-        if message:
-            print(f"  {message}")
-        if details:
-            print(f"  {Colors.CYAN}{details}{Colors.RESET}")
-        self.test_results.append({
-            'test': test_name,
-            'passed': passed,
-            'message': message
-        })
+        with measure(self.overhead, 'logging'):
+            if self.events is not None:
+                self.events.emit('check', test=test_name, passed=passed, message=message)
+            if not self.quiet:
+                status = f"{Colors.GREEN}✓ PASS{Colors.RESET}" if passed else f"{Colors.RED}✗ FAIL{Colors.RESET}"
+                print(f"{status} {Colors.BOLD}{test_name}{Colors.RESET}")
+                if message:
+                    print(f"  {message}")
+                if details:
+                    print(f"  {Colors.CYAN}{details}{Colors.RESET}")
+            self.test_results.append({
+                'test': test_name,
+                'passed': passed,
+                'message': message
+            })
+
+    def preview(self, response, limit: Optional[int] = 300) -> str:
+        """Response body for log_test details; skipped entirely in quiet mode"""
+        if self.quiet:
+            return ""
+        return f"Response: {response.text[:limit]}"
+
+    def log_warning(self, test_name: str, message: str = ""):
+        """Log an advisory finding: reported in the summary, but it does not fail the suite"""
+        with measure(self.overhead, 'logging'):
+            if self.events is not None:
+                self.events.emit('warning', test=test_name, message=message)
+            if not self.quiet:
+                print(f"{Colors.YELLOW}⚠ WARN{Colors.RESET} {Colors.BOLD}{test_name}{Colors.RESET}")
+                if message:
+                    print(f"  {message}")
+            self.warnings.append({'test': test_name, 'message': message})
+
+    def check_schema(self, test_name: str, type_name: str, data) -> bool:
+        """Validate a decoded body against the app's model (schemas.ROUTE_TYPES)"""
+        problem = self.schemas.validate(type_name, data)
+        count = f"{len(data)} item(s) match" if isinstance(data, list) else "Matches"
+        self.log_test(test_name, problem is None, problem or f"{count} {type_name}")
+        return problem is None
 
     def test_health_check(self):
         """Test if the API is reachable"""
@@ -63,7 +118,7 @@ class LeoConnectDetailedTester:
                 "GET /",
                 response.status_code == 200,
                 f"Status: {response.status_code}",
-                f"Response: {response.text[:200]}"
+                self.preview(response, limit=200)
             )
             return response.status_code == 200
         except requests.exceptions.RequestException as e:
@@ -83,7 +138,7 @@ class LeoConnectDetailedTester:
                 "POST /auth/google (empty body)",
                 response.status_code in [400, 401],
                 f"Status: {response.status_code}",
-                f"Response: {response.text}"
+                self.preview(response, limit=None)
             )
         except requests.exceptions.RequestException as e:
             self.log_test("POST /auth/google (empty body)", False, f"Error: {str(e)}")
@@ -99,7 +154,7 @@ class LeoConnectDetailedTester:
                 "POST /auth/google (mock token in body)",
                 response.status_code in [200, 401, 403],
                 f"Status: {response.status_code}",
-                f"Response: {response.text[:200]}"
+                self.preview(response, limit=200)
             )
         except requests.exceptions.RequestException as e:
             self.log_test("POST /auth/google (mock token)", False, f"Error: {str(e)}")
@@ -107,17 +162,17 @@ class LeoConnectDetailedTester:
         # Test 3: With Authorization header
         try:
             headers = {'Authorization': 'Bearer mock_token_12345'}
-            response = requests.post(
+            response = self.session.post(
                 f"{self.base_url}/auth/google",
                 json={},
-                headers={**self.session.headers, **headers},
+                headers=headers,
                 timeout=10
             )
             self.log_test(
                 "POST /auth/google (token in header)",
                 response.status_code in [200, 401, 403],
                 f"Status: {response.status_code}",
-                f"Response: {response.text[:200]}"
+                self.preview(response, limit=200)
             )
         except requests.exceptions.RequestException as e:
             self.log_test("POST /auth/google (header)", False, f"Error: {str(e)}")
@@ -128,9 +183,9 @@ class LeoConnectDetailedTester:
         print(f"{Colors.BOLD}3. Feed Endpoint{Colors.RESET}")
         print(f"{Colors.BLUE}{'='*70}{Colors.RESET}\n")
 
-        # Test without auth
+        # Session carries the token when one was provided
         try:
-            response = requests.get(
+            response = self.session.get(
                 f"{self.base_url}/feed",
                 params={'limit': 10},
                 headers={'Accept': 'application/json'},
@@ -142,7 +197,7 @@ class LeoConnectDetailedTester:
                     "GET /feed?limit=10 (with auth)",
                     response.status_code == 200,
                     f"Status: {response.status_code}",
-                    f"Response: {response.text[:300]}"
+                    self.preview(response)
                 )
 
                 if response.status_code == 200:
@@ -156,7 +211,7 @@ class LeoConnectDetailedTester:
                     "GET /feed?limit=10 (no auth)",
                     response.status_code == 401,
                     f"Status: {response.status_code} - Correctly requires authentication",
-                    f"Response: {response.text}"
+                    self.preview(response, limit=None)
                 )
         except requests.exceptions.RequestException as e:
             self.log_test("GET /feed", False, f"Error: {str(e)}")
@@ -188,35 +243,24 @@ class LeoConnectDetailedTester:
 
         if len(posts) > 0:
             post = posts[0]
-            print(f"\n  {Colors.CYAN}Sample Post Structure:{Colors.RESET}")
-            print(f"  {json.dumps(post, indent=2)}\n")
+            if not self.quiet:
+                print(f"\n  {Colors.CYAN}Sample Post Structure:{Colors.RESET}")
+                print(f"  {json.dumps(abbreviate(post), indent=2)}\n")
 
-            # Check required fields
-            required_fields = ['postId', 'clubId', 'authorName', 'content', 'likesCount', 'isLikedByUser']
-            missing_fields = [f for f in required_fields if f not in post]
-
-            if missing_fields:
-                self.log_test(
-                    "Post Required Fields",
-                    False,
-                    f"Missing fields: {', '.join(missing_fields)}"
-                )
-            else:
-                self.log_test(
-                    "Post Required Fields",
-                    True,
-                    "All required fields present"
-                )
+            self.check_schema("Post Schema", 'List<Post>', posts)
 
     def test_districts_and_clubs(self):
         """Test districts and clubs endpoints"""
+        self.test_clubs_for_districts(self.test_districts())
+
+    def test_districts(self) -> List[str]:
+        """Test districts endpoint, returning the districts found"""
         print(f"\n{Colors.BLUE}{'='*70}{Colors.RESET}")
         print(f"{Colors.BOLD}4. Districts & Clubs Endpoints{Colors.RESET}")
         print(f"{Colors.BLUE}{'='*70}{Colors.RESET}\n")
 
-        # Test districts
         try:
-            response = requests.get(f"{self.base_url}/districts", timeout=10)
+            response = self.session.get(f"{self.base_url}/districts", timeout=10)
             self.log_test(
                 "GET /districts",
                 response.status_code == 200,
@@ -225,18 +269,22 @@ class LeoConnectDetailedTester:
 
             if response.status_code == 200:
                 districts = response.json()
+                self.check_schema("Districts Schema", 'List<String>', districts)
                 print(f"  {Colors.CYAN}Districts found: {districts}{Colors.RESET}\n")
-
-                # Test clubs for each district
-                for district in districts[:2]:  # Test first 2 districts
-                    self.test_clubs_for_district(district)
+                return districts
         except requests.exceptions.RequestException as e:
             self.log_test("GET /districts", False, f"Error: {str(e)}")
+        return []
+
+    def test_clubs_for_districts(self, districts: List[str]):
+        """Test clubs endpoint for the first districts found"""
+        for district in districts[:2]:  # Test first 2 districts
+            self.test_clubs_for_district(district)
 
     def test_clubs_for_district(self, district: str):
         """Test clubs endpoint for a specific district"""
         try:
-            response = requests.get(
+            response = self.session.get(
                 f"{self.base_url}/clubs",
                 params={'district': district},
                 timeout=10
@@ -246,7 +294,7 @@ class LeoConnectDetailedTester:
                 f"GET /clubs?district={district}",
                 response.status_code == 200,
                 f"Status: {response.status_code}",
-                f"Response: {response.text[:300]}"
+                self.preview(response)
             )
 
             if response.status_code == 200:
@@ -254,39 +302,25 @@ class LeoConnectDetailedTester:
                     clubs = response.json()
                     if isinstance(clubs, list) and len(clubs) > 0:
                         club = clubs[0]
-                        print(f"  {Colors.CYAN}Sample Club:{Colors.RESET}")
-                        print(f"  {json.dumps(club, indent=2)}\n")
-
-                        # Check required fields
-                        required_fields = ['clubId', 'name', 'district']
-                        missing_fields = [f for f in required_fields if f not in club]
-
-                        if missing_fields:
-                            self.log_test(
-                                f"Club Structure ({district})",
-                                False,
-                                f"Missing fields: {', '.join(missing_fields)}"
-                            )
-                        else:
-                            self.log_test(
-                                f"Club Structure ({district})",
-                                True,
-                                f"Found {len(clubs)} club(s)"
-                            )
+                        if not self.quiet:
+                            print(f"  {Colors.CYAN}Sample Club:{Colors.RESET}")
+                            print(f"  {json.dumps(club, indent=2)}\n")
+
+                        self.check_schema(f"Club Structure ({district})", 'List<Club>', clubs)
                 except json.JSONDecodeError:
                     self.log_test(f"Clubs Response ({district})", False, "Invalid JSON")
         except requests.exceptions.RequestException as e:
             self.log_test(f"GET /clubs ({district})", False, f"Error: {str(e)}")
 
-    def test_create_post(self):
-        """Test post creation"""
+    def test_create_post(self) -> Optional[str]:
+        """Test post creation, returning the new post ID if one was created"""
         print(f"\n{Colors.BLUE}{'='*70}{Colors.RESET}")
         print(f"{Colors.BOLD}5. Post Management{Colors.RESET}")
         print(f"{Colors.BLUE}{'='*70}{Colors.RESET}\n")
 
         if not self.token:
             print(f"  {Colors.YELLOW}Skipping post creation tests (no auth token){Colors.RESET}\n")
-            return
+            return None
 
         try:
             # Test post creation
@@ -305,19 +339,20 @@ class LeoConnectDetailedTester:
                 "POST /posts",
                 response.status_code in [200, 201],
                 f"Status: {response.status_code}",
-                f"Response: {response.text[:300]}"
+                self.preview(response)
             )
 
             if response.status_code in [200, 201]:
                 try:
                     post = response.json()
+                    self.check_schema("Post Creation Schema", 'Post', post)
                     if 'postId' in post or 'id' in post:
-                        post_id = post.get('postId', post.get('id'))
-                        self.test_like_post(post_id)
+                        return post.get('postId', post.get('id'))
                 except json.JSONDecodeError:
                     self.log_test("Post Creation Response", False, "Invalid JSON")
         except requests.exceptions.RequestException as e:
             self.log_test("POST /posts", False, f"Error: {str(e)}")
+        return None
 
     def test_like_post(self, post_id: str):
         """Test liking a post"""
@@ -331,7 +366,7 @@ class LeoConnectDetailedTester:
                 f"POST /posts/{post_id}/like",
                 response.status_code in [200, 201],
                 f"Status: {response.status_code}",
-                f"Response: {response.text}"
+                self.preview(response, limit=None)
             )
         except requests.exceptions.RequestException as e:
             self.log_test(f"POST /posts/:id/like", False, f"Error: {str(e)}")
@@ -343,7 +378,7 @@ class LeoConnectDetailedTester:
         print(f"{Colors.BLUE}{'='*70}{Colors.RESET}\n")
 
         try:
-            response = requests.get(f"{self.base_url}/districts", timeout=10)
+            response = self.session.get(f"{self.base_url}/districts", timeout=10)
 
             # Check CORS headers
             cors_headers = {
@@ -352,11 +387,12 @@ class LeoConnectDetailedTester:
                 'Access-Control-Allow-Headers': response.headers.get('Access-Control-Allow-Headers'),
             }
 
-            print(f"  {Colors.CYAN}CORS Headers:{Colors.RESET}")
-            for header, value in cors_headers.items():
-                if value:
-                    print(f"    {header}: {value}")
-            print()
+            if not self.quiet:
+                print(f"  {Colors.CYAN}CORS Headers:{Colors.RESET}")
+                for header, value in cors_headers.items():
+                    if value:
+                        print(f"    {header}: {value}")
+                print()
 
             has_cors = cors_headers['Access-Control-Allow-Origin'] is not None
             self.log_test(
@@ -364,11 +400,43 @@ class LeoConnectDetailedTester:
                 has_cors,
                 f"CORS {'enabled' if has_cors else 'disabled'}"
             )
+
+            content_type = response.headers.get('Content-Type', '')
+            self.log_test(
+                "Content-Type",
+                'application/json' in content_type,
+                f"Content-Type: {content_type or 'missing'}"
+            )
+
+            encoding = response.headers.get('Content-Encoding', 'identity')
+            size = len(response.content)
+            vary = response.headers.get('Vary', '')
+            details = f"Content-Encoding: {encoding}, {size} bytes decoded, Vary: {vary or 'missing'}"
+            if encoding == 'identity' and size >= 1024:
+                # Advisory only: compression_probe.py enforces the size budgets
+                self.log_warning("Compression", details)
+            else:
+                # A compressed body without Vary can be served from caches to clients that cannot decode it
+                self.log_test("Compression", encoding == 'identity' or 'accept-encoding' in vary.lower(), details)
         except requests.exceptions.RequestException as e:
             self.log_test("CORS Check", False, f"Error: {str(e)}")
 
-    def run_all_tests(self):
+    def build_task_graph(self) -> TaskGraph:
+        """Independent sections run concurrently; edges carry real data dependencies"""
+        graph = TaskGraph()
+        graph.add("auth", self.test_authentication)
+        graph.add("feed", self.test_feed_endpoint)
+        graph.add("districts", self.test_districts)
+        graph.add("clubs", self.test_clubs_for_districts, depends_on=["districts"])
+        graph.add("create_post", self.test_create_post)
+        graph.add("like_post", lambda post_id: post_id and self.test_like_post(post_id),
+                  depends_on=["create_post"])
+        graph.add("cors", self.test_cors)
+        return graph
+
+    def run_all_tests(self, workers: int = 8):
         """Run all tests"""
+        started = time.perf_counter()
         print(f"\n{Colors.BOLD}{Colors.BLUE}{'='*70}{Colors.RESET}")
         print(f"{Colors.BOLD}LeoConnect API Detailed Test Suite{Colors.RESET}")
         print(f"{Colors.BOLD}Base URL: {self.base_url}{Colors.RESET}")
@@ -384,11 +452,10 @@ class LeoConnectDetailedTester:
             print(f"\n{Colors.RED}API is not reachable. Stopping tests.{Colors.RESET}")
             return
 
-        self.test_authentication()
-        self.test_feed_endpoint()
-        self.test_districts_and_clubs()
-        self.test_create_post()
-        self.test_cors()
+        runner = ConcurrentRunner(self, max_workers=workers)
+        runner.run(self.build_task_graph())
+        self.wall_time = time.perf_counter() - started
+        print(f"\n{Colors.BOLD}Sections finished in {runner.elapsed:.2f}s ({runner.max_workers} workers){Colors.RESET}")
 
         # Print summary
         self.print_summary()
@@ -418,19 +485,79 @@ class LeoConnectDetailedTester:
                         print(f"    {result['message']}")
             print()
 
+        if self.warnings:
+            print(f"{Colors.YELLOW}Warnings:{Colors.RESET}")
+            for warning in self.warnings:
+                print(f"  ⚠ {warning['test']}: {warning['message']}")
+            print()
+
+        if self.latency.total_count:
+            print(f"{Colors.CYAN}Latency by endpoint (ms):{Colors.RESET}")
+            for line in self.latency.report_lines(self.wall_time):
+                print(f"  {line}")
+            print()
+
+        connections = shared_adapter().stats
+        if connections.requests:
+            print(f"{Colors.CYAN}Connection phases (ms):{Colors.RESET}")
+            for line in connections.report_lines():
+                print(f"  {line}")
+            print()
+
+        if self.cache is not None and self.cache.stats:
+            print(f"{Colors.CYAN}HTTP cache:{Colors.RESET}")
+            for line in self.cache.report_lines():
+                print(f"  {line}")
+            print()
+
+        if self.schemas.stats:
+            print(f"{Colors.CYAN}Response schemas:{Colors.RESET}")
+            for line in self.schemas.report_lines():
+                print(f"  {line}")
+            print()
+
+        if self.overhead is not None:
+            print_overhead(self.overhead)
+
         print(f"{Colors.BOLD}Completed at: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}{Colors.RESET}")
         print(f"{Colors.BLUE}{'='*70}{Colors.RESET}\n")
 
 
 def main():
     """Main function"""
-    token = None
-    if len(sys.argv) > 1:
-        token = sys.argv[1]
+    parser = argparse.ArgumentParser(description="LeoConnect API detailed test suite")
+    parser.add_argument('token', nargs='?', help="Bearer token for authenticated tests")
+    parser.add_argument('--base-url', default="https://leoconnect.rexosphere.com")
+    parser.add_argument('--workers', type=int, default=8,
+                        help="Concurrent sections (1 runs everything sequentially)")
+    add_pool_arguments(parser)
+    add_cache_arguments(parser)
+    add_record_arguments(parser)
+    add_live_arguments(parser)
+    add_quiet_arguments(parser)
+    add_history_arguments(parser)
+    add_stand_in_arguments(parser)
+    args = parser.parse_args()
+    configure_pool_from_args(args)
+    start_stand_in(args)
+    record_from_args(args, 'test_api_detailed')
+    live = live_from_args(args, 'test_api_detailed')
+    events = events_from_args(args)
+
+    token = args.token
+    if token:
         print(f"Using provided authentication token")
 
-    tester = LeoConnectDetailedTester(token=token)
-    tester.run_all_tests()
+    tester = LeoConnectDetailedTester(base_url=args.base_url, token=token, cache=cache_from_args(args),
+                                      quiet=args.quiet, events=events, overhead=overhead_from_args(args))
+    with live_view(live), quiet_output(args.quiet):
+        tester.run_all_tests(workers=args.workers)
+    if args.quiet or (live is not None and live.enabled):
+        tester.print_summary()
+    close_events(events)
+    passed = sum(1 for r in tester.test_results if r['passed'])
+    save_from_args(args, 'test_api_detailed', tester.latency, tester.wall_time,
+                   extra={'tests': {'passed': passed, 'failed': len(tester.test_results) - passed}})
 
 
 if __name__ == "__main__":
@@ -0,0 +1,396 @@
+#!/usr/bin/env python3
+"""
+LeoConnect Traffic Log
+Records every request through the shared pool to a compact JSON Lines log and replays it at 1x, Nx or full speed
+"""
+
+import argparse
+import atexit
+import base64
+import gzip
+import hashlib
+import json
+import threading
+import time
+from datetime import datetime
+from typing import Any, Dict, List, Optional
+from urllib.parse import urlsplit
+
+import requests
+
+from bench_history import add_history_arguments, save_from_args
+from colors import Colors
+from http_pool import add_listener, add_pool_arguments, configure_pool_from_args, mount_shared_pool
+from latency import LatencyHistogram, LatencyRecorder, route_template, status_class
+from stub_server import add_stand_in_arguments, start_stand_in
+
+
+LOG_VERSION = 1
+
+# Request headers a replay needs to reproduce the same exchange (Authorization is aliased separately)
+REPLAYED_HEADERS = ('Accept', 'Content-Type', 'Idempotency-Key')
+
+
+def _open(path: str, mode: str):
+    """Plain or gzip-compressed (by .gz suffix) text file"""
+    if path.endswith('.gz'):
+        return gzip.open(path, mode + 't', encoding='utf-8')
+    return open(path, mode, encoding='utf-8')
+
+
+def headers_time(timing) -> Optional[float]:
+    """Seconds from starting the request to having response headers (connect + send + server time)"""
+    if timing is None or timing.headers_at is None:
+        return None
+    return timing.headers_at - timing.started
+
+
+class TrafficRecorder:
+    """
+    Shared-pool listener writing one line per request. Bodies are stored once per
+    hash, tokens are replaced by stable aliases (a1, a2, ...) unless keep_tokens,
+    and each request carries its lane (issuing thread) so replays keep ordering.
+    """
+
+    def __init__(self, path: str, tool: str, keep_tokens: bool = False):
+        self.path = path
+        self.keep_tokens = keep_tokens
+        self.started = time.perf_counter()
+        self.count = 0
+        self._file = _open(path, 'w')
+        self._lock = threading.Lock()
+        self._bodies = set()
+        self._aliases: Dict[str, str] = {}
+        self._lanes: Dict[int, int] = {}
+        self._closed = False
+        self._write({'type': 'header', 'version': LOG_VERSION, 'tool': tool,
+                     'recorded_at': datetime.now().isoformat(timespec='seconds')})
+
+    def _write(self, entry: Dict[str, Any]):
+        self._file.write(json.dumps(entry, separators=(',', ':')) + '\n')
+
+    def _alias(self, authorization: Optional[str]) -> Optional[str]:
+        if not authorization:
+            return None
+        alias = self._aliases.get(authorization)
+        if alias is None:
+            alias = self._aliases[authorization] = f"a{len(self._aliases) + 1}"
+            entry = {'type': 'auth', 'alias': alias}
+            if self.keep_tokens:
+                entry['authorization'] = authorization
+            self._write(entry)
+        return alias
+
+    def _body(self, body) -> Optional[str]:
+        if body is None:
+            return None
+        if isinstance(body, str):
+            body = body.encode()
+        if not isinstance(body, bytes):
+            return None
+        digest = hashlib.sha1(body).hexdigest()[:16]
+        if digest not in self._bodies:
+            self._bodies.add(digest)
+            try:
+                self._write({'type': 'body', 'hash': digest, 'text': body.decode()})
+            except UnicodeDecodeError:
+                self._write({'type': 'body', 'hash': digest, 'b64': base64.b64encode(body).decode()})
+        return digest
+
+    def __call__(self, request, response, timing, error):
+        parts = urlsplit(request.url)
+        entry = {
+            'type': 'req',
+            't': round(timing.started - self.started, 6),
+            'm': request.method,
+            'p': parts.path or '/',
+        }
+        if parts.query:
+            entry['q'] = parts.query
+        headers = {name: request.headers[name] for name in REPLAYED_HEADERS if name in request.headers}
+        if headers:
+            entry['h'] = headers
+        if response is not None:
+            entry['s'] = response.status_code
+            size = response.headers.get('Content-Length')
+            if size is not None and size.isdigit():
+                entry['n'] = int(size)
+            entry['d'] = round(headers_time(timing) or 0.0, 6)
+        else:
+            entry['e'] = type(error).__name__
+        with self._lock:
+            if self._closed:
+                return
+            entry['l'] = self._lanes.setdefault(threading.get_ident(), len(self._lanes))
+            alias = self._alias(request.headers.get('Authorization'))
+            if alias:
+                entry['a'] = alias
+            body = self._body(request.body)
+            if body:
+                entry['b'] = body
+            self._write(entry)
+            self.count += 1
+
+    def close(self):
+        with self._lock:
+            if not self._closed:
+                self._closed = True
+                self._file.close()
+
+
+def start_recording(path: str, tool: str, keep_tokens: bool = False) -> TrafficRecorder:
+    """Record every request made through the shared pool from now until exit"""
+    recorder = TrafficRecorder(path, tool, keep_tokens)
+    add_listener(recorder)
+    atexit.register(recorder.close)
+    return recorder
+
+
+def add_record_arguments(parser):
+    """--record-traffic options for tools whose traffic can be replayed"""
+    parser.add_argument('--record-traffic', metavar='PATH', help="Log every request to PATH (.gz to compress)")
+    parser.add_argument('--record-tokens', action='store_true',
+                        help="Store bearer tokens in the traffic log so a replay can reuse them")
+
+
+def record_from_args(args, tool: str) -> Optional[TrafficRecorder]:
+    if not getattr(args, 'record_traffic', None):
+        return None
+    return start_recording(args.record_traffic, tool, args.record_tokens)
+
+
+class TrafficLog:
+    """A recorded log loaded for replay"""
+
+    def __init__(self, path: str):
+        self.header: Dict[str, Any] = {}
+        self.bodies: Dict[str, bytes] = {}
+        self.auth: Dict[str, Optional[str]] = {}
+        self.requests: List[Dict[str, Any]] = []
+        with _open(path, 'r') as f:
+            for line in f:
+                try:
+                    entry = json.loads(line)
+                except ValueError:
+                    continue
+                kind = entry.get('type')
+                if kind == 'req':
+                    self.requests.append(entry)
+                elif kind == 'body':
+                    self.bodies[entry['hash']] = (entry['text'].encode() if 'text' in entry
+                                                  else base64.b64decode(entry['b64']))
+                elif kind == 'auth':
+                    self.auth[entry['alias']] = entry.get('authorization')
+                elif kind == 'header':
+                    self.header = entry
+        self.requests.sort(key=lambda r: r['t'])
+
+    @property
+    def span(self) -> float:
+        return self.requests[-1]['t'] - self.requests[0]['t'] if self.requests else 0.0
+
+    def lanes(self) -> Dict[int, List[Dict[str, Any]]]:
+        lanes: Dict[int, List[Dict[str, Any]]] = {}
+        for entry in self.requests:
+            lanes.setdefault(entry.get('l', 0), []).append(entry)
+        return lanes
+
+    def peak_concurrency(self) -> int:
+        """Most requests in flight at once (from recorded start and time-to-headers)"""
+        edges = []
+        for entry in self.requests:
+            edges.append((entry['t'], 1))
+            edges.append((entry['t'] + entry.get('d', 0.0), -1))
+        peak = current = 0
+        for _, delta in sorted(edges):
+            current += delta
+            peak = max(peak, current)
+        return peak
+
+
+def endpoint_of(entry: Dict[str, Any]) -> str:
+    return f"{entry['m']} {route_template(entry['p'])}"
+
+
+class Replayer:
+    """
+    Re-issues a TrafficLog against another backend. Each recorded lane replays in
+    order on its own thread, sleeping until its request's original offset divided
+    by `speed` (speed None = no waiting), so concurrency and gaps are preserved.
+    """
+
+    def __init__(self, log: TrafficLog, base_url: str, speed: Optional[float] = 1.0,
+                 authorization: Optional[Dict[str, str]] = None, timeout: float = 30):
+        self.log = log
+        self.base_url = base_url.rstrip('/')
+        self.speed = speed
+        self.authorization = authorization or {}
+        self.timeout = timeout
+        self.recorder = LatencyRecorder()
+        self.original = LatencyRecorder()
+        self.pairs: List[tuple] = []
+        self.mismatches: Dict[str, int] = {}
+        self.lag = LatencyHistogram()
+        self._lock = threading.Lock()
+
+    def _headers(self, entry: Dict[str, Any]) -> Dict[str, str]:
+        headers = dict(entry.get('h', {}))
+        alias = entry.get('a')
+        if alias:
+            authorization = self.authorization.get(alias) or self.authorization.get('*') or self.log.auth.get(alias)
+            if authorization:
+                headers['Authorization'] = authorization
+        return headers
+
+    def _lane(self, entries: List[Dict[str, Any]], origin: float, start: float):
+        session = mount_shared_pool(requests.Session())
+        session.headers.clear()
+        for entry in entries:
+            if self.speed:
+                due = start + (entry['t'] - origin) / self.speed
+                delay = due - time.perf_counter()
+                if delay > 0:
+                    time.sleep(delay)
+                with self._lock:
+                    self.lag.record_seconds(max(0.0, time.perf_counter() - due))
+            url = f"{self.base_url}{entry['p']}" + (f"?{entry['q']}" if entry.get('q') else '')
+            body = self.log.bodies.get(entry.get('b')) if entry.get('b') else None
+            sent = time.perf_counter()
+            status = None
+            elapsed = None
+            try:
+                response = session.request(entry['m'], url, data=body, headers=self._headers(entry),
+                                           timeout=self.timeout)
+                status = response.status_code
+                elapsed = headers_time(getattr(response, 'timing', None))
+            except requests.exceptions.RequestException:
+                pass
+            name = endpoint_of(entry)
+            end = sent + (elapsed if elapsed is not None else time.perf_counter() - sent)
+            self.recorder.record(name, status_class(status), sent, end)
+            if 'd' in entry:
+                self.original.record(name, status_class(entry.get('s')), 0.0, entry['d'])
+            with self._lock:
+                if status != entry.get('s'):
+                    key = f"{name} {entry.get('s', 'error')} -> {status or 'error'}"
+                    self.mismatches[key] = self.mismatches.get(key, 0) + 1
+                if 'd' in entry and elapsed is not None:
+                    self.pairs.append((name, entry['d'], elapsed))
+
+    def run(self) -> float:
+        lanes = self.log.lanes()
+        origin = self.log.requests[0]['t'] if self.log.requests else 0.0
+        start = time.perf_counter() + 0.2
+        threads = [threading.Thread(target=self._lane, args=(entries, origin, start), daemon=True)
+                   for entries in lanes.values()]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        return time.perf_counter() - start
+
+
+def print_log_summary(log: TrafficLog, path: str):
+    counts: Dict[str, int] = {}
+    for entry in log.requests:
+        counts[endpoint_of(entry)] = counts.get(endpoint_of(entry), 0) + 1
+    print(f"\n{Colors.BOLD}{path}: {len(log.requests)} requests over {log.span:.1f}s from "
+          f"{log.header.get('tool', '?')} ({log.header.get('recorded_at', '?')}){Colors.RESET}")
+    print(f"{len(log.lanes())} lanes, peak {log.peak_concurrency()} in flight, {len(log.bodies)} distinct bodies, "
+          f"{len(log.auth)} identities ({sum(1 for v in log.auth.values() if v)} with stored tokens)\n")
+    for name, count in sorted(counts.items(), key=lambda item: -item[1]):
+        print(f"  {count:>7}  {name}")
+    print()
+
+
+def print_comparison(replayer: Replayer):
+    """Per endpoint: recorded vs replayed time-to-headers, and the median per-request ratio"""
+    by_endpoint: Dict[str, List[float]] = {}
+    for name, before, after in replayer.pairs:
+        if before > 0:
+            by_endpoint.setdefault(name, []).append(after / before)
+    print(f"\n{Colors.BOLD}Recorded vs replayed time to headers (ms){Colors.RESET}")
+    print(f"{'Endpoint':<34}{'Count':>7}{'p50 rec':>9}{'p50 new':>9}{'p95 rec':>9}{'p95 new':>9}{'median x':>10}")
+    for name in sorted(by_endpoint):
+        before = replayer.original.combined(name).histogram
+        after = replayer.recorder.combined(name).histogram
+        ratios = sorted(by_endpoint[name])
+        median = ratios[len(ratios) // 2]
+        color = Colors.RED if median > 1.1 else Colors.GREEN if median < 0.9 else ''
+        print(f"{name[:33]:<34}{len(ratios):>7}{before.percentile(50) / 1000:>9.1f}{after.percentile(50) / 1000:>9.1f}"
+              f"{before.percentile(95) / 1000:>9.1f}{after.percentile(95) / 1000:>9.1f}"
+              f"{color}{median:>9.2f}x{Colors.RESET}")
+    if replayer.mismatches:
+        print(f"\n{Colors.YELLOW}Status differences (recorded -> replayed):{Colors.RESET}")
+        for key, count in sorted(replayer.mismatches.items(), key=lambda item: -item[1]):
+            print(f"  {count:>6}  {key}")
+    if replayer.speed and replayer.lag.total_count:
+        print(f"\nSchedule lag: p50 {replayer.lag.percentile(50) / 1000:.1f} ms, "
+              f"p99 {replayer.lag.percentile(99) / 1000:.1f} ms behind the scaled timeline")
+    print()
+
+
+def parse_speed(text: str) -> Optional[float]:
+    if text.lower() in ('max', 'inf', '0'):
+        return None
+    speed = float(text.lower().rstrip('x'))
+    if speed <= 0:
+        raise argparse.ArgumentTypeError("speed must be positive or 'max'")
+    return speed
+
+
+def main():
+    """Main function"""
+    parser = argparse.ArgumentParser(description="LeoConnect traffic record and replay")
+    commands = parser.add_subparsers(dest='command', required=True)
+
+    show = commands.add_parser('show', help="Summarise a traffic log")
+    show.add_argument('log')
+
+    replay = commands.add_parser('replay', help="Re-issue a traffic log against a backend")
+    replay.add_argument('log')
+    replay.add_argument('--base-url', default="https://leoconnect.rexosphere.com")
+    replay.add_argument('--speed', type=parse_speed, default=1.0, help="Time scale: 1, 10, ... or 'max'")
+    replay.add_argument('--token', help="Bearer token used for every recorded identity")
+    replay.add_argument('--tokens-file', help="Tokens for recorded identities a1, a2, ... one per line")
+    add_pool_arguments(replay)
+    add_history_arguments(replay)
+    add_stand_in_arguments(replay)
+    args = parser.parse_args()
+
+    log = TrafficLog(args.log)
+    if args.command == 'show':
+        print_log_summary(log, args.log)
+        return
+    if not log.requests:
+        raise SystemExit(f"No requests in {args.log}")
+
+    authorization = {}
+    if args.token:
+        authorization['*'] = f"Bearer {args.token}"
+    if args.tokens_file:
+        with open(args.tokens_file) as f:
+            for index, line in enumerate(l.strip() for l in f if l.strip()):
+                authorization[f"a{index + 1}"] = f"Bearer {line}"
+    lanes = len(log.lanes())
+    configure_pool_from_args(args, default_maxsize=lanes)
+    start_stand_in(args)
+
+    speed = 'max speed' if args.speed is None else f"{args.speed:g}x"
+    print(f"\n{Colors.BOLD}LeoConnect Traffic Replay ({speed}){Colors.RESET}")
+    print(f"{Colors.BOLD}Log: {args.log} ({len(log.requests)} requests, {lanes} lanes, "
+          f"{log.span:.1f}s recorded){Colors.RESET}")
+    print(f"{Colors.BOLD}Base URL: {args.base_url}{Colors.RESET}")
+    print(f"{Colors.BOLD}Started at: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}{Colors.RESET}")
+
+    replayer = Replayer(log, args.base_url, args.speed, authorization)
+    wall_time = replayer.run()
+    print(f"\nReplayed {replayer.recorder.total_count} requests in {wall_time:.1f}s "
+          f"({replayer.recorder.total_count / max(wall_time, 1e-9):.1f} req/s)")
+    print_comparison(replayer)
+    save_from_args(args, f"replay:{log.header.get('tool', 'unknown')}", replayer.recorder, wall_time,
+                   extra={'log': args.log, 'speed': args.speed})
+
+
+if __name__ == "__main__":
+    main()